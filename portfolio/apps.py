@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PortfolioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portfolio'
+
+    def ready(self):
+        # Connect the signal receivers keeping the search indexes and the fragment cache current, and generating the
+        # previews of the documents.
+        from portfolio import fragment_cache, previews, search, typeahead  # noqa: F401
+
+        # Time every template render for the template report.
+        if getattr(settings, 'TEMPLATE_PROFILING', False):
+            from portfolio import template_profiling
+            template_profiling.install()
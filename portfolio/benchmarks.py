@@ -0,0 +1,319 @@
+"""View-level benchmark of every named route of vcpms/urls.py.
+
+The benchmark command seeds a throwaway database at a chosen scale and requests every named route through the test
+client, logged in as a staff user, a number of times. Each route records:
+
+- median_ms, p95_ms: the wall-clock latency of the request, including reading a streamed response,
+- queries, sql_ms: the number of SQL queries and the time spent executing them (median over the requests),
+- template_ms: the time spent rendering templates, which includes the queries run lazily while rendering.
+
+Every request runs in a transaction that is rolled back, so routes that write on GET (archive, logout, ...) leave the
+dataset as it was for the next request.
+
+Budgets
+-------
+The main pages have budgets that a change must not exceed at any scale, see BUDGETS:
+
+- dashboard: the company grid, which must not query per company,
+- portfolio_company: the company page (see CompanyPageLoader), in a fixed number of queries,
+- individual_profile: the individual page,
+- programme_detail: the programme page.
+
+Query budgets do not depend on the machine. Latency budgets are generous upper bounds for the default scale on a
+developer laptop; a baseline (a previous results file) gives a tighter comparison on the same machine.
+"""
+import io
+import json
+import logging
+import math
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+from django.urls import URLPattern, reverse
+
+from portfolio.instrumentation import RequestTimings, measure
+from portfolio.models import Programme, Investment, Investor, Founder, Document, User, Portfolio_Company
+from portfolio.models.investment_model import ContractRight
+from portfolio.seeders import UserSeeder, CompanySeeder, PortfolioCompaniesSeeder, IndividualSeeder, \
+    InvestorCompanySeeder, InvestorIndividualSeeder, InvestmentSeeder, ProgrammeSeeder, DocumentSeeder, \
+    FounderSeeder, DerivedDataSeeder
+
+# The dataset of each scale is the default seed multiplied by the scale.
+SEED_COUNTS = {
+    'companies': 25,
+    'portfolio_companies': 25,
+    'individuals': 25,
+    'investor_companies': 5,
+    'investor_individuals': 5,
+    'investments': 50,
+    'programmes': 5,
+    'documents': 100,
+    'founders': 10,
+}
+
+# The budget of a page holds at every scale: its number of queries must not grow with the dataset.
+BUDGETS = {
+    'dashboard': {'queries': 5, 'median_ms': 100},
+    'portfolio_company': {'queries': 12, 'median_ms': 150},
+    'individual_profile': {'queries': 30, 'median_ms': 150},
+    'programme_detail': {'queries': 10, 'median_ms': 100},
+}
+
+# The sample row whose id is given to the routes taking an id, when the parameter name alone is ambiguous.
+ROUTE_SAMPLES = {
+    'individual_update': {'id': 'individual'},
+    'individual_delete': {'id': 'individual'},
+    'founder_delete': {'id': 'founder'},
+    'founder_modify': {'id': 'founder'},
+    'individual_profile': {'id': 'individual'},
+    'archive_individual': {'id': 'individual'},
+    'unarchive_individual': {'id': 'individual'},
+    'investor_individual_modify': {'id': 'investor_individual'},
+    'programme_update': {'id': 'programme'},
+    'programme_delete': {'id': 'programme'},
+    'programme_detail': {'id': 'programme'},
+    'permission_edit_user': {'id': 'user'},
+    'permission_delete_user': {'id': 'user'},
+    'permission_reset_password': {'id': 'user'},
+    'permission_edit_group': {'id': 'group'},
+    'permission_delete_group': {'id': 'group'},
+    'investment_update': {'id': 'investment'},
+    'investment_delete': {'id': 'investment'},
+    'investor_company_update': {'company_id': 'investor_company'},
+    'contract_right_delete': {'id': 'contract_right'},
+    'open_url': {'file_id': 'url_document'},
+}
+
+# The query string of the routes reading GET parameters.
+ROUTE_QUERIES = {
+    'company_search_result': {'searchresult': 'an'},
+    'individual_search_result': {'searchresult': 'an'},
+    'programme_search_result': {'searchresult': 'an'},
+    'archive_search': {'searchresult': 'an'},
+    'change_company_layout': {'layout_number': 2},
+    'change_individual_layout': {'layout_number': 2},
+    'change_company_filter': {'filter_number': 2},
+    'change_individual_filter': {'filter_number': 2},
+    'change_archived_company_filter': {'filter_number': 2},
+    'change_archived_individual_filter': {'filter_number': 2},
+}
+
+# The sample row, or value, given to a route parameter by name.
+PARAMETER_SAMPLES = {
+    'company_id': 'company',
+    'individual_id': 'individual',
+    'programme_id': 'programme',
+    'investment_id': 'investment',
+    'file_id': 'document',
+    'dataset': 'investments',
+    'export_format': 'csv',
+}
+
+
+@contextmanager
+def throwaway_database(scale, workers=1):
+    """Runs the block against a temporary test database seeded at the given scale, with a temporary MEDIA_ROOT."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = f"{directory}/benchmark.sqlite3"
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(MEDIA_ROOT=f"{directory}/media"):
+                print(f"seeding scale {scale}...")
+                with redirect_stdout(io.StringIO()):
+                    seed(scale, workers=workers)
+                yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def seed(scale, workers=1):
+    """Seeds the current database with the default dataset multiplied by the scale."""
+
+    counts = {name: count * scale for name, count in SEED_COUNTS.items()}
+    for seeder in [UserSeeder(),
+                   CompanySeeder(counts['companies'], workers=workers),
+                   PortfolioCompaniesSeeder(counts['portfolio_companies'], workers=workers),
+                   IndividualSeeder(counts['individuals'], workers=workers),
+                   InvestorCompanySeeder(counts['investor_companies']),
+                   InvestorIndividualSeeder(counts['investor_individuals']),
+                   InvestmentSeeder(counts['investments']),
+                   ProgrammeSeeder(counts['programmes']),
+                   DocumentSeeder(counts['documents']),
+                   FounderSeeder(counts['founders']),
+                   DerivedDataSeeder()]:
+        seeder.seed()
+    Group.objects.get_or_create(name="Benchmark group")
+
+
+def samples():
+    """Returns the id of the row each kind of route is requested with, the busiest row where it matters."""
+
+    portfolio_company = Portfolio_Company.objects.annotate(investments=Count('startup')).order_by(
+        '-investments', 'id').first()
+    programme = Programme.objects.annotate(participant_count=Count('participants')).order_by(
+        '-participant_count', 'id').first()
+    investor_individual = Investor.objects.filter(individual__isnull=False).order_by('id').first()
+    return {
+        'company': portfolio_company.parent_company_id if portfolio_company else None,
+        'portfolio_company': portfolio_company.id if portfolio_company else None,
+        'individual': investor_individual.individual_id if investor_individual else None,
+        'investor_individual': investor_individual.id if investor_individual else None,
+        'investor_company': _first_id(Investor.objects.filter(company__isnull=False)),
+        'founder': _first_id(Founder.objects.all()),
+        'programme': programme.id if programme else None,
+        'investment': _first_id(Investment.objects.all()),
+        'contract_right': _first_id(ContractRight.objects.all()),
+        'document': _first_id(Document.objects.exclude(file='')),
+        'url_document': _first_id(Document.objects.filter(url__isnull=False)),
+        'user': _first_id(User.objects.filter(is_staff=False)),
+        'group': _first_id(Group.objects.all()),
+    }
+
+
+def _first_id(queryset):
+    return queryset.order_by('pk').values_list('pk', flat=True).first()
+
+
+def named_routes(urlpatterns, sample_ids):
+    """Returns {name: path} for every named route of the url patterns, and {name: reason} for those without a
+    sample for one of their parameters."""
+
+    routes = {}
+    skipped = {}
+    for pattern in urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in routes:
+            continue
+        kwargs = {}
+        for parameter in pattern.pattern.converters:
+            sample = ROUTE_SAMPLES.get(pattern.name, {}).get(parameter) or PARAMETER_SAMPLES.get(parameter)
+            value = sample_ids[sample] if sample in sample_ids else sample
+            if value is None:
+                skipped[pattern.name] = f"no sample for {parameter}"
+                break
+            kwargs[parameter] = value
+        else:
+            routes[pattern.name] = reverse(pattern.name, kwargs=kwargs)
+            if pattern.name in ROUTE_QUERIES:
+                routes[pattern.name] += f"?{urlencode(ROUTE_QUERIES[pattern.name])}"
+    return routes, skipped
+
+
+def percentile(values, percentile):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percentile * len(ordered)) - 1)]
+
+
+class Benchmark:
+    """Requests routes with the test client, logged in as the given user, and measures each request."""
+
+    def __init__(self, user, repeat=10, warmup=1):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+        session = self.client.session
+        for variable in ['company_filter', 'company_layout', 'individual_filter', 'individual_layout',
+                         'archived_company_filter', 'archived_individual_filter']:
+            session[variable] = 1
+        session.save()
+        self.session_key = session.session_key
+
+    def run(self, routes):
+        """Returns the results of every route, by name."""
+
+        # Server errors are reported by their status, not logged.
+        logger = logging.getLogger('django.request')
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        try:
+            return {name: self.measure(path) for name, path in routes.items()}
+        finally:
+            logger.setLevel(level)
+
+    def measure(self, path):
+        for _ in range(self.warmup):
+            self._request(path)
+        requests = [self._request(path) for _ in range(self.repeat)]
+        latencies = [timings.latency * 1000 for timings in requests]
+        return {
+            'path': path,
+            'status': requests[-1].status,
+            'median_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'queries': statistics.median_low([timings.queries for timings in requests]),
+            'sql_ms': round(statistics.median([timings.sql_time * 1000 for timings in requests]), 2),
+            'template_ms': round(statistics.median([timings.template_time * 1000 for timings in requests]), 2),
+        }
+
+    def _request(self, path):
+        # Restore the session, which a previous request may have flushed (e.g. logout).
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = self.session_key
+        timings = RequestTimings()
+        with transaction.atomic():
+            with measure(timings):
+                start = time.perf_counter()
+                response = self.client.get(path)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.latency = time.perf_counter() - start
+            transaction.set_rollback(True)
+        timings.status = response.status_code
+        return timings
+
+
+def check_budgets(results, budgets=None):
+    """Returns a message for every budget a route exceeds."""
+
+    failures = []
+    for name, budget in (BUDGETS if budgets is None else budgets).items():
+        if name not in results:
+            continue
+        for metric, limit in budget.items():
+            if results[name][metric] > limit:
+                failures.append(f"{name}: {metric} {results[name][metric]} exceeds its budget of {limit}")
+    return failures
+
+
+def compare(results, baseline, latency_threshold=0.25, query_threshold=0, min_delta_ms=1.0):
+    """Returns a message for every route that regressed from the baseline results: more than query_threshold extra
+    queries, or a median latency more than latency_threshold (a fraction) and min_delta_ms above the baseline."""
+
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries'] + query_threshold:
+            regressions.append(f"{name}: {result['queries']} queries, {previous['queries']} in the baseline")
+        slower = result['median_ms'] - previous['median_ms']
+        if slower > min_delta_ms and result['median_ms'] > previous['median_ms'] * (1 + latency_threshold):
+            regressions.append(f"{name}: median {result['median_ms']} ms, {previous['median_ms']} ms in the "
+                               f"baseline")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)['routes']
+
+
+def write_results(path, results, skipped, scale, repeat):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'scale': scale, 'repeat': repeat, 'routes': results, 'skipped': skipped}, file, indent=2,
+                  sort_keys=True)
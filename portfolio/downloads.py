@@ -0,0 +1,149 @@
+"""Streaming file downloads with HTTP range requests and revalidation.
+
+A stored file is sent in chunks of DOWNLOAD_CHUNK_SIZE bytes read one at a time, so a worker holds at most one chunk of
+it in memory whatever the size of the file. The response supports:
+
+- Range: a single byte range (bytes=first-last, bytes=first- or bytes=-suffix) is answered with 206 Partial Content,
+  which lets clients resume an interrupted download. A range outside the file is answered with 416, and multiple
+  ranges or malformed headers are ignored, sending the whole file as RFC 9110 allows.
+- If-Range: the range is only honoured while the file still has the given ETag or Last-Modified date, otherwise the
+  whole file is sent, so a resumed download never mixes two versions of a file.
+- If-None-Match, If-Modified-Since (and If-Match, If-Unmodified-Since): answered with 304 or 412 by Django's
+  get_conditional_response.
+
+Every response has a Content-Length, a strong ETag and a Last-Modified date. Downloads are behind a login, so they are
+marked private: browsers keep them and revalidate them with no-cache, shared proxies do not store them.
+"""
+import hashlib
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+
+from vcpms import settings
+
+# Bytes read from the file and sent at a time.
+DOWNLOAD_CHUNK_SIZE = getattr(settings, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+
+CACHE_CONTROL = 'private, no-cache'
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range has no byte in the file."""
+
+
+def file_etag(name, size, modified):
+    """Returns a strong ETag for a version of a stored file, from its name, size and modification time."""
+
+    return quote_etag(hashlib.md5(f'{name}:{size}:{modified.timestamp()}'.encode()).hexdigest())
+
+
+def parse_range(header, size):
+    """Returns the (first, last) byte positions, inclusive, of a Range header for a file of size bytes. Returns None when
+    the header is not a single byte range, so that the whole file is sent, and raises RangeNotSatisfiable when the range
+    starts past the end of the file."""
+
+    match = _RANGE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_chunks(file, offset, length, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Yields length bytes of an open file from offset, chunk_size bytes at a time, and closes the file."""
+
+    try:
+        file.seek(offset)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_validators(field_file, modified=None):
+    """Returns the ETag and the Last-Modified time, in seconds, of a stored file. modified is the time the file last
+    changed, by default its modification time in the storage."""
+
+    if modified is None:
+        modified = field_file.storage.get_modified_time(field_file.name)
+    return file_etag(field_file.name, field_file.size, modified), int(modified.timestamp())
+
+
+def content_disposition(filename, attachment=True):
+    """Returns the Content-Disposition of a file saved as filename, or shown in the browser when not an attachment."""
+
+    return ('attachment; filename=' if attachment else 'inline; filename=') + filename
+
+
+def set_file_headers(response, etag, last_modified):
+    """Sets the validators and the caching headers of a response sending a file, and returns it."""
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def file_response(request, field_file, filename, modified=None, content_type='application/octet-stream',
+                  attachment=True):
+    """Returns a streaming response sending a stored file (a FieldFile) as an attachment, or inline, or the part of it
+    asked by a Range header, or a 304, 412 or 416 response, see the module documentation. modified is the time the file
+    last changed, sent as its Last-Modified date, by default its modification time in the storage."""
+
+    size = field_file.size
+    etag, last_modified = file_validators(field_file, modified)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return set_file_headers(response, etag, last_modified)
+
+    first, last = 0, size - 1
+    status = 200
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_passes(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return set_file_headers(response, etag, last_modified)
+        if byte_range is not None:
+            first, last = byte_range
+            status = 206
+
+    length = last - first + 1
+    file = field_file.storage.open(field_file.name, 'rb')
+    response = StreamingHttpResponse(read_chunks(file, first, length), status=status, content_type=content_type)
+    response['Content-Length'] = str(length)
+    if status == 206:
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Content-Disposition'] = content_disposition(filename, attachment)
+    return set_file_headers(response, etag, last_modified)
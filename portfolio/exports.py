@@ -0,0 +1,106 @@
+"""Streaming exports of investments, companies and individuals as CSV or NDJSON.
+
+Rows are read with QuerySet.iterator(chunk_size=...) and written out one at a time, so an export holds at most one
+chunk of rows in memory whatever the size of the table. Related rows are joined with select_related, and the contract
+rights of each chunk of investments are fetched with a single prefetch query.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from portfolio.models import Company, Individual, Investment
+
+# Rows fetched from the database at a time.
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _investment_rows():
+    investments = Investment.objects.select_related(
+        'investor__company', 'investor__individual', 'startup__parent_company'
+    ).prefetch_related('contractright_set').order_by('id')
+    for investment in investments.iterator(chunk_size=CHUNK_SIZE):
+        investor = investment.investor.company or investment.investor.individual
+        yield {
+            'id': investment.id,
+            'investor_id': investment.investor_id,
+            'investor': investor.name if investor else '',
+            'startup_id': investment.startup_id,
+            'startup': investment.startup.parent_company.name,
+            'typeOfFoundingRounds': investment.typeOfFoundingRounds,
+            'investmentAmount': investment.investmentAmount,
+            'dateInvested': investment.dateInvested,
+            'dateExit': investment.dateExit,
+            'contract_rights': [{'right': contract_right.right, 'details': contract_right.details}
+                                for contract_right in investment.contractright_set.all()],
+        }
+
+
+COMPANY_FIELDS = ['id', 'name', 'company_registration_number', 'trading_names', 'previous_names',
+                  'registered_address', 'jurisdiction', 'incorporation_date', 'is_archived', 'is_investor',
+                  'is_portfolio_company']
+
+
+def _company_rows():
+    return Company.objects.order_by('id').values(*COMPANY_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+INDIVIDUAL_FIELDS = ['id', 'name', 'Company', 'Position', 'Email', 'PrimaryNumber', 'SecondaryNumber',
+                     'AngelListLink', 'CrunchbaseLink', 'LinkedInLink', 'is_archived']
+
+
+def _individual_rows():
+    return Individual.objects.order_by('id').values(*INDIVIDUAL_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+# The exportable datasets: their columns and a function yielding their rows as dicts.
+DATASETS = {
+    'investments': (['id', 'investor_id', 'investor', 'startup_id', 'startup', 'typeOfFoundingRounds',
+                     'investmentAmount', 'dateInvested', 'dateExit', 'contract_rights'], _investment_rows),
+    'companies': (COMPANY_FIELDS, _company_rows),
+    'individuals': (INDIVIDUAL_FIELDS, _individual_rows),
+}
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """Encodes dates and decimals like DjangoJSONEncoder, and any other value (e.g. phone numbers) as a string."""
+
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+class _Echo:
+    """A file-like object returning what is written to it, so csv.writer can produce one line at a time."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=ExportJSONEncoder)
+    return '' if value is None else value
+
+
+def export_lines(dataset, export_format):
+    """Yields the lines of an export of the dataset in the given format ('csv' or 'ndjson')."""
+
+    columns, rows = DATASETS[dataset]
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows():
+            yield writer.writerow([_csv_cell(row[column]) for column in columns])
+    elif export_format == 'ndjson':
+        for row in rows():
+            yield json.dumps({column: row[column] for column in columns}, cls=ExportJSONEncoder) + '\n'
+    else:
+        raise ValueError(f'Unknown export format {export_format}')
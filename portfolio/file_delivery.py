@@ -0,0 +1,121 @@
+"""Delivery of stored files, once a view has authorised the request.
+
+The views serving documents, profile pictures and programme covers check who is asking, then hand the file to deliver.
+The FILE_DELIVERY setting picks who sends its bytes:
+
+- 'stream', the default for development: the worker streams the file itself, see portfolio.downloads.
+- 'x-accel-redirect', behind nginx: the response has no body and an X-Accel-Redirect header giving the path of the
+  file under FILE_DELIVERY_INTERNAL_URL, an internal location of nginx that clients cannot request themselves:
+
+      location /protected-media/ {
+          internal;
+          alias /path/to/media/;
+      }
+
+- 'x-sendfile', behind Apache with mod_xsendfile or lighttpd: the response has no body and an X-Sendfile header giving
+  the absolute path of the file, which must be allowed by XSendFilePath.
+
+FILE_DELIVERY can also be the dotted path of a FileDelivery subclass. When the front-end server sends the file, the
+worker is free as soon as the headers are out: Django still answers the conditional requests it can (304 and 412) and
+sets the Content-Type, Content-Disposition, ETag, Last-Modified and Cache-Control, while the server sends the bytes,
+the Content-Length and the partial content asked by a Range header.
+"""
+import mimetypes
+import os
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.module_loading import import_string
+
+from portfolio.downloads import content_disposition, file_response, file_validators, set_file_headers
+
+
+class FileDelivery:
+    """Sends a stored file in the response to an authorised request."""
+
+    def response(self, request, field_file, filename, modified, content_type, attachment):
+        raise NotImplementedError
+
+
+class StreamingDelivery(FileDelivery):
+    """Streams the file from the worker, with range requests."""
+
+    def response(self, request, field_file, filename, modified, content_type, attachment):
+        return file_response(request, field_file, filename, modified, content_type, attachment)
+
+
+class OffloadedDelivery(FileDelivery):
+    """Hands the file to the front-end server in the header of an empty response."""
+
+    header = None
+
+    def location(self, field_file):
+        """Returns where the front-end server finds the file."""
+
+        raise NotImplementedError
+
+    def response(self, request, field_file, filename, modified, content_type, attachment):
+        etag, last_modified = file_validators(field_file, modified)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(content_type=content_type)
+            response[self.header] = self.location(field_file)
+            response['Content-Disposition'] = content_disposition(filename, attachment)
+        return set_file_headers(response, etag, last_modified)
+
+
+class XAccelRedirectDelivery(OffloadedDelivery):
+    """Hands the file to nginx, as a path under its internal location FILE_DELIVERY_INTERNAL_URL."""
+
+    header = 'X-Accel-Redirect'
+
+    def location(self, field_file):
+        internal_url = getattr(settings, 'FILE_DELIVERY_INTERNAL_URL', '/protected-media/')
+        return internal_url.rstrip('/') + '/' + quote(field_file.name.replace(os.sep, '/'))
+
+
+class XSendfileDelivery(OffloadedDelivery):
+    """Hands the file to Apache (mod_xsendfile) or lighttpd, as an absolute path."""
+
+    header = 'X-Sendfile'
+
+    def location(self, field_file):
+        return field_file.path
+
+
+DELIVERY_BACKENDS = {
+    'stream': StreamingDelivery,
+    'x-accel-redirect': XAccelRedirectDelivery,
+    'x-sendfile': XSendfileDelivery,
+}
+
+
+@lru_cache
+def _backend(name):
+    backend = DELIVERY_BACKENDS.get(name) or import_string(name)
+    return backend()
+
+
+def get_delivery():
+    """Returns the file delivery backend named by the FILE_DELIVERY setting."""
+
+    return _backend(getattr(settings, 'FILE_DELIVERY', 'stream'))
+
+
+def deliver(request, field_file, filename=None, modified=None, content_type=None, attachment=True):
+    """Returns the response sending a stored file (a FieldFile) with the configured backend, as an attachment or
+    inline. The filename defaults to the name of the file in the storage, and the content type is guessed from the
+    filename rather than the storage name, which has no extension for the documents stored by content. modified, the
+    time the file last changed, defaults to its modification time in the storage. Raises Http404 when the field has no
+    file or the file is missing from the storage."""
+
+    if not field_file or not field_file.storage.exists(field_file.name):
+        raise Http404
+    if filename is None:
+        filename = os.path.basename(field_file.name)
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return get_delivery().response(request, field_file, filename, modified, content_type, attachment)
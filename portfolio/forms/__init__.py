@@ -9,3 +9,4 @@ from .investment_form import *
 from .permission_form import *
 from .profile_picture_form import *
 from .programme_form import *
+from .import_form import *
@@ -1,7 +1,8 @@
 from django import forms
+from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
-from portfolio.models import Document
+from portfolio.models import Document, DocumentUpload
 
 
 class DocumentUploadForm(forms.ModelForm):
@@ -61,3 +62,21 @@ class URLUploadForm(forms.ModelForm):
             document.save()
 
         return document
+
+
+class ChunkedUploadForm(forms.ModelForm):
+    """A form starting the upload of a document in chunks, for a company, an individual or a programme."""
+
+    class Meta:
+        model = DocumentUpload
+        fields = ["file_name", "size", "is_private", "company", "individual", "programme"]
+
+    def clean_file_name(self):
+        """Keeps the name of the file as the browser gave it, like DocumentUploadForm does, without its directories and
+        non-printable characters. The storage makes it a valid file name when storing the file."""
+
+        file_name = self.cleaned_data["file_name"].rsplit("/")[-1].rsplit("\\")[-1]
+        file_name = "".join(char for char in file_name if char.isprintable()).strip()
+        if file_name in {"", ".", ".."}:
+            raise ValidationError("The file has no valid name.")
+        return file_name
@@ -0,0 +1,11 @@
+from django import forms
+from django.utils.translation import gettext_lazy as _
+
+from portfolio.imports import IMPORTERS
+
+
+class PortfolioImportForm(forms.Form):
+    """A form for uploading a CSV file of companies, individuals, investors or investments."""
+
+    kind = forms.ChoiceField(label=_("Rows to import:"), choices=[(kind, kind.capitalize()) for kind in IMPORTERS])
+    file = forms.FileField(label=_("Select a CSV file to import:"))
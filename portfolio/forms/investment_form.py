@@ -38,12 +38,12 @@ class InvestmentForm(forms.ModelForm):
         }
 
     investor = InvestorChoiceField(
-        queryset=Investor.objects.all(),
+        queryset=Investor.objects.select_related('company', 'individual'),
         widget=forms.Select()
     )
 
     startup = PortfolioCompanyChoiceField(
-        queryset=Portfolio_Company.objects.all(),
+        queryset=Portfolio_Company.objects.select_related('parent_company'),
         widget=forms.Select()
     )
 
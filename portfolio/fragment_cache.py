@@ -0,0 +1,66 @@
+"""Cache of the rendered company and individual grids.
+
+Toggling the layout or the filter of a listing page re-renders the same few pages over and over. A rendered grid is
+cached under its filter, layout and page, together with the data version of the rows it shows. Saving or deleting any
+of those rows replaces the version (see DataVersion), so stale grids are never served again and simply expire.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import signals
+from django.dispatch import receiver
+from django.utils.safestring import mark_safe
+
+from portfolio.metrics import cache_lookup
+from portfolio.models import Company, Individual, Investor, InvestorCompany, Founder, Portfolio_Company, DataVersion
+from vcpms import settings
+
+COMPANIES = 'companies'
+INDIVIDUALS = 'individuals'
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+
+# The grids whose content depends on the rows of each model.
+DEPENDENT_GRIDS = {
+    Company: [COMPANIES],
+    InvestorCompany: [COMPANIES],
+    Portfolio_Company: [COMPANIES],
+    Individual: [INDIVIDUALS],
+    Founder: [INDIVIDUALS],
+    Investor: [COMPANIES, INDIVIDUALS],
+}
+
+
+def cached_fragment(grid, key, render):
+    """Returns the cached rendering of a grid for the given key, calling render() to produce it on a miss."""
+
+    version = DataVersion.current(grid)
+    digest = hashlib.md5(repr((key, version)).encode()).hexdigest()
+    cache_key = f'fragment:{grid}:{digest}'
+    start = time.perf_counter()
+    html = cache.get(cache_key)
+    cache_lookup('fragment', html is not None, time.perf_counter() - start)
+    if html is None:
+        html = render()
+        cache.set(cache_key, html, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+@receiver(signals.post_save, sender=Company)
+@receiver(signals.post_delete, sender=Company)
+@receiver(signals.post_save, sender=InvestorCompany)
+@receiver(signals.post_delete, sender=InvestorCompany)
+@receiver(signals.post_save, sender=Portfolio_Company)
+@receiver(signals.post_delete, sender=Portfolio_Company)
+@receiver(signals.post_save, sender=Individual)
+@receiver(signals.post_delete, sender=Individual)
+@receiver(signals.post_save, sender=Founder)
+@receiver(signals.post_delete, sender=Founder)
+@receiver(signals.post_save, sender=Investor)
+@receiver(signals.post_delete, sender=Investor)
+def invalidate_grids(sender, instance, **kwargs):
+    """Invalidates the grids showing a saved or deleted row. The versions replaced and the new ones are kept on the
+    row for the typeahead receivers, which run next."""
+
+    instance._bumped_versions = {grid: DataVersion.bump(grid) for grid in DEPENDENT_GRIDS[sender]}
@@ -0,0 +1,269 @@
+"""Bulk import of companies, individuals, investors and investments from CSV.
+
+A CSV file is parsed one row at a time. Each row is validated with the validators of its model (clean_fields and
+clean), its foreign keys are resolved from lookup dicts built once at the start of the import, and its unique values
+are checked against in-memory sets of the values already taken, so validating a row never queries the database.
+Valid rows are written in batches with bulk_create, one transaction per batch. A row that fails is reported with its
+line number and skipped, it never aborts the rest of the import.
+
+bulk_create sends no signals, so the importers update the search indexes, company roles and investment rollups
+themselves, and replace the data versions the typeahead and the cached grids follow.
+"""
+import csv
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError, transaction
+
+from portfolio.fragment_cache import COMPANIES, INDIVIDUALS
+from portfolio.models import Company, Individual, Investor, Investment, InvestmentRollup, Portfolio_Company, \
+    DataVersion
+from portfolio.search import company_index, individual_index
+
+# Rows written per bulk_create and transaction.
+BATCH_SIZE = 500
+
+
+class ImportReport:
+    """The number of rows imported and the errors of the rows that were not, by line number."""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+class Importer:
+    """Builds, validates and writes the instances of a model from CSV rows."""
+
+    model = None
+    columns = []
+    # Foreign keys resolved from the lookups, which need no validation against the database.
+    resolved_fields = []
+    # The cached grids showing the imported rows.
+    grids = []
+
+    def build(self, row):
+        """Returns the unsaved instance described by a row, raising ValidationError when it cannot be built."""
+
+        return self.model(**{column: value for column, value in row.items() if column in self.columns and value})
+
+    def validate(self, instance):
+        instance.clean_fields(exclude=self.resolved_fields)
+        instance.clean()
+
+    def claim(self, instance):
+        """Reserves the unique values of a valid instance, raising ValidationError when one is already taken."""
+
+    def create(self, instances):
+        self.model.objects.bulk_create(instances)
+
+    def finish(self, created):
+        """Does, once the import is over, what the signals of the model would have done for every row."""
+
+        if not created:
+            return
+        for grid in self.grids:
+            DataVersion.bump(grid)
+
+
+class CompanyImporter(Importer):
+    """Companies, which become portfolio companies when given a wayra_number."""
+
+    model = Company
+    columns = ['name', 'company_registration_number', 'trading_names', 'previous_names', 'registered_address',
+               'jurisdiction']
+    unique_fields = ['name', 'trading_names', 'previous_names']
+    grids = [COMPANIES]
+
+    def __init__(self):
+        self.taken = {field: set() for field in self.unique_fields}
+        for values in Company.objects.values_list(*self.unique_fields).iterator():
+            for field, value in zip(self.unique_fields, values):
+                self.taken[field].add(value)
+        self.wayra_numbers = set(Portfolio_Company.objects.values_list('wayra_number', flat=True).iterator())
+
+    def build(self, row):
+        company = super().build(row)
+        company.wayra_number = row.get('wayra_number') or None
+        company.is_portfolio_company = company.wayra_number is not None
+        return company
+
+    def validate(self, company):
+        super().validate(company)
+        if company.wayra_number is not None:
+            Portfolio_Company(wayra_number=company.wayra_number).clean_fields(exclude=['parent_company'])
+
+    def claim(self, company):
+        for field in self.unique_fields:
+            if getattr(company, field) in self.taken[field]:
+                raise company.unique_error_message(Company, (field,))
+        if company.wayra_number in self.wayra_numbers:
+            raise Portfolio_Company().unique_error_message(Portfolio_Company, ('wayra_number',))
+        for field in self.unique_fields:
+            self.taken[field].add(getattr(company, field))
+        if company.wayra_number is not None:
+            self.wayra_numbers.add(company.wayra_number)
+
+    def create(self, companies):
+        Company.objects.bulk_create(companies)
+        Portfolio_Company.objects.bulk_create([
+            Portfolio_Company(parent_company=company, wayra_number=company.wayra_number)
+            for company in companies if company.wayra_number is not None
+        ])
+        company_index.insert(companies)
+
+
+class IndividualImporter(Importer):
+    model = Individual
+    columns = ['name', 'Company', 'Position', 'Email', 'PrimaryNumber', 'SecondaryNumber', 'AngelListLink',
+               'CrunchbaseLink', 'LinkedInLink']
+    grids = [INDIVIDUALS]
+
+    def __init__(self):
+        self.content_type = ContentType.objects.get_for_model(Individual)
+
+    def build(self, row):
+        individual = super().build(row)
+        individual.content_type = self.content_type
+        return individual
+
+    def create(self, individuals):
+        Individual.objects.bulk_create(individuals)
+        individual_index.insert(individuals)
+
+
+def _lookup(rows):
+    """Maps keys to ids, or to None for keys shared by several rows, which cannot be resolved."""
+
+    lookup = {}
+    for key, pk in rows:
+        lookup[key] = None if key in lookup else pk
+    return lookup
+
+
+def _resolve(lookup, key, label):
+    if key not in lookup:
+        raise ValidationError(f'Unknown {label} "{key}".')
+    if lookup[key] is None:
+        raise ValidationError(f'Several rows match the {label} "{key}".')
+    return lookup[key]
+
+
+class InvestorImporter(Importer):
+    """Investors, either a company given by name or an individual given by email."""
+
+    model = Investor
+    columns = ['classification']
+    resolved_fields = ['company', 'individual']
+    grids = [COMPANIES, INDIVIDUALS]
+
+    def __init__(self):
+        self.companies = _lookup(Company.objects.values_list('name', 'id').iterator())
+        self.individuals = _lookup(Individual.objects.values_list('Email', 'id').iterator())
+
+    def build(self, row):
+        investor = super().build(row)
+        if row.get('company'):
+            investor.company = Company(id=_resolve(self.companies, row['company'], 'company'))
+        if row.get('individual_email'):
+            investor.individual = Individual(id=_resolve(self.individuals, row['individual_email'], 'individual'))
+        return investor
+
+    def create(self, investors):
+        Investor.objects.bulk_create(investors)
+        Company.objects.filter(pk__in={investor.company_id for investor in investors}).refresh_roles()
+
+
+class InvestmentImporter(Importer):
+    """Investments in a portfolio company given by wayra_number, from an investor given by company name or by
+    individual email."""
+
+    model = Investment
+    columns = ['typeOfFoundingRounds', 'investmentAmount', 'dateInvested', 'dateExit']
+    resolved_fields = ['investor', 'startup']
+
+    def __init__(self):
+        investors = Investor.objects.order_by('id')
+        self.company_investors = _lookup(
+            investors.filter(company__isnull=False).values_list('company__name', 'id').iterator())
+        self.individual_investors = _lookup(
+            investors.filter(individual__isnull=False).values_list('individual__Email', 'id').iterator())
+        self.startups = _lookup(Portfolio_Company.objects.values_list('wayra_number', 'id').iterator())
+
+    def build(self, row):
+        investment = super().build(row)
+        if row.get('investor'):
+            investment.investor_id = _resolve(self.company_investors, row['investor'], 'investor')
+        elif row.get('investor_email'):
+            investment.investor_id = _resolve(self.individual_investors, row['investor_email'], 'investor')
+        else:
+            raise ValidationError('An investor or investor_email is required.')
+        investment.startup_id = _resolve(self.startups, row.get('startup', ''), 'startup')
+        return investment
+
+    def create(self, investments):
+        Investment.objects.bulk_create(investments)
+        InvestmentRollup.add_all(investments)
+
+
+IMPORTERS = {
+    'companies': CompanyImporter,
+    'individuals': IndividualImporter,
+    'investors': InvestorImporter,
+    'investments': InvestmentImporter,
+}
+
+
+def import_csv(kind, lines, batch_size=BATCH_SIZE):
+    """Imports the rows of a CSV file, given as an iterable of lines, as instances of the kind. Returns an
+    ImportReport."""
+
+    importer = IMPORTERS[kind]()
+    report = ImportReport()
+    reader = csv.DictReader(lines)
+    batch = []
+    for row in reader:
+        row = {column: (value or '').strip() for column, value in row.items() if column is not None}
+        try:
+            instance = importer.build(row)
+            importer.validate(instance)
+            importer.claim(instance)
+        except ValidationError as error:
+            report.add_error(reader.line_num, _messages(error))
+            continue
+        batch.append((reader.line_num, instance))
+        if len(batch) == batch_size:
+            _write(importer, batch, report)
+            batch = []
+    if batch:
+        _write(importer, batch, report)
+    importer.finish(report.created)
+    return report
+
+
+def _messages(error):
+    if not hasattr(error, 'error_dict'):
+        return ' '.join(error.messages)
+    return ' '.join(message if field == NON_FIELD_ERRORS else f'{field}: {message}'
+                    for field, messages in error.message_dict.items() for message in messages)
+
+
+def _write(importer, batch, report):
+    try:
+        with transaction.atomic():
+            importer.create([instance for line, instance in batch])
+        report.created += len(batch)
+    except IntegrityError:
+        # Find the rows the database refused by writing the rows of the batch one at a time.
+        for line, instance in batch:
+            instance.pk = None
+            instance._state.adding = True
+            try:
+                with transaction.atomic():
+                    importer.create([instance])
+                report.created += 1
+            except IntegrityError as error:
+                report.add_error(line, str(error))
@@ -0,0 +1,115 @@
+"""Per-request measurements of SQL queries, template rendering, cache lookups and session storage.
+
+measure(timings) records, for the code run in its block on the current thread, the number of SQL queries and the time
+spent executing them (through a database execute wrapper) and the time spent rendering templates (through a wrapper
+of Template.render, installed on first use). Nested template renders (includes, extends) are only counted once, in the
+outermost render. The caches and the session store report their own lookups with record_cache_lookup() and timed().
+Blocks can be nested, every enclosing block records the inner block too. Outside a measure() block the template
+wrapper only costs a thread-local lookup.
+
+The time spent rendering templates and loading or saving the session includes the queries they run, which are also
+counted in sql_time; template_sql_time and session_sql_time are the parts of sql_time spent inside them.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.template.base import Template
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+class RequestTimings:
+    """The SQL queries, template rendering, cache lookups and session storage of a request, times in seconds."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_lookups = 0
+        self.cache_time = 0.0
+        self.session_time = 0.0
+        self.template_sql_time = 0.0
+        self.session_sql_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _install_template_timer():
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        render = Template.render
+
+        def timed_render(template, context):
+            stack = getattr(_local, 'stack', None)
+            if not stack or _local.depth:
+                return render(template, context)
+            _local.depth = 1
+            try:
+                with timed('template_time', 'template_sql_time'):
+                    return render(template, context)
+            finally:
+                _local.depth = 0
+
+        Template.render = timed_render
+        _installed = True
+
+
+@contextmanager
+def measure(timings):
+    """Records the queries and template rendering of the block into timings."""
+
+    if not _installed:
+        _install_template_timer()
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+        _local.depth = 0
+    _local.stack.append(timings)
+    try:
+        with connection.execute_wrapper(timings):
+            yield timings
+    finally:
+        _local.stack.pop()
+
+
+def _active():
+    return getattr(_local, 'stack', None) or ()
+
+
+@contextmanager
+def timed(attribute, sql_attribute):
+    """Adds the time spent in the block, and the part of it spent running SQL queries, to the given attributes of the
+    timings being measured on this thread."""
+
+    stack = tuple(_active())
+    if not stack:
+        yield
+        return
+    sql_times = [timings.sql_time for timings in stack]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for timings, sql_time in zip(stack, sql_times):
+            setattr(timings, attribute, getattr(timings, attribute) + elapsed)
+            setattr(timings, sql_attribute, getattr(timings, sql_attribute) + timings.sql_time - sql_time)
+
+
+def record_cache_lookup(duration):
+    """Adds a cache lookup, which took duration seconds, to the timings being measured on this thread."""
+
+    for timings in _active():
+        timings.cache_lookups += 1
+        timings.cache_time += duration
@@ -0,0 +1,232 @@
+"""Concurrent load test replaying analyst sessions against the app, in-process.
+
+Each synthetic analyst is a staff user logged in to its own test client, running in its own thread with its own
+database connection, so the requests of different analysts really run concurrently against the same SQLite file,
+with its write locking. An analyst repeatedly picks an action from a mix, with the weights of the mix:
+
+- browse: the dashboard, a portfolio company page and an individual page,
+- filter: toggling the filter or layout of the company or individual grid,
+- search: typing a name in a search box, one request per keyup,
+- upload: uploading a small document to a portfolio company,
+- edit_investment: opening and saving the form of an investment with a new amount,
+- archive: archiving a portfolio company, then restoring it.
+
+Every request is timed. A request fails when it raises or answers with an error status; failures caused by SQLite
+refusing a write ("database is locked") are also counted on their own.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.forms import model_to_dict
+from django.test import Client
+from django.urls import reverse
+
+from portfolio.benchmarks import percentile
+from portfolio.models import Company, Individual, Investment, Portfolio_Company, User
+
+# The weight of each action in the mixes an analyst can run.
+MIXES = {
+    'analyst': {'browse': 40, 'filter': 20, 'search': 20, 'upload': 5, 'edit_investment': 10, 'archive': 5},
+    'read_only': {'browse': 50, 'filter': 25, 'search': 25},
+    'write_heavy': {'browse': 20, 'upload': 25, 'edit_investment': 30, 'archive': 25},
+}
+
+# Rows of each kind the analysts pick from.
+SAMPLE_SIZE = 100
+
+# The fields of the investment form.
+INVESTMENT_FIELDS = ['investor', 'startup', 'typeOfFoundingRounds', 'investmentAmount', 'dateInvested']
+
+
+def create_analysts(count):
+    """Creates count staff users for the load test, who cannot log in with a password."""
+
+    taken = User.objects.filter(email__endswith='@loadtest.example.org').count()
+    analysts = []
+    for number in range(taken, count):
+        analyst = User(email=f'analyst{number}@loadtest.example.org', first_name='Analyst', last_name=str(number),
+                       phone='+447312345678', is_staff=True)
+        analyst.set_unusable_password()
+        analysts.append(analyst)
+    User.objects.bulk_create(analysts)
+    return list(User.objects.filter(email__endswith='@loadtest.example.org').order_by('id')[:count])
+
+
+class Samples:
+    """The rows the analysts browse, search and edit, read once before the load test starts."""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.companies = list(Portfolio_Company.objects.order_by('id').values_list('parent_company_id',
+                                                                                   flat=True)[:size])
+        self.individuals = list(Individual.objects.order_by('id').values_list('id', flat=True)[:size])
+        self.company_names = list(Company.objects.order_by('id').values_list('name', flat=True)[:size])
+        self.individual_names = list(Individual.objects.order_by('id').values_list('name', flat=True)[:size])
+        self.investments = [(investment.id, model_to_dict(investment, fields=INVESTMENT_FIELDS))
+                            for investment in Investment.objects.order_by('id')[:size]]
+
+
+class Recorder:
+    """The requests of one analyst: (action, latency in seconds, failed, locked) tuples."""
+
+    def __init__(self):
+        self.requests = []
+
+    def add(self, action, latency, failed, locked):
+        self.requests.append((action, latency, failed, locked))
+
+
+class Analyst:
+    """A logged in staff user running actions of a mix."""
+
+    def __init__(self, user, samples, mix, rng):
+        self.samples = samples
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.rng = rng
+        self.recorder = Recorder()
+        self.client = Client()
+        self.client.force_login(user)
+        session = self.client.session
+        for variable in ['company_filter', 'company_layout', 'individual_filter', 'individual_layout',
+                         'archived_company_filter', 'archived_individual_filter']:
+            session[variable] = 1
+        session.save()
+        self.action = None
+
+    def run_action(self):
+        self.action = self.rng.choices(self.actions, self.weights)[0]
+        getattr(self, self.action)()
+
+    def request(self, method, path, data=None):
+        start = time.perf_counter()
+        failed = locked = False
+        try:
+            response = getattr(self.client, method)(path, data)
+            failed = response.status_code >= 400
+        except OperationalError as error:
+            failed = True
+            locked = 'database is locked' in str(error)
+        except Exception:
+            failed = True
+        self.recorder.add(self.action, time.perf_counter() - start, failed, locked)
+
+    def browse(self):
+        self.request('get', reverse('dashboard'))
+        if self.samples.companies:
+            self.request('get', reverse('portfolio_company', args=[self.rng.choice(self.samples.companies)]))
+        if self.samples.individuals:
+            self.request('get', reverse('individual_profile', args=[self.rng.choice(self.samples.individuals)]))
+
+    def filter(self):
+        route, parameter = self.rng.choice([('change_company_filter', 'filter_number'),
+                                            ('change_company_layout', 'layout_number'),
+                                            ('change_individual_filter', 'filter_number'),
+                                            ('change_individual_layout', 'layout_number')])
+        self.request('get', reverse(route), {parameter: self.rng.randint(1, 3)})
+
+    def search(self):
+        route, names = self.rng.choice([('company_search_result', self.samples.company_names),
+                                        ('individual_search_result', self.samples.individual_names)])
+        if not names:
+            return
+        name = self.rng.choice(names)
+        for length in range(1, min(len(name), 6) + 1):
+            self.request('get', reverse(route), {'searchresult': name[:length]})
+
+    def upload(self):
+        if not self.samples.companies:
+            return
+        company_id = self.rng.choice(self.samples.companies)
+        document = SimpleUploadedFile(f'load-test-{self.rng.randrange(10 ** 9)}.txt', b'load test document\n',
+                                      content_type='text/plain')
+        self.request('post', reverse('company_document_upload', args=[company_id]),
+                     {'upload_file': '', 'file': document})
+
+    def edit_investment(self):
+        if not self.samples.investments:
+            return
+        investment_id, investment = self.rng.choice(self.samples.investments)
+        url = reverse('investment_update', args=[investment_id])
+        investment = {field: '' if value is None else value for field, value in investment.items()}
+        self.request('get', url)
+        investment['investmentAmount'] = self.rng.randrange(1000, 10 ** 7)
+        self.request('post', url, investment)
+
+    def archive(self):
+        if not self.samples.companies:
+            return
+        company_id = self.rng.choice(self.samples.companies)
+        self.request('get', reverse('archive_company', args=[company_id]))
+        self.request('get', reverse('unarchive_company', args=[company_id]))
+
+
+def run(users, mix='analyst', duration=None, actions=None, think_time=0.0, seed=None):
+    """Runs one analyst per user concurrently, each until duration seconds have passed or it ran the given number of
+    actions. Returns the report of every request (see report())."""
+
+    samples = Samples()
+    rng = random.Random(seed)
+    analysts = [Analyst(user, samples, MIXES[mix], random.Random(rng.random())) for user in users]
+    deadline = None if duration is None else time.perf_counter() + duration
+
+    def work(analyst):
+        count = 0
+        while (actions is None or count < actions) and (deadline is None or time.perf_counter() < deadline):
+            analyst.run_action()
+            count += 1
+            if think_time:
+                time.sleep(analyst.rng.uniform(0, 2 * think_time))
+
+    def work_in_thread(analyst):
+        try:
+            work(analyst)
+        finally:
+            connection.close()
+
+    # Failed requests are reported by the load test, not logged.
+    logger = logging.getLogger('django.request')
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    start = time.perf_counter()
+    try:
+        if len(analysts) == 1:
+            work(analysts[0])
+        else:
+            threads = [threading.Thread(target=work_in_thread, args=[analyst]) for analyst in analysts]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        logger.setLevel(level)
+    elapsed = time.perf_counter() - start
+    return report([request for analyst in analysts for request in analyst.recorder.requests], elapsed)
+
+
+def report(requests, elapsed):
+    """Returns the throughput, latency percentiles, error rate and locked database errors of the requests, overall
+    ('all') and by action."""
+
+    by_action = {'all': requests}
+    for request in requests:
+        by_action.setdefault(request[0], []).append(request)
+    results = {}
+    for action, action_requests in by_action.items():
+        latencies = [latency * 1000 for _, latency, _, _ in action_requests]
+        failures = sum(failed for _, _, failed, _ in action_requests)
+        results[action] = {
+            'requests': len(action_requests),
+            'throughput': round(len(action_requests) / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 0.5), 2) if latencies else 0,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else 0,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else 0,
+            'max_ms': round(max(latencies), 2) if latencies else 0,
+            'errors': failures,
+            'error_rate': round(failures / len(action_requests), 4) if action_requests else 0,
+            'locked': sum(locked for _, _, _, locked in action_requests),
+        }
+    return results
@@ -0,0 +1,59 @@
+"""Data loaders fetching everything a page shows in a fixed number of queries.
+
+A loader builds lazy query sets up front, with the related rows each template follows joined (select_related) or
+batched (prefetch_related), so the number of queries a page issues does not grow with the number of rows it lists.
+"""
+from django.db.models import Exists, OuterRef, Prefetch
+
+from portfolio.models import Company, Individual, Programme, Investment, Investor, Founder, Document
+
+
+class CompanyPageLoader:
+    """Loads the company, its investments, programmes, documents and associated individuals for the company page."""
+
+    def __init__(self, company_id):
+        self.company = Company.objects.annotate(
+            is_investor_company=Exists(Investor.objects.filter(company=OuterRef('pk'))),
+            has_startup_investments=Exists(Investment.objects.filter(startup__parent_company=OuterRef('pk'))),
+            has_investor_investments=Exists(Investment.objects.filter(investor__company=OuterRef('pk'))),
+        ).get(id=company_id)
+
+    @property
+    def investments(self):
+        """The investments received by the company, or else the investments it made, not evaluated yet."""
+
+        investments = Investment.objects.select_related(
+            'startup__parent_company', 'investor__company', 'investor__individual').order_by('id')
+        if self.company.has_startup_investments:
+            return investments.filter(startup__parent_company=self.company)
+        elif self.company.has_investor_investments:
+            return investments.filter(investor__company=self.company)
+        return investments.none()
+
+    def get_context_data(self):
+        programmes = Programme.objects.filter(participants__name=self.company.name).prefetch_related(
+            Prefetch('coaches_mentors', queryset=Individual.objects.order_by('id')))
+        investors = Investor.objects.filter(id__in=Investment.objects.filter(startup=self.company.id).values('investor'))
+        founders = Founder.objects.all()
+
+        return {
+            'company': self.company,
+            'is_investor_company': self.company.is_investor_company,
+            'is_portfolio_company': self.company.is_portfolio_company,
+            'programmes': programmes,
+            'coaches_mentors': self._coaches_mentors(programmes),
+            'documents': Document.objects.filter(company=self.company),
+            'founders': Individual.objects.filter(id__in=founders.values('individualFounder'), is_archived=False),
+            'company_investors': Company.objects.filter(id__in=investors.values('company')),
+            'individual_investors': Individual.objects.filter(id__in=investors.values('individual')),
+        }
+
+    @staticmethod
+    def _coaches_mentors(programmes):
+        """The distinct coaches and mentors of the programmes, read from the prefetched programmes."""
+
+        coaches_mentors = {}
+        for programme in programmes:
+            for individual in programme.coaches_mentors.all():
+                coaches_mentors.setdefault(individual.id, individual)
+        return list(coaches_mentors.values())
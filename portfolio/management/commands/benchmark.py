@@ -0,0 +1,66 @@
+from django.core.management import BaseCommand, CommandError
+
+from portfolio.benchmarks import BUDGETS, Benchmark, throwaway_database, samples, named_routes, check_budgets, \
+    compare, load_results, write_results
+from portfolio.models import User
+from vcpms import urls
+
+
+class Command(BaseCommand):
+    """Benchmarks every named route against a throwaway seeded database and checks the budgets of the main pages."""
+
+    help = "Benchmarks every named route against a throwaway seeded database and checks the budgets of the main pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help="Multiplier of the default seeded dataset.")
+        parser.add_argument('--repeat', type=int, default=10, help="Number of measured requests per route.")
+        parser.add_argument('--warmup', type=int, default=1, help="Number of unmeasured requests per route.")
+        parser.add_argument('--routes', nargs='*', help="Only benchmark these route names.")
+        parser.add_argument('--output', help="JSON file the results are written to.")
+        parser.add_argument('--baseline', help="JSON results of a previous run to compare against.")
+        parser.add_argument('--latency-threshold', type=float, default=0.25,
+                            help="Fraction by which a median latency may exceed the baseline.")
+        parser.add_argument('--query-threshold', type=int, default=0,
+                            help="Number of queries by which a route may exceed the baseline.")
+        parser.add_argument('--workers', type=int, default=1, help="Number of processes generating the fake data.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_results(options['baseline'])
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f"Cannot read the baseline {options['baseline']}: {error}")
+
+        with throwaway_database(options['scale'], workers=options['workers']):
+            routes, skipped = named_routes(urls.urlpatterns, samples())
+            if options['routes']:
+                routes = {name: path for name, path in routes.items() if name in options['routes']}
+            benchmark = Benchmark(User.objects.filter(is_staff=True).order_by('id').first(),
+                                  repeat=options['repeat'], warmup=options['warmup'])
+            results = benchmark.run(routes)
+
+        self._print(results, skipped)
+        if options['output']:
+            write_results(options['output'], results, skipped, options['scale'], options['repeat'])
+            print(f"results written to {options['output']}.")
+
+        failures = check_budgets(results)
+        if baseline is not None:
+            failures += compare(results, baseline, latency_threshold=options['latency_threshold'],
+                                query_threshold=options['query_threshold'])
+        for failure in failures:
+            print(failure)
+        if failures:
+            raise CommandError(f"{len(failures)} budgets exceeded or regressions found.")
+        print("done.")
+
+    @staticmethod
+    def _print(results, skipped):
+        print(f"{'route':32} {'status':>6} {'median':>9} {'p95':>9} {'queries':>7} {'sql':>9} {'templates':>9}")
+        for name, result in results.items():
+            budget = '  *' if name in BUDGETS else ''
+            print(f"{name:32} {result['status']:>6} {result['median_ms']:>6.1f} ms {result['p95_ms']:>6.1f} ms "
+                  f"{result['queries']:>7} {result['sql_ms']:>6.1f} ms {result['template_ms']:>6.1f} ms{budget}")
+        for name, reason in skipped.items():
+            print(f"{name:32} skipped: {reason}")
@@ -0,0 +1,55 @@
+from django.core.files import File
+from django.db import transaction
+
+from portfolio.memory_profiling import ProfiledCommand, size
+from portfolio.models import Document, DocumentBlob
+from portfolio.models.document_blob_model import file_sha256
+
+
+class Command(ProfiledCommand):
+    """Moves the files of the documents stored under the name of their company, individual or programme to the
+    content-addressed storage, where every content is stored once."""
+
+    help = "Moves the files of the documents stored per company, individual or programme to the content-addressed " \
+           "storage, keeping one file per content."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report the documents that would be moved and the space that would be freed.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of documents read per query.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        known = set(DocumentBlob.objects.values_list('sha256', flat=True).iterator())
+        moved = duplicates = freed = missing = 0
+        documents = Document.objects.filter(blob__isnull=True).exclude(file='').exclude(file__isnull=True)
+        with self.phase('dedupe'):
+            for document in documents.order_by('file_id').iterator(chunk_size=options['batch_size']):
+                storage = document.file.storage
+                if not storage.exists(document.file.name):
+                    missing += 1
+                    continue
+                # The blob is stored with its reference taken in the transaction saving the document. The previous file
+                # is deleted once it commits, unless another document uses it.
+                with transaction.atomic():
+                    with storage.open(document.file.name, 'rb') as file:
+                        content = File(file, name=document.file.name)
+                        sha256 = file_sha256(content)
+                        if sha256 in known:
+                            duplicates += 1
+                            freed += content.size
+                        known.add(sha256)
+                        blob = None if dry_run else DocumentBlob.store(content, sha256)
+                    if blob is not None:
+                        # The content did not change, so the updated_at of the document is kept.
+                        document.blob = blob
+                        document.file = blob.file.name
+                        document.checksum = blob.sha256
+                        document.save(update_fields=['file', 'blob', 'checksum'])
+                moved += 1
+        verb = "would be" if dry_run else "were"
+        print(f"{moved} documents {verb} moved to the content-addressed storage, {duplicates} of them duplicates.")
+        print(f"{size(freed)} {verb} freed.")
+        if missing:
+            print(f"{missing} documents have no file in the storage and {verb} left as they are.")
+        print("done.")
@@ -0,0 +1,32 @@
+from django.core.management import CommandError
+
+from portfolio.exports import DATASETS, FORMATS, export_lines
+from portfolio.memory_profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    """Streams every investment, company or individual as CSV or NDJSON to a file or the standard output."""
+
+    help = "Streams every investment, company or individual as CSV or NDJSON to a file or the standard output."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS), help="The rows to export.")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help="The export format.")
+        parser.add_argument('--output', help="The file written to, the standard output when omitted.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['dataset'], options['format'])
+        if options['output'] is None:
+            with self.phase('export'):
+                for line in lines:
+                    self.stdout.write(line, ending='')
+            return
+
+        try:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output, self.phase('export'):
+                for line in lines:
+                    output.write(line)
+        except OSError as error:
+            raise CommandError(f"Cannot write {options['output']}: {error}")
+        print(f"{options['dataset']} exported to {options['output']}.")
+        print("done.")
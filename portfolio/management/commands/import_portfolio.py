@@ -0,0 +1,28 @@
+from django.core.management import CommandError
+
+from portfolio.imports import BATCH_SIZE, IMPORTERS, import_csv
+from portfolio.memory_profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    """Imports companies, individuals, investors or investments from a CSV file, reporting the rejected rows."""
+
+    help = "Imports companies, individuals, investors or investments from a CSV file, reporting the rejected rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS), help="The rows to import.")
+        parser.add_argument('path', help="The CSV file to import, with a header row naming the columns.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Number of rows written per query and transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as lines, self.phase('import'):
+                report = import_csv(options['kind'], lines, batch_size=options['batch_size'])
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+
+        for line, message in report.errors:
+            print(f"Line {line}: {message}")
+        print(f"{report.created} {options['kind']} imported, {len(report.errors)} rows rejected.")
+        print("done.")
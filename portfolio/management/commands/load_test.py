@@ -0,0 +1,53 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+
+from portfolio.benchmarks import throwaway_database
+from portfolio.load_test import MIXES, create_analysts, run
+
+
+class Command(BaseCommand):
+    """Replays concurrent analyst sessions against a throwaway seeded database and reports throughput, latency
+    percentiles, error rates and locked database errors."""
+
+    help = "Replays concurrent analyst sessions against a throwaway seeded database and reports throughput, latency " \
+           "percentiles, error rates and locked database errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of concurrent analysts.")
+        parser.add_argument('--mix', choices=sorted(MIXES), default='analyst', help="The mix of actions to replay.")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds the load test runs for.")
+        parser.add_argument('--actions', type=int, help="Stop each analyst after this many actions instead.")
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help="Mean number of seconds an analyst waits between two actions.")
+        parser.add_argument('--scale', type=int, default=1, help="Multiplier of the default seeded dataset.")
+        parser.add_argument('--workers', type=int, default=1, help="Number of processes generating the fake data.")
+        parser.add_argument('--seed', type=int, help="Seed of the random choices of the analysts.")
+        parser.add_argument('--output', help="JSON file the results are written to.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("At least one user is needed.")
+
+        with throwaway_database(options['scale'], workers=options['workers']):
+            users = create_analysts(options['users'])
+            print(f"{len(users)} analysts running the {options['mix']} mix...")
+            results = run(users, mix=options['mix'], duration=None if options['actions'] else options['duration'],
+                          actions=options['actions'], think_time=options['think_time'], seed=options['seed'])
+
+        self._print(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'users': options['users'], 'mix': options['mix'], 'scale': options['scale'],
+                           'actions': results}, file, indent=2, sort_keys=True)
+            print(f"results written to {options['output']}.")
+        print("done.")
+
+    @staticmethod
+    def _print(results):
+        print(f"{'action':16} {'requests':>8} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7} "
+              f"{'locked':>7}")
+        for action, result in results.items():
+            print(f"{action:16} {result['requests']:>8} {result['throughput']:>8.1f} {result['p50_ms']:>6.1f} ms "
+                  f"{result['p95_ms']:>6.1f} ms {result['p99_ms']:>6.1f} ms {result['error_rate']:>6.1%} "
+                  f"{result['locked']:>7}")
@@ -0,0 +1,17 @@
+from portfolio.memory_profiling import ProfiledCommand
+from portfolio.models import InvestmentRollup
+
+
+class Command(ProfiledCommand):
+    """Recomputes the investment rollups from the investments."""
+
+    help = "Recomputes the investment rollups from the investments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of rollups inserted per query.")
+
+    def handle(self, *args, **options):
+        with self.phase('rebuild'):
+            count = InvestmentRollup.rebuild(batch_size=options['batch_size'])
+        print(f"{count} investment rollups rebuilt.")
+        print("done.")
@@ -0,0 +1,21 @@
+from portfolio.memory_profiling import ProfiledCommand
+from portfolio.search import INDEXES
+
+
+class Command(ProfiledCommand):
+    """Rebuilds the full-text search indexes of companies, individuals and programmes."""
+
+    help = "Rebuilds the full-text search indexes of companies, individuals and programmes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of rows inserted per statement batch.")
+
+    def handle(self, *args, **options):
+        for index in INDEXES:
+            if not index.is_supported():
+                print("Full-text search is only supported on SQLite, nothing to reindex.")
+                return
+            with self.phase(index.table):
+                count = index.rebuild(batch_size=options['batch_size'])
+            print(f"{count} rows indexed in {index.table}.")
+        print("done.")
@@ -1,23 +1,53 @@
-from django.core.management import BaseCommand
-
+from portfolio.memory_profiling import ProfiledCommand
 from portfolio.seeders import *
 
 
-class Command(BaseCommand):
-    seeders = [UserSeeder(),
-               CompanySeeder(),
-               PortfolioCompaniesSeeder(),
-               IndividualSeeder(),
-               InvestorCompanySeeder(),
-               InvestorIndividualSeeder(),
-               InvestmentSeeder(),
-               ProgrammeSeeder(),
-               DocumentSeeder(),
-               FounderSeeder(),
-               ]
+class Command(ProfiledCommand):
+    """Seeds the database with fake data, in volumes set by the size flags."""
+
+    help = "Seeds the database with fake data, in volumes set by the size flags."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=CompanySeeder.COMPANIES_COUNT,
+                            help="Number of companies that are not portfolio companies.")
+        parser.add_argument('--portfolio-companies', type=int, default=PortfolioCompaniesSeeder.COMPANIES_COUNT,
+                            help="Number of portfolio companies.")
+        parser.add_argument('--individuals', type=int, default=IndividualSeeder.INDIVIDUAL_COUNT,
+                            help="Number of individuals.")
+        parser.add_argument('--investor-companies', type=int, default=InvestorCompanySeeder.INVESTOR_COMPANY_COUNT,
+                            help="Number of companies that are investors.")
+        parser.add_argument('--investor-individuals', type=int,
+                            default=InvestorIndividualSeeder.INVESTOR_INDIVIDUAL_COUNT,
+                            help="Number of individuals who are investors.")
+        parser.add_argument('--investments', type=int, default=InvestmentSeeder.INVESTMENT_COUNT,
+                            help="Number of investments.")
+        parser.add_argument('--programmes', type=int, default=ProgrammeSeeder.PROGRAMME_COUNT,
+                            help="Number of programmes.")
+        parser.add_argument('--documents', type=int, default=None,
+                            help="Number of documents, by default six per company, individual and programme.")
+        parser.add_argument('--founders', type=int, default=FounderSeeder.FOUNDER_COUNT, help="Number of founders.")
+        parser.add_argument('--batch-size', type=int, default=Seeder.BATCH_SIZE,
+                            help="Number of rows inserted per query.")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Number of processes generating fake companies and individuals in parallel.")
 
     def handle(self, *args, **options):
+        settings = {'batch_size': options['batch_size'], 'workers': options['workers']}
+        seeders = [UserSeeder(),
+                   CompanySeeder(options['companies'], **settings),
+                   PortfolioCompaniesSeeder(options['portfolio_companies'], **settings),
+                   IndividualSeeder(options['individuals'], **settings),
+                   InvestorCompanySeeder(options['investor_companies'], **settings),
+                   InvestorIndividualSeeder(options['investor_individuals'], **settings),
+                   InvestmentSeeder(options['investments'], **settings),
+                   ProgrammeSeeder(options['programmes'], **settings),
+                   DocumentSeeder(options['documents'], **settings),
+                   FounderSeeder(options['founders'], **settings),
+                   DerivedDataSeeder(**settings),
+                   ]
+
         print("seeding...")
-        for seeder in self.seeders:
-            seeder.seed()
+        for seeder in seeders:
+            with self.phase(type(seeder).__name__):
+                seeder.seed()
         print(f"done.")
@@ -0,0 +1,253 @@
+"""Memory profiling of management commands with tracemalloc.
+
+Commands built on ProfiledCommand accept --profile-memory. The command then runs with tracemalloc tracing every
+allocation, and its phases (the seeders of seed, the indexes of reindex, ...) are measured one by one:
+
+- peak: the highest memory traced while the phase ran,
+- growth: the memory the phase allocated and still held when it ended, and the lines holding the most of it.
+
+The traces are cleared when a phase starts, which also resets the peak (tracemalloc.reset_peak only exists from Python
+3.9). A phase is thus measured by what it allocates: the memory it frees from before it began is not subtracted, so
+its peak and growth are upper bounds.
+
+At the end, the report adds the peak of the whole command and the lines and call sites holding the most memory among
+the allocations since the last phase started, then it is written as JSON to MEMORY_PROFILE_DIR (or the path given to
+--profile-memory) and summarised on the standard error, so that commands streaming to the standard output still can.
+A streaming or chunked phase should have a peak that stays flat as the data grows, and next to no growth.
+
+A call site is the innermost line of the portfolio app on the traceback of an allocation, which is where the code of
+this repository asked for the memory, even when Django or the standard library allocated it.
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.core.management import BaseCommand
+
+from vcpms import settings
+
+MEMORY_PROFILE_DIR = getattr(settings, 'MEMORY_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'logs', 'memory'))
+
+# Frames stored per allocation, enough to reach the call site in the portfolio app from inside Django.
+MEMORY_PROFILE_FRAMES = getattr(settings, 'MEMORY_PROFILE_FRAMES', 25)
+
+# Number of lines and call sites listed in the report, overall and per phase.
+TOP_ALLOCATIONS = 20
+TOP_PHASE_GROWTH = 5
+
+_APP_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_TESTS_DIRECTORY = os.path.join(_APP_DIRECTORY, 'tests')
+_SKIPPED_FILES = {os.path.abspath(__file__)}
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def _relative(filename):
+    return os.path.relpath(filename, os.path.dirname(_APP_DIRECTORY))
+
+
+def _is_app_frame(filename):
+    filename = os.path.abspath(filename)
+    return filename.startswith(_APP_DIRECTORY) and not filename.startswith(_TESTS_DIRECTORY) \
+        and filename not in _SKIPPED_FILES
+
+
+def _line(frame):
+    return f'{_relative(frame.filename) if _is_app_frame(frame.filename) else frame.filename}:{frame.lineno}'
+
+
+def _call_site(traceback):
+    """Returns the innermost frame of the portfolio app of a traceback as path:line, or '' when there is none."""
+
+    for frame in reversed(traceback):
+        if _is_app_frame(frame.filename):
+            return f'{_relative(frame.filename)}:{frame.lineno}'
+    return ''
+
+
+def top_lines(snapshot, limit=TOP_ALLOCATIONS):
+    """Returns the lines holding the most memory in a snapshot, as dicts of line, size and count."""
+
+    return [{'line': _line(statistic.traceback[-1]), 'size': statistic.size, 'count': statistic.count}
+            for statistic in snapshot.statistics('lineno')[:limit]]
+
+
+def top_call_sites(snapshot, limit=TOP_ALLOCATIONS):
+    """Returns the call sites in the portfolio app holding the most memory in a snapshot, as dicts of call site, size
+    and count."""
+
+    sites = {}
+    for statistic in snapshot.statistics('traceback'):
+        site = _call_site(statistic.traceback)
+        if not site:
+            continue
+        size, count = sites.get(site, (0, 0))
+        sites[site] = (size + statistic.size, count + statistic.count)
+    ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+    return [{'call_site': site, 'size': size, 'count': count} for site, (size, count) in ranked[:limit]]
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+class MemoryProfile:
+    """The peak memory, the memory held by line and call site, and the growth of every phase of a run traced by
+    tracemalloc."""
+
+    def __init__(self, name, frames=MEMORY_PROFILE_FRAMES):
+        self.name = name
+        self.frames = frames
+        self.phases = []
+        self.peak = 0
+        self.started = None
+        self.report = None
+        self._stop_tracing = False
+        # Memory traced when the traces were last cleared, which the traced memory is counted from since.
+        self._base = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._stop_tracing = True
+        tracemalloc.clear_traces()
+        self.started = time.perf_counter()
+
+    def _read_peak(self):
+        current, peak = tracemalloc.get_traced_memory()
+        current, peak = self._base + current, self._base + peak
+        self.peak = max(self.peak, peak)
+        return current, peak
+
+    @contextmanager
+    def phase(self, name):
+        """Measures the peak and the growth of the memory while the block runs."""
+
+        start_memory, _ = self._read_peak()
+        tracemalloc.clear_traces()
+        self._base = start_memory
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            end_memory, peak = self._read_peak()
+            self.phases.append({
+                'name': name,
+                'seconds': round(seconds, 3),
+                'start': start_memory,
+                'end': end_memory,
+                'growth': end_memory - start_memory,
+                'peak': peak,
+                'top_growth': top_lines(_snapshot(), TOP_PHASE_GROWTH),
+            })
+
+    def stop(self):
+        """Stops tracing and returns the report."""
+
+        current, _ = self._read_peak()
+        snapshot = _snapshot()
+        if self._stop_tracing:
+            tracemalloc.stop()
+        self.report = {
+            'command': self.name,
+            'time': time.time(),
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'peak': self.peak,
+            'current': current,
+            'phases': self.phases,
+            'top_lines': top_lines(snapshot),
+            'top_call_sites': top_call_sites(snapshot),
+        }
+        return self.report
+
+    def write(self, path=None):
+        """Writes the report as JSON to path, by default to a new file of MEMORY_PROFILE_DIR. Returns the path."""
+
+        if not path:
+            os.makedirs(MEMORY_PROFILE_DIR, exist_ok=True)
+            path = os.path.join(MEMORY_PROFILE_DIR, f'{self.name}-{datetime.now():%Y%m%d-%H%M%S-%f}.json')
+        with open(path, 'w') as file:
+            json.dump(self.report, file, indent=2)
+        return path
+
+
+def size(value):
+    """Formats a number of bytes for humans."""
+
+    if abs(value) < 1024:
+        return f'{value} B'
+    for unit in ['KiB', 'MiB', 'GiB']:
+        value /= 1024
+        if abs(value) < 1024 or unit == 'GiB':
+            return f'{value:.1f} {unit}'
+
+
+def summary(report):
+    """Returns the lines summarising a report: the peak, every phase and the top call sites."""
+
+    lines = [f"memory: peak {size(report['peak'])}, {size(report['current'])} still held at the end"]
+    for phase in report['phases']:
+        lines.append(f"  {phase['name']:32} peak {size(phase['peak']):>11}  growth {size(phase['growth']):>11}  "
+                     f"{phase['seconds']:>8.2f} s")
+    if report['top_call_sites']:
+        lines.append("top call sites:")
+        for site in report['top_call_sites'][:5]:
+            lines.append(f"  {site['call_site']:48} {size(site['size']):>11} in {site['count']} blocks")
+    return lines
+
+
+class ProfiledCommand(BaseCommand):
+    """A management command that can run under the memory profiler with --profile-memory.
+
+    The command marks its phases with self.phase(name), which only measures anything when profiling."""
+
+    profile = None
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--profile-memory', nargs='?', const='', default=None, metavar='PATH',
+                            help="Trace the memory of the command with tracemalloc and write a report to PATH, by "
+                                 "default to a new file of MEMORY_PROFILE_DIR.")
+        return parser
+
+    def execute(self, *args, **options):
+        path = options.get('profile_memory')
+        if path is not None:
+            # Only the handle method is profiled, leaving out the modules imported by the system checks.
+            handle = self.handle
+
+            def profiled_handle(*args, **options):
+                return self._profile(handle, path, *args, **options)
+
+            self.handle = profiled_handle
+        return super().execute(*args, **options)
+
+    def _profile(self, handle, path, *args, **options):
+        self.profile = MemoryProfile(self.__module__.rsplit('.', 1)[-1])
+        self.profile.start()
+        try:
+            return handle(*args, **options)
+        finally:
+            report = self.profile.stop()
+            written = self.profile.write(path)
+            for line in summary(report):
+                self.stderr.write(line)
+            self.stderr.write(f"memory report written to {written}.")
+            self.profile = None
+
+    @contextmanager
+    def phase(self, name):
+        if self.profile is None:
+            yield
+        else:
+            with self.profile.phase(name):
+                yield
@@ -0,0 +1,335 @@
+"""Prometheus metrics of the requests served, exposed in the text format at /metrics.
+
+MetricsMiddleware observes every request into the histograms below, labelled by route (the name of the matched URL
+pattern): its latency, its number of SQL queries and the time spent running them, the time spent rendering templates
+and the size of its response. The caches count their hits and misses in CACHE_REQUESTS.
+
+Recording a value must cost microseconds, so no lock is taken on the hot path: every thread updates its own shard of a
+metric (a plain dict), and the shards are only added up when the metrics are collected. The lock of a metric is taken
+once per thread, to register its shard, and once more when the thread exits, to fold its shard into the totals of the
+exited threads, so a server starting a thread per request keeps as many shards as it has live threads.
+
+A deployment running several worker processes on one host sets METRICS_DIR to a directory shared by the workers. Each
+worker then writes a snapshot of its metrics to its own file in that directory at most every METRICS_FLUSH_INTERVAL
+seconds, and /metrics adds up the snapshots of every worker. The snapshots of the workers that have since exited are
+folded into a single file of retired metrics, so counts never go backwards and the directory does not grow with every
+restart. Without METRICS_DIR, /metrics reports the metrics of the process answering it.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    # Serialises the collections folding the snapshots of exited workers, on POSIX systems.
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from portfolio.instrumentation import record_cache_lookup
+from vcpms import settings
+
+# Directory shared by the worker processes to aggregate their metrics, None for a single process.
+METRICS_DIR = getattr(settings, 'METRICS_DIR', None)
+
+# Seconds between two snapshots of the metrics of a process to METRICS_DIR.
+METRICS_FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REGISTRY = []
+
+
+class Metric:
+    """A metric with labels, whose values are kept in one shard per thread."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # The thread-local owner goes when the thread exits, which folds the shard into the retired totals.
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(owner)] = shard
+            weakref.finalize(owner, self._retire, id(owner))
+            return shard
+
+    def _retire(self, key):
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            for labels, value in (shard or {}).items():
+                self._retired[labels] = self._add(self._retired.get(labels), value)
+
+    def samples(self):
+        """Returns {label values: value} added up over the shards of every live thread and the exited threads."""
+
+        with self._lock:
+            shards = [dict(self._retired)] + list(self._shards.values())
+        samples = {}
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                samples[labels] = self._add(samples.get(labels), value)
+        return samples
+
+    def snapshot(self):
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'documentation': self.documentation,
+            'labels': list(self.labels),
+            'samples': [[list(labels), value] for labels, value in self.samples().items()],
+        }
+
+    @staticmethod
+    def _add(total, value):
+        raise NotImplementedError
+
+
+class _ShardOwner:
+    """Kept in the thread-local storage of a metric, to learn when the thread exits."""
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _add(total, value):
+        return value if total is None else total + value
+
+
+class Histogram(Metric):
+    """A histogram, whose values are the count of observations in each bucket followed by the sum of the
+    observations. The last count is of the observations above the last bucket (+Inf)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self):
+        return dict(super().snapshot(), buckets=list(self.buckets))
+
+    @staticmethod
+    def _add(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+
+REQUEST_DURATION = Histogram('vcpms_request_duration_seconds', 'Time taken to answer a request.', ['route'],
+                             LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram('vcpms_request_queries', 'SQL queries run by a request.', ['route'], QUERY_BUCKETS)
+REQUEST_DB_TIME = Histogram('vcpms_request_db_seconds', 'Time a request spent running SQL queries.', ['route'],
+                            LATENCY_BUCKETS)
+TEMPLATE_RENDER_TIME = Histogram('vcpms_template_render_seconds', 'Time a request spent rendering templates.',
+                                 ['route'], LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('vcpms_response_size_bytes', 'Size of the body of a response, when it is known.',
+                          ['route'], SIZE_BUCKETS)
+CACHE_REQUESTS = Counter('vcpms_cache_requests_total', 'Cache lookups, by cache and result (hit or miss).',
+                         ['cache', 'result'])
+
+
+def cache_lookup(cache_name, hit, duration):
+    """Counts a cache lookup, which took duration seconds, in CACHE_REQUESTS and in the timings of the request."""
+
+    CACHE_REQUESTS.inc(cache_name, 'hit' if hit else 'miss')
+    record_cache_lookup(duration)
+
+
+def snapshot():
+    """Returns the metrics of this process, as JSON serializable dicts."""
+
+    return [metric.snapshot() for metric in REGISTRY]
+
+
+def merge(snapshots):
+    """Adds up several snapshots (lists of metric dicts) into one."""
+
+    merged = {}
+    for metrics in snapshots:
+        for metric in metrics:
+            total = merged.setdefault(metric['name'], dict(metric, samples={}))
+            add = Histogram._add if metric['kind'] == 'histogram' else Counter._add
+            for labels, value in metric['samples']:
+                labels = tuple(labels)
+                total['samples'][labels] = add(total['samples'].get(labels), value)
+    return [dict(metric, samples=list(metric['samples'].items())) for metric in merged.values()]
+
+
+_process = {'pid': None, 'name': None, 'next_flush': 0.0}
+_flush_lock = threading.Lock()
+
+RETIRED_SNAPSHOT = 'metrics-retired.json'
+
+
+def _snapshot_path():
+    # A forked worker gets its own file, named after its pid and a random token so a reused pid never overwrites the
+    # snapshot of an exited worker.
+    if _process['pid'] != os.getpid():
+        _process['pid'] = os.getpid()
+        _process['name'] = f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+    return os.path.join(METRICS_DIR, _process['name'])
+
+
+def flush():
+    """Writes the snapshot of this process to METRICS_DIR."""
+
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path()
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(snapshot(), file)
+    os.replace(f'{path}.tmp', path)
+    _process['next_flush'] = time.monotonic() + METRICS_FLUSH_INTERVAL
+
+
+def flush_if_due():
+    """Flushes the snapshot of this process when METRICS_DIR is set and the last flush is old enough."""
+
+    if METRICS_DIR is None or time.monotonic() < _process['next_flush']:
+        return
+    if _flush_lock.acquire(blocking=False):
+        try:
+            flush()
+        finally:
+            _flush_lock.release()
+
+
+def _snapshot_pid(name):
+    """Returns the pid of the worker that wrote a snapshot file, None for the retired metrics."""
+
+    pid = name[len('metrics-'):].split('-', 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _directory_lock():
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(METRICS_DIR, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect():
+    """Returns the metrics of every worker process, or of this process when METRICS_DIR is not set. The snapshots of
+    the workers that exited are folded into the retired metrics on the way."""
+
+    if METRICS_DIR is None:
+        return merge([snapshot()])
+    with _flush_lock:
+        flush()
+    with _directory_lock() as locked:
+        retired_path = os.path.join(METRICS_DIR, RETIRED_SNAPSHOT)
+        retired = _read_snapshot(retired_path) or []
+        snapshots = []
+        exited = []
+        for name in sorted(os.listdir(METRICS_DIR)):
+            if not name.startswith('metrics-') or not name.endswith('.json') or name == RETIRED_SNAPSHOT:
+                continue
+            path = os.path.join(METRICS_DIR, name)
+            worker = _read_snapshot(path)
+            if worker is None:
+                continue
+            pid = _snapshot_pid(name)
+            if locked and pid is not None and not _is_running(pid):
+                exited.append(path)
+                retired = merge([retired, worker])
+            else:
+                snapshots.append(worker)
+        if exited:
+            with open(f'{retired_path}.tmp', 'w') as file:
+                json.dump(retired, file)
+            os.replace(f'{retired_path}.tmp', retired_path)
+            for path in exited:
+                os.remove(path)
+    return merge([retired] + snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, **extra):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra.items()]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def exposition(metrics):
+    """Returns the metrics in the Prometheus text exposition format."""
+
+    lines = []
+    for metric in metrics:
+        name, names = metric['name'], metric['labels']
+        lines.append(f'# HELP {name} {metric["documentation"]}')
+        lines.append(f'# TYPE {name} {metric["kind"]}')
+        for labels, value in sorted(metric['samples'], key=lambda sample: tuple(sample[0])):
+            if metric['kind'] == 'histogram':
+                cumulative = 0
+                bounds = [_number(bound) for bound in metric['buckets']] + ['+Inf']
+                for bound, count in zip(bounds, value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(names, labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(names, labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(names, labels)} {cumulative}')
+            else:
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
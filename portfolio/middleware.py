@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import reverse
+
+from portfolio import metrics, profiling, slow_queries
+from portfolio.instrumentation import RequestTimings, measure
+
+
+class MetricsMiddleware:
+    """Observes the latency, SQL queries, template rendering and response size of every request, by route."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        start = time.perf_counter()
+        with measure(timings):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        metrics.REQUEST_DURATION.observe(duration, route)
+        metrics.REQUEST_QUERIES.observe(timings.queries, route)
+        metrics.REQUEST_DB_TIME.observe(timings.sql_time, route)
+        metrics.TEMPLATE_RENDER_TIME.observe(timings.template_time, route)
+        size = _response_size(response)
+        if size is not None:
+            metrics.RESPONSE_SIZE.observe(size, route)
+        metrics.flush_if_due()
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Records the slow and sampled SQL statements of every request to the slow query log."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(slow_queries.SlowQueryRecorder(request, slow_queries.slow_query_log)):
+            return self.get_response(request)
+
+
+class ProfilerMiddleware:
+    """Profiles the requests of staff users asking for it, see portfolio/profiling.py."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.is_requested(request) or not request.user.is_staff:
+            return self.get_response(request)
+        response, profile_id = profiling.profile(request, self.get_response)
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = reverse('profile_detail', args=[profile_id])
+        return response
+
+
+class ServerTimingMiddleware:
+    """Breaks the time taken by every request down in a Server-Timing header, shown by the network panel of the
+    browser: SQL queries, templates (without their queries), cache lookups, session load and save (without their
+    queries), and the rest, spent in the view and the middleware. Enabled by the SERVER_TIMING setting, which is off
+    by default outside DEBUG since every client sees the header."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        start = time.perf_counter()
+        with measure(timings):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = server_timing(timings, total)
+        return response
+
+
+def server_timing(timings, total):
+    """Returns the value of the Server-Timing header of a request, given its timings and duration in seconds."""
+
+    template_time = timings.template_time - timings.template_sql_time
+    session_time = timings.session_time - timings.session_sql_time
+    entries = [
+        ('db', timings.sql_time, 'DB'),
+        ('queries', None, f'{timings.queries} queries'),
+        ('tpl', template_time, 'Templates'),
+        ('cache', timings.cache_time, f'Cache ({timings.cache_lookups} lookups)'),
+        ('session', session_time, 'Session'),
+        ('view', total - timings.sql_time - template_time - timings.cache_time - session_time, 'View'),
+        ('total', total, 'Total'),
+    ]
+    return ', '.join(f'{name};desc="{description}"' if duration is None else
+                     f'{name};dur={max(duration, 0) * 1000:.2f};desc="{description}"'
+                     for name, duration, description in entries)
+
+
+def _response_size(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if not response.streaming:
+        return len(response.content)
+    return None
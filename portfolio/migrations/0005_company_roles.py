@@ -0,0 +1,45 @@
+# Generated by Django 4.1.2 on 2026-10-17 17:47
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def populate_company_roles(apps, schema_editor):
+    Company = apps.get_model('portfolio', 'Company')
+    Investor = apps.get_model('portfolio', 'Investor')
+    InvestorCompany = apps.get_model('portfolio', 'InvestorCompany')
+    Portfolio_Company = apps.get_model('portfolio', 'Portfolio_Company')
+
+    Company.objects.filter(Exists(Investor.objects.filter(company=OuterRef('pk')))).update(is_investor=True)
+    Company.objects.filter(Exists(InvestorCompany.objects.filter(company=OuterRef('pk')))).update(is_investor=True)
+    Company.objects.filter(Exists(Portfolio_Company.objects.filter(parent_company=OuterRef('pk')))) \
+        .update(is_portfolio_company=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_programme_description_alter_investment_dateinvested_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='is_investor',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='is_portfolio_company',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['is_investor', 'is_archived', 'id'], name='portfolio_c_is_inve_a64243_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['is_portfolio_company', 'is_archived', 'id'], name='portfolio_c_is_port_3da80f_idx'),
+        ),
+        migrations.RunPython(populate_company_roles, migrations.RunPython.noop),
+    ]
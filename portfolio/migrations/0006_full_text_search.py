@@ -0,0 +1,37 @@
+# Creates the FTS5 shadow tables used by portfolio.search. They are only created on SQLite, other backends fall back
+# to LIKE lookups.
+
+from django.db import migrations
+
+INDEXES = [
+    ('portfolio_company', ['name', 'trading_names', 'previous_names']),
+    ('portfolio_individual', ['name', 'Company', 'Position']),
+    ('portfolio_programme', ['name', 'description']),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, fields in INDEXES:
+        columns = ', '.join(fields)
+        schema_editor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({columns}, tokenize="trigram")')
+        schema_editor.execute(f'INSERT INTO {table}_fts (rowid, {columns}) SELECT id, {columns} FROM {table}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, fields in INDEXES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_company_roles'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.2 on 2026-10-17 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import ExtractYear
+
+
+def populate_rollups(apps, schema_editor):
+    Investment = apps.get_model('portfolio', 'Investment')
+    InvestmentRollup = apps.get_model('portfolio', 'InvestmentRollup')
+    groupings = [
+        ('round', F('typeOfFoundingRounds')),
+        ('year', ExtractYear('dateInvested')),
+        ('investor', F('investor_id')),
+        ('startup', F('startup_id')),
+    ]
+    for dimension, grouping in groupings:
+        totals = Investment.objects.order_by().annotate(bucket=grouping).values('bucket').annotate(
+            total_amount=Sum('investmentAmount'), count=Count('id'),
+            first_invested=Min('dateInvested'), last_invested=Max('dateInvested'),
+        )
+        InvestmentRollup.objects.bulk_create(
+            [InvestmentRollup(dimension=dimension, key=str(row.pop('bucket')), **row) for row in totals],
+            batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('round', 'Founding round'), ('year', 'Year'), ('investor', 'Investor'), ('startup', 'Startup')], max_length=10)),
+                ('key', models.CharField(max_length=50)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_invested', models.DateField()),
+                ('last_invested', models.DateField()),
+            ],
+            options={
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
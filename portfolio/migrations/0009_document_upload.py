@@ -0,0 +1,38 @@
+# Generated by Django 4.1.2 on 2026-10-17 19:43
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_investment_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256 checksum'),
+        ),
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=254, validators=[django.core.validators.RegexValidator(message='Document name must consist of up to 254 valid characters: 0-9 a-z A-Z _ \\ - . and spaces', regex='^[0-9a-zA-Z_\\-. ]+$')])),
+                ('size', models.PositiveBigIntegerField(validators=[django.core.validators.MinValueValidator(1, message='The file is empty.')])),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('is_private', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='portfolio.company')),
+                ('individual', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='portfolio.individual')),
+                ('programme', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='portfolio.programme')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
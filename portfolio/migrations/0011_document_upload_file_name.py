@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_document_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentupload',
+            name='file_name',
+            field=models.CharField(max_length=254),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.2 on 2026-10-17 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_document_upload_file_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(fields=['typeOfFoundingRounds', 'dateInvested'], name='portfolio_i_typeOfF_2baa17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(fields=['dateInvested'], name='portfolio_i_dateInv_58ff69_idx'),
+        ),
+    ]
@@ -2,7 +2,9 @@ from .auth_usermodel import User
 from .company_model import Company
 from .individual_model import Individual
 from .programme_model import Programme
+from .document_blob_model import DocumentBlob
 from .document_model import Document
+from .document_upload_model import DocumentUpload
 from .founder_model import Founder
 from .address_model import ResidentialAddress
 from .portfolio_company_model import Portfolio_Company
@@ -10,3 +12,5 @@ from .investment_model import Investment
 from .investor_company_model import InvestorCompany
 from .investor_model import Investor
 from .past_experience_model import PastExperience
+from .data_version_model import DataVersion
+from .investment_rollup_model import InvestmentRollup
@@ -1,10 +1,46 @@
 from django.core.validators import RegexValidator, MinLengthValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from django.dispatch import receiver
+
+# Flags maintained by signals on the investor and portfolio company models.
+ROLE_FIELDS = ('is_investor', 'is_portfolio_company')
+
+
+class CompanyQuerySet(models.QuerySet):
+    """Query set exposing the cached company roles as single indexed predicates."""
+
+    def investors(self):
+        return self.filter(is_investor=True)
+
+    def portfolio_companies(self):
+        return self.filter(is_portfolio_company=True)
+
+    def with_filter(self, company_filter):
+        """Returns the companies shown for a dashboard filter: 1 all, 2 portfolio companies, 3 investors."""
+
+        company_filter = int(company_filter or 1)
+        if company_filter == 3:
+            return self.investors()
+        elif company_filter == 2:
+            return self.portfolio_companies()
+        return self
+
+    def refresh_roles(self):
+        """Recomputes the role flags of the selected companies from the investor and portfolio company tables."""
+
+        companies = self.model.objects.filter(pk=OuterRef('pk'))
+        return self.update(
+            is_investor=Exists(companies.filter(Q(company__isnull=False) | Q(investorcompany__isnull=False))),
+            is_portfolio_company=Exists(companies.filter(parent_company__isnull=False)),
+        )
 
 
 class Company(models.Model):
     """A company to store information about."""
 
+    objects = CompanyQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.name}'
 
@@ -47,6 +83,21 @@ class Company(models.Model):
     incorporation_date = models.DateField(auto_now=True)
     investors = None  # e.g. models.ForeignKey(Individual)
     is_archived = models.BooleanField(default=False)
+    is_investor = models.BooleanField(default=False, editable=False)
+    is_portfolio_company = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_investor', 'is_archived', 'id']),
+            models.Index(fields=['is_portfolio_company', 'is_archived', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Never write back role flags from a possibly stale instance, they are owned by the signals below.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in ROLE_FIELDS]
+        super().save(*args, **kwargs)
 
     def archive(self):
         self.is_archived = True
@@ -55,3 +106,11 @@ class Company(models.Model):
     def unarchive(self):
         self.is_archived = False
         self.save()
+
+
+@receiver(models.signals.post_save, sender=Company)
+def refresh_roles_on_raw_save(sender, instance, raw, **kwargs):
+    """Recomputes the role flags of a company loaded from a fixture, which may arrive after its investor rows."""
+
+    if raw:
+        Company.objects.filter(pk=instance.pk).refresh_roles()
@@ -0,0 +1,33 @@
+"""Data version model, used to invalidate cached renderings."""
+import uuid
+
+from django.db import models, transaction
+
+
+class DataVersion(models.Model):
+    """The version of a named set of rows, replaced by a new random token whenever one of the rows is written.
+
+    The token is stored in the database rather than in the cache so that every process sees the same version and a
+    rolled back write also rolls back the version.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    token = models.CharField(max_length=32)
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list('token', flat=True).first() or ''
+
+    @classmethod
+    def bump(cls, name):
+        """Replaces the version of a set of rows. Returns the token it replaced ('' for a new version) and the new one,
+        read under the lock of the row so that the versions of concurrent writes follow each other."""
+
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            version, created = cls.objects.select_for_update().get_or_create(name=name, defaults={'token': token})
+            if created:
+                return '', token
+            previous = version.token
+            version.token = token
+            version.save(update_fields=['token'])
+        return previous, token
@@ -0,0 +1,108 @@
+"""Model of the files of documents, stored once by content"""
+import hashlib
+import os
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+DEFAULT_PATH = "blobs/"
+
+
+# Returns the storage path of the file with the given SHA-256, spread over two levels of directories.
+def get_path(sha256):
+    return os.path.join(DEFAULT_PATH, sha256[:2], sha256[2:4], sha256)
+
+
+def file_sha256(content):
+    """Returns the SHA-256 of a file (a Django File), read in chunks."""
+
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+class DocumentBlob(models.Model):
+    """The content of a document file, stored once under the SHA-256 of its bytes however many documents have it.
+
+    references counts the documents using the blob, kept current by the Document signal receivers. The blob and its
+    file are deleted once the last document using it is deleted or given another file.
+    """
+    # Set on the blob returned by store, whose reference is for the document it is given to.
+    held = False
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+    @classmethod
+    def store(cls, content, sha256=''):
+        """Returns the blob with the content of a file (a Django File), storing the file only when no blob has the same
+        content yet. sha256 is the checksum of the file when the caller computed it already.
+
+        The blob is returned with one reference counted, taken as it is found or created, for the document it is given
+        to: release cannot delete it in between. The caller saves that document in the same transaction, so that the
+        reference is rolled back with the blob should the document not be saved."""
+
+        sha256 = sha256 or file_sha256(content)
+        name = get_path(sha256)
+        storage = cls._meta.get_field('file').storage
+        while True:
+            if cls.acquire(sha256):
+                blob = cls.objects.get(sha256=sha256)
+                break
+            # The file is already there when a transaction creating its blob rolled back, or another process stores it.
+            if not storage.exists(name):
+                stored = storage.save(name, content)
+                if stored != name:
+                    storage.delete(stored)
+            try:
+                with transaction.atomic():
+                    blob = cls.objects.create(sha256=sha256, file=name, size=content.size, references=1)
+                break
+            except IntegrityError:
+                # Another upload created it meanwhile, its reference is taken on the next turn.
+                continue
+        blob.held = True
+        return blob
+
+    @classmethod
+    def acquire(cls, sha256):
+        """Counts one more document using a blob. Returns False when there is no such blob."""
+
+        return cls.objects.filter(sha256=sha256).update(references=F('references') + 1) > 0
+
+    @classmethod
+    def release(cls, sha256):
+        """Counts one document less using a blob, and deletes the blob once no document uses it. Its file is deleted
+        when the transaction commits, so that a rolled back deletion does not lose it."""
+
+        cls.objects.filter(sha256=sha256, references__gt=0).update(references=F('references') - 1)
+        name = cls.objects.filter(sha256=sha256, references=0).values_list('file', flat=True).first()
+        # Only deleted while no document uses it: a blob acquired meanwhile by store is kept.
+        if name is None or not cls.objects.filter(sha256=sha256, references=0).delete()[0]:
+            return
+        storage = cls._meta.get_field('file').storage
+
+        def delete_file():
+            # Stored again since by another upload, the blob keeps its file.
+            if not cls.objects.filter(sha256=sha256).exists():
+                storage.delete(name)
+
+        transaction.on_commit(delete_file)
+
+    @classmethod
+    def recount(cls):
+        """Recomputes the references of every blob from the documents, and deletes the blobs no document uses."""
+
+        counts = models.Count('document')
+        for blob in cls.objects.annotate(count=counts).exclude(references=F('count')):
+            cls.objects.filter(sha256=blob.sha256).update(references=blob.count)
+        for blob in cls.objects.filter(references=0):
+            cls.release(blob.sha256)
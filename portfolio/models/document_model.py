@@ -1,13 +1,20 @@
 import os
 
+from django.conf import settings
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
 from django.dispatch import receiver
 
 from portfolio.models import Company, Individual, Programme
+from portfolio.models.document_blob_model import DocumentBlob
 
 DEFAULT_PATH = "documents/"
 
+FILE_NAME_VALIDATOR = RegexValidator(
+    regex=r"^[0-9a-zA-Z_\-. ]+$",
+    message="Document name must consist of up to 254 valid characters: 0-9 a-z A-Z _ \\ - . and spaces"
+)
+
 
 # Returns the storage path of a file.
 def get_path(instance, file_name):
@@ -22,17 +29,20 @@ def get_path(instance, file_name):
 
 
 class Document(models.Model):
-    """A document stored in the system."""
+    """A document stored in the system.
+
+    In content-addressed mode (CONTENT_ADDRESSED_DOCUMENTS), the file of a document is stored once by SHA-256 in a
+    DocumentBlob shared by every document with the same bytes, and file names the file of the blob. Otherwise, and for
+    the documents stored before the dedupe_documents command was run, the file is stored under the name of the
+    company, individual or programme of the document.
+    """
 
     file_id = models.BigAutoField(primary_key=True)
     file_name = models.CharField(
         max_length=254,
         unique=False,
         blank=False,
-        validators=[RegexValidator(
-            regex=r"^[0-9a-zA-Z_\-. ]+$",
-            message="Document name must consist of up to 254 valid characters: 0-9 a-z A-Z _ \\ - . and spaces"
-        )]
+        validators=[FILE_NAME_VALIDATOR]
     )
     file_type = models.CharField(
         max_length=254,
@@ -44,8 +54,10 @@ class Document(models.Model):
         )]
     )
     file_size = models.PositiveIntegerField(default=0)
+    checksum = models.CharField("SHA-256 checksum", max_length=64, blank=True)
     url = models.URLField(max_length=200, blank=True, null=True)
     file = models.FileField(upload_to=get_path, blank=True, null=True)
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, blank=True, null=True, editable=False)
     company = models.ForeignKey(Company, on_delete=models.CASCADE, blank=True, null=True)
     individual = models.ForeignKey(Individual, on_delete=models.CASCADE, blank=True, null=True)
     programme = models.ForeignKey(Programme, on_delete=models.CASCADE, blank=True, null=True)
@@ -56,6 +68,12 @@ class Document(models.Model):
     def __str__(self):
         return self.file_name
 
+    def save(self, *args, **kwargs):
+        # The blob of the file is stored and its reference counted by the signal receivers below, in the same
+        # transaction as the document, so that a failed save does not leave them behind.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         """Define constraints to ensure url, file, company, individual and programme fields are valid."""
 
@@ -77,28 +95,74 @@ class Document(models.Model):
         ]
 
 
-@receiver(models.signals.post_delete, sender=Document)
-def auto_delete_file_on_delete(sender, instance, **kwargs):
-    """Deletes the file from local storage when the corresponding "Document" object is deleted."""
+def content_addressed():
+    """Whether the new files of documents are stored once by content, see DocumentBlob."""
+
+    return getattr(settings, 'CONTENT_ADDRESSED_DOCUMENTS', True)
+
 
-    if instance.file:
-        if os.path.isfile(instance.file.path):
-            os.remove(instance.file.path)
+def _delete_unused_file(name):
+    """Deletes a file stored for a single document, when the transaction commits, unless a document still uses it."""
+
+    if not Document.objects.filter(file=name).exists():
+        storage = Document._meta.get_field('file').storage
+        transaction.on_commit(lambda: storage.delete(name))
 
 
 @receiver(models.signals.pre_save, sender=Document)
-def auto_delete_file_on_change(sender, instance, **kwargs):
-    """Deletes the old file from local storage when corresponding "Document" object is updated with a new file."""
+def store_file_by_content(sender, instance, **kwargs):
+    """Stores the new file of a document once by content, reusing the blob of any document with the same bytes, and
+    counts the reference of the document to the blob of its new file. Records the file the document had before for
+    count_blob_references."""
+
+    previous = Document.objects.filter(pk=instance.pk).values_list('file', 'blob_id').first() if instance.pk else None
+    instance._previous_file = previous or ('', None)
+    instance._acquired_blob = False
+
+    if instance.file and not instance.file._committed:
+        if content_addressed():
+            if not (instance.company_id or instance.individual_id or instance.programme_id):
+                raise ValueError("Document must be associated with a company, individual or programme.")
+            blob = DocumentBlob.store(instance.file.file)
+            instance.file = blob.file.name
+            instance.blob = blob
+            instance.checksum = blob.sha256
+            instance.file_size = blob.size
+            instance._acquired_blob = True
+        else:
+            instance.blob = None
+    elif (instance.file.name or '') != instance._previous_file[0]:
+        blob = instance.blob
+        if blob is not None and blob.held and blob.file.name == instance.file.name:
+            # Given by DocumentBlob.store, with its reference taken.
+            blob.held = False
+        elif instance.file:
+            blob = DocumentBlob.objects.filter(file=instance.file.name).first()
+            if blob is not None and not DocumentBlob.acquire(blob.sha256):
+                blob = None
+        else:
+            blob = None
+        instance.blob = blob
+        instance._acquired_blob = blob is not None
+
+
+@receiver(models.signals.post_save, sender=Document)
+def count_blob_references(sender, instance, **kwargs):
+    """Releases the blob of the previous file of a document once it was given another, and deletes the previous file
+    when it was stored for this document alone."""
+
+    previous_name, previous_blob = instance._previous_file
+    if previous_blob and (instance._acquired_blob or instance.blob_id != previous_blob):
+        DocumentBlob.release(previous_blob)
+    if previous_name and previous_blob is None and previous_name != instance.file.name:
+        _delete_unused_file(previous_name)
 
-    if not instance.pk:
-        return False
 
-    try:
-        old_file = Document.objects.get(pk=instance.pk).file
-    except Document.DoesNotExist:
-        return False
+@receiver(models.signals.post_delete, sender=Document)
+def release_file_on_delete(sender, instance, **kwargs):
+    """Releases the blob of a deleted document, or deletes the file stored for this document alone."""
 
-    new_file = instance.file
-    if not old_file == new_file and old_file:
-        if os.path.isfile(old_file.path):
-            os.remove(old_file.path)
+    if instance.blob_id:
+        DocumentBlob.release(instance.blob_id)
+    elif instance.file:
+        _delete_unused_file(instance.file.name)
@@ -0,0 +1,41 @@
+"""Model of the documents being uploaded in chunks"""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.db import models
+
+from portfolio.models import Company, Individual, Programme, User
+
+
+class DocumentUpload(models.Model):
+    """A document being uploaded in chunks, see portfolio.uploads.
+
+    The chunks received so far are in a temporary file of UPLOAD_TEMP_DIR, and received is the number of bytes it
+    holds, the offset of the next chunk. The Document is only created when the upload is finalized.
+
+    file_name is the name shown for the document, as the browser gave it. The file is stored under a valid name made
+    from it by the storage, or under its checksum in content-addressed mode.
+    """
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=254)
+    size = models.PositiveBigIntegerField(validators=[MinValueValidator(1, message="The file is empty.")])
+    received = models.PositiveBigIntegerField(default=0)
+    is_private = models.BooleanField(default=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, blank=True, null=True)
+    individual = models.ForeignKey(Individual, on_delete=models.CASCADE, blank=True, null=True)
+    programme = models.ForeignKey(Programme, on_delete=models.CASCADE, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.file_name
+
+    def clean(self):
+        if [self.company_id, self.individual_id, self.programme_id].count(None) != 2:
+            raise ValidationError("A document must be uploaded to a company, an individual or a programme.")
+
+    @property
+    def complete(self):
+        return self.received == self.size
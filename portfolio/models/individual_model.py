@@ -1,5 +1,6 @@
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.db.models.query import QuerySet
 from phonenumber_field.modelfields import PhoneNumberField
 
@@ -18,6 +19,28 @@ class PolymorphicQuerySet(QuerySet):
             yield item.as_child_class()
 
 
+class IndividualQuerySet(QuerySet):
+    """Query set of individuals."""
+
+    def with_roles(self):
+        """Annotates each individual with whether it is a founder (is_founder) and an investor (is_investor)."""
+
+        return self.annotate(
+            is_founder=Exists(self.model.objects.filter(pk=OuterRef('pk'), founder__isnull=False)),
+            is_investor=Exists(self.model.objects.filter(pk=OuterRef('pk'), individual__isnull=False)),
+        )
+
+    def with_filter(self, individual_filter):
+        """Returns the individuals shown for an individual page filter: 1 all, 2 founders, 3 investors."""
+
+        individual_filter = int(individual_filter or 1)
+        if individual_filter == 3:
+            return self.filter(Exists(self.model.objects.filter(pk=OuterRef('pk'), individual__isnull=False)))
+        elif individual_filter == 2:
+            return self.filter(Exists(self.model.objects.filter(pk=OuterRef('pk'), founder__isnull=False)))
+        return self
+
+
 ## Individual Manager Override
 class IndividualManager(models.Manager):
     def get_query_set(self):
@@ -31,7 +54,7 @@ class Individual(models.Model):
         return f'{self.name}'
 
     content_type = models.ForeignKey(ContentType, editable=False, null=True, on_delete=models.CASCADE)
-    objects = IndividualManager()
+    objects = IndividualManager.from_queryset(IndividualQuerySet)()
 
     name = models.CharField("name", max_length=200)
     AngelListLink = models.URLField("Angellist link", max_length=200)
@@ -29,6 +29,13 @@ class Investment(models.Model):
     dateInvested = models.DateField(validators=[MaxValueValidator(limit_value=timezone.now().date())])
     dateExit = models.DateField(blank=True, null=True)
 
+    class Meta:
+        # The first and last dates of a founding round or a year, read by InvestmentRollup.remove.
+        indexes = [
+            models.Index(fields=['typeOfFoundingRounds', 'dateInvested']),
+            models.Index(fields=['dateInvested']),
+        ]
+
     def clean(self):
         if self.dateExit is not None and self.dateInvested > self.dateExit:
             raise ValidationError('Date invest cannot be after date exit')
@@ -0,0 +1,208 @@
+"""Model to store running totals of investments"""
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import ExtractYear, Greatest, Least
+from django.dispatch import receiver
+
+from portfolio.models.investment_model import Investment
+
+
+class InvestmentRollup(models.Model):
+    """The total amount, number and first/last date of the investments sharing a founding round, a year, an investor
+    or a startup.
+
+    Rollups are kept current by the Investment signal receivers below, so reading the totals of a bucket is a single
+    row lookup. The rebuild_rollups command recomputes every bucket from the investments.
+    """
+    ROUND = 'round'
+    YEAR = 'year'
+    INVESTOR = 'investor'
+    STARTUP = 'startup'
+
+    DIMENSIONS = [
+        (ROUND, 'Founding round'),
+        (YEAR, 'Year'),
+        (INVESTOR, 'Investor'),
+        (STARTUP, 'Startup'),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key = models.CharField(max_length=50)
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    first_invested = models.DateField()
+    last_invested = models.DateField()
+
+    class Meta:
+        unique_together = ('dimension', 'key')
+
+    @classmethod
+    def lookup(cls, dimension, key):
+        """Returns the rollup of a bucket, or None when no investment falls in it."""
+
+        return cls.objects.filter(dimension=dimension, key=str(key)).first()
+
+    @staticmethod
+    def values_of(investment):
+        """Returns the amount and date of an investment as stored, even when they were assigned as strings."""
+
+        amount = Investment._meta.get_field('investmentAmount').to_python(investment.investmentAmount)
+        date = Investment._meta.get_field('dateInvested').to_python(investment.dateInvested)
+        return amount, date
+
+    @classmethod
+    def buckets_of(cls, investment):
+        """Returns the (dimension, key) of every bucket an investment counts towards."""
+
+        return [
+            (cls.ROUND, investment.typeOfFoundingRounds),
+            (cls.YEAR, str(cls.values_of(investment)[1].year)),
+            (cls.INVESTOR, str(investment.investor_id)),
+            (cls.STARTUP, str(investment.startup_id)),
+        ]
+
+    @staticmethod
+    def investments_in(dimension, key):
+        """Returns the investments of a bucket."""
+
+        lookups = {
+            InvestmentRollup.ROUND: {'typeOfFoundingRounds': key},
+            InvestmentRollup.YEAR: {'dateInvested__year': key},
+            InvestmentRollup.INVESTOR: {'investor_id': key},
+            InvestmentRollup.STARTUP: {'startup_id': key},
+        }
+        return Investment.objects.filter(**lookups[dimension])
+
+    @classmethod
+    def edges_of(cls, dimension, key):
+        """Returns the first and last dates of the investments of a bucket, or (None, None) when it is empty.
+
+        Each is read as the first row of the bucket in date order, a seek on the (typeOfFoundingRounds, dateInvested)
+        or dateInvested index of Investment for founding rounds and years, and on the foreign key index for investors
+        and startups."""
+
+        dates = cls.investments_in(dimension, key).values_list('dateInvested', flat=True)
+        return dates.order_by('dateInvested').first(), dates.order_by('-dateInvested').first()
+
+    @classmethod
+    def add(cls, investment):
+        """Adds an investment to the totals of its buckets."""
+
+        amount, date = cls.values_of(investment)
+        for dimension, key in cls.buckets_of(investment):
+            rollup, created = cls.objects.get_or_create(dimension=dimension, key=key, defaults={
+                'total_amount': amount, 'count': 1, 'first_invested': date, 'last_invested': date,
+            })
+            if not created:
+                cls.objects.filter(pk=rollup.pk).update(
+                    total_amount=F('total_amount') + amount,
+                    count=F('count') + 1,
+                    first_invested=Least('first_invested', Value(date)),
+                    last_invested=Greatest('last_invested', Value(date)),
+                )
+
+    @classmethod
+    def add_all(cls, investments, batch_size=1000):
+        """Adds investments written without signals to the totals of their buckets, with three queries per dimension
+        however many there are. Runs in the transaction writing the investments, which locks the rollups it updates.
+        """
+
+        added = {}
+        for investment in investments:
+            amount, date = cls.values_of(investment)
+            for dimension, key in cls.buckets_of(investment):
+                total = added.setdefault(dimension, {}).get(key)
+                if total is None:
+                    added[dimension][key] = cls(dimension=dimension, key=key, total_amount=amount, count=1,
+                                                first_invested=date, last_invested=date)
+                    continue
+                total.total_amount += amount
+                total.count += 1
+                total.first_invested = min(total.first_invested, date)
+                total.last_invested = max(total.last_invested, date)
+        for dimension, totals in added.items():
+            rollups = list(cls.objects.select_for_update().filter(dimension=dimension, key__in=list(totals)))
+            for rollup in rollups:
+                total = totals.pop(rollup.key)
+                rollup.total_amount += total.total_amount
+                rollup.count += total.count
+                rollup.first_invested = min(rollup.first_invested, total.first_invested)
+                rollup.last_invested = max(rollup.last_invested, total.last_invested)
+            cls.objects.bulk_update(rollups, ['total_amount', 'count', 'first_invested', 'last_invested'],
+                                    batch_size=batch_size)
+            cls.objects.bulk_create(totals.values(), batch_size=batch_size)
+
+    @classmethod
+    def remove(cls, investment):
+        """Removes an investment, which must no longer be stored with these values, from the totals of its buckets."""
+
+        amount, date = cls.values_of(investment)
+        for dimension, key in cls.buckets_of(investment):
+            rollup = cls.objects.filter(dimension=dimension, key=key).first()
+            if rollup is None:
+                continue
+            if rollup.count <= 1:
+                rollup.delete()
+                continue
+            cls.objects.filter(pk=rollup.pk).update(
+                total_amount=F('total_amount') - amount,
+                count=F('count') - 1,
+            )
+            # A minimum or maximum cannot be undone incrementally, read it again when the investment was on the edge.
+            if date in (rollup.first_invested, rollup.last_invested):
+                first, last = cls.edges_of(dimension, key)
+                if first is None:
+                    cls.objects.filter(pk=rollup.pk).delete()
+                else:
+                    cls.objects.filter(pk=rollup.pk).update(first_invested=first, last_invested=last)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recomputes every rollup with one grouped aggregate over the investments per dimension. Returns the number
+        of rollups written."""
+
+        groupings = [
+            (cls.ROUND, F('typeOfFoundingRounds')),
+            (cls.YEAR, ExtractYear('dateInvested')),
+            (cls.INVESTOR, F('investor_id')),
+            (cls.STARTUP, F('startup_id')),
+        ]
+        count = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            for dimension, grouping in groupings:
+                totals = Investment.objects.order_by().annotate(bucket=grouping).values('bucket').annotate(
+                    total_amount=Sum('investmentAmount'), count=Count('id'),
+                    first_invested=Min('dateInvested'), last_invested=Max('dateInvested'),
+                )
+                rollups = [cls(dimension=dimension, key=str(row['bucket']), total_amount=row['total_amount'],
+                               count=row['count'], first_invested=row['first_invested'],
+                               last_invested=row['last_invested']) for row in totals.iterator()]
+                cls.objects.bulk_create(rollups, batch_size=batch_size)
+                count += len(rollups)
+        return count
+
+
+@receiver(models.signals.pre_save, sender=Investment)
+def remember_rolled_up_values(sender, instance, **kwargs):
+    """Remembers the stored values of an investment about to be updated, to take them out of the rollups."""
+
+    instance._rolled_up = Investment.objects.filter(pk=instance.pk).first() if instance.pk else None
+
+
+@receiver(models.signals.post_save, sender=Investment)
+def update_rollups_on_save(sender, instance, **kwargs):
+    """Moves a saved investment from the rollups of its previous values to those of its current values."""
+
+    previous = getattr(instance, '_rolled_up', None)
+    if previous is not None:
+        InvestmentRollup.remove(previous)
+    InvestmentRollup.add(instance)
+    instance._rolled_up = None
+
+
+@receiver(models.signals.post_delete, sender=Investment)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    """Takes a deleted investment out of the rollups."""
+
+    InvestmentRollup.remove(instance)
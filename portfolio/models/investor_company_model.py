@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 
 from portfolio.models.company_model import Company
 
@@ -59,3 +60,12 @@ class InvestorCompany(models.Model):
         choices=INVESTOR_TYPES,
         default=VENTURE_CAPITAL,
     )
+
+
+@receiver(models.signals.post_save, sender=InvestorCompany)
+@receiver(models.signals.post_delete, sender=InvestorCompany)
+def refresh_company_roles(sender, instance, **kwargs):
+    """Keeps the role flags of the investing company in sync with its investor company rows."""
+
+    if instance.company_id:
+        Company.objects.filter(pk=instance.company_id).refresh_roles()
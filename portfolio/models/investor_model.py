@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.dispatch import receiver
 
 from portfolio.models import Company, Individual
 
@@ -65,3 +66,12 @@ class Investor(models.Model):
         if (self.company is None and self.individual is None) or \
                 (self.company and self.individual):
             raise ValidationError('company and individual cannot both be null')
+
+
+@receiver(models.signals.post_save, sender=Investor)
+@receiver(models.signals.post_delete, sender=Investor)
+def refresh_company_roles(sender, instance, **kwargs):
+    """Keeps the role flags of the investing company in sync with its investor rows."""
+
+    if instance.company_id:
+        Company.objects.filter(pk=instance.company_id).refresh_roles()
@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 
 from portfolio.models import Company
 
@@ -6,3 +7,12 @@ from portfolio.models import Company
 class Portfolio_Company(models.Model):
     parent_company = models.OneToOneField(Company, on_delete=models.CASCADE, related_name="parent_company")
     wayra_number = models.CharField(max_length=255, unique=True)
+
+
+@receiver(models.signals.post_save, sender=Portfolio_Company)
+@receiver(models.signals.post_delete, sender=Portfolio_Company)
+def refresh_company_roles(sender, instance, **kwargs):
+    """Keeps the role flags of the parent company in sync with its portfolio company row."""
+
+    if instance.parent_company_id:
+        Company.objects.filter(pk=instance.parent_company_id).refresh_roles()
@@ -0,0 +1,135 @@
+"""Keyset (cursor) pagination for the listing pages.
+
+Unlike django.core.paginator.Paginator, a keyset page never issues a COUNT(*) or an OFFSET scan: the next page is
+selected with a range predicate on the ordering columns, starting after the last row of the previous page. The
+ordering columns must be non-null and end with a unique column, which is appended automatically ('id').
+"""
+import base64
+import binascii
+import hashlib
+import json
+import time
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from portfolio.metrics import cache_lookup
+from vcpms import settings
+
+# Seconds an approximate total is reused before it is counted again.
+APPROXIMATE_COUNT_TIMEOUT = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+
+
+class InvalidCursor(InvalidPage):
+    """Raised when a cursor cannot be decoded for the paginator's ordering."""
+    pass
+
+
+def encode_cursor(values):
+    """Encodes the sort key values of a row as an opaque, URL safe cursor."""
+
+    data = json.dumps(list(values), cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor produced by encode_cursor back into a list of sort key values."""
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('The cursor is malformed.')
+    if not isinstance(values, list):
+        raise InvalidCursor('The cursor is malformed.')
+    return values
+
+
+class KeysetPage(Sequence):
+    """A single page of a keyset paginator, usable wherever a list of objects is expected."""
+
+    def __init__(self, object_list, next_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.paginator = paginator
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def approximate_count(self):
+        return self.paginator.approximate_count()
+
+
+class KeysetPaginator:
+    """Paginates a query set on (sort_key, ..., id) without counting or offsetting rows."""
+
+    def __init__(self, object_list, per_page, ordering=('id',)):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        if self.ordering[-1].lstrip('-') != 'id':
+            self.ordering += ('id',)
+
+    def page(self, cursor=None):
+        """Returns the page following the given cursor, or the first page when no cursor is given."""
+
+        query_set = self.object_list.order_by(*self.ordering)
+        if cursor:
+            try:
+                query_set = query_set.filter(self._after(decode_cursor(cursor)))
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor('The cursor does not match the ordering of this paginator.')
+
+        # Fetch one extra row to find out whether there is a next page.
+        rows = list(query_set[:self.per_page + 1])
+        next_cursor = self.cursor_for(rows[self.per_page - 1]) if len(rows) > self.per_page else None
+        return KeysetPage(rows[:self.per_page], next_cursor, self)
+
+    def cursor_for(self, row):
+        """Returns the cursor pointing just after the given row (a model instance or a .values() dict)."""
+
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return encode_cursor(row[field] for field in fields)
+        return encode_cursor(getattr(row, field) for field in fields)
+
+    def approximate_count(self):
+        """Returns the number of rows, counted at most once per APPROXIMATE_COUNT_TIMEOUT for the same query."""
+
+        key = 'keyset-count:' + hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+        start = time.perf_counter()
+        count = cache.get(key)
+        cache_lookup('keyset-count', count is not None, time.perf_counter() - start)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, APPROXIMATE_COUNT_TIMEOUT)
+        return count
+
+    def _after(self, values):
+        """Builds the predicate selecting rows strictly after the given sort key values."""
+
+        if len(values) != len(self.ordering):
+            raise InvalidCursor('The cursor does not match the ordering of this paginator.')
+
+        # (a, b, c) > (x, y, z)  <=>  a > x  or  (a = x and b > y)  or  (a = x and b = y and c > z)
+        predicate = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+            predicate |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return predicate
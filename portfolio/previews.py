@@ -0,0 +1,261 @@
+"""Thumbnails and previews of documents, generated in the background.
+
+When a document with a file is saved, its previews are queued once the transaction commits and generated by a pool of
+PREVIEW_WORKERS threads, so that the upload returns as fast as before. Every size of PREVIEW_SIZES is a JPEG no larger
+than the size, of:
+
+- images: the picture itself (the first frame of animated or multi-page images), turned upright from its EXIF data,
+- PDFs: the first page, when PyMuPDF is installed and the storage keeps files on the local disk.
+
+The stored file is decoded straight from the storage, never read into memory whole, and images of more than
+PREVIEW_MAX_PIXELS pixels are not decoded at all, so that a decompression bomb only loses its preview.
+
+Previews are cached in the media storage in a directory of previews/ named after the stored file of the document.
+Documents sharing a file (see DocumentBlob) share its previews, and a document given a new file gets new ones. The
+receivers at the bottom delete the previews of a file once the file itself is deleted.
+
+The document_preview view serves them lazily: a preview not generated yet (the pool is still busy, the process
+restarted, or the document was uploaded before previews existed) is queued then, and the view answers 404 at once, on
+which the pages fall back to the icon of the file type until the next visit. Whether a document can have a preview
+only depends on its file type, so listing documents costs no file access.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from portfolio.models import Document, DocumentBlob
+from vcpms import settings
+
+try:
+    # Optional: renders the first page of PDFs.
+    import fitz
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+# Largest width and height of the previews, by name
+PREVIEW_SIZES = getattr(settings, 'PREVIEW_SIZES', {'thumbnail': (160, 160), 'preview': (800, 800)})
+
+# Number of threads generating previews
+PREVIEW_WORKERS = getattr(settings, 'PREVIEW_WORKERS', 2)
+
+# Largest number of pixels of an image decoded for its previews
+PREVIEW_MAX_PIXELS = getattr(settings, 'PREVIEW_MAX_PIXELS', 50_000_000)
+
+# Bumped whenever previews are drawn differently, so that the previous ones are not served anymore
+PREVIEW_VERSION = 1
+
+PREVIEW_PATH = "previews/"
+
+IMAGE_TYPES = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+PDF_TYPES = {'pdf'}
+
+_executor = None
+_pending = {}
+_failed = set()
+_lock = threading.Lock()
+
+
+class PreviewError(Exception):
+    """Raised when a stored file cannot be drawn."""
+
+
+def previewable(file_type):
+    """Whether documents of a file type can have a preview."""
+
+    file_type = (file_type or '').lower()
+    return file_type in IMAGE_TYPES or (fitz is not None and file_type in PDF_TYPES)
+
+
+def preview_directory(name):
+    """Returns the directory of the previews of a stored file in the media storage."""
+
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    return f'{PREVIEW_PATH}{digest[:2]}/{digest}/'
+
+
+def preview_name(name, size):
+    """Returns the name of a preview of a stored file in the media storage."""
+
+    width, height = PREVIEW_SIZES[size]
+    return f'{preview_directory(name)}{size}-{width}x{height}-v{PREVIEW_VERSION}.jpg'
+
+
+def _open_image(file):
+    image = Image.open(file)
+    if image.width * image.height > PREVIEW_MAX_PIXELS:
+        raise PreviewError(f"{image.width}x{image.height} pixels is above PREVIEW_MAX_PIXELS.")
+    image.seek(0)
+    # Lets JPEG decoders scale down while decoding.
+    image.draft('RGB', max(PREVIEW_SIZES.values()))
+    return ImageOps.exif_transpose(image)
+
+
+def _open_pdf(name):
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        raise PreviewError("PDFs are only previewed from a storage on the local disk.")
+    with fitz.open(path) as pdf:
+        page = pdf.load_page(0)
+        width, height = max(PREVIEW_SIZES.values())
+        scale = min(width / page.rect.width, height / page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def draw(image):
+    """Returns the JPEG of an image, on a white background where it is transparent."""
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=80, optimize=True)
+    return output.getvalue()
+
+
+def _save_previews(name, image, sizes):
+    # From the largest size down, each preview is scaled in place from the one before.
+    for size in sorted(sizes, key=lambda size: PREVIEW_SIZES[size], reverse=True):
+        image.thumbnail(PREVIEW_SIZES[size])
+        default_storage.save(preview_name(name, size), ContentFile(draw(image)))
+
+
+def generate(name, file_type):
+    """Generates the previews of a stored file missing from the cache. Runs in the worker pool."""
+
+    missing = [size for size in PREVIEW_SIZES if not default_storage.exists(preview_name(name, size))]
+    if not missing:
+        return
+    try:
+        if file_type in PDF_TYPES:
+            _save_previews(name, _open_pdf(name), missing)
+        else:
+            with default_storage.open(name, 'rb') as file:
+                _save_previews(name, _open_image(file), missing)
+    except Exception:
+        # A damaged, unsupported or oversized file only loses its preview, it is not tried again by this process.
+        logger.warning("No preview of %s", name, exc_info=True)
+        with _lock:
+            _failed.add(name)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix='preview')
+        return _executor
+
+
+def schedule(document):
+    """Queues the generation of the previews of a document, unless they are queued already or failed before."""
+
+    if not document.file or not previewable(document.file_type):
+        return
+    name = document.file.name
+    executor = _get_executor()
+    with _lock:
+        if name in _pending or name in _failed:
+            return
+        future = _pending[name] = executor.submit(generate, name, document.file_type.lower())
+    future.add_done_callback(lambda done: _forget(name))
+
+
+def _forget(name):
+    with _lock:
+        _pending.pop(name, None)
+
+
+def wait(timeout=None):
+    """Waits for the previews queued so far to be generated."""
+
+    with _lock:
+        futures = list(_pending.values())
+    wait_futures(futures, timeout=timeout)
+
+
+def preview_file(document, size):
+    """Returns the preview of a document as a FieldFile, or None when the document has no preview or it is not
+    generated yet, in which case it is queued."""
+
+    if size not in PREVIEW_SIZES or not document.file or not previewable(document.file_type):
+        return None
+    name = preview_name(document.file.name, size)
+    if not default_storage.exists(name):
+        schedule(document)
+        return None
+    field = Document._meta.get_field('file')
+    return field.attr_class(document, field, name)
+
+
+def delete_previews(name):
+    """Deletes the previews of a stored file."""
+
+    directory = preview_directory(name)
+    try:
+        files = default_storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        default_storage.delete(directory + file_name)
+    try:
+        os.rmdir(default_storage.path(directory))
+    except (NotImplementedError, OSError):
+        pass
+    with _lock:
+        _failed.discard(name)
+
+
+def _delete_previews_once_deleted(name):
+    """Deletes the previews of a stored file when the transaction commits, if the file was deleted by then. The
+    receivers of the Document model deleting the file were connected first, so their callbacks run before."""
+
+    def delete():
+        if not default_storage.exists(name):
+            delete_previews(name)
+
+    transaction.on_commit(delete)
+
+
+@receiver(models.signals.post_save, sender=Document)
+def schedule_previews(sender, instance, **kwargs):
+    """Queues the previews of a saved document once the transaction commits, so the upload does not wait for them,
+    and deletes the previews of the file it had before once that file is gone."""
+
+    if instance.file and previewable(instance.file_type):
+        transaction.on_commit(lambda: schedule(instance))
+    previous_name = getattr(instance, '_previous_file', ('', None))[0]
+    if previous_name and previous_name != instance.file.name:
+        _delete_previews_once_deleted(previous_name)
+
+
+@receiver(models.signals.post_delete, sender=Document)
+def delete_previews_of_document(sender, instance, **kwargs):
+    """Deletes the previews of the file of a deleted document, once the file is gone."""
+
+    if instance.file:
+        _delete_previews_once_deleted(instance.file.name)
+
+
+@receiver(models.signals.post_delete, sender=DocumentBlob)
+def delete_previews_of_blob(sender, instance, **kwargs):
+    """Deletes the previews of the file of a deleted blob when the transaction commits, as its file is."""
+
+    name = instance.file.name
+    transaction.on_commit(lambda: delete_previews(name))
@@ -0,0 +1,133 @@
+"""On-demand profiling of a single request, for staff users.
+
+A staff user adds ?_profile=1 to a URL (or sends the header X-Profile: 1) to run that request under cProfile. The stats
+are saved to PROFILE_DIR as <request id>.prof, next to a small JSON file describing the request, and the response
+carries the id in its X-Profile-Id header. The profiles page lists the recent profiles, shows the hot functions of one
+as a table sorted by any column, and downloads the .prof file for snakeviz, pstats or similar tools. Only the
+PROFILE_KEEP most recent profiles are kept.
+
+Requests without the opt-in are not profiled and only pay for checking the query string and the header.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime
+
+from vcpms import settings
+
+PROFILE_DIR = getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'logs', 'profiles'))
+
+# Number of profiles kept, the oldest are deleted.
+PROFILE_KEEP = getattr(settings, 'PROFILE_KEEP', 50)
+
+PROFILE_PARAMETER = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+# The columns the hot functions can be sorted by, and the pstats key of each.
+SORT_KEYS = {
+    'calls': 'ncalls',
+    'tottime': 'tottime',
+    'cumtime': 'cumulative',
+}
+
+_PROFILE_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def is_requested(request):
+    return PROFILE_PARAMETER in request.GET or PROFILE_HEADER in request.META
+
+
+def profile(request, get_response):
+    """Answers the request under cProfile and saves the stats. Returns the response and the id of the profile."""
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    duration = time.perf_counter() - start
+
+    profile_id = uuid.uuid4().hex
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(_path(profile_id, 'prof'))
+    with open(_path(profile_id, 'json'), 'w') as file:
+        json.dump({'id': profile_id, 'path': request.get_full_path(), 'method': request.method,
+                   'status': response.status_code, 'duration_ms': duration * 1000, 'time': time.time()}, file)
+    _discard_old_profiles()
+    return response, profile_id
+
+
+def _path(profile_id, extension):
+    return os.path.join(PROFILE_DIR, f'{profile_id}.{extension}')
+
+
+def _discard_old_profiles():
+    profiles = recent_profiles()
+    for old in profiles[PROFILE_KEEP:]:
+        for extension in ['prof', 'json']:
+            try:
+                os.remove(_path(old['id'], extension))
+            except FileNotFoundError:
+                pass
+
+
+def recent_profiles():
+    """Returns the description of every saved profile, most recent first."""
+
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith('.json'):
+            try:
+                profiles.append(_description(os.path.join(PROFILE_DIR, name)))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda description: description['time'], reverse=True)
+
+
+def profile_path(profile_id):
+    """Returns the path of the .prof file of a profile, or None when there is no such profile."""
+
+    if not _PROFILE_ID.fullmatch(profile_id):
+        return None
+    path = _path(profile_id, 'prof')
+    return path if os.path.exists(path) else None
+
+
+def describe(profile_id):
+    return _description(_path(profile_id, 'json'))
+
+
+def _description(path):
+    with open(path) as file:
+        description = json.load(file)
+    description['profiled_at'] = datetime.fromtimestamp(description['time'])
+    return description
+
+
+def hot_functions(profile_id, sort='cumtime', limit=100):
+    """Returns the functions of a profile, sorted by the given column of SORT_KEYS, the highest first."""
+
+    stats = pstats.Stats(profile_path(profile_id))
+    stats.sort_stats(SORT_KEYS[sort])
+    rows = []
+    for function in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_time, cumulative_time, callers = stats.stats[function]
+        filename, line, name = function
+        rows.append({
+            'function': name,
+            'location': f'{filename}:{line}' if line else filename,
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': total_time * 1000,
+            'cumtime_ms': cumulative_time * 1000,
+            'percall_ms': cumulative_time * 1000 / primitive_calls if primitive_calls else 0,
+        })
+    return rows
@@ -0,0 +1,165 @@
+"""Full-text search over companies, individuals and programmes.
+
+Each searchable model has an FTS5 shadow table (<model table>_fts) whose rowid is the primary key of the indexed row.
+The tables use the trigram tokenizer, so a query matches any substring of the indexed columns, exactly like the
+name__contains lookups it replaces, but is answered from the index and ranked with bm25. Rows whose name starts with
+the query are ranked first. Queries with a term shorter than three characters cannot use a trigram index and fall back
+to a LIKE scan, as does every query on database backends other than SQLite.
+
+The shadow tables are created by migration 0006, kept current by the signal receivers below and can be rebuilt from
+scratch with the reindex management command.
+"""
+from django.db import connection
+from django.db.models import BooleanField, Case, F, FloatField, Func, Q, Value, When, signals
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+
+from portfolio.models import Company, Individual, Programme
+
+# Shortest term a trigram index can answer.
+MIN_TERM_LENGTH = 3
+
+
+class FullTextIndex:
+    """An FTS5 shadow table indexing some text columns of a model."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+
+    @property
+    def table(self):
+        return f'{self.model._meta.db_table}_fts'
+
+    @staticmethod
+    def is_supported():
+        return connection.vendor == 'sqlite'
+
+    def create(self, schema_editor=None):
+        """Creates the shadow table if it does not exist yet."""
+
+        columns = ', '.join(self.fields)
+        self._execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5({columns}, tokenize="trigram")',
+                      schema_editor=schema_editor)
+
+    def drop(self, schema_editor=None):
+        self._execute(f'DROP TABLE IF EXISTS {self.table}', schema_editor=schema_editor)
+
+    def rebuild(self, batch_size=1000):
+        """Empties the shadow table and indexes every row of the model again. Returns the number of rows indexed."""
+
+        self.create()
+        count = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            rows = self.model._base_manager.values_list('pk', *self.fields).order_by('pk')
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(tuple('' if value is None else value for value in row))
+                if len(batch) == batch_size:
+                    cursor.executemany(self._insert_sql(), batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(self._insert_sql(), batch)
+                count += len(batch)
+        return count
+
+    def update(self, instance):
+        """Indexes the current values of a saved instance, replacing any previous entry."""
+
+        if not self.is_supported():
+            return
+        values = [getattr(instance, field) for field in self.fields]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [instance.pk])
+            cursor.execute(self._insert_sql(), [instance.pk] + ['' if value is None else value for value in values])
+
+    def insert(self, instances):
+        """Indexes newly created instances, e.g. written with bulk_create which sends no signals."""
+
+        if not self.is_supported() or not instances:
+            return
+        rows = [[instance.pk] + ['' if getattr(instance, field) is None else getattr(instance, field)
+                                 for field in self.fields] for instance in instances]
+        with connection.cursor() as cursor:
+            cursor.executemany(self._insert_sql(), rows)
+
+    def delete(self, pk):
+        if not self.is_supported():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def search(self, queryset, searched):
+        """Narrows a query set of the indexed model down to the rows matching every term of the search string.
+
+        Results are ordered best match first. Terms that are too short for the index are matched with LIKE instead.
+        """
+
+        terms = searched.split()
+        if not terms:
+            return queryset.none()
+
+        if not self.is_supported() or min(len(term) for term in terms) < MIN_TERM_LENGTH:
+            for term in terms:
+                matches_term = Q()
+                for field in self.fields:
+                    matches_term |= Q(**{f'{field}__icontains': term})
+                queryset = queryset.filter(matches_term)
+            return queryset.order_by('pk')
+
+        query = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+        table = connection.ops.quote_name(self.table)
+        # The MATCH narrowing the rows runs once, in a subquery that does not depend on the outer row. The rank of each
+        # row kept is then read from the index by its rowid.
+        matches = RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query])
+        rank = Func(Value(query), F('pk'), template=f'(SELECT rank FROM {table} WHERE {table} MATCH %(expressions)s)',
+                    arg_joiner=' AND rowid = ', output_field=FloatField())
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=rank,
+            starts_with_query=Case(When(**{f'{self.fields[0]}__istartswith': searched.strip()}, then=Value(True)),
+                                   default=Value(False), output_field=BooleanField()),
+        ).order_by('-starts_with_query', 'search_rank', 'pk')
+
+    def _insert_sql(self):
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        return f'INSERT INTO {self.table} (rowid, {", ".join(self.fields)}) VALUES ({placeholders})'
+
+    def _execute(self, sql, schema_editor=None):
+        if not self.is_supported():
+            return
+        if schema_editor is not None:
+            schema_editor.execute(sql)
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+
+
+company_index = FullTextIndex(Company, ['name', 'trading_names', 'previous_names'])
+individual_index = FullTextIndex(Individual, ['name', 'Company', 'Position'])
+programme_index = FullTextIndex(Programme, ['name', 'description'])
+
+INDEXES = [company_index, individual_index, programme_index]
+
+
+@receiver(signals.post_save, sender=Company)
+@receiver(signals.post_save, sender=Individual)
+@receiver(signals.post_save, sender=Programme)
+def update_search_index(sender, instance, **kwargs):
+    """Indexes a company, individual or programme whenever it is saved."""
+
+    for index in INDEXES:
+        if index.model is sender:
+            index.update(instance)
+
+
+@receiver(signals.post_delete, sender=Company)
+@receiver(signals.post_delete, sender=Individual)
+@receiver(signals.post_delete, sender=Programme)
+def delete_from_search_index(sender, instance, **kwargs):
+    """Removes a deleted company, individual or programme from its index."""
+
+    for index in INDEXES:
+        if index.model is sender:
+            index.delete(instance.pk)
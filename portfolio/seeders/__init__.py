@@ -7,3 +7,4 @@ from .investments import *
 from .portfolio_companies import *
 from .programmes import *
 from .users import *
+from .derived_data import *
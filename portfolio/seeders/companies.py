@@ -1,47 +1,51 @@
-import random
+from portfolio.models import Company
+from portfolio.seeders.seeder import Seeder, seeded_faker, unique
 
-from django.core.exceptions import ObjectDoesNotExist
 
-from portfolio.models import Company
-from portfolio.seeders import Seeder
+def company_rows(chunk):
+    """Makes the fake values of a chunk of companies: name, trading name, previous name, registration number,
+    address, jurisdiction and incorporation date."""
+
+    seed, size = chunk
+    faker, rng = seeded_faker(seed)
+    return [(faker.company(), faker.company(), faker.company(), f'{rng.randrange(10 ** 8):08}', faker.address(),
+             faker.city(), faker.date_this_century()) for _ in range(size)]
 
 
 class CompanySeeder(Seeder):
     COMPANIES_COUNT = 25
+    count = COMPANIES_COUNT
 
     def seed(self):
-        self._create_companies(self.COMPANIES_COUNT)
+        self._create_companies(self.count - Company.objects.filter(parent_company__isnull=True).count())
         print(f"{Company.objects.count()} companies in the db.\n")
 
     def _create_companies(self, count):
-        for i in range(1, count + 1):
-            try:
-                Company.objects.get(id=i)
-                print(f"Company with id({i}) has already seeded.")
-
-            except ObjectDoesNotExist:
-                name = self.faker.company()
-                if name in Company.objects.values_list('name', flat=True):
-                    name = f'{name} {i}'
-
-                trading_name = self.faker.company()
-                if trading_name in Company.objects.values_list('trading_names', flat=True):
-                    trading_name = f'{trading_name} {i}'
-
-                previous_name = self.faker.company()
-                if previous_name in Company.objects.values_list('previous_names', flat=True):
-                    previous_name = f'{previous_name} {i}'
-
-                crn = random.randint(0, 10 ** 8)
-                address = self.faker.address()
-                city = self.faker.city()
-                company = Company.objects.create(name=name,
-                                                 company_registration_number=crn,
-                                                 trading_names=trading_name,
-                                                 previous_names=previous_name,
-                                                 registered_address=address,
-                                                 jurisdiction=city,
-                                                 incorporation_date=self.faker.date_this_century()
-                                                 )
-                company.save()
-                print(f"Company with id({i}) has been seeded.")
+        for companies in self.build_companies(count):
+            Company.objects.bulk_create(companies)
+        print(f"{max(count, 0)} companies have been seeded.")
+
+    def build_companies(self, count, **fields):
+        """Yields batches of unsaved companies with unique fake names, count in total."""
+
+        taken = {'name': set(), 'trading_names': set(), 'previous_names': set()}
+        for names in Company.objects.values_list(*taken).iterator():
+            for field, name in zip(taken, names):
+                taken[field].add(name)
+
+        number = Company.objects.count()
+        for rows in self.generate(company_rows, max(count, 0)):
+            companies = []
+            for name, trading_name, previous_name, crn, address, city, incorporation_date in rows:
+                number += 1
+                companies.append(Company(
+                    name=unique(name, taken['name'], number),
+                    company_registration_number=crn,
+                    trading_names=unique(trading_name, taken['trading_names'], number),
+                    previous_names=unique(previous_name, taken['previous_names'], number),
+                    registered_address=address,
+                    jurisdiction=city,
+                    incorporation_date=incorporation_date,
+                    **fields
+                ))
+            yield companies
@@ -0,0 +1,20 @@
+from portfolio.fragment_cache import COMPANIES, INDIVIDUALS
+from portfolio.models import Company, DataVersion, InvestmentRollup
+from portfolio.search import INDEXES
+from portfolio.seeders.seeder import Seeder
+from portfolio.typeahead import PROGRAMMES
+
+
+class DerivedDataSeeder(Seeder):
+    """Recomputes the data the model signals maintain, which bulk_create bypasses: the company roles, the full-text
+    indexes, the investment rollups and the versions of the cached grids and typeaheads."""
+
+    def seed(self):
+        Company.objects.refresh_roles()
+        for index in INDEXES:
+            if index.is_supported():
+                index.rebuild(batch_size=self.batch_size)
+        InvestmentRollup.rebuild(batch_size=self.batch_size)
+        for version in [COMPANIES, INDIVIDUALS, PROGRAMMES]:
+            DataVersion.bump(version)
+        print("company roles, search indexes and investment rollups are up to date.\n")
@@ -1,8 +1,10 @@
 import random
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.files.uploadedfile import SimpleUploadedFile
-from portfolio.models import Document, Company, Individual, Programme
-from portfolio.seeders import Seeder
+
+from django.core.files.base import ContentFile
+
+from portfolio.models import Document, DocumentBlob, Company, Individual, Programme
+from portfolio.models.document_model import content_addressed
+from portfolio.seeders.seeder import Seeder
 
 
 class DocumentSeeder(Seeder):
@@ -10,111 +12,63 @@ class DocumentSeeder(Seeder):
 
     # The number of documents to seed per company, individual or programme (not evenly distributed between entities).
     DOCUMENT_COUNT = 6
-    # The number of companies in the db.
-    COMPANY_COUNT = 0
-    # The number of individuals in the db.
-    INDIVIDUAL_COUNT = 0
-    # The number of programmes in the db.
-    PROGRAMME_COUNT = 0
+    # The total number of documents to seed, by default DOCUMENT_COUNT per company, individual and programme.
+    count = None
 
     def seed(self):
-        # Get the number of companies, individuals and programmes in the db.
-        self.COMPANY_COUNT = Company.objects.count()
-        self.INDIVIDUAL_COUNT = Individual.objects.count()
-        self.PROGRAMME_COUNT = Programme.objects.count()
+        # Get the id and name of the companies, individuals and programmes in the db.
+        entities = {
+            "company": (Company, list(Company.objects.values_list('id', 'name'))),
+            "individual": (Individual, list(Individual.objects.values_list('id', 'name'))),
+            "programme": (Programme, list(Programme.objects.values_list('id', 'name'))),
+        }
 
         # Seed documents if there are companies, individuals and programmes in the db.
-        if self.COMPANY_COUNT and self.INDIVIDUAL_COUNT and self.PROGRAMME_COUNT:
-            total_count = self.DOCUMENT_COUNT * self.COMPANY_COUNT + self.DOCUMENT_COUNT * self.INDIVIDUAL_COUNT + self.DOCUMENT_COUNT * self.PROGRAMME_COUNT
-            self._create_documents(total_count)
+        if all(rows for model, rows in entities.values()):
+            total_count = self.count
+            if total_count is None:
+                total_count = self.DOCUMENT_COUNT * sum(len(rows) for model, rows in entities.values())
+            self._create_documents(total_count - Document.objects.count(), entities)
             print(f"{Document.objects.count()} documents in the db.\n")
         else:
             print(f"Couldn't seed documents. Seed companies, individuals and programmes first.")
 
-    def _create_documents(self, count):
-        for i in range(1, count + 1):
-            try:
-                Document.objects.get(file_id=i)
-                print(f"Document with the id {i} is already seeded.")
+    def _create_documents(self, count, entities):
+        names = set(Document.objects.values_list('file_name', flat=True).iterator())
+        # The documents are inserted in bulk, without the signal receivers storing their files by content: the one blob
+        # they share is stored here and its references counted at the end.
+        blob = DocumentBlob.store(ContentFile(b"file contents")) if content_addressed() else None
+        documents = []
+        for i in range(max(count, 0)):
+            is_file = random.choice([True, False])
+            foreign_model = random.choice(list(entities))
 
-            except ObjectDoesNotExist:
-                is_file = random.choice([True, False])
-                foreign_model = random.choice(["company", "individual", "programme"])
+            name = self.faker.file_name(category=None)
 
+            # Ensure the file name is unique.
+            while name in names:
                 name = self.faker.file_name(category=None)
+            names.add(name)
 
-                # Ensure the file name is unique.
-                while Document.objects.filter(file_name=name).exists():
-                    name = self.faker.file_name(category=None)
-
-                extension = name.split(".")[-1]
-
-                if is_file:
-                    if foreign_model == "company":
-                        company_id = random.randint(1, self.COMPANY_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type=extension,
-                            company=Company.objects.get(id=company_id),
-                            individual=None,
-                            programme=None,
-                            file=SimpleUploadedFile(f"{name}", b"file contents")
-                        )
-                    elif foreign_model == "individual":
-                        individual_id = random.randint(1, self.INDIVIDUAL_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type=extension,
-                            company=None,
-                            individual=Individual.objects.get(id=individual_id),
-                            programme=None,
-                            file=SimpleUploadedFile(f"{name}", b"file contents")
-                        )
-                    elif foreign_model == "programme":
-                        programme_id = random.randint(1, self.PROGRAMME_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type=extension,
-                            company=None,
-                            individual=None,
-                            programme=Programme.objects.get(id=programme_id),
-                            file=SimpleUploadedFile(f"{name}", b"file contents")
-                        )
-                    else:
-                        raise ValueError("Associated model must be a company, individual or programme.")
+            model, rows = entities[foreign_model]
+            entity_id, entity_name = random.choice(rows)
+            document = Document(file_name=name, **{foreign_model: model(id=entity_id, name=entity_name)})
+            if is_file:
+                document.file_type = name.split(".")[-1]
+                if blob is not None:
+                    document.file, document.blob, document.checksum = blob.file.name, blob, blob.sha256
+                    document.file_size = blob.size
                 else:
-                    if foreign_model == "company":
-                        company_id = random.randint(1, self.COMPANY_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type="URL",
-                            company=Company.objects.get(id=company_id),
-                            individual=None,
-                            programme=None,
-                            url="https://www.wayra.uk"
-                        )
-                    elif foreign_model == "individual":
-                        individual_id = random.randint(1, self.INDIVIDUAL_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type="URL",
-                            company=None,
-                            individual=Individual.objects.get(id=individual_id),
-                            programme=None,
-                            url="https://www.wayra.uk"
-                        )
-                    elif foreign_model == "programme":
-                        programme_id = random.randint(1, self.PROGRAMME_COUNT)
-                        document = Document.objects.create(
-                            file_name=f"{name}",
-                            file_type="URL",
-                            company=None,
-                            individual=None,
-                            programme=Programme.objects.get(id=programme_id),
-                            url="https://www.wayra.uk"
-                        )
-                    else:
-                        raise ValueError("Associated model must be a company, individual or programme.")
+                    document.file.save(name, ContentFile(b"file contents"), save=False)
+            else:
+                document.file_type = "URL"
+                document.url = "https://www.wayra.uk"
+            documents.append(document)
 
-                document.save()
-                print(f"The document with the id {i} has been seeded.")
+            if len(documents) == self.batch_size:
+                Document.objects.bulk_create(documents)
+                documents = []
+        Document.objects.bulk_create(documents)
+        if blob is not None:
+            DocumentBlob.recount()
+        print(f"{max(count, 0)} documents have been seeded.")
@@ -1,31 +1,25 @@
 from portfolio.models import Founder, Company, Individual
-from portfolio.seeders import Seeder
+from portfolio.seeders.seeder import Seeder
 
 
 class FounderSeeder(Seeder):
     FOUNDER_COUNT = 10
+    count = FOUNDER_COUNT
 
     def seed(self):
-        self._populate_founders(self.FOUNDER_COUNT)
+        self._populate_founders(self.count - Founder.objects.count())
         print(f"{Founder.objects.count()} founders in the db.\n")
 
     def _populate_founders(self, count):
-        """Seeder for fake founders"""
+        """Seeder for fake founders, pairing the first companies and individuals without a founder."""
 
         print('seeding founders...')
-        for i in range(1, count + 1):
-
-            if Founder.objects.filter(id=i).exists():
-                print(f"Founder with the id({i}) is already seeded.")
-                continue
-
-            if not Company.objects.filter(id=i).exists() and not Individual.objects.filter(id=i).exists():
-                print(f"Company or individual with the id({i}) does not exist.")
-                continue
-
-            founder = Founder.objects.create(
-                companyFounded=Company.objects.get(id=i),
-                individualFounder=Individual.objects.get(id=i),
-            )
-            founder.save()
-            print(F"Founders with id({founder.id}) has been seeded.")
+        count = max(count, 0)
+        companies = Company.objects.filter(founder__isnull=True).order_by('id').values_list('id', flat=True)
+        individuals = Individual.objects.filter(founder__isnull=True).order_by('id').values_list('id', flat=True)
+        founders = [Founder(companyFounded_id=company_id, individualFounder_id=individual_id)
+                    for company_id, individual_id in zip(companies[:count], individuals[:count])]
+        Founder.objects.bulk_create(founders, batch_size=self.batch_size)
+        if len(founders) < count:
+            print(f"Only {len(founders)} companies and individuals without a founder exist.")
+        print(f"{len(founders)} founders have been seeded.")
@@ -1,51 +1,61 @@
+from django.contrib.contenttypes.models import ContentType
+
 from portfolio.models import Individual, ResidentialAddress
-from portfolio.seeders import Seeder
+from portfolio.seeders.seeder import Seeder, seeded_faker
+
+
+def individual_rows(chunk):
+    """Makes the fake values of a chunk of individuals and of their addresses."""
+
+    seed, size = chunk
+    faker, rng = seeded_faker(seed)
+    return [
+        ((faker.name(), faker.company(), faker.job(), faker.email(), faker.phone_number(), faker.phone_number()),
+         (faker.building_number(), faker.street_address(), faker.city(), faker.postcode(), faker.country_code(),
+          faker.country()))
+        for _ in range(size)
+    ]
 
 
 class IndividualSeeder(Seeder):
     INDIVIDUAL_COUNT = 25
+    count = INDIVIDUAL_COUNT
 
     def seed(self):
-        self._populate_individuals(self.INDIVIDUAL_COUNT)
+        self._populate_individuals(self.count - Individual.objects.count())
         print(f"{Individual.objects.count()} individuals in the db.\n")
 
     def _populate_individuals(self, count):
         """Seeder for fake individuals"""
         print('seeding individuals...')
-        for i in range(1, count + 1):
-            name = self.faker.name()
-            company = self.faker.company()
-            position = self.faker.job()
-            email = self.faker.email()
-            primary_phone_number = self.faker.phone_number()
-            secondary_phone_number = self.faker.phone_number()
-
-            individual = Individual.objects.create(
-                name=name,
-                AngelListLink="https://www.AngelList.com",
-                CrunchbaseLink="https://www.Crunchbase.com",
-                LinkedInLink="https://www.LinkedIn.com",
-                Company=company,
-                Position=position,
-                Email=email,
-                PrimaryNumber=primary_phone_number,
-                SecondaryNumber=secondary_phone_number
-            )
-            individual.save()
-
-            address1 = self.faker.building_number()
-            address2 = self.faker.street_address()
-            city = self.faker.city()
-            postcode = self.faker.postcode()
-            state = self.faker.country_code()
-            country = self.faker.country()
-            addr = ResidentialAddress.objects.create(
-                address_line1=address1,
-                address_line2=address2,
-                postal_code=postcode,
-                city=city,
-                state=state,
-                country=country,
-                individual=individual
-            )
-            addr.save()
+        content_type = ContentType.objects.get_for_model(Individual)
+        for rows in self.generate(individual_rows, max(count, 0)):
+            individuals = [
+                Individual(
+                    name=name,
+                    AngelListLink="https://www.AngelList.com",
+                    CrunchbaseLink="https://www.Crunchbase.com",
+                    LinkedInLink="https://www.LinkedIn.com",
+                    Company=company,
+                    Position=position,
+                    Email=email,
+                    PrimaryNumber=primary_phone_number,
+                    SecondaryNumber=secondary_phone_number,
+                    content_type=content_type,
+                )
+                for (name, company, position, email, primary_phone_number, secondary_phone_number), _ in rows
+            ]
+            Individual.objects.bulk_create(individuals)
+
+            ResidentialAddress.objects.bulk_create([
+                ResidentialAddress(
+                    address_line1=address1,
+                    address_line2=address2,
+                    postal_code=postcode,
+                    city=city,
+                    state=state,
+                    country=country,
+                    individual=individual
+                )
+                for individual, (_, (address1, address2, city, postcode, state, country)) in zip(individuals, rows)
+            ])
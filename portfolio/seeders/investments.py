@@ -1,55 +1,59 @@
 import random
-
-from django.core.exceptions import ObjectDoesNotExist
+from datetime import date, timedelta
 
 from portfolio.models import Company, Investment, Portfolio_Company, Individual
 from portfolio.models.investment_model import FOUNDING_ROUNDS, ContractRight
 from portfolio.models.investor_model import Investor
-from portfolio.seeders import Seeder
+from portfolio.seeders.seeder import Seeder, power_law_weights
+
+# Shape of the Pareto distribution of investment amounts (the 80/20 rule).
+AMOUNT_SHAPE = 1.16
+MAX_AMOUNT = 10 ** 12
 
 
 class InvestorCompanySeeder(Seeder):
     INVESTOR_COMPANY_COUNT = 5
+    count = INVESTOR_COMPANY_COUNT
 
     def seed(self):
-        self._create_investor_companies(self.INVESTOR_COMPANY_COUNT)
+        self._create_investor_companies(self.count - Investor.objects.filter(company__isnull=False).count())
         print(f"{Investor.objects.filter(individual__isnull=True).count()} investor companies in the db.\n")
 
     def _create_investor_companies(self, count):
-        for i in range(1, count + 1):
-            try:
-                Investor.objects.get(id=i)
-                print(f"InvestorCompany with id({i}) has already seeded.")
-            except ObjectDoesNotExist:
-                Investor.objects.create(
-                    company=Company.objects.get(id=i),
-                    classification=Investor.INVESTOR_TYPES[i],
-                )
-                print(f"InvestorCompany with id({i}) has been seeded.")
+        companies = Company.objects.filter(company__isnull=True, parent_company__isnull=True).order_by('id')
+        investors = [
+            Investor(company_id=company_id, classification=Investor.INVESTOR_TYPES[i % len(Investor.INVESTOR_TYPES)][0])
+            for i, company_id in enumerate(companies.values_list('id', flat=True)[:max(count, 0)])
+        ]
+        Investor.objects.bulk_create(investors, batch_size=self.batch_size)
+        print(f"{len(investors)} investor companies have been seeded.")
 
 
 class InvestorIndividualSeeder(Seeder):
     INVESTOR_INDIVIDUAL_COUNT = 5
+    count = INVESTOR_INDIVIDUAL_COUNT
 
     def seed(self):
-        self._create_investor_companies(self.INVESTOR_INDIVIDUAL_COUNT)
-        print(f"{Investor.objects.filter(company__isnull=True).count()} investor companies in the db.\n")
+        self._create_investor_individuals(self.count - Investor.objects.filter(individual__isnull=False).count())
+        print(f"{Investor.objects.filter(company__isnull=True).count()} investor individuals in the db.\n")
 
-    def _create_investor_companies(self, count):
-        for i in range(1, count + 1):
-            try:
-                Investor.objects.get(id=i + InvestorCompanySeeder.INVESTOR_COMPANY_COUNT)
-                print(f"InvestorIndividual with id({i}) has already seeded.")
-            except ObjectDoesNotExist:
-                Investor.objects.create(
-                    individual=Individual.objects.get(id=i),
-                    classification=Investor.INVESTOR_TYPES[i],
-                )
-                print(f"InvestorIndividual with id({i}) has been seeded.")
+    def _create_investor_individuals(self, count):
+        individuals = Individual.objects.filter(individual__isnull=True).order_by('id')
+        investors = [
+            Investor(individual_id=individual_id,
+                     classification=Investor.INVESTOR_TYPES[i % len(Investor.INVESTOR_TYPES)][0])
+            for i, individual_id in enumerate(individuals.values_list('id', flat=True)[:max(count, 0)])
+        ]
+        Investor.objects.bulk_create(investors, batch_size=self.batch_size)
+        print(f"{len(investors)} investor individuals have been seeded.")
 
 
 class InvestmentSeeder(Seeder):
-    INVESTMENT_COUNT = 25
+    """Seeds investments whose number per investor and per startup follows a power law: a few investors and startups
+    take part in most of the investments, like in a real portfolio. Amounts follow a Pareto distribution."""
+
+    INVESTMENT_COUNT = 50
+    count = INVESTMENT_COUNT
 
     contract_rights = [
         ('Wayra Investment', '25%'),
@@ -64,68 +68,45 @@ class InvestmentSeeder(Seeder):
     ]
 
     def seed(self):
-        self._create_investments_for_investor_companies(self.INVESTMENT_COUNT)
-        self._create_investments_for_investor_individuals(self.INVESTMENT_COUNT)
+        self._create_investments(self.count - Investment.objects.count())
         print(f"{Investment.objects.count()} investments in the db.\n")
 
-    def _get_objects_from_models(self, model, index, slice_size):
-        random_number_of_object = random.randint(1, slice_size)
-        objects = list(
-            model.objects.filter(id__in=range(index * slice_size, index * slice_size + random_number_of_object)))
-        return objects
-
-    def _create_investments_for_investor_companies(self, count):
-        investor_count = 0
-        investor_companies = list(Investor.objects.filter(individual__isnull=True))
-        for i in range(1, count + 1):
-            try:
-                Investment.objects.get(id=i)
-                print(f"InvestorCompany with id({i}) has already seeded.")
-            except ObjectDoesNotExist:
-                investment = Investment.objects.create(
-                    investor=investor_companies[investor_count],
-                    startup=Portfolio_Company.objects.get(wayra_number=f'WN-{i}'),
-                    typeOfFoundingRounds=random.choice(FOUNDING_ROUNDS)[1],
-                    investmentAmount=random.randint(10_000, 10_000_000),
-                    dateInvested=self.faker.date_this_century(),
-                )
-                rights = set(random.choices(self.contract_rights, k=random.randint(1, len(self.contract_rights))))
-                for right, detail in rights:
-                    ContractRight.objects.create(
-                        investment=investment,
-                        right=right,
-                        details=detail
-                    )
-
-                if random.randint(0, 101) > 30 and investor_count != len(investor_companies) - 1:
-                    investor_count += 1
-
-                print(f"Investment with id({i}) has been seeded.")
-
-    def _create_investments_for_investor_individuals(self, count):
-        investor_count = 0
-        investor_individuals = list(Investor.objects.filter(company__isnull=True))
-        for i in range(1, count + 1):
-            try:
-                Investment.objects.get(id=self.INVESTMENT_COUNT + i)
-                print(f"Investment with id({self.INVESTMENT_COUNT + i}) has already seeded.")
-            except ObjectDoesNotExist:
-                investment = Investment.objects.create(
-                    investor=investor_individuals[investor_count],
-                    startup=Portfolio_Company.objects.get(wayra_number=f'WN-{i}'),
+    def _create_investments(self, count):
+        investors = list(Investor.objects.values_list('id', flat=True))
+        startups = list(Portfolio_Company.objects.values_list('id', flat=True))
+        if not investors or not startups:
+            print("Couldn't seed investments. Seed investors and portfolio companies first.")
+            return
+
+        # The rank of an investor or startup in the power law is random, not its id.
+        random.shuffle(investors)
+        random.shuffle(startups)
+        investor_weights = power_law_weights(len(investors))
+        startup_weights = power_law_weights(len(startups))
+        first_day = date(2000, 1, 1)
+        days = (date.today() - first_day).days
+
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            investments = [
+                Investment(
+                    investor_id=investor_id,
+                    startup_id=startup_id,
                     typeOfFoundingRounds=random.choice(FOUNDING_ROUNDS)[1],
-                    investmentAmount=random.randint(10_000, 10_000_000),
-                    dateInvested=self.faker.date_this_century(),
+                    investmentAmount=min(int(10_000 * random.paretovariate(AMOUNT_SHAPE)), MAX_AMOUNT),
+                    dateInvested=first_day + timedelta(days=random.randint(0, days)),
                 )
+                for investor_id, startup_id in zip(random.choices(investors, cum_weights=investor_weights, k=size),
+                                                   random.choices(startups, cum_weights=startup_weights, k=size))
+            ]
+            Investment.objects.bulk_create(investments)
 
+            contract_rights = []
+            for investment in investments:
                 rights = set(random.choices(self.contract_rights, k=random.randint(1, len(self.contract_rights))))
-                for right, detail in rights:
-                    ContractRight.objects.create(
-                        investment=investment,
-                        right=right,
-                        details=detail
-                    )
-                if random.randint(0, 101) > 30 and investor_count != len(investor_individuals) - 1:
-                    investor_count += 1
-
-                print(f"Investment with id({self.INVESTMENT_COUNT + i}) has been seeded.")
+                contract_rights.extend(ContractRight(investment=investment, right=right, details=detail)
+                                       for right, detail in rights)
+            ContractRight.objects.bulk_create(contract_rights, batch_size=self.batch_size)
+            created += size
+        print(f"{max(count, 0)} investments have been seeded.")
@@ -1,59 +1,59 @@
 import os
 import random
-import shutil
-from io import BytesIO
 
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from portfolio.models import Programme, Company, Portfolio_Company, Individual
-from portfolio.seeders import Seeder, CompanySeeder
-from vcpms.settings import MEDIA_ROOT, BASE_DIR
+from portfolio.seeders.seeder import Seeder
+from vcpms.settings import BASE_DIR
 
 
 class ProgrammeSeeder(Seeder):
     PROGRAMME_COUNT = 5
+    count = PROGRAMME_COUNT
 
     def seed(self):
-        self._create_programme(self.PROGRAMME_COUNT)
+        self._create_programme(self.count)
         print(f"{Programme.objects.count()} programmes in the db.\n")
 
-    def _get_objects_from_models(self, model, index, slice_size):
-        # print(model, index, slice_size)
+    def _get_slice(self, ids, index, slice_size):
         random_number_of_object = random.randint(1, slice_size + 1)
         start = index * slice_size
         end = start + random_number_of_object
-        objects = list(model.objects.all().order_by('id')[start:end])
-
-        return objects
+        return ids[start:end]
 
     def _create_programme(self, count):
-        # TODO: Reset media directory should write a proper way soon
-        shutil.rmtree(MEDIA_ROOT)
-        os.mkdir(MEDIA_ROOT)
-        for i in range(1, count + 1):
-            try:
-                Programme.objects.get(name=f"Accelerator Programme {i}", cohort=1)
-                print(f"Accelerator Programme {i} has already been seeded.")
-            except ObjectDoesNotExist:
-                image_file = BytesIO()
-                image_file.write(
-                    open(os.path.join(BASE_DIR, 'portfolio/seeders/resource/edison_programme.png'), 'rb').read())
-                image_file.seek(0)
-                file_data = SimpleUploadedFile("edison_programme.png", image_file.read(), content_type="image/png")
-
-                accelerator_1 = Programme.objects.create(
-                    name=f"Accelerator Programme {i}",
-                    cohort=1,
-                    cover=file_data,
-                    description=self.faker.paragraph(nb_sentences=30)
-                )
-                for company in self._get_objects_from_models(Company, i - 1, CompanySeeder.COMPANIES_COUNT // count):
-                    accelerator_1.partners.add(company)
-                for p_company in self._get_objects_from_models(Portfolio_Company, i - 1,
-                                                               Portfolio_Company.objects.count() // count):
-                    accelerator_1.participants.add(p_company.parent_company)
-                for individual in self._get_objects_from_models(Individual, i - 1, Individual.objects.count() // count):
-                    accelerator_1.coaches_mentors.add(individual)
-                accelerator_1.save()
-                print(f"Accelerator Programme {i} has been seeded.")
+        names = [f"Accelerator Programme {i}" for i in range(1, count + 1)]
+        seeded = set(Programme.objects.filter(name__in=names, cohort=1).values_list('name', flat=True))
+        for name in sorted(seeded):
+            print(f"{name} has already been seeded.")
+        with open(os.path.join(BASE_DIR, 'portfolio/seeders/resource/edison_programme.png'), 'rb') as image_file:
+            cover = image_file.read()
+
+        programmes = [Programme(
+            name=name,
+            cohort=1,
+            cover=SimpleUploadedFile("edison_programme.png", cover, content_type="image/png"),
+            description=self.faker.paragraph(nb_sentences=30)
+        ) for name in names if name not in seeded]
+        # bulk_create saves the covers to the storage as save() does.
+        Programme.objects.bulk_create(programmes, batch_size=self.batch_size)
+
+        companies = list(Company.objects.order_by('id').values_list('id', flat=True))
+        portfolio_companies = list(Portfolio_Company.objects.order_by('id').values_list('parent_company_id', flat=True))
+        individuals = list(Individual.objects.order_by('id').values_list('id', flat=True))
+        partners, participants, coaches_mentors = [], [], []
+        for programme in programmes:
+            i = names.index(programme.name)
+            partners += [Programme.partners.through(programme_id=programme.id, company_id=company_id)
+                         for company_id in self._get_slice(companies, i, len(companies) // count)]
+            participants += [Programme.participants.through(programme_id=programme.id, company_id=company_id)
+                             for company_id in self._get_slice(portfolio_companies, i,
+                                                               len(portfolio_companies) // count)]
+            coaches_mentors += [Programme.coaches_mentors.through(programme_id=programme.id,
+                                                                  individual_id=individual_id)
+                                for individual_id in self._get_slice(individuals, i, len(individuals) // count)]
+        for field, relation in [(Programme.partners, partners), (Programme.participants, participants),
+                                (Programme.coaches_mentors, coaches_mentors)]:
+            field.through.objects.bulk_create(relation, batch_size=self.batch_size)
+        print(f"{len(programmes)} programmes have been seeded.")
@@ -1,10 +1,27 @@
 import abc
+import itertools
+import multiprocessing
+import random
 
 from faker import Faker
 
+# Exponent of the Zipf law followed by the number of investments per investor and per startup.
+POWER_LAW_EXPONENT = 1.1
+
 
 class Seeder(metaclass=abc.ABCMeta):
     faker = Faker('en_GB')
+    # Rows written per bulk_create.
+    BATCH_SIZE = 1000
+
+    def __init__(self, count=None, batch_size=BATCH_SIZE, workers=1):
+        """count overrides the default number of rows of the seeder, workers is the number of processes generating
+        fake data in parallel."""
+
+        if count is not None:
+            self.count = count
+        self.batch_size = batch_size
+        self.workers = workers
 
     @classmethod
     def __subclasshook__(cls, subclass):
@@ -15,3 +32,43 @@ class Seeder(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def seed(self):
         raise NotImplementedError
+
+    def generate(self, make_rows, count):
+        """Yields lists of at most batch_size rows, count in total, made by make_rows((seed, size)).
+
+        make_rows must be a module level function so that it can run in the worker processes. Each batch is made from
+        its own random seed, so the processes never repeat each other's data.
+        """
+
+        seed = random.randrange(2 ** 32)
+        chunks = [(seed + start, min(self.batch_size, count - start)) for start in range(0, count, self.batch_size)]
+        if self.workers > 1 and len(chunks) > 1:
+            with multiprocessing.Pool(self.workers) as pool:
+                yield from pool.imap(make_rows, chunks)
+        else:
+            for chunk in chunks:
+                yield make_rows(chunk)
+
+
+def seeded_faker(seed):
+    """Returns the shared Faker reseeded, and a random number generator with the same seed."""
+
+    Seeder.faker.seed_instance(seed)
+    return Seeder.faker, random.Random(seed)
+
+
+def unique(value, taken, suffix):
+    """Returns the value, suffixed if it is taken already, and marks it as taken."""
+
+    candidate = value
+    while candidate in taken:
+        candidate = f'{value} {suffix}'
+        suffix += 1
+    taken.add(candidate)
+    return candidate
+
+
+def power_law_weights(count, exponent=POWER_LAW_EXPONENT):
+    """Cumulative weights of count ranks following a Zipf law, for random.choices(cum_weights=...)."""
+
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
@@ -0,0 +1,17 @@
+"""Database session store timing its loads and saves, for the Server-Timing header.
+
+Set as SESSION_ENGINE; sessions are stored exactly like with django.contrib.sessions.backends.db.
+"""
+from django.contrib.sessions.backends import db
+
+from portfolio.instrumentation import timed
+
+
+class SessionStore(db.SessionStore):
+    def load(self):
+        with timed('session_time', 'session_sql_time'):
+            return super().load()
+
+    def save(self, must_create=False):
+        with timed('session_time', 'session_sql_time'):
+            return super().save(must_create)
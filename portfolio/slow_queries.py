@@ -0,0 +1,272 @@
+"""Log of the slow SQL queries, with the view and the line of code running them.
+
+SlowQueryLogMiddleware times every SQL statement of a request with a database execute wrapper. A statement taking
+longer than SLOW_QUERY_THRESHOLD seconds, or picked by sampling with probability SLOW_QUERY_SAMPLE_RATE, is recorded
+with its SQL, the shape of its parameters (their types, never their values), its duration, the name of the view and
+the innermost frame of the portfolio app on the stack (the call site).
+
+Records are handed to a queue and written as JSON lines by a background thread (logging.handlers.QueueListener), so a
+request never waits on the log file. Every process writes a file of its own next to SLOW_QUERY_LOG, named with its
+pid (slow_queries.<pid>.log), as a rotating file handler is only safe with a single writer. Each file rotates at
+SLOW_QUERY_LOG_MAX_BYTES, keeping SLOW_QUERY_LOG_BACKUPS old files, and a process starting its log deletes the files of
+exited processes but the SLOW_QUERY_LOG_BACKUPS newest. The slow queries page groups the records of every file by
+fingerprint: the SQL with its literals and placeholders replaced, so the same query run with different values or IN
+lists of different lengths is counted once.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from vcpms import settings
+
+# Seconds above which a statement is recorded.
+SLOW_QUERY_THRESHOLD = getattr(settings, 'SLOW_QUERY_THRESHOLD', 0.5)
+
+# Fraction of the other statements that is recorded too, to see what a typical query costs.
+SLOW_QUERY_SAMPLE_RATE = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 0.0)
+
+SLOW_QUERY_LOG = getattr(settings, 'SLOW_QUERY_LOG', os.path.join(settings.BASE_DIR, 'logs', 'slow_queries.log'))
+SLOW_QUERY_LOG_MAX_BYTES = getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)
+SLOW_QUERY_LOG_BACKUPS = getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 5)
+
+_APP_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.join(_APP_DIRECTORY, 'middleware.py'),
+                  os.path.join(_APP_DIRECTORY, 'instrumentation.py')}
+_TESTS_DIRECTORY = os.path.join(_APP_DIRECTORY, 'tests') + os.sep
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Returns the SQL with its literals and placeholders replaced by ?, and lists of them by (...)."""
+
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def params_shape(params, many):
+    """Describes the parameters of a statement by the types of their values, e.g. (int, str) or 500 x (int, str)."""
+
+    if params is None:
+        return ''
+    if many:
+        params = list(params)
+        first = params[0] if params else ()
+        return f'{len(params)} x {params_shape(first, False)}'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in params) + ')'
+
+
+def call_site():
+    """Returns the innermost line of the portfolio app on the stack, outside this module and the tests, as
+    path:line in function."""
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIRECTORY) and not filename.startswith(_TESTS_DIRECTORY) \
+                and filename not in _SKIPPED_FILES:
+            relative = os.path.relpath(filename, os.path.dirname(os.path.dirname(_APP_DIRECTORY)))
+            return f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SlowQueryLog:
+    """A log of JSON lines in a rotating file per process, written by a background thread."""
+
+    def __init__(self, path, max_bytes=SLOW_QUERY_LOG_MAX_BYTES, backups=SLOW_QUERY_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._handler = None
+        self._listener = None
+        self._pid = None
+        root, extension = os.path.splitext(os.path.basename(path))
+        # slow_queries.<pid>.log and its backups slow_queries.<pid>.log.<n>, and the files of a single process
+        # slow_queries.log written before, taken as written by an exited process.
+        self._file_name = re.compile(rf'{re.escape(root)}(?:\.(\d+))?{re.escape(extension)}(?:\.\d+)?$')
+
+    def process_path(self, pid=None):
+        """Returns the path of the file written by a process, by default the current one."""
+
+        root, extension = os.path.splitext(self.path)
+        return f'{root}.{pid or os.getpid()}{extension}'
+
+    def write(self, record):
+        if self._handler is None or self._pid != os.getpid():
+            self._start()
+        self._handler.emit(logging.makeLogRecord({'msg': json.dumps(record)}))
+
+    def _start(self):
+        with self._lock:
+            if self._handler is not None and self._pid == os.getpid():
+                return
+            # A log started before the process forked has a listener thread that did not survive the fork.
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._delete_exited()
+            file_handler = RotatingFileHandler(self.process_path(), maxBytes=self.max_bytes,
+                                               backupCount=self.backups)
+            records = queue.SimpleQueue()
+            self._listener = QueueListener(records, file_handler)
+            self._listener.start()
+            self._handler = QueueHandler(records)
+            self._pid = os.getpid()
+        atexit.register(self.flush)
+
+    def _files(self):
+        """Returns the paths of the files of the log with the pid of the process writing them, None when unknown."""
+
+        try:
+            names = os.listdir(os.path.dirname(self.path))
+        except FileNotFoundError:
+            return []
+        files = []
+        for name in names:
+            match = self._file_name.match(name)
+            if match:
+                files.append((os.path.join(os.path.dirname(self.path), name),
+                              int(match.group(1)) if match.group(1) else None))
+        return files
+
+    def _delete_exited(self):
+        """Deletes the files of the processes that exited, but the newest SLOW_QUERY_LOG_BACKUPS."""
+
+        exited = [path for path, pid in self._files() if pid is None or not _is_running(pid)]
+        exited.sort(key=os.path.getmtime, reverse=True)
+        for path in exited[self.backups:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """Waits until every record handed to the log is written."""
+
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                for handler in self._listener.handlers:
+                    handler.close()
+                self._handler = self._listener = self._pid = None
+
+    def read(self):
+        """Yields every record of the log, of every process, oldest file first."""
+
+        paths = []
+        for path, pid in self._files():
+            # Backups are older the higher their number, should the file system round their times together.
+            backup = os.path.splitext(path)[1][1:]
+            try:
+                paths.append((os.path.getmtime(path), -int(backup) if backup.isdigit() else 0, path))
+            except FileNotFoundError:
+                continue
+        for _, _, path in sorted(paths):
+            try:
+                with open(path) as file:
+                    for line in file:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                continue
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_LOG)
+
+
+class SlowQueryRecorder:
+    """A database execute wrapper recording the slow and sampled statements run while answering a request."""
+
+    def __init__(self, request, log):
+        self.request = request
+        self.log = log
+        self.threshold = SLOW_QUERY_THRESHOLD
+        self.sample_rate = SLOW_QUERY_SAMPLE_RATE
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            slow = duration >= self.threshold
+            if slow or (self.sample_rate and random.random() < self.sample_rate):
+                self.record(sql, params, many, duration, slow)
+
+    def record(self, sql, params, many, duration, slow):
+        match = self.request.resolver_match
+        self.log.write({
+            'time': time.time(),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': params_shape(params, many),
+            'duration': duration,
+            'slow': slow,
+            'view': match.view_name if match else '',
+            'call_site': call_site(),
+        })
+
+
+def top_offenders(records, limit=50):
+    """Groups records by fingerprint, the groups taking the most time in total first."""
+
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': normalize(record['sql']),
+            'count': 0,
+            'slow_count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'call_sites': set(),
+        })
+        duration_ms = record['duration'] * 1000
+        group['count'] += 1
+        group['slow_count'] += record['slow']
+        group['total_ms'] += duration_ms
+        group['max_ms'] = max(group['max_ms'], duration_ms)
+        if record['view']:
+            group['views'].add(record['view'])
+        if record['call_site']:
+            group['call_sites'].add(record['call_site'])
+    for group in groups.values():
+        group['mean_ms'] = group['total_ms'] / group['count']
+        group['views'] = sorted(group['views'])
+        group['call_sites'] = sorted(group['call_sites'])
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
@@ -0,0 +1,85 @@
+// Upload the file of a document in chunks, resuming from the offset the server has after a dropped chunk.
+// Browsers without fetch send the form as a single multipart POST.
+var CHUNKED_UPLOAD_RETRIES = 5;
+
+function chunked_upload_request(url, options, csrf_token) {
+    options.headers = Object.assign({'X-CSRFToken': csrf_token}, options.headers || {});
+    options.credentials = 'same-origin';
+    return fetch(url, options).then(function (response) {
+        return response.json().then(function (data) {
+            data.status = response.status;
+            return data;
+        });
+    });
+}
+
+function chunked_upload_send(state, file, csrf_token, retries, progress) {
+    if (state.offset >= file.size) {
+        return Promise.resolve(state);
+    }
+    var last = Math.min(state.offset + state.chunk_size, file.size) - 1;
+    return chunked_upload_request(state.chunk_url, {
+        method: 'PUT',
+        headers: {'Content-Range': 'bytes ' + state.offset + '-' + last + '/' + file.size},
+        body: file.slice(state.offset, last + 1)
+    }, csrf_token).then(function (data) {
+        if (data.status !== 200 && data.status !== 409 && data.status !== 400) {
+            throw new Error(data.error);
+        }
+        if (data.status !== 200) {
+            retries -= 1;
+        }
+        return data;
+    }, function () {
+        // The connection dropped: ask the server where to carry on from.
+        retries -= 1;
+        return chunked_upload_request(state.chunk_url, {method: 'GET'}, csrf_token);
+    }).then(function (data) {
+        if (retries < 0) {
+            throw new Error('The upload failed, please try again.');
+        }
+        state.offset = data.offset;
+        progress(state.offset / file.size);
+        return chunked_upload_send(state, file, csrf_token, retries, progress);
+    });
+}
+
+document.addEventListener('submit', function (event) {
+    var form = event.target;
+    var input = form.querySelector('input[type=file]');
+    if (!form.classList.contains('chunked-upload') || !window.fetch || !input || !input.files.length) {
+        return;
+    }
+    event.preventDefault();
+    var file = input.files[0];
+    var button = form.querySelector('button[type=submit]');
+    var csrf_token = form.querySelector('input[name=csrfmiddlewaretoken]').value;
+    var is_private = form.querySelector('input[name=is_private]');
+    var init = new FormData();
+    init.append('file_name', file.name);
+    init.append('size', file.size);
+    init.append(form.dataset.target, form.dataset.targetId);
+    if (is_private && is_private.checked) {
+        init.append('is_private', 'on');
+    }
+    button.disabled = true;
+    chunked_upload_request(form.dataset.initUrl, {method: 'POST', body: init}, csrf_token).then(function (state) {
+        if (state.status !== 201) {
+            throw new Error(Object.values(state.errors).join(' '));
+        }
+        return chunked_upload_send(state, file, csrf_token, CHUNKED_UPLOAD_RETRIES, function (done) {
+            button.textContent = Math.floor(done * 100) + '%';
+        });
+    }).then(function (state) {
+        return chunked_upload_request(state.finalize_url, {method: 'POST'}, csrf_token);
+    }).then(function (uploaded) {
+        if (uploaded.status !== 201) {
+            throw new Error(uploaded.error);
+        }
+        window.location = uploaded.redirect;
+    }).catch(function (error) {
+        alert(error.message);
+        button.disabled = false;
+        button.textContent = 'Submit';
+    });
+});
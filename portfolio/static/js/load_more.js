@@ -0,0 +1,55 @@
+// Append the next keyset page of a listing below the items already shown
+function load_more(button) {
+    if ($(button).data('loading')) {
+        return;
+    }
+    $(button).data('loading', true);
+    var container = $(button).closest('.container-fluid, .table-responsive').find('.page-items').first();
+
+    $.ajax(
+        {
+            type: "GET",
+            url: $(button).data('url'),
+            data: {
+                cursor: $(button).attr('data-cursor')
+            },
+            success: function (data, status, xhr) {
+                var next_cursor = xhr.getResponseHeader('X-Next-Cursor');
+                container.append(data);
+                if (next_cursor) {
+                    $(button).attr('data-cursor', next_cursor);
+                    $(button).attr('href', '?' + $(button).data('cursor-name') + '=' + next_cursor);
+                } else {
+                    $(button).parent().remove();
+                }
+            },
+            complete: function () {
+                $(button).data('loading', false);
+            }
+        })
+}
+
+$(document).on('click', '.load-more', function (event) {
+    event.preventDefault();
+    load_more(this);
+});
+
+// Infinite scroll: load the next page as soon as the "Load more" button scrolls into view
+if ('IntersectionObserver' in window) {
+    var load_more_observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                load_more(entry.target);
+            }
+        });
+    });
+
+    var observe_load_more_buttons = function () {
+        $('.load-more').each(function () {
+            load_more_observer.observe(this);
+        });
+    };
+
+    $(document).ready(observe_load_more_buttons);
+    $(document).ajaxComplete(observe_load_more_buttons);
+}
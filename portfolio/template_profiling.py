@@ -0,0 +1,126 @@
+"""Render time and SQL queries of every template, aggregated across requests.
+
+When TEMPLATE_PROFILING is on, PortfolioConfig.ready() installs the profiler and every render of a template is timed:
+the page templates, the templates they extend and every included partial. Each render records its total time, its
+self time (without the templates it includes or extends) and the SQL queries run while it was the innermost template
+being rendered, i.e. the lazy queries its own tags and variables triggered.
+
+The figures are added to counters of portfolio.metrics labelled by template name, so they are aggregated per thread
+without locks, across worker processes through METRICS_DIR, and exported at /metrics too. The template report ranks
+the templates by any of them.
+"""
+import threading
+import time
+
+from django.db import connection
+from django.template.base import Template
+
+from portfolio.metrics import Counter
+
+TEMPLATE_RENDERS = Counter('vcpms_template_renders_total', 'Renders of a template.', ['template'])
+TEMPLATE_TIME = Counter('vcpms_template_seconds_total',
+                        'Time spent rendering a template, including the templates it includes or extends.',
+                        ['template'])
+TEMPLATE_SELF_TIME = Counter('vcpms_template_self_seconds_total',
+                             'Time spent rendering a template, without the templates it includes or extends.',
+                             ['template'])
+TEMPLATE_QUERIES = Counter('vcpms_template_queries_total', 'SQL queries run while rendering a template itself.',
+                           ['template'])
+TEMPLATE_SQL_TIME = Counter('vcpms_template_sql_seconds_total',
+                            'Time spent in the SQL queries run while rendering a template itself.', ['template'])
+
+# The columns of the report, from the counters.
+COLUMNS = {
+    'renders': TEMPLATE_RENDERS,
+    'total': TEMPLATE_TIME,
+    'self': TEMPLATE_SELF_TIME,
+    'queries': TEMPLATE_QUERIES,
+    'sql': TEMPLATE_SQL_TIME,
+}
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+
+class _Render:
+    """A template being rendered: the time spent in its children and the SQL queries run while it is innermost."""
+
+    __slots__ = ['name', 'children_time', 'queries', 'sql_time']
+
+    def __init__(self, name):
+        self.name = name
+        self.children_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+
+
+def _attribute_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stack = getattr(_local, 'stack', None)
+        if stack:
+            stack[-1].queries += 1
+            stack[-1].sql_time += time.perf_counter() - start
+
+
+def install():
+    """Times every template render from now on. Template._render is wrapped rather than Template.render to also
+    time the templates rendered by {% extends %}."""
+
+    with _install_lock:
+        if getattr(Template._render, 'profiles_templates', False):
+            return
+        render = Template._render
+
+        def profiled_render(template, context):
+            stack = getattr(_local, 'stack', None)
+            if stack is None:
+                stack = _local.stack = []
+            current = _Render(template.name or '<unknown>')
+            wrapper = None
+            if not stack:
+                wrapper = connection.execute_wrapper(_attribute_query)
+                wrapper.__enter__()
+            stack.append(current)
+            start = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1].children_time += elapsed
+                if wrapper is not None:
+                    wrapper.__exit__(None, None, None)
+                TEMPLATE_RENDERS.inc(current.name)
+                TEMPLATE_TIME.inc(current.name, amount=elapsed)
+                TEMPLATE_SELF_TIME.inc(current.name, amount=elapsed - current.children_time)
+                if current.queries:
+                    TEMPLATE_QUERIES.inc(current.name, amount=current.queries)
+                    TEMPLATE_SQL_TIME.inc(current.name, amount=current.sql_time)
+
+        profiled_render.profiles_templates = True
+        Template._render = profiled_render
+
+
+def report(collected, sort='self'):
+    """Returns a row per template from collected metrics (see metrics.collect()), sorted by the given column of
+    COLUMNS, the highest first."""
+
+    names = {counter.name: column for column, counter in COLUMNS.items()}
+    rows = {}
+    for metric in collected:
+        column = names.get(metric['name'])
+        if column is None:
+            continue
+        for (template,), value in metric['samples']:
+            row = rows.setdefault(template, dict({name: 0 for name in COLUMNS}, template=template))
+            row[column] = value
+    for row in rows.values():
+        for column in ['total', 'self', 'sql']:
+            row[f'{column}_ms'] = row[column] * 1000
+            row[f'mean_{column}_ms'] = row[f'{column}_ms'] / row['renders'] if row['renders'] else 0
+        row['queries_per_render'] = row['queries'] / row['renders'] if row['renders'] else 0
+    return sorted(rows.values(), key=lambda row: row[sort], reverse=True)
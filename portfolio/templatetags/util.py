@@ -1,12 +1,24 @@
 from django import template
 
+from portfolio import previews
 from portfolio.models import Investor
 
 register = template.Library()
 
 
+def _role_annotation(value, role):
+    """Returns the role annotation added by IndividualQuerySet.with_roles(), or None when it was not annotated."""
+
+    if type(value) != dict:
+        value = value.__dict__
+    return value.get(role)
+
+
 @register.filter
 def is_investor(value):
+    annotation = _role_annotation(value, 'is_investor')
+    if annotation is not None:
+        return annotation or None
     # print(type(value))
     if type(value) != dict:
         value = value.__dict__
@@ -16,6 +28,9 @@ def is_investor(value):
 
 @register.filter
 def is_founder(value):
+    annotation = _role_annotation(value, 'is_founder')
+    if annotation is not None:
+        return annotation or None
     if hasattr(value, 'founder'):
         return True
 
@@ -24,3 +39,10 @@ def is_founder(value):
 def is_founder_and_investor(value):
     if is_investor(value) and is_founder(value):
         return True
+
+
+@register.filter
+def previewable(file_type):
+    """Whether documents of a file type get a thumbnail and a preview, without reading any file."""
+
+    return previews.previewable(file_type)
@@ -1,13 +1,15 @@
+import hashlib
 import mimetypes
 import os
 import shutil
+import tempfile
 import time
 from io import BytesIO
 
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from portfolio.forms import URLUploadForm, DocumentUploadForm
 from portfolio.models import Company, Document
@@ -102,6 +104,7 @@ class DocumentFormTestCase(TestCase):
         with self.assertRaises(ValueError):
             form.save(commit=True)
 
+    @override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
     def test_form_must_save_correctly(self):
         form = DocumentUploadForm(data=self.form_input, files=self.form_input)
         before_count = Document.objects.count()
@@ -126,3 +129,19 @@ class DocumentFormTestCase(TestCase):
             self.assertEqual(document.file_size, self.file_data.size)
 
         self.assertEqual(document.is_private, self.form_input['is_private'])
+
+    def test_form_saves_the_file_by_content(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            form = DocumentUploadForm(data=self.form_input, files=self.form_input)
+            document = form.save(commit=False)
+            document.company = self.defaultCompany
+            document.save()
+            with open("portfolio/tests/forms/TestingExcel.xlsx", "rb") as f:
+                content = f.read()
+            self.assertEqual(document.checksum, hashlib.sha256(content).hexdigest())
+            self.assertEqual(document.file.name, document.blob.file.name)
+            self.assertTrue(document.file.name.startswith('blobs/'))
+            self.assertEqual(document.file.read(), content)
+            document.file.close()
@@ -1,6 +1,17 @@
+import functools
+from datetime import date
+
 from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from portfolio.models import Company, Portfolio_Company, Individual, Investor, InvestorCompany, Investment, Founder, \
+    Programme, Document, ResidentialAddress, PastExperience
+from portfolio.models.investment_model import ContractRight
+from portfolio.typeahead import TYPEAHEADS
+
 
 class LogInTester:
     def _is_logged_in(self):
@@ -65,3 +76,119 @@ def set_session_archived_company_filter_variable(client, filter_number):
     session['archived_company_filter'] = filter_number
     session.save()
     set_session_cookies(client, session)
+
+
+# Query budgets
+def grow_dataset(count=5):
+    """Adds count rows of every kind, archived or not, and count related rows to every company, portfolio company,
+    individual and programme already in the database, so pages listing or detailing them have more to show."""
+
+    companies = list(Company.objects.all())
+    portfolio_companies = list(Portfolio_Company.objects.all())
+    individuals = list(Individual.objects.all())
+    programmes = list(Programme.objects.all())
+    start = Company.objects.count() + Individual.objects.count()
+
+    new_companies = []
+    new_individuals = []
+    for number in range(start, start + count):
+        company = Company.objects.create(name=f"Grown company {number}", trading_names=f"Grown trading {number}",
+                                         previous_names=f"Grown previous {number}")
+        Portfolio_Company.objects.create(parent_company=company, wayra_number=f"WN-grown-{number}")
+        InvestorCompany.objects.create(company=company, angelListLink="https://angel.co/grown",
+                                       crunchbaseLink="https://crunchbase.com/grown",
+                                       linkedInLink="https://linkedin.com/grown", classification="VENTURE_CAPITAL")
+        new_companies.append(company)
+        individual = Individual.objects.create(name=f"Grown individual {number}", AngelListLink="https://angel.co/a",
+                                               CrunchbaseLink="https://crunchbase.com/a",
+                                               LinkedInLink="https://linkedin.com/a", Company="Grown",
+                                               Position="Analyst", Email=f"grown{number}@example.org",
+                                               PrimaryNumber="+447312345678")
+        Founder.objects.create(companyFounded=company, individualFounder=individual)
+        new_individuals.append(individual)
+        archived_company = Company.objects.create(name=f"Archived company {number}",
+                                                  trading_names=f"Archived trading {number}",
+                                                  previous_names=f"Archived previous {number}", is_archived=True)
+        Portfolio_Company.objects.create(parent_company=archived_company, wayra_number=f"WN-archived-{number}")
+        Individual.objects.create(name=f"Archived individual {number}", AngelListLink="https://angel.co/a",
+                                  CrunchbaseLink="https://crunchbase.com/a", LinkedInLink="https://linkedin.com/a",
+                                  Company="Grown", Position="Analyst", Email=f"archived{number}@example.org",
+                                  PrimaryNumber="+447312345678", is_archived=True)
+
+    investors = [Investor.objects.create(company=company, classification='VENTURE CAPITAL')
+                 for company in new_companies]
+    investors += [Investor.objects.create(individual=individual, classification='VENTURE CAPITAL')
+                  for individual in new_individuals]
+    for startup in portfolio_companies:
+        for investor in investors:
+            investment = Investment.objects.create(investor=investor, startup=startup, typeOfFoundingRounds='Seed',
+                                                   investmentAmount=1000, dateInvested=date(2022, 1, 1))
+            ContractRight.objects.create(investment=investment, right="Board seat", details="Grown")
+
+    for number in range(count):
+        for company in companies:
+            Document.objects.create(file_name=f"grown {number}", file_type="URL",
+                                    url="https://example.org/grown", company=company)
+        for individual in individuals:
+            Document.objects.create(file_name=f"grown {number}", file_type="URL",
+                                    url="https://example.org/grown", individual=individual)
+            ResidentialAddress.objects.create(address_line1=f"{number} Grown Street", postal_code="WC2R 2LS",
+                                              city="London", country="GB", individual=individual)
+            PastExperience.objects.create(companyName="Grown", workTitle="Analyst", start_year=2010,
+                                          end_year=2012, individual=individual)
+        for programme in programmes:
+            Document.objects.create(file_name=f"grown {number}", file_type="URL",
+                                    url="https://example.org/grown", programme=programme)
+    new_programmes = [Programme.objects.create(name=f"Grown programme {number}", cohort=1)
+                      for number in range(start, start + count)]
+    for programme in programmes + new_programmes:
+        programme.participants.add(*new_companies)
+        programme.partners.add(*new_companies)
+        programme.coaches_mentors.add(*new_individuals)
+
+
+def reset_typeaheads():
+    """Discards the typeaheads loaded by previous tests, whose rows were rolled back without running the receivers
+    that keep the typeaheads current."""
+
+    for typeahead in TYPEAHEADS:
+        typeahead.reset()
+
+
+class QueryBudgetTester:
+    """Checks that a view runs at most a given number of SQL queries, and no more once the dataset has grown.
+
+    The dataset is grown once before the first count, so that every relation the view shows has rows at both sizes
+    and a query only run for non-empty relations does not pass for growth."""
+
+    def assertQueryBudget(self, url, budget, data=None, grow=grow_dataset):
+        grow()
+        small = self._count_queries(url, data)
+        grow()
+        large = self._count_queries(url, data)
+        self.assertLessEqual(small, budget, f"{url} runs {small} queries, its budget is {budget}")
+        self.assertLessEqual(large, small, f"{url} runs {small} queries, and {large} once the dataset has grown")
+
+    def _count_queries(self, url, data):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+        self.assertLess(response.status_code, 400, f"{url} answered {response.status_code}")
+        return len(queries)
+
+
+def query_budget(budget, data=None, grow=grow_dataset):
+    """Turns a test method returning the URL of a view into a test that the view runs at most budget queries, at two
+    sizes of the dataset grown by grow (see QueryBudgetTester). The test class must be a QueryBudgetTester."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def test(self):
+            self.assertQueryBudget(method(self), budget, data=data, grow=grow)
+
+        return test
+
+    return decorator
@@ -2,7 +2,7 @@ from django.core.exceptions import ValidationError
 from django.test import TestCase
 from django.utils import timezone
 
-from portfolio.models import Company
+from portfolio.models import Company, Investor, InvestorCompany, Portfolio_Company
 
 
 class CompanyModelTestCase(TestCase):
@@ -35,6 +35,52 @@ class CompanyModelTestCase(TestCase):
         self.company.name = "x" * 61
         self._assert_company_is_invalid()
 
+    def test_new_company_has_no_roles(self):
+        self.assertFalse(self.company.is_investor)
+        self.assertFalse(self.company.is_portfolio_company)
+
+    def test_creating_investor_flags_company_as_investor(self):
+        Investor.objects.create(company=self.company)
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.is_investor)
+        self.assertIn(self.company, Company.objects.investors())
+
+    def test_creating_investor_company_flags_company_as_investor(self):
+        InvestorCompany.objects.create(company=self.company, angelListLink="https://www.AngelList.com",
+                                       crunchbaseLink="https://www.Crunchbase.com",
+                                       linkedInLink="https://www.LinkedIn.com")
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.is_investor)
+
+    def test_deleting_investor_clears_investor_flag(self):
+        investor = Investor.objects.create(company=self.company)
+        investor.delete()
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.is_investor)
+
+    def test_creating_portfolio_company_flags_parent_company(self):
+        portfolio_company = Portfolio_Company.objects.create(parent_company=self.company, wayra_number="WN-1")
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.is_portfolio_company)
+        self.assertIn(self.company, Company.objects.portfolio_companies())
+        portfolio_company.delete()
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.is_portfolio_company)
+
+    def test_saving_stale_company_keeps_roles(self):
+        Investor.objects.create(company=self.company)
+        self.company.archive()
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.is_investor)
+        self.assertTrue(self.company.is_archived)
+
+    def test_with_filter_selects_company_role(self):
+        Investor.objects.create(company=self.company)
+        second_company = self._create_second_company()
+        self.assertEqual(list(Company.objects.with_filter(3)), [self.company])
+        self.assertEqual(list(Company.objects.with_filter('2')), [])
+        self.assertEqual(set(Company.objects.with_filter(1)), {self.company, second_company})
+
     """Helper functions"""
 
     # Assert a company is valid
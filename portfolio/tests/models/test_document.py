@@ -2,14 +2,15 @@ import os
 
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from portfolio.models import Company
 from portfolio.models import Document
 
 
+@override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
 class DocumentModelTestCase(TestCase):
-    """Unit tests for the Document model."""
+    """Unit tests for the Document model, storing files under the name of their company, individual or programme."""
 
     fixtures = ["portfolio/tests/fixtures/default_company.json"]
 
@@ -36,7 +37,8 @@ class DocumentModelTestCase(TestCase):
         self.assertTrue(os.path.isfile(file_path))
 
         # Test if the file is deleted when its record in the database is deleted.
-        self.document.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.delete()
         self.assertFalse(os.path.isfile(file_path))
 
     def test_auto_delete_file_on_change(self):
@@ -50,7 +52,8 @@ class DocumentModelTestCase(TestCase):
 
         # Update the first document with the second document's file.
         self.document.file = second_document.file
-        self.document.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.save()
         self.assertFalse(os.path.isfile(old_file_path))
         self.assertTrue(os.path.isfile(new_file_path))
 
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.db.models import ProtectedError
+from django.test import TestCase, override_settings
+
+from portfolio.models import Company, Document, DocumentBlob, Individual
+from portfolio.models.document_blob_model import get_path
+
+
+class DocumentBlobModelTestCase(TestCase):
+    """Unit tests for the DocumentBlob model, storing the files of documents once by content."""
+
+    fixtures = ["portfolio/tests/fixtures/default_company.json",
+                "portfolio/tests/fixtures/default_individual.json"]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.company = Company.objects.get(id=1)
+
+    def _create_document(self, content=b"term sheet", name="term_sheet.pdf", **owner):
+        return Document.objects.create(file_name=name, file_type="pdf", file=ContentFile(content, name=name),
+                                       **(owner or {'company': self.company}))
+
+    def _blob(self, document):
+        return DocumentBlob.objects.get(sha256=document.blob_id)
+
+    def test_file_is_stored_by_content(self):
+        document = self._create_document()
+        sha256 = hashlib.sha256(b"term sheet").hexdigest()
+        self.assertEqual(document.checksum, sha256)
+        self.assertEqual(document.file.name, get_path(sha256))
+        self.assertEqual(document.file.name, f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}')
+        self.assertEqual(document.file_size, len(b"term sheet"))
+        self.assertEqual(self._blob(document).references, 1)
+        with document.file.open('rb') as file:
+            self.assertEqual(file.read(), b"term sheet")
+
+    def test_same_content_is_stored_once(self):
+        first = self._create_document()
+        second = self._create_document(name="copy.pdf", individual=Individual.objects.first())
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+        self.assertEqual(self._blob(first).references, 2)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.file.path))), 1)
+
+    def test_file_is_deleted_with_the_last_reference(self):
+        first = self._create_document()
+        second = self._create_document(name="copy.pdf")
+        path = first.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self._blob(second).references, 1)
+        self.assertTrue(os.path.isfile(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(DocumentBlob.objects.exists())
+        self.assertFalse(os.path.isfile(path))
+
+    def test_file_is_kept_until_the_deletion_commits(self):
+        document = self._create_document()
+        path = document.file.path
+        with self.captureOnCommitCallbacks() as callbacks:
+            document.delete()
+        self.assertTrue(os.path.isfile(path))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.isfile(path))
+
+    def test_failed_save_leaves_no_blob(self):
+        with self.assertRaises(IntegrityError):
+            Document.objects.create(file_name="term_sheet.pdf", file_type="pdf", url="https://example.org",
+                                    file=ContentFile(b"term sheet", name="term_sheet.pdf"), company=self.company)
+        self.assertFalse(DocumentBlob.objects.exists())
+
+    def test_stored_blob_is_not_deleted_by_a_release(self):
+        document = self._create_document()
+        blob = DocumentBlob.store(ContentFile(b"term sheet"))
+        self.assertEqual(self._blob(document).references, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertTrue(DocumentBlob.objects.filter(sha256=blob.sha256, references=1).exists())
+        self.assertTrue(blob.file.storage.exists(blob.file.name))
+        other = Document.objects.create(file_name="copy.pdf", file_type="pdf", file=blob.file.name, blob=blob,
+                                        company=self.company)
+        self.assertEqual(self._blob(other).references, 1)
+
+    def test_file_stored_again_before_the_deletion_commits_is_kept(self):
+        document = self._create_document()
+        path = document.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+            self.assertFalse(DocumentBlob.objects.exists())
+            self._create_document(name="copy.pdf")
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(DocumentBlob.objects.get().references, 1)
+
+    def test_new_file_moves_the_reference(self):
+        document = self._create_document()
+        other = self._create_document(b"pitch deck", name="deck.pdf")
+        old_path = document.file.path
+        document.file = ContentFile(b"new term sheet", name="term_sheet.pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+        self.assertEqual(document.checksum, hashlib.sha256(b"new term sheet").hexdigest())
+        self.assertFalse(os.path.isfile(old_path))
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document.file = other.file
+            document.save()
+        self.assertEqual(document.blob_id, other.blob_id)
+        self.assertEqual(self._blob(other).references, 2)
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+
+    def test_deleting_the_owner_releases_the_blobs(self):
+        document = self._create_document()
+        self._create_document(name="copy.pdf", individual=Individual.objects.first())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.delete()
+        self.assertEqual(DocumentBlob.objects.get(sha256=document.blob_id).references, 1)
+
+    def test_blob_used_by_a_document_cannot_be_deleted(self):
+        document = self._create_document()
+        with self.assertRaises(ProtectedError):
+            self._blob(document).delete()
+
+    def test_document_needs_an_owner(self):
+        with self.assertRaises(ValueError):
+            Document.objects.create(file_name="orphan.pdf", file_type="pdf", file=ContentFile(b"x", name="orphan.pdf"))
+        self.assertFalse(DocumentBlob.objects.exists())
+
+    def test_recount(self):
+        document = self._create_document()
+        orphan = DocumentBlob.store(ContentFile(b"orphan"))
+        DocumentBlob.objects.filter(sha256=document.blob_id).update(references=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentBlob.recount()
+        self.assertEqual(self._blob(document).references, 1)
+        self.assertFalse(DocumentBlob.objects.filter(sha256=orphan.sha256).exists())
+        self.assertFalse(orphan.file.storage.exists(orphan.file.name))
+
+    @override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
+    def test_files_are_stored_by_owner_when_not_content_addressed(self):
+        document = self._create_document()
+        self.assertIsNone(document.blob)
+        self.assertEqual(document.file.name, f'documents/{self.company.name}/term_sheet.pdf')
+        self.assertFalse(DocumentBlob.objects.exists())
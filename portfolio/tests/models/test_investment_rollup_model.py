@@ -0,0 +1,103 @@
+import datetime
+import io
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from portfolio.models import Company, Portfolio_Company, Investment, InvestmentRollup
+from portfolio.models.investor_model import Investor
+
+
+class InvestmentRollupModelTestCase(TestCase):
+    fixtures = ['portfolio/tests/fixtures/default_company.json',
+                'portfolio/tests/fixtures/default_portfolio_company.json']
+
+    def setUp(self) -> None:
+        self.investor = Investor.objects.create(company=Company.objects.get(id=1), classification='VC')
+        self.other_investor = Investor.objects.create(company=Company.objects.get(id=101), classification='VC')
+        self.portfolio_company = Portfolio_Company.objects.get(pk=101)
+
+    def _invest(self, amount, date, investor=None, founding_round='Series A'):
+        return Investment.objects.create(
+            investor=investor or self.investor,
+            startup=self.portfolio_company,
+            typeOfFoundingRounds=founding_round,
+            dateInvested=date,
+            investmentAmount=amount,
+        )
+
+    def _assert_rollup(self, dimension, key, total_amount, count, first_invested, last_invested):
+        rollup = InvestmentRollup.lookup(dimension, key)
+        self.assertEqual(rollup.total_amount, Decimal(total_amount))
+        self.assertEqual(rollup.count, count)
+        self.assertEqual(rollup.first_invested, first_invested)
+        self.assertEqual(rollup.last_invested, last_invested)
+
+    def _assert_rollups_match_rebuild(self):
+        incremental = set(InvestmentRollup.objects.values_list(
+            'dimension', 'key', 'total_amount', 'count', 'first_invested', 'last_invested'))
+        InvestmentRollup.rebuild()
+        rebuilt = set(InvestmentRollup.objects.values_list(
+            'dimension', 'key', 'total_amount', 'count', 'first_invested', 'last_invested'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_investments_are_added_to_every_dimension(self):
+        self._invest(1000, datetime.date(2021, 5, 1))
+        self._invest(500, datetime.date(2021, 1, 1), investor=self.other_investor, founding_round='Seed round')
+        first, last = datetime.date(2021, 1, 1), datetime.date(2021, 5, 1)
+        self._assert_rollup(InvestmentRollup.ROUND, 'Series A', 1000, 1, last, last)
+        self._assert_rollup(InvestmentRollup.ROUND, 'Seed round', 500, 1, first, first)
+        self._assert_rollup(InvestmentRollup.YEAR, 2021, 1500, 2, first, last)
+        self._assert_rollup(InvestmentRollup.INVESTOR, self.investor.id, 1000, 1, last, last)
+        self._assert_rollup(InvestmentRollup.STARTUP, self.portfolio_company.id, 1500, 2, first, last)
+        self._assert_rollups_match_rebuild()
+
+    def test_updated_investment_moves_between_buckets(self):
+        investment = self._invest(1000, datetime.date(2021, 5, 1))
+        self._invest(200, datetime.date(2022, 3, 1))
+        investment.dateInvested = datetime.date(2022, 1, 1)
+        investment.investmentAmount = 3000
+        investment.save()
+        self.assertIsNone(InvestmentRollup.lookup(InvestmentRollup.YEAR, 2021))
+        self._assert_rollup(InvestmentRollup.YEAR, 2022, 3200, 2, datetime.date(2022, 1, 1), datetime.date(2022, 3, 1))
+        self._assert_rollups_match_rebuild()
+
+    def test_deleting_edge_investment_recomputes_dates(self):
+        self._invest(1000, datetime.date(2021, 1, 1))
+        self._invest(2000, datetime.date(2021, 6, 1))
+        last = self._invest(3000, datetime.date(2021, 9, 1))
+        last.delete()
+        self._assert_rollup(InvestmentRollup.YEAR, 2021, 3000, 2, datetime.date(2021, 1, 1), datetime.date(2021, 6, 1))
+        self._assert_rollups_match_rebuild()
+
+    def test_edges_of_round_and_year_are_read_from_an_index(self):
+        self._invest(1000, datetime.date(2021, 1, 1))
+        for dimension, key in [(InvestmentRollup.ROUND, 'Series A'), (InvestmentRollup.YEAR, '2021')]:
+            dates = InvestmentRollup.investments_in(dimension, key).values_list('dateInvested', flat=True)
+            for ordering in ['dateInvested', '-dateInvested']:
+                plan = dates.order_by(ordering)[:1].explain()
+                self.assertIn('USING COVERING INDEX', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+        self.assertEqual(InvestmentRollup.edges_of(InvestmentRollup.YEAR, '2021'),
+                         (datetime.date(2021, 1, 1), datetime.date(2021, 1, 1)))
+        self.assertEqual(InvestmentRollup.edges_of(InvestmentRollup.YEAR, '2020'), (None, None))
+
+    def test_deleting_last_investment_removes_bucket(self):
+        self._invest(1000, datetime.date(2021, 1, 1)).delete()
+        self.assertFalse(InvestmentRollup.objects.exists())
+
+    def test_string_values_are_rolled_up(self):
+        self._invest('1500.50', '2020-02-02')
+        self._assert_rollup(InvestmentRollup.YEAR, 2020, '1500.50', 1, datetime.date(2020, 2, 2),
+                            datetime.date(2020, 2, 2))
+
+    def test_rebuild_rollups_command(self):
+        self._invest(1000, datetime.date(2021, 1, 1))
+        InvestmentRollup.objects.all().delete()
+        with redirect_stdout(io.StringIO()) as output:
+            call_command('rebuild_rollups')
+        self.assertIn("4 investment rollups rebuilt.", output.getvalue())
+        self._assert_rollup(InvestmentRollup.INVESTOR, self.investor.id, 1000, 1, datetime.date(2021, 1, 1),
+                            datetime.date(2021, 1, 1))
@@ -0,0 +1,69 @@
+"""Unit tests of the view benchmark"""
+from django.test import TestCase
+from django.urls import path
+
+from portfolio import views
+from portfolio.benchmarks import Benchmark, named_routes, check_budgets, compare
+from portfolio.models import Company, User
+from portfolio.tests.helpers import reset_typeaheads
+
+
+class BenchmarkTestCase(TestCase):
+    """Unit tests of the view benchmark"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+    ]
+
+    def setUp(self):
+        reset_typeaheads()
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+
+    def test_named_routes(self):
+        urlpatterns = [
+            path('dashboard/', views.dashboard, name='dashboard'),
+            path('portfolio_company/<int:company_id>', views.CompanyDetailView.as_view(), name='portfolio_company'),
+            path('individual_profile_page/<int:id>/', views.IndividualProfileListView.as_view(),
+                 name='individual_profile'),
+            path('search_result', views.searchcomp, name='company_search_result'),
+            path('unnamed/', views.dashboard),
+        ]
+        routes, skipped = named_routes(urlpatterns, {'company': 1, 'individual': None})
+        self.assertEqual(routes, {
+            'dashboard': '/dashboard/',
+            'portfolio_company': '/portfolio_company/1',
+            'company_search_result': '/search_result?searchresult=an',
+        })
+        self.assertEqual(skipped, {'individual_profile': 'no sample for id'})
+
+    def test_measure(self):
+        benchmark = Benchmark(self.admin_user, repeat=3, warmup=0)
+        result = benchmark.measure('/portfolio_company/1')
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(result['path'], '/portfolio_company/1')
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['template_ms'], 0)
+        self.assertLessEqual(result['median_ms'], result['p95_ms'])
+
+    def test_requests_are_rolled_back(self):
+        benchmark = Benchmark(self.admin_user, repeat=2, warmup=0)
+        benchmark.run({'archive_company': '/portfolio_company/archive/1', 'logout': '/logout'})
+        self.assertFalse(Company.objects.get(id=1).is_archived)
+        self.assertEqual(benchmark.measure('/dashboard/')['status'], 200)
+
+    def test_check_budgets(self):
+        results = {'dashboard': {'queries': 6, 'median_ms': 10}, 'login': {'queries': 100, 'median_ms': 10}}
+        self.assertEqual(check_budgets(results, {'dashboard': {'queries': 5, 'median_ms': 100}}),
+                         ["dashboard: queries 6 exceeds its budget of 5"])
+
+    def test_compare(self):
+        baseline = {'dashboard': {'queries': 3, 'median_ms': 10.0}, 'login': {'queries': 2, 'median_ms': 2.0}}
+        results = {'dashboard': {'queries': 4, 'median_ms': 14.0}, 'login': {'queries': 2, 'median_ms': 2.9},
+                   'logout': {'queries': 9, 'median_ms': 9.0}}
+        self.assertEqual(compare(results, baseline), [
+            "dashboard: 4 queries, 3 in the baseline",
+            "dashboard: median 14.0 ms, 10.0 ms in the baseline",
+        ])
+        self.assertEqual(compare(results, baseline, latency_threshold=0.5, query_threshold=1), [])
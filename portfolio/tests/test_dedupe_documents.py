@@ -0,0 +1,73 @@
+"""Unit tests of the dedupe_documents command"""
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from portfolio.models import Company, Document, DocumentBlob, Individual
+
+
+class DedupeDocumentsTestCase(TestCase):
+    """Unit tests of the dedupe_documents command"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+    ]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        with override_settings(CONTENT_ADDRESSED_DOCUMENTS=False):
+            self.documents = [
+                self._create_document("deck.pdf", b"pitch deck", company=Company.objects.get(id=1)),
+                self._create_document("deck.pdf", b"pitch deck", individual=Individual.objects.first()),
+                self._create_document("terms.pdf", b"term sheet", company=Company.objects.get(id=1)),
+            ]
+        self.legacy_paths = [document.file.path for document in self.documents]
+
+    def _create_document(self, name, content, **owner):
+        return Document.objects.create(file_name=name, file_type="pdf", file=ContentFile(content, name=name), **owner)
+
+    def _dedupe(self, *args):
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True), redirect_stdout(stdout):
+            call_command('dedupe_documents', *args)
+        return stdout.getvalue()
+
+    def test_dedupe_moves_the_files_to_blobs(self):
+        output = self._dedupe()
+        self.assertIn("3 documents were moved to the content-addressed storage, 1 of them duplicates.", output)
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+        deck, copy, terms = (Document.objects.get(file_id=document.file_id) for document in self.documents)
+        self.assertEqual(deck.blob_id, copy.blob_id)
+        self.assertEqual(deck.file.name, copy.file.name)
+        self.assertEqual(DocumentBlob.objects.get(sha256=deck.blob_id).references, 2)
+        self.assertEqual(deck.updated_at, self.documents[0].updated_at)
+        with terms.file.open('rb') as file:
+            self.assertEqual(file.read(), b"term sheet")
+        self.assertFalse(any(os.path.isfile(path) for path in self.legacy_paths))
+
+    def test_dedupe_is_idempotent(self):
+        self._dedupe()
+        self.assertIn("0 documents were moved", self._dedupe())
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+
+    def test_dry_run_changes_nothing(self):
+        output = self._dedupe('--dry-run')
+        self.assertIn("3 documents would be moved to the content-addressed storage, 1 of them duplicates.", output)
+        self.assertIn("10 B would be freed.", output)
+        self.assertFalse(DocumentBlob.objects.exists())
+        self.assertTrue(all(os.path.isfile(path) for path in self.legacy_paths))
+
+    def test_documents_without_a_file_are_left(self):
+        os.remove(self.legacy_paths[2])
+        output = self._dedupe()
+        self.assertIn("1 documents have no file in the storage", output)
+        self.assertIsNone(Document.objects.get(file_id=self.documents[2].file_id).blob)
@@ -0,0 +1,136 @@
+"""Unit tests of the streaming document downloads"""
+import io
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from portfolio.downloads import RangeNotSatisfiable, parse_range, read_chunks
+from portfolio.models import Company, Document, User
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTestCase(TestCase):
+    """Unit tests of the Range header parsing"""
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(parse_range('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=-24', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=-5000', 1024), (0, 1023))
+        self.assertEqual(parse_range('bytes=1000-5000', 1024), (1000, 1023))
+
+    def test_ranges_that_are_ignored(self):
+        for header in ['bytes=0-9,20-29', 'bytes=-', 'bytes=9-0', 'items=0-9', 'bytes=a-b']:
+            self.assertIsNone(parse_range(header, 1024), header)
+
+    def test_unsatisfiable_ranges(self):
+        for header, size in [('bytes=1024-', 1024), ('bytes=-0', 1024), ('bytes=-10', 0)]:
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, size)
+
+    def test_read_chunks(self):
+        file = io.BytesIO(CONTENT)
+        chunks = list(read_chunks(file, 100, 300, chunk_size=128))
+        self.assertEqual([len(chunk) for chunk in chunks], [128, 128, 44])
+        self.assertEqual(b''.join(chunks), CONTENT[100:400])
+        self.assertTrue(file.closed)
+
+
+class DownloadDocumentTestCase(TestCase):
+    """Unit tests of the download_document view"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/default_company.json",
+    ]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.document = Document.objects.create(file_name='deck.pdf', file_type='pdf',
+                                                file=ContentFile(CONTENT, name='deck.pdf'),
+                                                company=Company.objects.get(id=1))
+        self.url = reverse('download_document', kwargs={'file_id': self.document.file_id})
+        self.client.login(email=User.objects.get(email="john.doe@example.org").email, password="Password123")
+
+    def _get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def test_download_streams_the_whole_file(self):
+        response, content = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(content, CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Last-Modified'], http_date(self.document.updated_at.timestamp()))
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{32}"$')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=deck.pdf')
+
+    def test_range_is_partial_content(self):
+        response, content = self._get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, CONTENT[100:200])
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+
+    def test_download_resumes_from_an_offset(self):
+        response, content = self._get(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, CONTENT[1000:])
+
+    def test_range_past_the_end_is_not_satisfiable(self):
+        response, _ = self._get(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_multiple_ranges_send_the_whole_file(self):
+        response, content = self._get(HTTP_RANGE='bytes=0-9,20-29')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, CONTENT)
+
+    def test_if_range_only_resumes_the_same_version(self):
+        etag = self._get()[0]['ETag']
+        response, content = self._get(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, CONTENT[10:20])
+        response, content = self._get(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, CONTENT)
+
+    def test_if_range_with_a_date(self):
+        last_modified = self._get()[0]['Last-Modified']
+        self.assertEqual(self._get(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=last_modified)[0].status_code, 206)
+        self.assertEqual(self._get(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=http_date(0))[0].status_code, 200)
+
+    def test_revalidation_is_not_modified(self):
+        response = self._get()[0]
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        not_modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_new_version_has_a_new_etag(self):
+        etag = self._get()[0]['ETag']
+        self.document.file.save('deck.pdf', ContentFile(CONTENT[:10]))
+        response, content = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, CONTENT[:10])
+
+    def test_missing_documents_are_not_found(self):
+        url_document = Document.objects.create(file_name='site', file_type='URL', url='https://www.wayra.uk',
+                                               company_id=1)
+        self.assertEqual(self.client.get(reverse('download_document', kwargs={'file_id': url_document.file_id}))
+                         .status_code, 404)
+        self.assertEqual(self.client.get(reverse('download_document', kwargs={'file_id': 9999})).status_code, 404)
+        self.document.file.storage.delete(self.document.file.name)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,115 @@
+"""Unit tests of the streaming exports"""
+import csv
+import io
+import json
+from datetime import date
+
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.exports import export_lines
+from portfolio.models import Company, Portfolio_Company, Investor, Investment, User
+from portfolio.models.investment_model import ContractRight
+from portfolio.tests.helpers import reverse_with_next
+
+
+class ExportTestCase(TestCase):
+    """Unit tests of the streaming exports"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_portfolio_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        self.investor = Investor.objects.create(company=Company.objects.get(id=3), classification='VENTURE CAPITAL')
+        self.investment = Investment.objects.create(
+            investor=self.investor,
+            startup=Portfolio_Company.objects.get(pk=101),
+            typeOfFoundingRounds='Series A',
+            investmentAmount=1_000_000,
+            dateInvested=date(2022, 1, 1),
+        )
+        ContractRight.objects.create(investment=self.investment, right='Board seat', details='One seat')
+
+    def _rows(self, lines):
+        return list(csv.DictReader(io.StringIO(''.join(lines))))
+
+    def test_csv_investments(self):
+        rows = self._rows(export_lines('investments', 'csv'))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['investor'], Company.objects.get(id=3).name)
+        self.assertEqual(rows[0]['startup'], self.investment.startup.parent_company.name)
+        self.assertEqual(rows[0]['dateInvested'], '2022-01-01')
+        self.assertEqual(rows[0]['dateExit'], '')
+        self.assertEqual(json.loads(rows[0]['contract_rights']), [{'right': 'Board seat', 'details': 'One seat'}])
+
+    def test_ndjson_investments(self):
+        rows = [json.loads(line) for line in export_lines('investments', 'ndjson')]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.investment.id)
+        self.assertEqual(rows[0]['investmentAmount'], '1000000.00')
+        self.assertEqual(rows[0]['contract_rights'], [{'right': 'Board seat', 'details': 'One seat'}])
+
+    def test_exports_every_company_and_individual(self):
+        companies = self._rows(export_lines('companies', 'csv'))
+        self.assertEqual([int(row['id']) for row in companies], list(Company.objects.order_by('id').values_list(
+            'id', flat=True)))
+        individuals = [json.loads(line) for line in export_lines('individuals', 'ndjson')]
+        self.assertEqual(len(individuals), 5)
+        self.assertEqual(individuals[0]['name'], 'Jemma Doe')
+
+    def test_investments_export_in_bounded_queries(self):
+        for _ in range(10):
+            Investment.objects.create(investor=self.investor, startup=self.investment.startup,
+                                      typeOfFoundingRounds='Seed round', investmentAmount=10,
+                                      dateInvested=date(2021, 1, 1))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(list(export_lines('investments', 'ndjson'))), 11)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(export_lines('companies', 'xml'))
+
+    def test_export_url(self):
+        self.assertEqual(reverse('export_data', kwargs={'dataset': 'companies', 'export_format': 'csv'}),
+                         '/export/companies/csv')
+
+    def test_get_export_streams_download(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        response = self.client.get(reverse('export_data', kwargs={'dataset': 'investments', 'export_format': 'csv'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="investments.csv"')
+        rows = self._rows(line.decode() for line in response.streaming_content)
+        self.assertEqual(int(rows[0]['id']), self.investment.id)
+
+    def test_get_export_unknown_dataset(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        response = self.client.get(reverse('export_data', kwargs={'dataset': 'users', 'export_format': 'csv'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_export_redirects_when_not_admin(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(reverse('export_data', kwargs={'dataset': 'companies', 'export_format': 'csv'}))
+        self.assertEqual(response.status_code, 302)
+
+    def test_get_export_redirects_when_not_logged_in(self):
+        url = reverse('export_data', kwargs={'dataset': 'companies', 'export_format': 'csv'})
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse_with_next('login', url), status_code=302, target_status_code=200)
+
+    def test_export_command(self):
+        output = io.StringIO()
+        call_command('export_data', 'investments', '--format', 'ndjson', stdout=output)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.investment.id])
@@ -0,0 +1,165 @@
+"""Unit tests of the delivery of documents, profile pictures and programme covers"""
+import os
+import tempfile
+from urllib.parse import unquote
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portfolio.file_delivery import StreamingDelivery, get_delivery
+from portfolio.models import Company, Document, Programme, User
+
+CONTENT = bytes(range(256)) * 4
+
+
+class FrontEndServer:
+    """Stand-in for nginx or Apache receiving a response that hands a file over: checks the response has no body and
+    points inside MEDIA_ROOT, and returns the content of the file the server would send."""
+
+    def __init__(self, test, media_root, internal_url='/protected-media/'):
+        self.test = test
+        self.media_root = os.path.realpath(media_root)
+        self.internal_url = internal_url
+
+    def path(self, response):
+        if 'X-Accel-Redirect' in response:
+            location = response['X-Accel-Redirect']
+            self.test.assertTrue(location.startswith(self.internal_url), location)
+            return os.path.join(self.media_root, unquote(location[len(self.internal_url):]))
+        location = response['X-Sendfile']
+        self.test.assertTrue(os.path.isabs(location), location)
+        return location
+
+    def send(self, response):
+        self.test.assertEqual(response.status_code, 200)
+        self.test.assertFalse(response.streaming)
+        self.test.assertEqual(response.content, b'')
+        path = os.path.realpath(self.path(response))
+        self.test.assertTrue(path.startswith(self.media_root + os.sep), path)
+        with open(path, 'rb') as file:
+            return file.read()
+
+
+class RecordingDelivery(StreamingDelivery):
+    """Streams files, recording the file names it was given."""
+
+    sent = []
+
+    def response(self, request, field_file, filename, modified, content_type, attachment):
+        self.sent.append(filename)
+        return super().response(request, field_file, filename, modified, content_type, attachment)
+
+
+class FileDeliveryTestCase(TestCase):
+    """Unit tests of the delivery of documents, profile pictures and programme covers"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/default_programme.json",
+    ]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.front_end = FrontEndServer(self, media.name)
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.document = Document.objects.create(file_name='deck.pdf', file_type='pdf',
+                                                file=ContentFile(CONTENT, name='board deck.pdf'),
+                                                company=Company.objects.get(id=1))
+        self.programme = Programme.objects.first()
+        self.programme.cover.save('cover.png', ContentFile(b'cover'))
+        self.user.profile_picture.save('me.png', ContentFile(b'picture'))
+        self.download_url = reverse('download_document', kwargs={'file_id': self.document.file_id})
+        self.picture_url = reverse('profile_picture', kwargs={'user_id': self.user.id})
+        self.cover_url = reverse('programme_cover', kwargs={'id': self.programme.id})
+        self.client.login(email=self.user.email, password="Password123")
+
+    def test_urls(self):
+        self.assertEqual(self.picture_url, f'/profile_picture/{self.user.id}')
+        self.assertEqual(self.cover_url, f'/programme_page/{self.programme.id}/cover')
+
+    def test_files_are_streamed_by_default(self):
+        self.assertIsInstance(get_delivery(), StreamingDelivery)
+        response = self.client.get(self.download_url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=deck.pdf')
+
+    def test_pictures_are_shown_inline(self):
+        for url, content in [(self.picture_url, b'picture'), (self.cover_url, b'cover')]:
+            response = self.client.get(url)
+            self.assertEqual(b''.join(response.streaming_content), content)
+            self.assertEqual(response['Content-Type'], 'image/png')
+            self.assertTrue(response['Content-Disposition'].startswith('inline; filename='))
+            self.assertIn('ETag', response)
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect')
+    def test_x_accel_redirect_hands_the_file_to_nginx(self):
+        response = self.client.get(self.download_url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.document.file.name}')
+        self.assertEqual(self.front_end.send(response), CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=deck.pdf')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.front_end.send(self.client.get(self.picture_url)), b'picture')
+        cover = self.client.get(self.cover_url)
+        self.assertTrue(cover['X-Accel-Redirect'].startswith('/protected-media/programmes/'))
+        self.assertEqual(self.front_end.send(cover), b'cover')
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect', FILE_DELIVERY_INTERNAL_URL='/internal/')
+    def test_x_accel_redirect_internal_url(self):
+        self.front_end.internal_url = '/internal/'
+        response = self.client.get(self.download_url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/internal/{self.document.file.name}')
+        self.assertEqual(self.front_end.send(response), CONTENT)
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect', CONTENT_ADDRESSED_DOCUMENTS=False)
+    def test_x_accel_redirect_quotes_the_path(self):
+        document = Document.objects.create(file_name='deck.pdf', file_type='pdf', company=Company.objects.get(id=1),
+                                           file=ContentFile(CONTENT, name='board deck.pdf'))
+        response = self.client.get(reverse('download_document', kwargs={'file_id': document.file_id}))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/Default%201%20Ltd/board_deck.pdf')
+        self.assertEqual(self.front_end.send(response), CONTENT)
+
+    @override_settings(FILE_DELIVERY='x-sendfile')
+    def test_x_sendfile_hands_the_file_to_apache(self):
+        response = self.client.get(self.download_url)
+        self.assertEqual(response['X-Sendfile'], self.document.file.path)
+        self.assertEqual(self.front_end.send(response), CONTENT)
+        self.assertEqual(self.front_end.send(self.client.get(self.cover_url)), b'cover')
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect')
+    def test_revalidation_is_answered_by_django(self):
+        etag = self.client.get(self.download_url)['ETag']
+        response = self.client.get(self.download_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+    @override_settings(FILE_DELIVERY='portfolio.tests.test_file_delivery.RecordingDelivery')
+    def test_backend_from_a_dotted_path(self):
+        RecordingDelivery.sent.clear()
+        self.assertEqual(b''.join(self.client.get(self.download_url).streaming_content), CONTENT)
+        self.assertEqual(RecordingDelivery.sent, ['deck.pdf'])
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect')
+    def test_missing_files_are_not_found(self):
+        self.user.profile_picture.delete()
+        self.assertEqual(self.client.get(self.picture_url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('profile_picture', kwargs={'user_id': 9999})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('programme_cover', kwargs={'id': 9999})).status_code, 404)
+        self.document.file.storage.delete(self.document.file.name)
+        self.assertEqual(self.client.get(self.download_url).status_code, 404)
+
+    def test_files_require_login(self):
+        self.client.logout()
+        for url in [self.download_url, self.picture_url, self.cover_url]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('X-Accel-Redirect', response)
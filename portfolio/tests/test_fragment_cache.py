@@ -0,0 +1,77 @@
+"""Unit tests of the cache of rendered company and individual grids"""
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.fragment_cache import cached_fragment, COMPANIES, INDIVIDUALS
+from portfolio.models import User, Company, Individual, Founder, DataVersion
+from portfolio.tests.helpers import set_session_variables
+
+
+class FragmentCacheTestCase(TestCase):
+    """Unit tests of the cache of rendered company and individual grids"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+        "portfolio/tests/fixtures/default_founder.json",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+
+    def test_fragment_is_rendered_once_per_key(self):
+        renders = []
+
+        def render():
+            renders.append(1)
+            return "<p>grid</p>"
+
+        self.assertEqual(cached_fragment(COMPANIES, (1, 1, None), render), "<p>grid</p>")
+        cached_fragment(COMPANIES, (1, 1, None), render)
+        cached_fragment(COMPANIES, (1, 3, None), render)
+        self.assertEqual(len(renders), 2)
+
+    def test_writes_change_data_version_of_dependent_grids(self):
+        companies_version = DataVersion.current(COMPANIES)
+        individuals_version = DataVersion.current(INDIVIDUALS)
+        Founder.objects.get(id=1).delete()
+        self.assertEqual(DataVersion.current(COMPANIES), companies_version)
+        self.assertNotEqual(DataVersion.current(INDIVIDUALS), individuals_version)
+
+    def test_toggling_company_layout_reuses_rendered_grid(self):
+        self.client.get(reverse('change_company_layout'), data={'layout_number': 3})
+        self.client.get(reverse('change_company_layout'), data={'layout_number': 1})
+        response = self.client.get(reverse('change_company_layout'), data={'layout_number': 3})
+        self.assertTemplateNotUsed(response, 'partials/company/company_grid.html')
+        self.assertTemplateUsed(response, 'company/company_dashboard_content_reusable.html')
+        self.assertContains(response, "Default 1 Ltd")
+
+    def test_company_grid_is_rendered_again_after_company_changes(self):
+        self.client.get(reverse('change_company_filter'), data={'filter_number': 1})
+        company = Company.objects.get(id=1)
+        company.name = "Renamed Ltd"
+        company.save()
+        response = self.client.get(reverse('change_company_filter'), data={'filter_number': 1})
+        self.assertTemplateUsed(response, 'partials/company/company_grid.html')
+        self.assertContains(response, "Renamed Ltd")
+
+    def test_toggling_individual_filter_reuses_rendered_grid(self):
+        self.client.get(reverse('change_individual_filter'), data={'filter_number': 2})
+        response = self.client.get(reverse('change_individual_filter'), data={'filter_number': 2})
+        self.assertTemplateNotUsed(response, 'partials/individual/individual_grid.html')
+        self.assertContains(response, "Jerry Doe")
+        self.assertNotContains(response, "Jemma Doe")
+
+    def test_individual_grid_is_rendered_again_after_individual_changes(self):
+        self.client.get(reverse('change_individual_layout'), data={'layout_number': 1})
+        individual = Individual.objects.get(id=1)
+        individual.archive()
+        response = self.client.get(reverse('change_individual_layout'), data={'layout_number': 1})
+        self.assertTemplateUsed(response, 'partials/individual/individual_grid.html')
+        self.assertNotContains(response, "Jemma Doe")
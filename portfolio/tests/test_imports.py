@@ -0,0 +1,176 @@
+"""Unit tests of the CSV bulk import"""
+import datetime
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.imports import import_csv
+from portfolio.models import Company, Individual, Investor, Investment, InvestmentRollup, Portfolio_Company, User
+from portfolio.search import company_index
+from portfolio.tests.helpers import reverse_with_next
+from portfolio.typeahead import company_typeahead
+
+COMPANIES_CSV = """name,company_registration_number,trading_names,previous_names,jurisdiction,wayra_number
+Imported One,00000011,Imported Trading One,Imported Previous One,United Kingdom,WN-11
+Imported Two,00000012,Imported Trading Two,Imported Previous Two,Spain,
+Default 1 Ltd,00000013,Imported Trading Three,Imported Previous Three,Spain,
+Bad_Name,00000014,Imported Trading Four,Imported Previous Four,Spain,
+Imported Five,00000015,Imported Trading Five,Imported Previous Five,Spain,WN-1
+"""
+
+
+class ImportTestCase(TestCase):
+    """Unit tests of the CSV bulk import"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_portfolio_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        self.url = reverse('import_portfolio')
+
+    def _import(self, kind, text, **kwargs):
+        return import_csv(kind, io.StringIO(text), **kwargs)
+
+    def test_import_companies(self):
+        report = self._import('companies', COMPANIES_CSV, batch_size=1)
+        self.assertEqual(report.created, 2)
+        self.assertEqual([line for line, message in report.errors], [4, 5, 6])
+        self.assertIn("Name", report.errors[0][1])
+        self.assertIn("already exists", report.errors[0][1])
+        self.assertIn("already exists", report.errors[2][1])
+
+        imported = Company.objects.get(name="Imported One")
+        self.assertEqual(imported.jurisdiction, "United Kingdom")
+        self.assertTrue(imported.is_portfolio_company)
+        self.assertEqual(Portfolio_Company.objects.get(parent_company=imported).wayra_number, "WN-11")
+        self.assertFalse(Company.objects.get(name="Imported Two").is_portfolio_company)
+        self.assertEqual(list(company_index.search(Company.objects.all(), "Imported").values_list('name', flat=True)),
+                         ["Imported One", "Imported Two"])
+
+    def test_import_writes_batches_in_constant_queries(self):
+        rows = "".join(f"Bulk {i},000000{i:02},Bulk Trading {i},Bulk Previous {i}\n" for i in range(40))
+        with self.assertNumQueries(14):
+            report = self._import('companies', "name,company_registration_number,trading_names,previous_names\n"
+                                  + rows, batch_size=20)
+        self.assertEqual(report.created, 40)
+        self.assertEqual(report.errors, [])
+
+    def test_import_reloads_typeahead(self):
+        company_typeahead.load()
+        self._import('companies', COMPANIES_CSV)
+        # The import sends no signals, the version it replaced is found by the next check.
+        company_typeahead.check()
+        self.assertEqual([result['name'] for result in company_typeahead.search("Imported")],
+                         ["Imported One", "Imported Two"])
+
+    def test_import_individuals(self):
+        report = self._import('individuals', (
+            "name,Company,Position,Email,PrimaryNumber,AngelListLink,CrunchbaseLink,LinkedInLink\n"
+            "Jane Roe,Acme,CEO,jane@example.org,+447975777666,https://angel.co/j,https://crunchbase.com/j,"
+            "https://linkedin.com/j\n"
+            "John Roe,Acme,CTO,not an email,+447975777666,https://angel.co/j,https://crunchbase.com/j,"
+            "https://linkedin.com/j\n"
+        ))
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.errors[0][0], 3)
+        self.assertIn("Email", report.errors[0][1])
+        individual = Individual.objects.get(name="Jane Roe")
+        self.assertEqual(individual.as_child_class(), individual)
+
+    def test_import_investors_and_investments(self):
+        report = self._import('investors', (
+            "company,individual_email,classification\n"
+            "Default 1 Ltd,,VENTURE_CAPITAL\n"
+            "Unknown Ltd,,VENTURE_CAPITAL\n"
+            ",,VENTURE_CAPITAL\n"
+        ))
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, message in report.errors], [3, 4])
+        self.assertIn('Unknown company "Unknown Ltd"', report.errors[0][1])
+        self.assertTrue(Company.objects.get(id=1).is_investor)
+
+        report = self._import('investments', (
+            "investor,startup,typeOfFoundingRounds,investmentAmount,dateInvested,dateExit\n"
+            "Default 1 Ltd,WN-1,Series A,1000,2022-01-01,\n"
+            "Default 1 Ltd,WN-1,Seed round,500,2021-01-01,2022-01-01\n"
+            "Default 1 Ltd,WN-404,Seed round,500,2021-01-01,\n"
+            "Default 1 Ltd,WN-1,Seed round,500,2022-01-01,2021-01-01\n"
+            "Default 1 Ltd,WN-1,Series Z,500,2021-01-01,\n"
+        ))
+        self.assertEqual(report.created, 2)
+        self.assertEqual([line for line, message in report.errors], [4, 5, 6])
+        self.assertEqual(Investment.objects.filter(investor__company_id=1, startup__wayra_number="WN-1").count(), 2)
+        self.assertEqual(InvestmentRollup.lookup(InvestmentRollup.STARTUP, 101).total_amount, 1500)
+
+    def test_import_investments_updates_touched_rollups(self):
+        investor = Investor.objects.create(company=Company.objects.get(id=1), classification='VENTURE_CAPITAL')
+        Investment.objects.create(investor=investor, startup=Portfolio_Company.objects.get(pk=101),
+                                  typeOfFoundingRounds='Series A', investmentAmount=2000,
+                                  dateInvested=datetime.date(2021, 6, 1))
+        rows = "".join(f"Default 1 Ltd,WN-1,Series A,{100 * (i + 1)},202{i % 3}-01-0{i % 9 + 1},\n" for i in range(12))
+        with patch.object(InvestmentRollup, 'rebuild') as rebuild:
+            report = self._import('investments', "investor,startup,typeOfFoundingRounds,investmentAmount,"
+                                                 "dateInvested,dateExit\n" + rows, batch_size=5)
+        rebuild.assert_not_called()
+        self.assertEqual(report.created, 12)
+        rollup = InvestmentRollup.lookup(InvestmentRollup.ROUND, 'Series A')
+        self.assertEqual((rollup.total_amount, rollup.count), (9800, 13))
+        self.assertEqual((rollup.first_invested, rollup.last_invested),
+                         (datetime.date(2020, 1, 1), datetime.date(2022, 1, 9)))
+
+        incremental = set(InvestmentRollup.objects.values_list(
+            'dimension', 'key', 'total_amount', 'count', 'first_invested', 'last_invested'))
+        InvestmentRollup.rebuild()
+        self.assertEqual(incremental, set(InvestmentRollup.objects.values_list(
+            'dimension', 'key', 'total_amount', 'count', 'first_invested', 'last_invested')))
+
+    def test_get_import(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'import/import_portfolio.html')
+
+    def test_post_import(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        upload = SimpleUploadedFile("companies.csv", COMPANIES_CSV.encode('utf-8-sig'), content_type="text/csv")
+        response = self.client.post(self.url, {'kind': 'companies', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].created, 2)
+        self.assertContains(response, "2 rows imported")
+        self.assertTrue(Company.objects.filter(name="Imported One").exists())
+
+    def test_get_import_redirects_when_not_admin(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_get_import_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('login', self.url), status_code=302, target_status_code=200)
+
+    def test_import_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'companies.csv')
+            with open(path, 'w') as file:
+                file.write(COMPANIES_CSV)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                call_command('import_portfolio', 'companies', path)
+        self.assertIn("Line 4:", output.getvalue())
+        self.assertIn("2 companies imported, 3 rows rejected.", output.getvalue())
+        self.assertEqual(Investor.objects.count(), 0)
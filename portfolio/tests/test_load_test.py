@@ -0,0 +1,88 @@
+"""Unit tests of the concurrent load test"""
+import random
+import tempfile
+from datetime import date
+
+from django.test import TestCase, override_settings
+
+from portfolio.load_test import MIXES, Analyst, Samples, create_analysts, report, run
+from portfolio.models import Company, Investor, Investment, Portfolio_Company
+
+
+class LoadTestTestCase(TestCase):
+    """Unit tests of the concurrent load test"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_portfolio_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+    ]
+
+    def setUp(self):
+        investor = Investor.objects.create(company=Company.objects.get(id=3), classification='VENTURE CAPITAL')
+        self.investment = Investment.objects.create(investor=investor, startup=Portfolio_Company.objects.get(pk=101),
+                                                    typeOfFoundingRounds='Series A', investmentAmount=1_000,
+                                                    dateInvested=date(2022, 1, 1))
+        self.analyst = Analyst(create_analysts(1)[0], Samples(), MIXES['analyst'], random.Random(0))
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def _run(self, action):
+        self.analyst.action = action
+        getattr(self.analyst, action)()
+        requests = self.analyst.recorder.requests
+        self.assertTrue(requests)
+        self.assertEqual([failed for _, _, failed, _ in requests], [False] * len(requests))
+        return requests
+
+    def test_create_analysts(self):
+        analysts = create_analysts(3)
+        self.assertEqual(len(analysts), 3)
+        self.assertTrue(all(analyst.is_staff and not analyst.has_usable_password() for analyst in analysts))
+        self.assertEqual(create_analysts(3), analysts)
+
+    def test_browse(self):
+        self.assertEqual(len(self._run('browse')), 3)
+
+    def test_filter(self):
+        self.assertEqual(len(self._run('filter')), 1)
+
+    def test_search_sends_a_request_per_keyup(self):
+        self.assertGreaterEqual(len(self._run('search')), 3)
+
+    def test_upload(self):
+        self._run('upload')
+        self.assertTrue(Company.objects.get(id=self.analyst.samples.companies[0]).document_set.exists())
+
+    def test_edit_investment(self):
+        self._run('edit_investment')
+        self.assertNotEqual(Investment.objects.get(id=self.investment.id).investmentAmount, 1_000)
+
+    def test_archive_restores_the_company(self):
+        self._run('archive')
+        self.assertFalse(Company.objects.get(id=self.analyst.samples.companies[0]).is_archived)
+
+    def test_run_reports_every_action(self):
+        results = run(create_analysts(1), mix='read_only', actions=5, seed=1)
+        self.assertEqual(results['all']['requests'], sum(result['requests'] for action, result in results.items()
+                                                         if action != 'all'))
+        self.assertEqual(results['all']['errors'], 0)
+        self.assertLessEqual(set(results), {'all', 'browse', 'filter', 'search'})
+
+    def test_report(self):
+        requests = [('browse', 0.010, False, False), ('browse', 0.030, True, True), ('search', 0.002, False, False),
+                    ('search', 0.004, True, False)]
+        results = report(requests, elapsed=2.0)
+        self.assertEqual(results['all']['requests'], 4)
+        self.assertEqual(results['all']['throughput'], 2.0)
+        self.assertEqual(results['all']['errors'], 2)
+        self.assertEqual(results['all']['error_rate'], 0.5)
+        self.assertEqual(results['all']['locked'], 1)
+        self.assertEqual(results['browse']['p50_ms'], 10.0)
+        self.assertEqual(results['browse']['max_ms'], 30.0)
+        self.assertEqual(results['search']['locked'], 0)
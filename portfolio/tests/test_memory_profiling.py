@@ -0,0 +1,88 @@
+"""Unit tests of the memory profiling of management commands"""
+import json
+import os
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from portfolio import memory_profiling
+from portfolio.memory_profiling import MemoryProfile, size
+
+
+class MemoryProfilingTestCase(TestCase):
+    """Unit tests of the memory profiling of management commands"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _profile(self, *phases):
+        profile = MemoryProfile('test')
+        profile.start()
+        for name, function in phases:
+            with profile.phase(name):
+                function()
+        return profile.stop()
+
+    def test_phases_record_peak_and_growth(self):
+        kept = []
+        report = self._profile(('transient', lambda: bytearray(4 * 1024 * 1024)),
+                               ('kept', lambda: kept.append(bytearray(1024 * 1024))))
+        transient, kept_phase = report['phases']
+        self.assertGreaterEqual(transient['peak'], 4 * 1024 * 1024)
+        self.assertLess(transient['growth'], 64 * 1024)
+        self.assertGreaterEqual(kept_phase['growth'], 1024 * 1024)
+        self.assertLess(kept_phase['peak'], 2 * 1024 * 1024)
+        self.assertGreaterEqual(report['peak'], transient['peak'])
+        self.assertTrue(kept_phase['top_growth'])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_phases_do_not_need_reset_peak(self):
+        # tracemalloc.reset_peak only exists from Python 3.9.
+        with mock.patch.object(tracemalloc, 'reset_peak', side_effect=AttributeError, create=True):
+            report = self._profile(('transient', lambda: bytearray(4 * 1024 * 1024)), ('empty', lambda: None))
+        transient, empty = report['phases']
+        self.assertGreaterEqual(transient['peak'], 4 * 1024 * 1024)
+        self.assertLess(empty['peak'], 1024 * 1024)
+
+    def test_command_writes_report(self):
+        path = os.path.join(self.directory, 'report.json')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('export_data', 'companies', profile_memory=path, stdout=stdout, stderr=stderr)
+        with open(path) as file:
+            report = json.load(file)
+        self.assertEqual(report['command'], 'export_data')
+        self.assertEqual([phase['name'] for phase in report['phases']], ['export'])
+        self.assertIn('portfolio/exports.py', ''.join(site['call_site'] for site in report['top_call_sites']))
+        self.assertIn(f'memory report written to {path}.', stderr.getvalue())
+        self.assertNotIn('memory', stdout.getvalue())
+        self.assertIn('Default 1 Ltd', stdout.getvalue())
+
+    def test_report_is_written_to_the_profile_directory_by_default(self):
+        with mock.patch.object(memory_profiling, 'MEMORY_PROFILE_DIR', self.directory), redirect_stdout(StringIO()):
+            call_command('rebuild_rollups', profile_memory='', stdout=StringIO(), stderr=StringIO())
+        [name] = os.listdir(self.directory)
+        self.assertTrue(name.startswith('rebuild_rollups-'))
+
+    def test_commands_are_not_profiled_by_default(self):
+        with mock.patch.object(memory_profiling, 'MEMORY_PROFILE_DIR', self.directory), \
+                mock.patch.object(memory_profiling.MemoryProfile, 'start') as start, redirect_stdout(StringIO()):
+            call_command('rebuild_rollups', stdout=StringIO(), stderr=StringIO())
+        start.assert_not_called()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_size(self):
+        self.assertEqual(size(512), '512 B')
+        self.assertEqual(size(1536), '1.5 KiB')
+        self.assertEqual(size(-3 * 1024 * 1024), '-3.0 MiB')
+        self.assertEqual(size(5 * 1024 ** 4), '5120.0 GiB')
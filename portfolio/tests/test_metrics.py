@@ -0,0 +1,152 @@
+"""Unit tests of the request metrics and the /metrics endpoint"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio import metrics
+from portfolio.metrics import Counter, Histogram
+from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.models import User
+
+
+def _sample(metric, *labels):
+    return metric.samples().get(labels)
+
+
+class MetricsTestCase(TestCase):
+    """Unit tests of the request metrics and the /metrics endpoint"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        self.url = reverse('metrics')
+
+    def _metric(self, metric):
+        self.addCleanup(metrics.REGISTRY.remove, metric)
+        return metric
+
+    def test_histogram_exposition_has_cumulative_buckets(self):
+        histogram = self._metric(Histogram('test_seconds', 'Test histogram.', ['route'], [0.1, 1]))
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value, 'home')
+        text = metrics.exposition(metrics.merge([[histogram.snapshot()]]))
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{route="home",le="0.1"} 2', text)
+        self.assertIn('test_seconds_bucket{route="home",le="1"} 3', text)
+        self.assertIn('test_seconds_bucket{route="home",le="+Inf"} 4', text)
+        self.assertIn('test_seconds_sum{route="home"} 3.65', text)
+        self.assertIn('test_seconds_count{route="home"} 4', text)
+
+    def test_label_values_are_escaped(self):
+        counter = self._metric(Counter('test_total', 'Test counter.', ['name']))
+        counter.inc('a "quoted"\nvalue')
+        text = metrics.exposition(metrics.merge([[counter.snapshot()]]))
+        self.assertIn('test_total{name="a \\"quoted\\"\\nvalue"} 1', text)
+
+    def test_shards_of_every_thread_are_added_up(self):
+        counter = self._metric(Counter('test_threads_total', 'Test counter.', ['name']))
+
+        def increment():
+            for _ in range(100):
+                counter.inc('x')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(_sample(counter, 'x'), 400)
+
+    def test_shards_of_exited_threads_are_folded(self):
+        counter = self._metric(Counter('test_exited_total', 'Test counter.', ['name']))
+        for _ in range(10):
+            thread = threading.Thread(target=counter.inc, args=('x',))
+            thread.start()
+            thread.join()
+        self.assertEqual(counter._shards, {})
+        self.assertEqual(_sample(counter, 'x'), 10)
+        counter.inc('x')
+        self.assertEqual(len(counter._shards), 1)
+        self.assertEqual(_sample(counter, 'x'), 11)
+
+    def test_snapshots_of_exited_workers_are_retired(self):
+        counter = self._metric(Counter('test_retired_total', 'Test counter.', ['name']))
+        counter.inc('x', amount=2)
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(metrics, 'METRICS_DIR', directory):
+            for name in [f'metrics-{exited.pid}-a.json', f'metrics-{exited.pid}-b.json']:
+                with open(os.path.join(directory, name), 'w') as file:
+                    file.write(json.dumps([dict(counter.snapshot(), samples=[[['x'], 3]])]))
+            for _ in range(2):
+                collected = {metric['name']: dict(metric['samples']) for metric in metrics.collect()}
+                self.assertEqual(collected['test_retired_total'], {('x',): 8})
+            self.assertEqual(sorted(name for name in os.listdir(directory) if name.endswith('.json')),
+                             sorted([metrics.RETIRED_SNAPSHOT, os.path.basename(metrics._snapshot_path())]))
+
+    def test_snapshots_of_worker_processes_are_added_up(self):
+        counter = self._metric(Counter('test_workers_total', 'Test counter.', ['name']))
+        counter.inc('x', amount=2)
+        other_worker = [dict(counter.snapshot(), samples=[[['x'], 3], [['y'], 1]])]
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(metrics, 'METRICS_DIR', directory):
+            metrics.flush()
+            with open(f'{directory}/metrics-1-other.json', 'w') as file:
+                file.write(json.dumps(other_worker))
+            collected = {metric['name']: dict(metric['samples']) for metric in metrics.collect()}
+        self.assertEqual(collected['test_workers_total'], {('x',): 5, ('y',): 1})
+
+    def test_middleware_observes_requests_by_route(self):
+        count = (_sample(metrics.REQUEST_DURATION, 'login') or [0])[:-1]
+        queries = _sample(metrics.REQUEST_QUERIES, 'login')
+        self.client.get(reverse('login'))
+        self.assertEqual(sum(_sample(metrics.REQUEST_DURATION, 'login')[:-1]), sum(count) + 1)
+        self.assertEqual(sum(_sample(metrics.REQUEST_QUERIES, 'login')[:-1]), sum((queries or [0])[:-1]) + 1)
+        self.assertGreater(_sample(metrics.TEMPLATE_RENDER_TIME, 'login')[-1], 0)
+        self.assertIsNotNone(_sample(metrics.RESPONSE_SIZE, 'login'))
+
+    def test_unmatched_requests_are_observed_together(self):
+        before = sum((_sample(metrics.REQUEST_DURATION, 'unmatched') or [0])[:-1])
+        self.client.get('/no/such/page/')
+        self.assertEqual(sum(_sample(metrics.REQUEST_DURATION, 'unmatched')[:-1]), before + 1)
+
+    def test_fragment_cache_counts_hits_and_misses(self):
+        cache.clear()
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+        hits = _sample(metrics.CACHE_REQUESTS, 'fragment', 'hit') or 0
+        misses = _sample(metrics.CACHE_REQUESTS, 'fragment', 'miss') or 0
+        self.client.get(reverse('change_company_layout'), data={'layout_number': 1})
+        self.client.get(reverse('change_company_layout'), data={'layout_number': 1})
+        self.assertEqual(_sample(metrics.CACHE_REQUESTS, 'fragment', 'miss'), misses + 1)
+        self.assertEqual(_sample(metrics.CACHE_REQUESTS, 'fragment', 'hit'), hits + 1)
+
+    def test_admin_can_read_metrics(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        self.client.get(reverse('login'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        content = response.content.decode()
+        self.assertIn('# TYPE vcpms_request_duration_seconds histogram', content)
+        self.assertIn('vcpms_request_duration_seconds_count{route="login"}', content)
+
+    def test_user_cannot_read_metrics(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url, follow=True)
+        self.assertRedirects(response, reverse('login'), status_code=302, target_status_code=200)
+
+    def test_get_metrics_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('login', self.url), status_code=302, target_status_code=200)
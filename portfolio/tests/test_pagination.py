@@ -0,0 +1,76 @@
+"""Unit tests of the keyset paginator"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from portfolio.models import Company
+from portfolio.pagination import KeysetPaginator, InvalidCursor, encode_cursor, decode_cursor
+
+
+class KeysetPaginatorTestCase(TestCase):
+    """Unit tests of the keyset paginator"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+    ]
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(["Default 1 Ltd", 1])), ["Default 1 Ltd", 1])
+
+    def test_decode_malformed_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("%%%")
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("e30")  # {}
+
+    def test_ordering_ends_with_id(self):
+        paginator = KeysetPaginator(Company.objects.all(), 2, ordering=('name',))
+        self.assertEqual(paginator.ordering, ('name', 'id'))
+
+    def test_pages_cover_every_row_once_in_order(self):
+        self._assert_pages_match(('id',))
+
+    def test_pages_on_sort_key_and_id(self):
+        self._assert_pages_match(('name',))
+
+    def test_pages_on_descending_sort_key(self):
+        self._assert_pages_match(('-name', '-id'))
+
+    def test_pages_on_values(self):
+        paginator = KeysetPaginator(Company.objects.values(), 3)
+        page = paginator.page()
+        next_page = paginator.page(page.next_cursor)
+        self.assertEqual(next_page[0]['id'], list(Company.objects.order_by('id').values_list('id', flat=True))[3])
+
+    def test_cursor_with_wrong_number_of_keys(self):
+        paginator = KeysetPaginator(Company.objects.all(), 2, ordering=('name',))
+        with self.assertRaises(InvalidCursor):
+            paginator.page(encode_cursor([1]))
+
+    def test_cursor_with_wrong_value_type(self):
+        paginator = KeysetPaginator(Company.objects.all(), 2)
+        with self.assertRaises(InvalidCursor):
+            paginator.page(encode_cursor(["a"]))
+
+    def test_page_does_not_count_rows(self):
+        paginator = KeysetPaginator(Company.objects.all(), 2)
+        page = paginator.page()
+        with self.assertNumQueries(1):
+            paginator.page(page.next_cursor)
+
+    def test_approximate_count_is_reused(self):
+        cache.clear()
+        paginator = KeysetPaginator(Company.objects.filter(name__contains="Ltd"), 2)
+        expected = Company.objects.filter(name__contains="Ltd").count()
+        self.assertEqual(paginator.approximate_count(), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.approximate_count(), expected)
+
+    def _assert_pages_match(self, ordering):
+        paginator = KeysetPaginator(Company.objects.all(), 2, ordering=ordering)
+        rows = []
+        page = paginator.page()
+        rows.extend(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            rows.extend(page)
+        self.assertEqual(rows, list(Company.objects.order_by(*paginator.ordering)))
@@ -0,0 +1,227 @@
+"""Unit tests of the thumbnails and previews of documents"""
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock, skipIf
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from portfolio import previews
+from portfolio.models import Company, Document, Individual, Programme, User
+
+
+def image_content(size=(1200, 600), mode='RGBA', image_format='PNG'):
+    output = BytesIO()
+    Image.new(mode, size, 'red').save(output, image_format)
+    return output.getvalue()
+
+
+class PreviewsTestCase(TestCase):
+    """Unit tests of the thumbnails and previews of documents"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/default_programme.json",
+    ]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        # The previews left queued by a test are generated before its media directory goes.
+        self.addCleanup(previews.wait)
+        self.addCleanup(previews._failed.clear)
+        self.company = Company.objects.get(id=1)
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+
+    def _create_document(self, name="logo.png", content=None, generate=True, **owner):
+        content = image_content() if content is None else content
+        with self.captureOnCommitCallbacks(execute=generate):
+            document = Document.objects.create(file_name=name, file_type=name.rsplit('.', 1)[-1],
+                                               file=ContentFile(content, name=name),
+                                               **(owner or {'company': self.company}))
+        previews.wait()
+        return document
+
+    def _preview(self, document, size='thumbnail'):
+        return self.client.get(reverse('document_preview', kwargs={'file_id': document.file_id, 'size': size}))
+
+    def _image(self, response):
+        return Image.open(BytesIO(b''.join(response.streaming_content)))
+
+    def test_url(self):
+        self.assertEqual(reverse('document_preview', kwargs={'file_id': 1, 'size': 'thumbnail'}),
+                         '/document_preview/1/thumbnail')
+
+    def test_previewable(self):
+        self.assertTrue(previews.previewable('png'))
+        self.assertTrue(previews.previewable('JPG'))
+        self.assertFalse(previews.previewable('docx'))
+        self.assertFalse(previews.previewable(None))
+        self.assertEqual(previews.previewable('pdf'), previews.fitz is not None)
+
+    def test_previews_are_generated_after_the_upload(self):
+        document = self._create_document()
+        for size in previews.PREVIEW_SIZES:
+            self.assertTrue(default_storage.exists(previews.preview_name(document.file.name, size)))
+        response = self._preview(document)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+        image = self._image(response)
+        self.assertEqual((image.format, image.mode), ('JPEG', 'RGB'))
+        self.assertEqual(image.size, (160, 80))
+        self.assertEqual(self._image(self._preview(document, 'preview')).size, (800, 400))
+
+    def test_upload_does_not_wait_for_the_previews(self):
+        with mock.patch.object(previews, 'schedule') as schedule:
+            with self.captureOnCommitCallbacks() as callbacks:
+                document = Document.objects.create(file_name="logo.png", file_type="png", company=self.company,
+                                                   file=ContentFile(image_content(), name="logo.png"))
+            schedule.assert_not_called()
+            for callback in callbacks:
+                callback()
+        schedule.assert_called_once_with(document)
+
+    def test_missing_preview_is_queued_on_request(self):
+        document = self._create_document(generate=False)
+        name = previews.preview_name(document.file.name, 'thumbnail')
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(self._preview(document).status_code, 404)
+        previews.wait()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self._preview(document).status_code, 200)
+
+    def test_request_does_not_wait_for_the_preview(self):
+        document = self._create_document(generate=False)
+        generating = threading.Event()
+        self.addCleanup(generating.set)
+        with mock.patch.object(previews, 'generate', side_effect=lambda *args: generating.wait(5)):
+            self.assertEqual(self._preview(document).status_code, 404)
+            generating.set()
+
+    def test_same_content_shares_its_previews(self):
+        content = image_content()
+        first = self._create_document(content=content)
+        second = self._create_document(name="copy.png", content=content, individual=Individual.objects.first())
+        self.assertEqual(previews.preview_name(first.file.name, 'thumbnail'),
+                         previews.preview_name(second.file.name, 'thumbnail'))
+        self.assertNotEqual(previews.preview_name(first.file.name, 'thumbnail'),
+                            previews.preview_name(first.file.name, 'preview'))
+        other = self._create_document(name="other.png", content=image_content(size=(300, 300)))
+        self.assertNotEqual(previews.preview_name(first.file.name, 'thumbnail'),
+                            previews.preview_name(other.file.name, 'thumbnail'))
+
+    @override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
+    def test_previews_of_documents_without_checksum(self):
+        document = self._create_document()
+        self.assertEqual(document.checksum, '')
+        self.assertEqual(self._preview(document).status_code, 200)
+
+    def test_first_frame_of_multi_frame_images(self):
+        output = BytesIO()
+        frames = [Image.new('RGB', (400, 200), colour) for colour in ('blue', 'green')]
+        frames[0].save(output, 'GIF', save_all=True, append_images=frames[1:])
+        document = self._create_document(name="animation.gif", content=output.getvalue())
+        image = self._image(self._preview(document))
+        self.assertEqual(image.size, (160, 80))
+        red, green, blue = image.getpixel((80, 40))
+        self.assertGreater(blue, green)
+
+    def test_images_are_decoded_from_the_stored_file(self):
+        with mock.patch.object(previews.Image, 'open', wraps=previews.Image.open) as image_open:
+            self._create_document()
+        opened = image_open.call_args[0][0]
+        self.assertNotIsInstance(opened, BytesIO)
+        self.assertTrue(opened.name.endswith(Document.objects.get().file.name))
+
+    def test_images_above_the_pixel_cap_have_no_preview(self):
+        with mock.patch.object(previews, 'PREVIEW_MAX_PIXELS', 1200 * 600 - 1), \
+                self.assertLogs('portfolio.previews', 'WARNING') as logs:
+            document = self._create_document()
+        self.assertIn("PREVIEW_MAX_PIXELS", "".join(logs.output))
+        self.assertEqual(self._preview(document).status_code, 404)
+
+    def test_previews_are_deleted_with_the_last_document_of_the_file(self):
+        content = image_content()
+        first = self._create_document(content=content)
+        second = self._create_document(name="copy.png", content=content)
+        name = previews.preview_name(first.file.name, 'thumbnail')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(previews.preview_directory(second.file.name)))
+
+    @override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
+    def test_previews_are_deleted_with_the_file_of_a_document(self):
+        document = self._create_document()
+        name = previews.preview_name(document.file.name, 'thumbnail')
+        document.file = ContentFile(image_content(size=(300, 300)), name="other.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+        self.assertFalse(default_storage.exists(name))
+        previews.wait()
+        self.assertTrue(default_storage.exists(previews.preview_name(document.file.name, 'thumbnail')))
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertFalse(default_storage.exists(previews.preview_name(document.file.name, 'thumbnail')))
+
+    def test_damaged_image_has_no_preview(self):
+        with self.assertLogs('portfolio.previews', 'WARNING'):
+            document = self._create_document(name="broken.png", content=b"not an image")
+        with mock.patch.object(previews, 'generate') as generate:
+            self.assertEqual(self._preview(document).status_code, 404)
+            previews.wait()
+        generate.assert_not_called()
+
+    def test_unsupported_documents_and_sizes_are_not_found(self):
+        document = self._create_document(name="notes.docx", content=b"notes")
+        self.assertEqual(self._preview(document).status_code, 404)
+        self.assertEqual(self._preview(self._create_document(), 'poster').status_code, 404)
+        url = Document.objects.create(file_name="site", file_type="url", url="https://example.org",
+                                      company=self.company)
+        self.assertEqual(self._preview(url).status_code, 404)
+
+    def test_private_previews_are_for_staff(self):
+        document = self._create_document(is_private=True, company=self.company)
+        self.assertEqual(self._preview(document).status_code, 404)
+        self.client.login(email="petra.pickles@example.org", password="Password123")
+        self.assertEqual(self._preview(document).status_code, 200)
+
+    def test_previews_require_login(self):
+        document = self._create_document()
+        self.client.logout()
+        self.assertEqual(self._preview(document).status_code, 302)
+
+    @skipIf(previews.fitz is None, "PyMuPDF is not installed")
+    def test_first_page_of_pdfs(self):
+        pdf = previews.fitz.open()
+        pdf.new_page(width=600, height=800)
+        document = self._create_document(name="deck.pdf", content=pdf.tobytes())
+        self.assertEqual(self._image(self._preview(document)).size, (120, 160))
+
+    def test_document_list_shows_thumbnails_without_reading_files(self):
+        programme = Programme.objects.first()
+        image = self._create_document(programme=programme)
+        pdf = self._create_document(name="deck.pdf", content=b"%PDF-1.4", programme=programme)
+        with mock.patch.object(previews.default_storage, 'exists') as exists:
+            response = self.client.get(reverse('programme_detail', kwargs={'id': programme.id}))
+        exists.assert_not_called()
+        self.assertContains(response, reverse('document_preview', kwargs={'file_id': image.file_id,
+                                                                          'size': 'thumbnail'}))
+        self.assertContains(response, reverse('document_preview', kwargs={'file_id': image.file_id,
+                                                                          'size': 'preview'}))
+        self.assertEqual(f"/document_preview/{pdf.file_id}/" in response.content.decode(),
+                         previews.previewable('pdf'))
@@ -0,0 +1,111 @@
+"""Unit tests of the on-demand request profiler"""
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio import profiling
+from portfolio.models import User
+from portfolio.tests.helpers import reverse_with_next, set_session_variables
+
+
+class ProfilingTestCase(TestCase):
+    """Unit tests of the on-demand request profiler"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(profiling, 'PROFILE_DIR', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _profile_dashboard(self):
+        response = self.client.get(reverse('dashboard'), {profiling.PROFILE_PARAMETER: 1})
+        self.assertEqual(response.status_code, 200)
+        return response['X-Profile-Id']
+
+    def _log_in_admin(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        set_session_variables(self.client)
+
+    def test_admin_request_is_profiled_on_demand(self):
+        self._log_in_admin()
+        profile_id = self._profile_dashboard()
+        self.assertTrue(os.path.exists(profiling.profile_path(profile_id)))
+        self.assertEqual(profiling.describe(profile_id)['path'], f"{reverse('dashboard')}?_profile=1")
+
+    def test_profile_header_opts_in(self):
+        self._log_in_admin()
+        response = self.client.get(reverse('dashboard'), HTTP_X_PROFILE='1')
+        self.assertIn('X-Profile-Id', response)
+
+    def test_requests_without_opt_in_are_not_profiled(self):
+        self._log_in_admin()
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiling.recent_profiles(), [])
+
+    def test_user_requests_are_never_profiled(self):
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+        response = self.client.get(reverse('dashboard'), {profiling.PROFILE_PARAMETER: 1})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiling.recent_profiles(), [])
+
+    def test_only_the_most_recent_profiles_are_kept(self):
+        self._log_in_admin()
+        with mock.patch.object(profiling, 'PROFILE_KEEP', 2):
+            for _ in range(3):
+                self._profile_dashboard()
+        self.assertEqual(len(profiling.recent_profiles()), 2)
+        self.assertEqual(len(os.listdir(profiling.PROFILE_DIR)), 4)
+
+    def test_hot_functions_are_sorted_by_the_chosen_column(self):
+        self._log_in_admin()
+        profile_id = self._profile_dashboard()
+        for sort, column in [('calls', 'calls'), ('tottime', 'tottime_ms'), ('cumtime', 'cumtime_ms')]:
+            values = [function[column] for function in profiling.hot_functions(profile_id, sort)]
+            self.assertEqual(values, sorted(values, reverse=True))
+
+    def test_admin_can_see_profile(self):
+        self._log_in_admin()
+        profile_id = self._profile_dashboard()
+        response = self.client.get(reverse('profile_detail', args=[profile_id]), {'sort': 'tottime'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'monitoring/profile_detail.html')
+        self.assertEqual(response.context['sort'], 'tottime')
+        self.assertTrue(response.context['functions'])
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, reverse('profile_detail', args=[profile_id]))
+
+    def test_admin_can_download_profile(self):
+        self._log_in_admin()
+        profile_id = self._profile_dashboard()
+        response = self.client.get(reverse('profile_download', args=[profile_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'filename="{profile_id}.prof"', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content))
+
+    def test_unknown_profile_is_not_found(self):
+        self._log_in_admin()
+        for profile_id in ['0' * 32, '..%2F..%2Fsettings']:
+            self.assertEqual(self.client.get(reverse('profile_detail', args=[profile_id])).status_code, 404)
+            self.assertEqual(self.client.get(reverse('profile_download', args=[profile_id])).status_code, 404)
+
+    def test_user_cannot_see_profiles(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(reverse('profile_list'), follow=True)
+        self.assertRedirects(response, reverse('login'), status_code=302, target_status_code=200)
+
+    def test_get_profiles_redirects_when_not_logged_in(self):
+        url = reverse('profile_list')
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse_with_next('login', url), status_code=302, target_status_code=200)
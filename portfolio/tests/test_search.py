@@ -0,0 +1,94 @@
+"""Unit tests of the full-text search indexes"""
+import io
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from portfolio.models import Company, Individual, Programme
+from portfolio.search import company_index, individual_index, programme_index
+
+
+class FullTextIndexTestCase(TestCase):
+    """Unit tests of the full-text search indexes"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+        "portfolio/tests/fixtures/default_programme.json",
+        "portfolio/tests/fixtures/other_programmes.json",
+    ]
+
+    def _search(self, index, searched, queryset=None):
+        if queryset is None:
+            queryset = index.model.objects.all()
+        return list(index.search(queryset, searched).values_list('id', flat=True))
+
+    def test_matches_substring_of_name_case_insensitively(self):
+        self.assertEqual(self._search(company_index, "DEFAULT"), [1, 3, 4, 5, 6, 201])
+        self.assertEqual(self._search(individual_index, "erry"), [4])
+
+    def test_matches_other_indexed_fields(self):
+        self.assertEqual(self._search(company_index, "D201_"), [201])
+        self.assertEqual(self._search(individual_index, "exampleCompany3"), [4])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self._search(programme_index, "Accelerator TWO"), [2])
+        self.assertEqual(self._search(programme_index, "Accelerator NonExistent"), [])
+
+    def test_names_starting_with_query_are_ranked_first(self):
+        company = Company.objects.get(id=5)
+        company.name = "Ltd Holdings"
+        company.save()
+        self.assertEqual(self._search(company_index, "Ltd")[0], 5)
+
+    def test_index_is_matched_once_per_query(self):
+        plan = company_index.search(Company.objects.all(), "Default").explain()
+        # The rows are narrowed down by a single MATCH, the rank of each row kept is looked up by rowid.
+        self.assertEqual(plan.count('VIRTUAL TABLE INDEX'), 2)
+        self.assertNotIn('CORRELATED LIST SUBQUERY', plan)
+        self.assertIn('CORRELATED SCALAR SUBQUERY', plan)
+        self.assertEqual(self._search(company_index, "Default Ltd"), [1, 3, 4, 5, 6, 201])
+
+    def test_search_composes_with_later_filters_and_values(self):
+        results = company_index.search(Company.objects.all(), "Default").exclude(id=3).filter(id__lt=200)
+        self.assertEqual(list(results.values_list('id', flat=True)), [1, 4, 5, 6])
+        self.assertEqual(list(results.values('name')[:1]), [{'name': Company.objects.get(id=1).name}])
+        self.assertEqual(list(results.order_by('-id').values_list('id', flat=True)), [6, 5, 4, 1])
+        self.assertTrue(Company.objects.filter(pk__in=results.values('pk')).exists())
+
+    def test_short_terms_fall_back_to_like(self):
+        self.assertEqual(self._search(individual_index, "Je"), [1, 2, 4])
+        self.assertEqual(self._search(company_index, "Default 4"), [4])
+
+    def test_search_is_restricted_to_query_set(self):
+        queryset = Company.objects.filter(id__in=[3, 4])
+        self.assertEqual(self._search(company_index, "Default", queryset), [3, 4])
+
+    def test_blank_search_matches_nothing(self):
+        self.assertEqual(self._search(company_index, "   "), [])
+
+    def test_quotes_in_search_are_escaped(self):
+        self.assertEqual(self._search(company_index, 'NonExistentCompany"$%#1234'), [])
+
+    def test_index_is_updated_on_save(self):
+        individual = Individual.objects.get(id=3)
+        individual.name = "Jonathan Smith"
+        individual.save()
+        self.assertEqual(self._search(individual_index, "Smith"), [3])
+        self.assertEqual(self._search(individual_index, "James"), [])
+
+    def test_index_is_updated_on_delete(self):
+        Programme.objects.get(id=2).delete()
+        self.assertEqual(self._search(programme_index, "Accelerator"), [1])
+
+    def test_reindex_command_rebuilds_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {company_index.table}')
+        self.assertEqual(self._search(company_index, "Default"), [])
+        with redirect_stdout(io.StringIO()) as output:
+            call_command('reindex')
+        self.assertIn(f"6 rows indexed in {company_index.table}.", output.getvalue())
+        self.assertEqual(self._search(company_index, "Default"), [1, 3, 4, 5, 6, 201])
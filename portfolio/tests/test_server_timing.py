@@ -0,0 +1,69 @@
+"""Unit tests of the Server-Timing header"""
+import re
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portfolio.instrumentation import RequestTimings
+from portfolio.middleware import server_timing
+from portfolio.models import User
+from portfolio.tests.helpers import set_session_variables
+
+
+def _entries(header):
+    """Returns {name: (duration, description)} of a Server-Timing header."""
+
+    entries = {}
+    for entry in header.split(', '):
+        name = entry.split(';')[0]
+        duration = re.search(r'dur=([\d.]+)', entry)
+        description = re.search(r'desc="([^"]*)"', entry).group(1)
+        entries[name] = (float(duration.group(1)) if duration else None, description)
+    return entries
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTestCase(TestCase):
+    """Unit tests of the Server-Timing header"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+
+    def test_header_breaks_request_down(self):
+        response = self.client.get(reverse('change_company_filter'), data={'filter_number': 1})
+        entries = _entries(response['Server-Timing'])
+        self.assertEqual(list(entries), ['db', 'queries', 'tpl', 'cache', 'session', 'view', 'total'])
+        self.assertRegex(entries['queries'][1], r'^[1-9]\d* queries$')
+        self.assertEqual(entries['cache'][1], 'Cache (1 lookups)')
+        self.assertGreater(entries['db'][0], 0)
+        self.assertGreater(entries['tpl'][0], 0)
+        self.assertGreater(entries['session'][0], 0)
+        parts = sum(entries[name][0] for name in ['db', 'tpl', 'cache', 'session', 'view'])
+        self.assertAlmostEqual(parts, entries['total'][0], delta=0.05)
+
+    def test_queries_inside_templates_and_session_are_counted_once(self):
+        timings = RequestTimings()
+        timings.queries = 3
+        timings.sql_time = 0.003
+        timings.template_time = 0.004
+        timings.template_sql_time = 0.001
+        timings.session_time = 0.002
+        timings.session_sql_time = 0.001
+        entries = _entries(server_timing(timings, 0.010))
+        self.assertEqual(entries['db'], (3.0, 'DB'))
+        self.assertEqual(entries['tpl'], (3.0, 'Templates'))
+        self.assertEqual(entries['session'], (1.0, 'Session'))
+        self.assertEqual(entries['view'], (3.0, 'View'))
+
+    @override_settings(SERVER_TIMING=False)
+    def test_header_can_be_turned_off(self):
+        response = self.client.get(reverse('change_company_filter'), data={'filter_number': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
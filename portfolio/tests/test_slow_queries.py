@@ -0,0 +1,156 @@
+"""Unit tests of the slow query log"""
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio import slow_queries
+from portfolio.slow_queries import SlowQueryLog, fingerprint, normalize, params_shape, top_offenders
+from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.models import User
+
+
+class SlowQueryLogTestCase(TestCase):
+    """Unit tests of the slow query log"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        self.url = reverse('slow_query_report')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = SlowQueryLog(f'{directory.name}/slow_queries.log')
+        self.addCleanup(self.log.flush)
+        patcher = mock.patch.object(slow_queries, 'slow_query_log', self.log)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _record_every_query(self):
+        patcher = mock.patch.object(slow_queries, 'SLOW_QUERY_THRESHOLD', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(normalize('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\''),
+                         'SELECT * FROM t WHERE id IN (...) AND name = ?')
+        self.assertEqual(fingerprint('SELECT a FROM t WHERE id = 1'), fingerprint('SELECT a FROM t WHERE id = %s'))
+        self.assertEqual(fingerprint('SELECT a FROM t WHERE id IN (%s)'),
+                         fingerprint('SELECT a FROM t WHERE id IN (%s, %s)'))
+        self.assertNotEqual(fingerprint('SELECT a FROM t'), fingerprint('SELECT b FROM t'))
+
+    def test_params_shape_has_types_not_values(self):
+        self.assertEqual(params_shape((1, 'secret'), False), '(int, str)')
+        self.assertEqual(params_shape([(1, 'a'), (2, 'b')], True), '2 x (int, str)')
+        self.assertEqual(params_shape(None, False), '')
+
+    def test_fast_queries_are_not_recorded(self):
+        self.client.get(reverse('login'))
+        self.log.flush()
+        self.assertEqual(list(self.log.read()), [])
+
+    def test_slow_queries_are_recorded_with_view_and_call_site(self):
+        self._record_every_query()
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+        self.client.get(reverse('dashboard'))
+        self.log.flush()
+        records = [record for record in self.log.read() if record['view'] == 'dashboard']
+        self.assertTrue(records)
+        self.assertTrue(all(record['slow'] for record in records))
+        self.assertTrue(any(record['call_site'].startswith('portfolio/') for record in records))
+        self.assertIn('portfolio/pagination.py', ''.join(record['call_site'] for record in records))
+        self.assertNotIn('portfolio/tests/', ''.join(record['call_site'] for record in records))
+
+    def test_sampled_queries_are_recorded_as_not_slow(self):
+        for setting, value in [('SLOW_QUERY_THRESHOLD', 60), ('SLOW_QUERY_SAMPLE_RATE', 1.0)]:
+            patcher = mock.patch.object(slow_queries, setting, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.get(reverse('login'))
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+        self.client.get(reverse('dashboard'))
+        self.log.flush()
+        records = list(self.log.read())
+        self.assertTrue(records)
+        self.assertFalse(any(record['slow'] for record in records))
+
+    def test_log_rotates(self):
+        log = SlowQueryLog(self.log.path, max_bytes=500, backups=2)
+        for number in range(20):
+            log.write({'fingerprint': 'f', 'sql': f'SELECT {number}', 'duration': 1.0, 'slow': True, 'view': '',
+                       'call_site': '', 'params': ''})
+        log.flush()
+        records = list(log.read())
+        self.assertLess(len(records), 20)
+        self.assertEqual(records[-1]['sql'], 'SELECT 19')
+
+    def test_every_process_writes_its_own_file(self):
+        record = {'fingerprint': 'f', 'duration': 1.0, 'slow': True, 'view': '', 'call_site': '', 'params': ''}
+        self.log.write(dict(record, sql='SELECT 1'))
+        self.log.flush()
+        self.assertTrue(os.path.exists(self.log.process_path()))
+        self.assertFalse(os.path.exists(self.log.path))
+        other = SlowQueryLog(self.log.path)
+        with mock.patch.object(slow_queries.os, 'getpid', return_value=os.getpid() + 1), \
+                mock.patch.object(slow_queries, '_is_running', return_value=True):
+            other.write(dict(record, sql='SELECT 2'))
+            other.flush()
+        self.assertTrue(os.path.exists(self.log.process_path(os.getpid() + 1)))
+        self.assertEqual(sorted(record['sql'] for record in self.log.read()), ['SELECT 1', 'SELECT 2'])
+
+    def test_files_of_exited_processes_are_deleted_but_the_newest(self):
+        exited = [self.log.process_path(pid) for pid in range(900001, 900005)]
+        for number, path in enumerate(exited):
+            with open(path, 'w') as file:
+                file.write('{"sql": "SELECT %d"}\n' % number)
+            os.utime(path, (number, number))
+        log = SlowQueryLog(self.log.path, backups=2)
+        with mock.patch.object(slow_queries, '_is_running', side_effect=lambda pid: pid == os.getpid()):
+            log.write({'sql': 'SELECT 4'})
+            log.flush()
+        self.assertEqual([os.path.exists(path) for path in exited], [False, False, True, True])
+        self.assertEqual([record['sql'] for record in log.read()], ['SELECT 2', 'SELECT 3', 'SELECT 4'])
+
+    def test_top_offenders_are_grouped_by_fingerprint(self):
+        record = {'slow': True, 'view': 'dashboard', 'call_site': 'portfolio/views/dashboard_views.py:1 in x',
+                  'params': '(int)'}
+        records = [dict(record, fingerprint=fingerprint('SELECT a FROM t WHERE id = 1'),
+                        sql='SELECT a FROM t WHERE id = 1', duration=0.6),
+                   dict(record, fingerprint=fingerprint('SELECT a FROM t WHERE id = 2'),
+                        sql='SELECT a FROM t WHERE id = 2', duration=0.8),
+                   dict(record, fingerprint=fingerprint('SELECT b FROM t'), sql='SELECT b FROM t', duration=1.0)]
+        offenders = top_offenders(records)
+        self.assertEqual(len(offenders), 2)
+        self.assertEqual(offenders[0]['sql'], 'SELECT a FROM t WHERE id = ?')
+        self.assertEqual(offenders[0]['count'], 2)
+        self.assertAlmostEqual(offenders[0]['total_ms'], 1400)
+        self.assertAlmostEqual(offenders[0]['max_ms'], 800)
+        self.assertEqual(offenders[0]['views'], ['dashboard'])
+
+    def test_admin_can_see_top_offenders(self):
+        self._record_every_query()
+        self.client.login(email=self.admin_user.email, password="Password123")
+        set_session_variables(self.client)
+        self.client.get(reverse('dashboard'))
+        self.log.flush()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'monitoring/slow_queries.html')
+        self.assertTrue(response.context['offenders'])
+        self.assertContains(response, 'dashboard')
+
+    def test_user_cannot_see_slow_queries(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url, follow=True)
+        self.assertRedirects(response, reverse('login'), status_code=302, target_status_code=200)
+
+    def test_get_slow_queries_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('login', self.url), status_code=302, target_status_code=200)
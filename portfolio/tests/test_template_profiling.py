@@ -0,0 +1,101 @@
+"""Unit tests of the template render profiling"""
+from django.apps import apps
+from django.template import Context, Engine
+from django.template.base import Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portfolio import metrics, template_profiling
+from portfolio.models import User
+from portfolio.tests.helpers import reverse_with_next, set_session_variables
+
+
+def _count(counter, template):
+    return counter.samples().get((template,), 0)
+
+
+class TemplateProfilingTestCase(TestCase):
+    """Unit tests of the template render profiling"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+    ]
+
+    def setUp(self):
+        template_profiling.install()
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.admin_user = User.objects.get(email="petra.pickles@example.org")
+        self.url = reverse('template_report')
+        self.engine = Engine(loaders=[('django.template.loaders.locmem.Loader', {
+            'profiling/outer.html': '{% for user in users %}{% include "profiling/inner.html" %}{% endfor %}',
+            'profiling/inner.html': '{{ user.email }} {{ companies.count }}',
+        })])
+
+    def test_profiler_is_installed_when_the_app_is_ready(self):
+        profiled = Template._render
+        self.addCleanup(setattr, Template, '_render', profiled)
+        Template._render = Template.render
+        with override_settings(TEMPLATE_PROFILING=False):
+            apps.get_app_config('portfolio').ready()
+        self.assertFalse(getattr(Template._render, 'profiles_templates', False))
+        with override_settings(TEMPLATE_PROFILING=True):
+            apps.get_app_config('portfolio').ready()
+        self.assertTrue(Template._render.profiles_templates)
+
+    def test_includes_are_timed_separately(self):
+        renders = _count(template_profiling.TEMPLATE_RENDERS, 'profiling/inner.html')
+        outer_time = _count(template_profiling.TEMPLATE_TIME, 'profiling/outer.html')
+        template = self.engine.get_template('profiling/outer.html')
+        template.render(Context({'users': list(User.objects.all()), 'companies': User.objects.all()}))
+        self.assertEqual(_count(template_profiling.TEMPLATE_RENDERS, 'profiling/inner.html'),
+                         renders + User.objects.count())
+        self.assertGreater(_count(template_profiling.TEMPLATE_TIME, 'profiling/outer.html'), outer_time)
+
+    def test_lazy_queries_are_attributed_to_the_innermost_template(self):
+        inner_queries = _count(template_profiling.TEMPLATE_QUERIES, 'profiling/inner.html')
+        outer_queries = _count(template_profiling.TEMPLATE_QUERIES, 'profiling/outer.html')
+        template = self.engine.get_template('profiling/outer.html')
+        template.render(Context({'users': User.objects.all(), 'companies': User.objects.all()}))
+        self.assertEqual(_count(template_profiling.TEMPLATE_QUERIES, 'profiling/outer.html'), outer_queries + 1)
+        self.assertEqual(_count(template_profiling.TEMPLATE_QUERIES, 'profiling/inner.html'),
+                         inner_queries + User.objects.count())
+
+    def test_extended_templates_are_timed(self):
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+        renders = _count(template_profiling.TEMPLATE_RENDERS, 'dashboard_template.html')
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(_count(template_profiling.TEMPLATE_RENDERS, 'dashboard_template.html'), renders + 1)
+
+    def test_report_sorts_templates(self):
+        collected = [
+            {'name': 'vcpms_template_renders_total', 'samples': [[('a.html',), 10], [('b.html',), 1]]},
+            {'name': 'vcpms_template_self_seconds_total', 'samples': [[('a.html',), 0.01], [('b.html',), 0.02]]},
+            {'name': 'vcpms_request_queries', 'samples': [[('dashboard',), [1, 0]]]},
+        ]
+        rows = template_profiling.report(collected, 'self')
+        self.assertEqual([row['template'] for row in rows], ['b.html', 'a.html'])
+        self.assertAlmostEqual(rows[1]['mean_self_ms'], 1.0)
+        self.assertEqual([row['template'] for row in template_profiling.report(collected, 'renders')],
+                         ['a.html', 'b.html'])
+
+    def test_admin_can_see_template_report(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        set_session_variables(self.client)
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(self.url, {'sort': 'queries'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'monitoring/template_report.html')
+        self.assertEqual(response.context['sort'], 'queries')
+        self.assertContains(response, 'company/main_dashboard.html')
+        self.assertIn('vcpms_template_renders_total', metrics.exposition(metrics.collect()))
+
+    def test_user_cannot_see_template_report(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url, follow=True)
+        self.assertRedirects(response, reverse('login'), status_code=302, target_status_code=200)
+
+    def test_get_template_report_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('login', self.url), status_code=302, target_status_code=200)
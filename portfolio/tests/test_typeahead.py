@@ -0,0 +1,210 @@
+"""Unit tests of the in-memory typeahead indexes"""
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from portfolio import typeahead as typeahead_module
+from portfolio.fragment_cache import COMPANIES
+from portfolio.models import Company, DataVersion, Individual, Programme, Founder, Investor
+from portfolio.typeahead import TYPEAHEADS, company_typeahead, individual_typeahead, programme_typeahead, \
+    company_criteria, individual_criteria
+
+
+class TypeaheadIndexTestCase(TestCase):
+    """Unit tests of the in-memory typeahead indexes"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+        "portfolio/tests/fixtures/default_programme.json",
+        "portfolio/tests/fixtures/other_programmes.json",
+        "portfolio/tests/fixtures/default_founder.json",
+        "portfolio/tests/fixtures/other_founders.json",
+        "portfolio/tests/fixtures/default_investor_individual.json",
+        "portfolio/tests/fixtures/other_investor_individuals.json",
+        "portfolio/tests/fixtures/default_investor_company.json",
+        "portfolio/tests/fixtures/other_investor_companies.json",
+    ]
+
+    def setUp(self):
+        for typeahead in TYPEAHEADS:
+            typeahead.reset()
+
+    def _ids(self, typeahead, searched, **criteria):
+        return [result['id'] for result in typeahead.search(searched, limit=10, **criteria)]
+
+    def test_loading_fixtures_reloads_index(self):
+        company_typeahead.search("Default")
+        call_command('loaddata', "portfolio/tests/fixtures/default_company.json", verbosity=0)
+        with mock.patch.object(company_typeahead, 'load', wraps=company_typeahead.load) as load:
+            company_typeahead.check()
+        load.assert_called_once()
+
+    def test_index_follows_changes_made_elsewhere(self):
+        company_typeahead.search("Default")
+        # Another process, or an update without signals, changes the rows and replaces their version.
+        Company.objects.filter(id=3).update(name="Renamed")
+        DataVersion.bump(COMPANIES)
+        self.assertEqual(self._ids(company_typeahead, "Renamed"), [])
+        company_typeahead.check()
+        self.assertEqual(self._ids(company_typeahead, "Renamed"), [3])
+
+    def test_changes_applied_by_the_receivers_are_not_loaded_again(self):
+        company_typeahead.search("Default")
+        company = Company.objects.get(id=3)
+        company.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            company.save()
+            Investor.objects.create(company=company)
+        with mock.patch.object(company_typeahead, 'load') as load:
+            company_typeahead.check()
+        load.assert_not_called()
+        self.assertEqual(self._ids(company_typeahead, "Renamed", **company_criteria(3)), [3])
+
+    def test_changes_made_elsewhere_before_a_change_applied_here_are_loaded(self):
+        company_typeahead.search("Default")
+        Company.objects.filter(id=4).update(name="Renamed elsewhere")
+        DataVersion.bump(COMPANIES)
+        company = Company.objects.get(id=3)
+        company.name = "Renamed here"
+        with self.captureOnCommitCallbacks(execute=True):
+            company.save()
+        company_typeahead.check()
+        self.assertEqual(self._ids(company_typeahead, "Renamed"), [4, 3])
+
+    def test_versions_applied_out_of_order_are_followed(self):
+        company_typeahead.search("Default")
+        previous = DataVersion.current(COMPANIES)
+        company_typeahead.apply([], 'second', 'third')
+        company_typeahead.apply([], previous, 'second')
+        DataVersion.objects.filter(name=COMPANIES).update(token='third')
+        with mock.patch.object(company_typeahead, 'load') as load:
+            company_typeahead.check()
+        load.assert_not_called()
+
+    def test_lookups_check_the_version_in_the_background_after_the_interval(self):
+        company_typeahead.search("Default")
+        with mock.patch.object(typeahead_module.threading, 'Thread') as thread:
+            company_typeahead.search("Default")
+            thread.assert_not_called()
+            with mock.patch.object(typeahead_module, 'TYPEAHEAD_CHECK_INTERVAL', 0):
+                company_typeahead.search("Default")
+        thread.assert_called_once_with(target=company_typeahead._check_in_background, name='typeahead-check',
+                                       daemon=True)
+        thread.return_value.start.assert_called_once()
+        company_typeahead._checking = False
+
+    def test_matches_substring_case_insensitively(self):
+        self.assertEqual(self._ids(individual_typeahead, "ERR"), [4])
+        self.assertEqual(self._ids(company_typeahead, "default 20"), [201])
+        self.assertEqual(self._ids(programme_typeahead, "two"), [2])
+
+    def test_results_contain_id_and_name(self):
+        self.assertEqual(programme_typeahead.search("TWO"), [{'id': 2, 'name': "Accelerator TWO Programme"}])
+
+    def test_names_starting_with_search_come_first(self):
+        company = Company.objects.get(id=5)
+        company.name = "Ltd Holdings"
+        with self.captureOnCommitCallbacks(execute=True):
+            company.save()
+        self.assertEqual(self._ids(company_typeahead, "ltd"), [5, 1, 3, 4, 6, 201])
+
+    def test_number_of_results_is_limited(self):
+        self.assertEqual(len(company_typeahead.search("Default")), 5)
+
+    def test_lookups_run_no_queries(self):
+        company_typeahead.search("Default")
+        with self.assertNumQueries(0):
+            company_typeahead.search("Default 3")
+
+    def test_long_search_strings(self):
+        with mock.patch.object(typeahead_module, 'SORT_LENGTH', 3):
+            company_typeahead.reset()
+            self.assertEqual(self._ids(company_typeahead, "default 20"), [201])
+            self.assertEqual(self._ids(company_typeahead, "t 3 lt"), [3])
+
+    def test_lookups_stop_at_the_limit(self):
+        company_typeahead.search("Default")
+        with mock.patch.object(company_typeahead, '_matches', wraps=company_typeahead._matches) as matches:
+            self.assertEqual(len(company_typeahead.search("Default", limit=2)), 2)
+        self.assertEqual(matches.call_count, 2)
+
+    def test_blank_search_matches_nothing(self):
+        self.assertEqual(company_typeahead.search(""), [])
+
+    def test_company_filters(self):
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria(1)), [1, 201, 3, 4, 5, 6])
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria('3')), [1, 3, 4])
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria(3, is_archived=True)), [])
+
+    def test_individual_filters(self):
+        self.assertEqual(self._ids(individual_typeahead, "Doe", **individual_criteria(1)), [1, 2, 3, 4, 5])
+        self.assertEqual(self._ids(individual_typeahead, "Doe", **individual_criteria('2')), [4, 5])
+        self.assertEqual(self._ids(individual_typeahead, "Doe", **individual_criteria(3)), [1, 2, 3])
+
+    def test_index_is_updated_on_save(self):
+        individual_typeahead.search("Doe")
+        individual = Individual.objects.get(id=3)
+        individual.name = "Jonathan Smith"
+        with self.captureOnCommitCallbacks(execute=True):
+            individual.save()
+        self.assertEqual(self._ids(individual_typeahead, "smith"), [3])
+        self.assertEqual(self._ids(individual_typeahead, "james"), [])
+
+    def test_index_is_updated_on_archive(self):
+        company_typeahead.search("Default")
+        company = Company.objects.get(id=3)
+        company.is_archived = True
+        with self.captureOnCommitCallbacks(execute=True):
+            company.save()
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria(1)), [1, 201, 4, 5, 6])
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria(1, is_archived=True)), [3])
+
+    def test_rolled_back_changes_are_dropped(self):
+        company_typeahead.search("Default")
+        company = Company.objects.get(id=3)
+        company.name = "Renamed"
+        with self.assertRaises(ValueError), transaction.atomic():
+            company.save()
+            raise ValueError
+        self.assertEqual(self._ids(company_typeahead, "Renamed"), [])
+        self.assertEqual(self._ids(company_typeahead, "Default 3"), [3])
+
+    def test_changes_leave_the_index_as_loaded(self):
+        with mock.patch.object(typeahead_module, 'SORT_LENGTH', 3):
+            company_typeahead.search("Default")
+            with self.captureOnCommitCallbacks(execute=True):
+                Company.objects.get(id=3).delete()
+                company = Company.objects.get(id=4)
+                company.name = "Default Default Ltd"
+                company.save()
+                added = Company.objects.create(name="Deeeefault", trading_names="Deeeefault",
+                                               previous_names="Deeeefault")
+            applied = (company_typeahead._starts, company_typeahead._suffixes)
+            for suffixes in applied:
+                keys = [typeahead_module._sort_key(company_typeahead._lowered, suffix) for suffix in suffixes]
+                self.assertEqual(keys, sorted(keys))
+            company_typeahead.load()
+            self.assertEqual([sorted(suffixes) for suffixes in applied],
+                             [sorted(company_typeahead._starts), sorted(company_typeahead._suffixes)])
+            self.assertEqual(self._ids(company_typeahead, "eee"), [added.pk])
+
+    def test_index_is_updated_on_delete(self):
+        programme_typeahead.search("Accelerator")
+        with self.captureOnCommitCallbacks(execute=True):
+            Programme.objects.get(id=2).delete()
+        self.assertEqual(self._ids(programme_typeahead, "Accelerator"), [1])
+
+    def test_roles_are_updated_from_related_rows(self):
+        individual_typeahead.search("Doe")
+        company_typeahead.search("Default")
+        with self.captureOnCommitCallbacks(execute=True):
+            Founder.objects.get(individualFounder=5).delete()
+            Investor.objects.create(individual=Individual.objects.get(id=5))
+            Investor.objects.create(company=Company.objects.get(id=6))
+        self.assertEqual(self._ids(individual_typeahead, "Doe", **individual_criteria(2)), [4])
+        self.assertEqual(self._ids(individual_typeahead, "Doe", **individual_criteria(3)), [1, 2, 3, 5])
+        self.assertEqual(self._ids(company_typeahead, "Default", **company_criteria(3)), [1, 3, 4, 6])
@@ -0,0 +1,298 @@
+"""Unit tests of the chunked, resumable document uploads"""
+import hashlib
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files import locks
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from portfolio import uploads
+from portfolio.models import Company, Document, DocumentBlob, DocumentUpload, Individual, Programme, User
+from portfolio.tests.helpers import QueryBudgetTester, query_budget
+from portfolio.uploads import UploadError, parse_content_range
+
+CONTENT = os.urandom(1000)
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+
+
+class ParseContentRangeTestCase(TestCase):
+    """Unit tests of the Content-Range header parsing"""
+
+    def test_content_range(self):
+        self.assertEqual(parse_content_range('bytes 0-99/1000', 1000), (0, 100))
+        self.assertEqual(parse_content_range('bytes 900-999/1000', 1000), (900, 100))
+
+    def test_invalid_content_ranges(self):
+        for header, status in [('', 400), ('bytes 0-99/*', 400), ('bytes 0-99/2000', 400), ('bytes 99-0/1000', 416),
+                               ('bytes 900-1000/1000', 416)]:
+            with self.assertRaises(UploadError, msg=header) as raised:
+                parse_content_range(header, 1000)
+            self.assertEqual(raised.exception.status, status)
+
+
+class ChunkedUploadTestCase(TestCase, QueryBudgetTester):
+    """Unit tests of the chunked upload views"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/default_programme.json",
+    ]
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=os.path.join(media.name, 'media'))
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.temp_dir = os.path.join(media.name, 'uploads')
+        temp_dir = mock.patch.object(uploads, 'UPLOAD_TEMP_DIR', self.temp_dir)
+        temp_dir.start()
+        self.addCleanup(temp_dir.stop)
+        self.company = Company.objects.get(id=1)
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+
+    def _init(self, **data):
+        data = {'file_name': 'deck.pdf', 'size': len(CONTENT), 'company': self.company.id, **data}
+        return self.client.post(reverse('upload_init'), data)
+
+    def _put(self, state, first, last, content=None):
+        content = CONTENT[first:last + 1] if content is None else content
+        return self.client.put(state['chunk_url'], content, content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(CONTENT)}')
+
+    def _upload(self, chunk_size=300, **data):
+        state = self._init(**data).json()
+        while state['offset'] < len(CONTENT):
+            state = self._put(state, state['offset'], min(state['offset'] + chunk_size, len(CONTENT)) - 1).json()
+        return state
+
+    def test_urls(self):
+        upload_id = '9f1c5f1e-9d0a-4f38-a8a4-2c4b8a9b4d11'
+        self.assertEqual(reverse('upload_init'), '/uploads/')
+        self.assertEqual(reverse('upload_chunk', kwargs={'upload_id': upload_id}), f'/uploads/{upload_id}')
+        self.assertEqual(reverse('upload_finalize', kwargs={'upload_id': upload_id}), f'/uploads/{upload_id}/finalize')
+
+    def test_init_creates_the_upload(self):
+        response = self._init(is_private=True)
+        self.assertEqual(response.status_code, 201)
+        state = response.json()
+        self.assertEqual(state['offset'], 0)
+        self.assertEqual(state['size'], len(CONTENT))
+        self.assertEqual(state['chunk_size'], uploads.UPLOAD_CHUNK_SIZE)
+        upload = DocumentUpload.objects.get(upload_id=state['upload_id'])
+        self.assertEqual(upload.user, self.user)
+        self.assertTrue(upload.is_private)
+        self.assertEqual(os.path.getsize(uploads.temp_path(upload)), 0)
+        self.assertFalse(Document.objects.exists())
+
+    def test_init_validates_the_upload(self):
+        for data in [{'file_name': '..'}, {'file_name': 'deck/'}, {'size': 0}, {'company': ''}, {'individual': 1},
+                     {'company': 999}]:
+            response = self._init(**data)
+            self.assertEqual(response.status_code, 400, data)
+            self.assertIn('errors', response.json())
+        self.assertFalse(DocumentUpload.objects.exists())
+
+    def test_chunks_are_appended(self):
+        state = self._init().json()
+        response = self._put(state, 0, 399)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['offset'], 400)
+        self.assertEqual(self._put(state, 400, 999).json()['offset'], 1000)
+        upload = DocumentUpload.objects.get(upload_id=state['upload_id'])
+        with open(uploads.temp_path(upload), 'rb') as file:
+            self.assertEqual(file.read(), CONTENT)
+
+    def test_chunk_at_the_wrong_offset_is_refused(self):
+        state = self._init().json()
+        self._put(state, 0, 399)
+        for first, last in [(0, 399), (500, 599)]:
+            response = self._put(state, first, last)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['offset'], 400)
+
+    def test_invalid_chunks_are_refused(self):
+        state = self._init().json()
+        self.assertEqual(self.client.put(state['chunk_url'], b'data').status_code, 400)
+        self.assertEqual(self._put(state, 0, 1000, content=CONTENT + b'!').status_code, 416)
+        with mock.patch.object(uploads, 'UPLOAD_MAX_CHUNK_SIZE', 100):
+            self.assertEqual(self._put(state, 0, 199).status_code, 413)
+        self.assertEqual(self.client.get(state['chunk_url']).json()['offset'], 0)
+
+    def test_chunk_sent_while_another_is_written_is_refused(self):
+        state = self._init().json()
+        upload = DocumentUpload.objects.get(upload_id=state['upload_id'])
+        with open(uploads.temp_path(upload), 'r+b') as file:
+            locks.lock(file, locks.LOCK_EX)
+            response = self._put(state, 0, 399)
+            locks.unlock(file)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertEqual(self._put(state, 0, 399).json()['offset'], 400)
+
+    def test_chunk_whose_offset_moved_meanwhile_is_refused(self):
+        upload = uploads.start(DocumentUpload(user=self.user, file_name='deck.pdf', size=len(CONTENT),
+                                              company=self.company))
+        stream = io.BytesIO(CONTENT[:400])
+        read = stream.read
+
+        def read_while_another_chunk_is_saved(size):
+            DocumentUpload.objects.filter(upload_id=upload.upload_id).update(received=400)
+            return read(size)
+
+        with mock.patch.object(stream, 'read', side_effect=read_while_another_chunk_is_saved):
+            with self.assertRaises(UploadError) as error:
+                uploads.write_chunk(upload, stream, f'bytes 0-399/{len(CONTENT)}')
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(DocumentUpload.objects.get().received, 400)
+
+    def test_chunk_cut_short_keeps_what_arrived(self):
+        state = self._init().json()
+        response = self._put(state, 0, 399, content=CONTENT[:250])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['offset'], 250)
+        self.assertEqual(self._put(state, 250, 999).json()['offset'], 1000)
+        document = Document.objects.get(file_id=self.client.post(state['finalize_url']).json()['file_id'])
+        self.assertEqual(document.checksum, CHECKSUM)
+
+    def test_upload_resumes_from_the_offset(self):
+        state = self._init().json()
+        self._put(state, 0, 299)
+        state = self.client.get(state['chunk_url']).json()
+        self.assertEqual(state['offset'], 300)
+        state = self._put(state, 300, 999).json()
+        self.assertEqual(state['offset'], 1000)
+
+    def test_finalize_creates_the_document(self):
+        state = self._upload(is_private=True)
+        response = self.client.post(state['finalize_url'], {'checksum': CHECKSUM.upper()})
+        self.assertEqual(response.status_code, 201)
+        result = response.json()
+        self.assertEqual(result['redirect'], reverse('portfolio_company', kwargs={'company_id': self.company.id}))
+        document = Document.objects.get(file_id=result['file_id'])
+        self.assertEqual((document.file_name, document.file_type, document.file_size, document.checksum),
+                         ('deck.pdf', 'pdf', len(CONTENT), CHECKSUM))
+        self.assertEqual(document.company, self.company)
+        self.assertTrue(document.is_private)
+        with document.file.open('rb') as file:
+            self.assertEqual(file.read(), CONTENT)
+        self.assertFalse(DocumentUpload.objects.exists())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_reupload_shares_the_stored_file(self):
+        first = self.client.post(self._upload()['finalize_url']).json()
+        second = self.client.post(self._upload()['finalize_url']).json()
+        first, second = Document.objects.get(file_id=first['file_id']), Document.objects.get(file_id=second['file_id'])
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(DocumentBlob.objects.get().references, 2)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_file_names_are_kept_as_given(self):
+        for file_name in ["Pitch deck (final).pdf", "O'Neil deck.pptx", "Büro.pdf"]:
+            state = self._upload(file_name=f"C:\\Users\\john/{file_name}")
+            document = Document.objects.get(file_id=self.client.post(state['finalize_url']).json()['file_id'])
+            self.assertEqual(document.file_name, file_name)
+            self.assertEqual(document.file_type, file_name.split('.')[-1])
+
+    @override_settings(CONTENT_ADDRESSED_DOCUMENTS=False)
+    def test_file_names_are_made_valid_for_the_storage(self):
+        state = self._upload(file_name="Pitch deck (final).pdf")
+        document = Document.objects.get(file_id=self.client.post(state['finalize_url']).json()['file_id'])
+        self.assertEqual(document.file_name, "Pitch deck (final).pdf")
+        self.assertEqual(document.file.name, f"documents/{self.company.name}/Pitch_deck_final.pdf")
+
+    def test_finalize_for_individuals_and_programmes(self):
+        for target, page in [(Individual.objects.first(), 'individual_profile'),
+                             (Programme.objects.first(), 'programme_detail')]:
+            field = target._meta.model_name
+            state = self._upload(company='', **{field: target.id})
+            result = self.client.post(state['finalize_url']).json()
+            self.assertEqual(result['redirect'], reverse(page, kwargs={'id': target.id}))
+            self.assertEqual(getattr(Document.objects.get(file_id=result['file_id']), field), target)
+
+    def test_checksum_is_computed_when_another_process_took_the_chunks(self):
+        state = self._init().json()
+        self._put(state, 0, 499)
+        uploads._hashes.clear()
+        self._put(state, 500, 999)
+        uploads._hashes.clear()
+        self.assertEqual(self.client.post(state['finalize_url']).json()['checksum'], CHECKSUM)
+
+    def test_upload_finalized_twice_creates_one_document(self):
+        state = self._upload()
+        upload = DocumentUpload.objects.get(upload_id=state['upload_id'])
+        # The second request finds the upload before the first one deletes its temporary file.
+        with mock.patch.object(uploads, '_discard'):
+            uploads.finalize(DocumentUpload.objects.get(upload_id=upload.upload_id))
+        with self.assertRaises(UploadError) as error:
+            uploads.finalize(upload)
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(Document.objects.count(), 1)
+        self.assertEqual(DocumentBlob.objects.get().references, 1)
+
+    def test_incomplete_upload_is_not_finalized(self):
+        state = self._init().json()
+        self._put(state, 0, 499)
+        response = self.client.post(state['finalize_url'])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 500)
+        self.assertFalse(Document.objects.exists())
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        state = self._upload()
+        response = self.client.post(state['finalize_url'], {'checksum': hashlib.sha256(b'other').hexdigest()})
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Document.objects.exists())
+        self.assertFalse(DocumentUpload.objects.exists())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_abort_deletes_the_upload(self):
+        state = self._init().json()
+        self._put(state, 0, 499)
+        self.assertEqual(self.client.delete(state['chunk_url']).status_code, 204)
+        self.assertFalse(DocumentUpload.objects.exists())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_stale_uploads_are_purged(self):
+        stale = self._init().json()
+        DocumentUpload.objects.filter(upload_id=stale['upload_id']).update(
+            updated_at=timezone.now() - timedelta(seconds=uploads.UPLOAD_EXPIRY + 1))
+        fresh = self._init().json()
+        self.assertEqual([str(upload_id) for upload_id in DocumentUpload.objects.values_list('upload_id', flat=True)],
+                         [fresh['upload_id']])
+        self.assertEqual(os.listdir(self.temp_dir), [f"{fresh['upload_id']}.part"])
+
+    def test_uploads_belong_to_their_user(self):
+        state = self._init().json()
+        self.client.login(email="petra.pickles@example.org", password="Password123")
+        self.assertEqual(self._put(state, 0, 99).status_code, 404)
+        self.assertEqual(self.client.post(state['finalize_url']).status_code, 404)
+        self.assertEqual(self.client.get(state['chunk_url']).status_code, 404)
+
+    def test_uploads_require_login(self):
+        state = self._init().json()
+        self.client.logout()
+        self.assertEqual(self._init().status_code, 302)
+        self.assertEqual(self._put(state, 0, 99).status_code, 302)
+        self.assertEqual(DocumentUpload.objects.get().received, 0)
+
+    def test_write_chunk_reads_the_stream_in_pieces(self):
+        upload = uploads.start(DocumentUpload(user=self.user, file_name='deck.pdf', size=len(CONTENT),
+                                              company=self.company))
+        stream = io.BytesIO(CONTENT)
+        with mock.patch.object(uploads, 'READ_SIZE', 64), mock.patch.object(stream, 'read', wraps=stream.read) as read:
+            upload = uploads.write_chunk(upload, stream, f'bytes 0-999/{len(CONTENT)}')
+        self.assertEqual(upload.received, 1000)
+        self.assertTrue(all(call.args[0] <= 64 for call in read.call_args_list))
+
+    @query_budget(3)
+    def test_upload_status_query_budget(self):
+        return self._init().json()['chunk_url']
@@ -4,12 +4,12 @@ from django.test import TestCase
 from django.urls import reverse
 
 from portfolio.models import Company, Individual, User, Portfolio_Company, Founder, Investor
-from portfolio.tests.helpers import reverse_with_next
+from portfolio.tests.helpers import reverse_with_next, QueryBudgetTester, query_budget, reset_typeaheads
 from portfolio.tests.helpers import set_session_variables, set_session_archived_company_filter_variable, \
     set_session_archived_individual_filter_variable
 
 
-class ArchiveViewTestCase(TestCase):
+class ArchiveViewTestCase(TestCase, QueryBudgetTester):
     """Unit tests of the archive view"""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -29,6 +29,7 @@ class ArchiveViewTestCase(TestCase):
     ]
 
     def setUp(self) -> None:
+        reset_typeaheads()
         self.url = reverse('archive_page')
         self.search_url = reverse('archive_search')
         self.company_filter_url = reverse('change_archived_company_filter')
@@ -46,6 +47,11 @@ class ArchiveViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'archive/archive_page.html')
 
+    @query_budget(6)
+    def test_get_archive_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_get_archive_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -72,6 +78,12 @@ class ArchiveViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response, HttpResponse)
 
+    # The first search loads the typeahead, which the later ones read without querying.
+    @query_budget(6, data={'searchresult': 'a'})
+    def test_get_search_archive_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.search_url
+
     def test_get_archive_search_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.search_url)
         response = self.client.get(self.search_url)
@@ -253,3 +265,89 @@ class ArchiveViewTestCase(TestCase):
         for individual in individual_search_result:
             self.assertContains(response, individual.name)
         self.assertEqual(len(individual_search_result), 0)
+
+
+class ArchivedNextPageViewTestCase(TestCase, QueryBudgetTester):
+    """Unit tests of the keyset pages of the archived companies and individuals"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+    ]
+
+    def setUp(self):
+        self.companies_url = reverse('archived_companies_next_page')
+        self.individuals_url = reverse('archived_individuals_next_page')
+        self.client.login(email="petra.pickles@example.org", password="Password123")
+        set_session_variables(self.client)
+        for i in range(8):
+            Company.objects.create(name=f"Archived Company {i}", trading_names=f"Archived trading {i}",
+                                   previous_names=f"Archived previous {i}", is_archived=True)
+            Individual.objects.create(name=f"Archived Individual {i}", AngelListLink="https://angel.co/a",
+                                      CrunchbaseLink="https://crunchbase.com/a", LinkedInLink="https://linkedin.com/a",
+                                      Company="Archived", Position="Analyst", Email=f"archived{i}@example.org",
+                                      PrimaryNumber="+447312345678", is_archived=True)
+
+    def test_next_page_urls(self):
+        self.assertEqual(self.companies_url, '/archived_companies_next_page/')
+        self.assertEqual(self.individuals_url, '/archived_individuals_next_page/')
+
+    def test_get_archive_links_to_next_pages(self):
+        response = self.client.get(reverse('archive_page'))
+        companies = response.context['companies']
+        individuals = response.context['individuals']
+        self.assertEqual((len(companies), len(individuals)), (6, 6))
+        self.assertContains(response, f'?company_cursor={companies.next_cursor}')
+        self.assertContains(response, f'?individual_cursor={individuals.next_cursor}')
+        self.assertContains(response, self.companies_url)
+        self.assertContains(response, self.individuals_url)
+
+    def test_get_archive_with_cursor_shows_following_companies(self):
+        first_page = self.client.get(reverse('archive_page')).context['companies']
+        response = self.client.get(reverse('archive_page'), data={'company_cursor': first_page.next_cursor})
+        self.assertEqual([company.name for company in response.context['companies']],
+                         [f"Archived Company {i}" for i in range(6, 8)])
+        self.assertEqual(len(response.context['individuals']), 6)
+
+    def test_get_archived_companies_next_page(self):
+        first_page = self.client.get(reverse('archive_page')).context['companies']
+        response = self.client.get(self.companies_url, data={'cursor': first_page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'archive/archived_company_page_items.html')
+        self.assertEqual(response['X-Next-Cursor'], '')
+        self.assertContains(response, "Archived Company 7")
+        self.assertNotContains(response, "Archived Company 0")
+
+    def test_get_archived_individuals_next_page(self):
+        first_page = self.client.get(reverse('archive_page')).context['individuals']
+        response = self.client.get(self.individuals_url, data={'cursor': first_page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'archive/archived_individual_page_items.html')
+        self.assertContains(response, "Archived Individual 7")
+        self.assertNotContains(response, "Archived Individual 0")
+
+    def test_get_archived_individuals_next_page_follows_the_filter(self):
+        set_session_archived_individual_filter_variable(self.client, 2)
+        response = self.client.get(self.individuals_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Archived Individual")
+
+    @query_budget(4)
+    def test_get_archived_companies_next_page_query_budget(self):
+        return self.companies_url
+
+    @query_budget(4)
+    def test_get_archived_individuals_next_page_query_budget(self):
+        return self.individuals_url
+
+    def test_get_archived_next_pages_with_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.companies_url, data={'cursor': '%%%'}).status_code, 400)
+        self.assertEqual(self.client.get(self.individuals_url, data={'cursor': '%%%'}).status_code, 400)
+
+    def test_get_archived_next_pages_redirects_when_not_admin(self):
+        self.client.login(email="john.doe@example.org", password="Password123")
+        self.assertRedirects(self.client.get(self.companies_url), reverse('logout'), fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(self.individuals_url), reverse('logout'), fetch_redirect_response=False)
@@ -6,11 +6,12 @@ from django.urls import reverse
 from portfolio.forms import ContractRightForm
 from portfolio.models import User, Company, Portfolio_Company, Individual
 from portfolio.models.investment_model import Investor, Investment, ContractRight
-from portfolio.tests.helpers import LogInTester, reverse_with_next, set_session_variables
+from portfolio.tests.helpers import LogInTester, reverse_with_next, set_session_variables, QueryBudgetTester, \
+    query_budget
 from vcpms import settings
 
 
-class ContractRightCreateViewTestCase(TestCase, LogInTester):
+class ContractRightCreateViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_portfolio_company.json']
@@ -48,6 +49,11 @@ class ContractRightCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(isinstance(form, ContractRightForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(2)
+    def test_get_create_contract_right_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_create_investment_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -75,7 +81,7 @@ class ContractRightCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(form.is_bound)
 
 
-class ContractRightDeleteViewTestCase(TestCase, LogInTester):
+class ContractRightDeleteViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_portfolio_company.json']
@@ -111,6 +117,11 @@ class ContractRightDeleteViewTestCase(TestCase, LogInTester):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_delete.html')
 
+    @query_budget(5)
+    def test_get_delete_contract_right_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_delete_contract_right_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -139,7 +150,7 @@ class ContractRightDeleteViewTestCase(TestCase, LogInTester):
         self.assertEqual(before_count - 1, after_count)
 
 
-class ContractRightListViewTestCase(TestCase, LogInTester):
+class ContractRightListViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_individual.json',
@@ -184,6 +195,33 @@ class ContractRightListViewTestCase(TestCase, LogInTester):
             self.assertContains(response, f'Default Right {i}')
             self.assertContains(response, f'Default Detail {i}')
 
+    @query_budget(8)
+    def test_get_contract_right_list_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
+    def test_get_contract_right_list_next_page(self):
+        self.client.login(username=self.user.email, password="Password123")
+        self._create_contract_rights(settings.ITEM_ON_PAGE + 1)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['contract_rights']), settings.ITEM_ON_PAGE)
+        next_cursor = response['X-Next-Cursor']
+        self.assertTrue(next_cursor)
+
+        next_page_url = reverse('contract_rights_next_page', kwargs={'investment_id': self.investment.id})
+        response = self.client.get(next_page_url + f'?cursor={next_cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_page_items.html')
+        self.assertTemplateNotUsed(response, 'investment/contract_rights/contract_right_list.html')
+        self.assertEqual(len(response.context['contract_rights']), 1)
+        self.assertContains(response, f'Default Right {settings.ITEM_ON_PAGE}')
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+    def test_get_contract_right_list_with_invalid_cursor(self):
+        self.client.login(username=self.user.email, password="Password123")
+        response = self.client.get(self.url + '?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
     def test_get_contract_right_list_for_individual_investor(self):
 
         self.investorIndividual = Investor.objects.create(individual=Individual.objects.first(), classification='Angel')
@@ -209,31 +247,24 @@ class ContractRightListViewTestCase(TestCase, LogInTester):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_list.html')
 
-        page_two_url = reverse('contract_right_list', kwargs={'investment_id': self.investment.id}) + '?page=1'
-        response = self.client.get(page_two_url)
         page_obj = response.context['page_obj']
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_list.html')
         self.assertEqual(len(response.context['contract_rights']), settings.ITEM_ON_PAGE)
-        self.assertFalse(page_obj.has_previous())
         self.assertTrue(page_obj.has_next())
 
-        page_two_url = reverse('contract_right_list', kwargs={'investment_id': self.investment.id}) + '?page=2'
+        page_two_url = self.url + f'?cursor={page_obj.next_cursor}'
         response = self.client.get(page_two_url)
         page_obj = response.context['page_obj']
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_list.html')
         self.assertEqual(len(response.context['contract_rights']), settings.ITEM_ON_PAGE)
-        self.assertTrue(page_obj.has_previous())
         self.assertTrue(page_obj.has_next())
 
-        page_three_url = reverse('contract_right_list', kwargs={'investment_id': self.investment.id}) + '?page=3'
+        page_three_url = self.url + f'?cursor={page_obj.next_cursor}'
         response = self.client.get(page_three_url)
         page_obj = response.context['page_obj']
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'investment/contract_rights/contract_right_list.html')
         self.assertEqual(len(response.context['contract_rights']), 1)
-        self.assertTrue(page_obj.has_previous())
         self.assertFalse(page_obj.has_next())
 
     def test_invalid_investment_id_redirects_to_dashboard(self):
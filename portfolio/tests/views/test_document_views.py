@@ -1,20 +1,21 @@
 import mimetypes
 import os
 import shutil
+import tempfile
 import time
 from io import BytesIO
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from portfolio.forms import DocumentUploadForm
 from portfolio.models import Company, Document, User
-from portfolio.tests.helpers import reverse_with_next
+from portfolio.tests.helpers import reverse_with_next, QueryBudgetTester, query_budget
 from vcpms.settings import MEDIA_ROOT
 
 
-class DocumentViewsTestCase(TestCase):
+class DocumentViewsTestCase(TestCase, QueryBudgetTester):
     """Tests for the URLUploadForm."""
 
     fixtures = ["portfolio/tests/fixtures/default_company.json",
@@ -23,6 +24,11 @@ class DocumentViewsTestCase(TestCase):
                 ]
 
     def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
         self.user = User.objects.get(email="john.doe@example.org")
         self.defaultCompany = Company.objects.get(id=1)
         self.url = reverse('company_document_upload', kwargs={'company_id': self.defaultCompany.id})
@@ -66,6 +72,11 @@ class DocumentViewsTestCase(TestCase):
         self.assertTrue(isinstance(form, DocumentUploadForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(2)
+    def test_get_document_upload_view_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_document_upload_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -103,6 +114,12 @@ class DocumentViewsTestCase(TestCase):
             "attachment; filename=TestingExcel.xlsx"
         )
 
+    @query_budget(3)
+    def test_download_document_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        self.client.post(self.url, self.document_form_input, follow=True)
+        return reverse('download_document', kwargs={'file_id': 1})
+
     def test_document_download_redirects_when_not_logged_in(self):
         self.url = reverse('download_document', kwargs={'file_id': 1})
         redirect_url = reverse_with_next('login', self.url)
@@ -157,6 +174,12 @@ class DocumentViewsTestCase(TestCase):
         redirect_url = "https://www.wayra.uk"
         self.assertEqual(response['Location'], redirect_url)
 
+    @query_budget(3)
+    def test_open_url_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        self.client.post(self.url, self.url_form_data, follow=True)
+        return reverse('open_url', kwargs={'file_id': 1})
+
     def test_document_open_url_redirects_when_not_logged_in(self):
         self.url = reverse('open_url', kwargs={'file_id': 1})
         redirect_url = reverse_with_next('login', self.url)
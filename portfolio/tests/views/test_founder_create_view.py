@@ -6,10 +6,10 @@ from phonenumber_field.phonenumber import PhoneNumber
 
 from portfolio.forms import FounderForm
 from portfolio.models import Founder, User, Individual, Company
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class FounderCreateTestCase(TestCase):
+class FounderCreateTestCase(TestCase, QueryBudgetTester):
     """Unit tests of the founder create view."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -56,6 +56,10 @@ class FounderCreateTestCase(TestCase):
         self.assertTemplateUsed(response, 'individual/founder_create.html')
         self.assertIsInstance(response.context['founderForm'], FounderForm)
 
+    @query_budget(4)
+    def test_founder_create_view_query_budget(self):
+        return self.url
+
     def test_founder_create_post(self):
         before_count = Founder.objects.count()
         response = self.client.post(self.url, self.post_input)
@@ -5,10 +5,10 @@ from django.utils import timezone
 from phonenumber_field.phonenumber import PhoneNumber
 
 from portfolio.models import Founder, User, Individual, Company
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class FounderDeleteTestCase(TestCase):
+class FounderDeleteTestCase(TestCase, QueryBudgetTester):
     """Unit tests for the founder delete page."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -53,6 +53,10 @@ class FounderDeleteTestCase(TestCase):
     def test_founder_delete_url(self):
         self.assertEqual(self.url, '/individual_page/{}/deleteFounder/'.format(self.listUsed.id))
 
+    @query_budget(3)
+    def test_founder_delete_view_query_budget(self):
+        return self.url
+
     def test_redirect_when_user_not_logged_in(self):
         self.client.logout()
         redirect_url = reverse_with_next('login', self.url)
@@ -5,10 +5,10 @@ from django.utils import timezone
 from phonenumber_field.phonenumber import PhoneNumber
 
 from portfolio.models import Founder, User, Individual, Company
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class FounderModifyTestCase(TestCase):
+class FounderModifyTestCase(TestCase, QueryBudgetTester):
     """Unit tests for the founder modify page."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -53,6 +53,10 @@ class FounderModifyTestCase(TestCase):
     def test_founder_modify_url(self):
         self.assertEqual(self.url, '/individual_page/{}/modifyFounder/'.format(self.listUsed.id))
 
+    @query_budget(5)
+    def test_founder_modify_view_query_budget(self):
+        return self.url
+
     def test_redirect_when_user_not_logged_in(self):
         self.client.logout()
         redirect_url = reverse_with_next('login', self.url)
@@ -5,10 +5,10 @@ from django_countries.fields import Country
 
 from portfolio.forms import IndividualCreateForm, AddressCreateForm, PastExperienceForm
 from portfolio.models import Individual, ResidentialAddress, PastExperience, User
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class IndividualCreateViewTestCase(TestCase):
+class IndividualCreateViewTestCase(TestCase, QueryBudgetTester):
     """Tests of the individual create view."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -70,6 +70,10 @@ class IndividualCreateViewTestCase(TestCase):
         self.assertFalse(adress_form.is_bound)
         self.assertFalse(individual_form.is_bound)
 
+    @query_budget(2)
+    def test_individual_create_view_query_budget(self):
+        return self.url
+
     def test_redirect_when_user_access_investor_individual_create_not_loggedin(self):
         self.client.logout()
         redirect_url = reverse_with_next('login', self.url)
@@ -4,10 +4,10 @@ from django.urls import reverse
 from django_countries.fields import Country
 
 from portfolio.models import ResidentialAddress, PastExperience, Individual, User
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class IndividualDeleteTestCase(TestCase):
+class IndividualDeleteTestCase(TestCase, QueryBudgetTester):
     """Unit tests for the individual delete page."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -57,6 +57,10 @@ class IndividualDeleteTestCase(TestCase):
     def test_individual_delete_url(self):
         self.assertEqual(self.url, '/individual_page/{}/delete/'.format(self.listUsed.id))
 
+    @query_budget(3)
+    def test_individual_delete_view_query_budget(self):
+        return self.url
+
     def test_redirect_when_user_not_logged_in(self):
         self.client.logout()
         redirect_url = reverse_with_next('login', self.url)
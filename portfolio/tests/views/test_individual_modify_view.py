@@ -4,11 +4,11 @@ from django.urls import reverse
 from django_countries.fields import Country
 
 from portfolio.models import ResidentialAddress, PastExperience, Individual, User
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 from portfolio.forms import IndividualCreateForm, AddressCreateForm, PastExperienceForm
 
 
-class IndividualModifyTestCase(TestCase):
+class IndividualModifyTestCase(TestCase, QueryBudgetTester):
     """Unit tests for the individual modify views."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -73,6 +73,10 @@ class IndividualModifyTestCase(TestCase):
         self.assertFalse(adress_form.is_bound)
         self.assertFalse(individual_form.is_bound)
 
+    @query_budget(5)
+    def test_individual_update_view_query_budget(self):
+        return self.url
+
     def test_successful_post_update(self):
         before_count_individual = Individual.objects.count()
         before_count_adress = ResidentialAddress.objects.count()
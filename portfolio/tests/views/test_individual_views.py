@@ -1,13 +1,16 @@
 """Tests of the Individual views."""
+from django.db import connection
 from django.http import HttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from portfolio.models import Individual, Founder, User, Investor
-from portfolio.tests.helpers import reverse_with_next, set_session_variables, set_session_individual_filter_variable
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, set_session_individual_filter_variable, \
+    QueryBudgetTester, query_budget, reset_typeaheads
 
 
-class IndividualProfileViewTestCase(TestCase):
+class IndividualProfileViewTestCase(TestCase, QueryBudgetTester):
     """Tests of the Individual views."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -29,6 +32,11 @@ class IndividualProfileViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'individual/individual_about_page.html')
 
+    @query_budget(9)
+    def test_get_individual_profile_view_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_redirect_when_user_access_individual_profile_not_loggedin(self):
         redirect_url = reverse_with_next('login', reverse('individual_page'))
         response = self.client.get(self.url, follow=True)
@@ -113,7 +121,7 @@ class IndividualUnarchiveViewTestCase(TestCase):
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
 
-class IndividualFilterViewTestCase(TestCase):
+class IndividualFilterViewTestCase(TestCase, QueryBudgetTester):
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
         "portfolio/tests/fixtures/other_users.json",
@@ -148,6 +156,10 @@ class IndividualFilterViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response, HttpResponse)
 
+    @query_budget(7, data={'filter_number': 1})
+    def test_get_individual_change_filter_query_budget(self):
+        return self.url
+
     def test_get_change_filter_returns_correct_data_for_all_individuals(self):
         self.client.login(email=self.user.email, password="Password123")
         response = self.client.get(self.url, data={'filter_number': 1})
@@ -184,7 +196,7 @@ class IndividualFilterViewTestCase(TestCase):
         self.assertEqual(len(test_result), 3)
 
 
-class IndividualLayoutViewTestCase(TestCase):
+class IndividualLayoutViewTestCase(TestCase, QueryBudgetTester):
     """Tests for the individual layout view."""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -220,6 +232,10 @@ class IndividualLayoutViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(int(self.client.session['individual_layout']), 1)
 
+    @query_budget(7, data={'layout_number': 1})
+    def test_get_change_individual_layout_query_budget(self):
+        return self.url
+
     def test_get_change_layout_returns_correct_data_for_all_individuals(self):
         self.client.login(email=self.user.email, password="Password123")
         response = self.client.get(self.url, data={'layout_number': 1})
@@ -250,7 +266,7 @@ class IndividualLayoutViewTestCase(TestCase):
         self.assertEqual(len(test_result), 3)
 
 
-class SearchIndividualViewTestCase(TestCase):
+class SearchIndividualViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ["portfolio/tests/fixtures/default_user.json",
                 "portfolio/tests/fixtures/default_company.json",
                 "portfolio/tests/fixtures/other_companies.json",
@@ -262,6 +278,7 @@ class SearchIndividualViewTestCase(TestCase):
                 "portfolio/tests/fixtures/other_investor_individuals.json"]
 
     def setUp(self) -> None:
+        reset_typeaheads()
         self.user = User.objects.get(id=1)
         self.url = reverse('dashboard')
         self.search_url = reverse('individual_search_result')
@@ -276,6 +293,12 @@ class SearchIndividualViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response, HttpResponse)
 
+    # The first search loads the typeahead, which the later ones read without querying.
+    @query_budget(3, data={'searchresult': 'a'})
+    def test_get_search_individual_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.search_url
+
     def test_get_search_individual_returns_correct_data_for_all_individuals(self):
         self.client.login(email=self.user.email, password="Password123")
         response = self.client.get(self.search_url, data={'searchresult': 'J'})
@@ -347,3 +370,114 @@ class SearchIndividualViewTestCase(TestCase):
         response = self.client.post(self.search_url, follow=True, data={'searchresult': 'en'})
         individuals = response.context['individuals']
         self.assertEqual(len(individuals), 1)
+
+
+class IndividualNextPageViewTestCase(TestCase, QueryBudgetTester):
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/other_users.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+        self.url = reverse('individuals_next_page')
+        set_session_variables(self.client)
+        for i in range(3):
+            individual = Individual.objects.get(id=1)
+            individual.pk = None
+            individual.name = f"Extra Individual {i}"
+            individual.save()
+
+    def test_individuals_next_page_url(self):
+        self.assertEqual(self.url, '/individuals_next_page/')
+
+    def test_get_individual_page_links_to_next_page(self):
+        response = self.client.get(reverse('individual_page'))
+        individuals = response.context['individuals']
+        self.assertEqual(len(individuals), 6)
+        self.assertTrue(individuals.has_next())
+        self.assertContains(response, individuals.next_cursor)
+
+    @query_budget(3)
+    def test_get_individual_page_query_budget(self):
+        return reverse('individual_page')
+
+    def test_get_individuals_next_page(self):
+        first_page = self.client.get(reverse('individual_page')).context['individuals']
+        response = self.client.get(self.url, data={'cursor': first_page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'partials/individual/individual_page_items.html')
+        self.assertEqual(response['X-Next-Cursor'], '')
+        for individual in Individual.objects.order_by('id')[6:]:
+            self.assertContains(response, individual.name)
+        for individual in first_page:
+            self.assertNotContains(response, individual.name)
+
+    @query_budget(3)
+    def test_get_individuals_next_page_query_budget(self):
+        return self.url
+
+    def test_get_individuals_next_page_with_invalid_cursor(self):
+        response = self.client.get(self.url, data={'cursor': '%%%'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_redirect_when_user_access_individuals_next_page_not_loggedin(self):
+        self.client.logout()
+        redirect_url = reverse_with_next('login', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+
+class IndividualRoleQueriesTestCase(TestCase):
+    """Tests that the roles shown on individual cards do not cost a query per card"""
+    fixtures = [
+        "portfolio/tests/fixtures/default_user.json",
+        "portfolio/tests/fixtures/default_company.json",
+        "portfolio/tests/fixtures/other_companies.json",
+        "portfolio/tests/fixtures/default_individual.json",
+        "portfolio/tests/fixtures/other_individuals.json",
+        "portfolio/tests/fixtures/default_founder.json",
+        "portfolio/tests/fixtures/other_founders.json",
+        "portfolio/tests/fixtures/default_investor_individual.json",
+        "portfolio/tests/fixtures/other_investor_individuals.json",
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(email="john.doe@example.org")
+        self.client.login(email=self.user.email, password="Password123")
+        set_session_variables(self.client)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_individual_page_query_count_does_not_grow_with_cards(self):
+        Individual.objects.exclude(id=1).delete()
+        queries_for_one_card = self._count_queries(reverse('individual_page'))
+        for i in range(5):
+            individual = Individual.objects.get(id=1)
+            individual.pk = None
+            individual.name = f"Extra Individual {i}"
+            individual.save()
+        self.assertEqual(self._count_queries(reverse('individual_page')), queries_for_one_card)
+
+    def test_individual_profile_reads_roles_from_annotations(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('individual_profile', kwargs={'id': 1}))
+        role_queries = [query['sql'] for query in queries
+                        if query['sql'].startswith('SELECT COUNT(*) AS "__count" FROM "portfolio_investor"')
+                        or query['sql'].startswith('SELECT "portfolio_founder"."id"')]
+        self.assertEqual(role_queries, [])
+
+    def test_individual_cards_show_roles(self):
+        response = self.client.get(reverse('individual_page'))
+        individuals = {individual.id: individual for individual in response.context['individuals']}
+        self.assertTrue(individuals[4].is_founder)
+        self.assertFalse(individuals[4].is_investor)
+        self.assertTrue(individuals[1].is_investor)
+        self.assertFalse(individuals[1].is_founder)
@@ -9,10 +9,10 @@ from portfolio.forms import InvestmentForm, InvestorCompanyCreateForm, InvestorE
     PortfolioCompanyEditForm
 from portfolio.models import Company, Portfolio_Company, User, Investment
 from portfolio.models.investor_model import Investor
-from portfolio.tests.helpers import LogInTester, reverse_with_next
+from portfolio.tests.helpers import LogInTester, reverse_with_next, QueryBudgetTester, query_budget
 
 
-class InvestmentCreateViewTestCase(TestCase, LogInTester):
+class InvestmentCreateViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_portfolio_company.json']
@@ -45,6 +45,11 @@ class InvestmentCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(isinstance(form, InvestmentForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(4)
+    def test_get_create_investment_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_create_investment_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -78,7 +83,7 @@ class InvestmentCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(form.is_bound)
 
 
-class InvestmentUpdateViewTestCase(TestCase, LogInTester):
+class InvestmentUpdateViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_portfolio_company.json']
@@ -119,6 +124,11 @@ class InvestmentUpdateViewTestCase(TestCase, LogInTester):
         self.assertTrue(isinstance(form, InvestmentForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(8)
+    def test_get_update_investment_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_update_investment_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -156,7 +166,7 @@ class InvestmentUpdateViewTestCase(TestCase, LogInTester):
         self.assertTrue(form.is_bound)
 
 
-class InvestmentDeleteViewTestCase(TestCase, LogInTester):
+class InvestmentDeleteViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json',
                 'portfolio/tests/fixtures/default_portfolio_company.json']
@@ -188,6 +198,11 @@ class InvestmentDeleteViewTestCase(TestCase, LogInTester):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'investment/investment_delete.html')
 
+    @query_budget(5)
+    def test_get_delete_investment_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_delete_investment_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -208,7 +223,7 @@ class InvestmentDeleteViewTestCase(TestCase, LogInTester):
         self.assertEqual(before_count - 1, after_count)
 
 
-class InvestorCreateViewTestCase(TestCase):
+class InvestorCreateViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json']
 
@@ -233,6 +248,11 @@ class InvestorCreateViewTestCase(TestCase):
         self.assertTrue(isinstance(form, InvestorCompanyCreateForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_create_investor_company_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_create_investor_company_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -263,7 +283,7 @@ class InvestorCreateViewTestCase(TestCase):
         self.assertTrue(form.is_bound)
 
 
-class InvestorUpdateViewTestCase(TestCase):
+class InvestorUpdateViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json']
 
@@ -292,6 +312,11 @@ class InvestorUpdateViewTestCase(TestCase):
         self.assertTrue(isinstance(form, InvestorEditForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_update_investor_company_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_update_investor_company_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -322,7 +347,7 @@ class InvestorUpdateViewTestCase(TestCase):
         self.assertTrue(form.is_bound)
 
 
-class PortfolioCompanyCreateViewTestCase(TestCase):
+class PortfolioCompanyCreateViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json']
 
@@ -347,6 +372,11 @@ class PortfolioCompanyCreateViewTestCase(TestCase):
         self.assertTrue(isinstance(form, PortfolioCompanyCreateForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_create_portfolio_company_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_create_portfolio_company_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -377,7 +407,7 @@ class PortfolioCompanyCreateViewTestCase(TestCase):
         self.assertTrue(form.is_bound)
 
 
-class PortfolioUpdateViewTestCase(TestCase):
+class PortfolioUpdateViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_company.json']
 
@@ -405,6 +435,11 @@ class PortfolioUpdateViewTestCase(TestCase):
         self.assertTrue(isinstance(form, PortfolioCompanyEditForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_update_portfolio_company_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_update_portfolio_company_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
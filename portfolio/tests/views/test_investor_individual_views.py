@@ -3,10 +3,10 @@ from django.urls import reverse
 
 from portfolio.forms import InvestorIndividualCreateForm, InvestorEditForm
 from portfolio.models import User, Investor, Individual
-from portfolio.tests.helpers import reverse_with_next, set_session_variables
+from portfolio.tests.helpers import reverse_with_next, set_session_variables, QueryBudgetTester, query_budget
 
 
-class InvestorIndividualCreateView(TestCase):
+class InvestorIndividualCreateView(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_individual.json']
 
@@ -32,6 +32,11 @@ class InvestorIndividualCreateView(TestCase):
         self.assertTrue(isinstance(form, InvestorIndividualCreateForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_create_investor_individual_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_create_investor_company_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -61,7 +66,7 @@ class InvestorIndividualCreateView(TestCase):
         self.assertTrue(form.is_bound)
 
 
-class InvestorIndividualUpdateView(TestCase):
+class InvestorIndividualUpdateView(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/default_individual.json']
 
@@ -90,6 +95,11 @@ class InvestorIndividualUpdateView(TestCase):
         self.assertTrue(isinstance(form, InvestorEditForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(3)
+    def test_get_update_investor_individual_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
     def test_get_update_investor_individual_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
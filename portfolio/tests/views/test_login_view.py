@@ -6,11 +6,11 @@ from django.urls import reverse
 
 from portfolio.forms import LogInForm
 from portfolio.models import User
-from portfolio.tests.helpers import LogInTester
+from portfolio.tests.helpers import LogInTester, QueryBudgetTester, query_budget
 from portfolio.tests.helpers import set_session_variables
 
 
-class LogInViewTestCase(TestCase, LogInTester):
+class LogInViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the log in view"""
 
     fixtures = [
@@ -39,6 +39,10 @@ class LogInViewTestCase(TestCase, LogInTester):
         messages_list = list(response.context['messages'])
         self.assertEqual(len(messages_list), 0)
 
+    @query_budget(1)
+    def test_get_log_in_query_budget(self):
+        return self.url
+
     def test_unsuccessful_user_log_in(self):
         form_input = {'email': "john.doe@example.org", 'password': 'WrongPassword123'}
         response = self.client.post(self.url, form_input)
@@ -7,12 +7,24 @@ from django.urls import reverse
 
 from portfolio.forms import UserCreationForm, CreateGroupForm, EditGroupForm, EditUserForm
 from portfolio.models import User, Company
-from portfolio.tests.helpers import reverse_with_next
+from portfolio.tests.helpers import reverse_with_next, QueryBudgetTester, query_budget
 from portfolio.tests.helpers import set_session_variables
 from vcpms import settings
 
 
-class UserListViewTestCase(TestCase):
+def grow_users_and_groups(count=5):
+    """Adds count groups with permissions, and count users in them."""
+
+    start = Group.objects.count()
+    for number in range(start, start + count):
+        group = Group.objects.create(name=f'Grown group {number}')
+        group.permissions.add(*Permission.objects.filter(codename__in=['add_user', 'change_user']))
+        user = User.objects.create_user(email=f'grown{number}@test.org', password='Password123',
+                                        first_name=f'First{number}', last_name=f'Last{number}', phone='+447312345678')
+        user.groups.add(group)
+
+
+class UserListViewTestCase(TestCase, QueryBudgetTester):
     """ Unit test for user list """
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
@@ -38,6 +50,11 @@ class UserListViewTestCase(TestCase):
             self.assertContains(response, f'+447312345678')
             self.assertIsNotNone(User.objects.get(email=f'user{user_id}@test.org'))
 
+    @query_budget(5, grow=grow_users_and_groups)
+    def test_get_user_list_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def test_user_list_pagination(self):
         self.client.login(email=self.user.email, password="Password123")
         # minus John doe
@@ -48,31 +65,43 @@ class UserListViewTestCase(TestCase):
         self.assertTemplateUsed(response, 'permissions/user_list.html')
 
         page_obj = response.context['page_obj']
-        page_one_url = reverse('permission_user_list') + '?page=1'
-        response = self.client.get(page_one_url)
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'permissions/user_list.html')
         self.assertEqual(len(response.context['users']), settings.ADMINS_USERS_PER_PAGE)
-        self.assertFalse(page_obj.has_previous())
         self.assertTrue(page_obj.has_next())
 
-        page_two_url = reverse('permission_user_list') + '?page=2'
+        page_two_url = reverse('permission_user_list') + f'?cursor={page_obj.next_cursor}'
         response = self.client.get(page_two_url)
         page_obj = response.context['page_obj']
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'permissions/user_list.html')
         self.assertEqual(len(response.context['users']), settings.ADMINS_USERS_PER_PAGE)
-        self.assertTrue(page_obj.has_previous())
         self.assertTrue(page_obj.has_next())
 
-        page_three_url = reverse('permission_user_list') + '?page=3'
+        page_three_url = reverse('permission_user_list') + f'?cursor={page_obj.next_cursor}'
         response = self.client.get(page_three_url)
         page_obj = response.context['page_obj']
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'permissions/user_list.html')
         self.assertEqual(len(response.context['users']), 1)
-        self.assertTrue(page_obj.has_previous())
         self.assertFalse(page_obj.has_next())
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+    def test_user_list_next_page(self):
+        self.client.login(email=self.user.email, password="Password123")
+        self._create_test_users(settings.ADMINS_USERS_PER_PAGE + 1)
+        next_cursor = self.client.get(self.url)['X-Next-Cursor']
+        self.assertTrue(next_cursor)
+
+        response = self.client.get(reverse('permission_users_next_page') + f'?cursor={next_cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'permissions/user_page_items.html')
+        self.assertTemplateNotUsed(response, 'permissions/user_list.html')
+        self.assertEqual(len(response.context['users']), 2)
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+    def test_user_list_with_invalid_cursor(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url + '?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
 
     def test_non_admin_cannot_access_page(self):
         redirect_url = reverse('dashboard')
@@ -95,7 +124,7 @@ class UserListViewTestCase(TestCase):
                                      )
 
 
-class UserSignUpFormViewTestCase(TestCase):
+class UserSignUpFormViewTestCase(TestCase, QueryBudgetTester):
     """ Unit test for UserSignUpFormView"""
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
@@ -119,6 +148,11 @@ class UserSignUpFormViewTestCase(TestCase):
     def test_sign_up_url(self):
         self.assertEqual(self.url, '/permissions/create_user/')
 
+    @query_budget(4, grow=grow_users_and_groups)
+    def test_get_user_sign_up_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def test_non_admin_cannot_get_page(self):
         redirect_url = reverse('dashboard')
         self.client.login(username='john.doe@example.org', password="Password123")
@@ -162,7 +196,7 @@ class UserSignUpFormViewTestCase(TestCase):
         self.assertTrue(form.is_bound)
 
 
-class GroupCreationViewTestCase(TestCase):
+class GroupCreationViewTestCase(TestCase, QueryBudgetTester):
     """ Unit test for GroupCreationView"""
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
@@ -178,6 +212,11 @@ class GroupCreationViewTestCase(TestCase):
     def test_create_group_url(self):
         self.assertEqual(self.url, '/permissions/create_group/')
 
+    @query_budget(2, grow=grow_users_and_groups)
+    def test_get_create_group_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def test_non_admin_cannot_get_page(self):
         redirect_url = reverse('dashboard')
         self.client.login(username='john.doe@example.org', password="Password123")
@@ -281,7 +320,7 @@ class UserDeleteViewTestCase(TestCase):
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
 
-class GroupListViewTestCase(TestCase):
+class GroupListViewTestCase(TestCase, QueryBudgetTester):
     """ Unit test for group list """
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
@@ -306,6 +345,11 @@ class GroupListViewTestCase(TestCase):
             self.assertContains(response, f'Can add user')
             self.assertIsNotNone(Group.objects.get(name=f'Group{group_id}'))
 
+    @query_budget(5, grow=grow_users_and_groups)
+    def test_get_group_list_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def _create_test_group(self, group_count):
         for group_id in range(group_count):
             group = Group.objects.create(name=f'Group{group_id}')
@@ -358,7 +402,7 @@ class GroupListViewTestCase(TestCase):
         self.assertFalse(page_obj.has_next())
 
 
-class GroupEditViewTestCase(TestCase):
+class GroupEditViewTestCase(TestCase, QueryBudgetTester):
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
 
@@ -375,6 +419,11 @@ class GroupEditViewTestCase(TestCase):
     def test_group_edit_url(self):
         self.assertEqual(self.url, f'/permissions/{self.test_group.id}/edit_group/')
 
+    @query_budget(7, grow=grow_users_and_groups)
+    def test_get_edit_group_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def test_non_admin_cannot_get_page(self):
         redirect_url = reverse('dashboard')
         self.client.login(username='john.doe@example.org', password="Password123")
@@ -493,7 +542,7 @@ class GroupDeleteViewTestCase(TestCase):
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
 
-class EditUserViewTestCase(TestCase):
+class EditUserViewTestCase(TestCase, QueryBudgetTester):
     """ Unit tests for EditUserView"""
     fixtures = ['portfolio/tests/fixtures/default_user.json',
                 'portfolio/tests/fixtures/other_users.json']
@@ -516,6 +565,11 @@ class EditUserViewTestCase(TestCase):
     def test_get_edit_user_url(self):
         self.assertEqual(self.url, f'/permissions/{self.test_user.id}/edit_user/')
 
+    @query_budget(7, grow=grow_users_and_groups)
+    def test_get_edit_user_query_budget(self):
+        self.client.login(username='petra.pickles@example.org', password="Password123")
+        return self.url
+
     def test_non_admin_cannot_get_page(self):
         redirect_url = reverse('dashboard')
         self.client.login(username='john.doe@example.org', password="Password123")
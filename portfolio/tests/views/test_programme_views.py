@@ -12,12 +12,13 @@ from django.urls import reverse
 from portfolio.forms import CreateProgrammeForm, EditProgrammeForm
 from portfolio.models import Company, Individual, Programme
 from portfolio.models import User, Portfolio_Company
-from portfolio.tests.helpers import LogInTester, reverse_with_next
+from portfolio.tests.helpers import LogInTester, reverse_with_next, QueryBudgetTester, query_budget, reset_typeaheads
 from portfolio.tests.helpers import set_session_variables
+from vcpms import settings
 from vcpms.settings import MEDIA_ROOT
 
 
-class ProgrammeCreateViewTestCase(TestCase, LogInTester):
+class ProgrammeCreateViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the programme list view"""
     DEFAULT_FIXTURES = ['portfolio/tests/fixtures/default_company.json',
                         'portfolio/tests/fixtures/default_individual.json',
@@ -85,6 +86,11 @@ class ProgrammeCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(isinstance(form, CreateProgrammeForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(2)
+    def test_get_programme_create_view_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_programme_create_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -107,7 +113,7 @@ class ProgrammeCreateViewTestCase(TestCase, LogInTester):
         self.assertTrue(form.is_bound)
 
 
-class ProgrammeUpdateViewTestCase(TestCase, LogInTester):
+class ProgrammeUpdateViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the programme list view"""
     DEFAULT_FIXTURES = ['portfolio/tests/fixtures/default_company.json',
                         'portfolio/tests/fixtures/default_individual.json',
@@ -174,6 +180,11 @@ class ProgrammeUpdateViewTestCase(TestCase, LogInTester):
         self.assertTrue(isinstance(form, EditProgrammeForm))
         self.assertFalse(form.is_bound)
 
+    @query_budget(11)
+    def test_get_programme_update_view_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_programme_update_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
@@ -287,7 +298,7 @@ class ProgrammeDeleteViewTestCase(TestCase, LogInTester):
         self.assertEqual(before_count - 1, after_count)
 
 
-class ProgrammeListViewTestCase(TestCase, LogInTester):
+class ProgrammeListViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the programme list view"""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -309,13 +320,39 @@ class ProgrammeListViewTestCase(TestCase, LogInTester):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'programmes/programme_list_page.html')
 
+    @query_budget(6)
+    def test_get_list_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_get_list_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
+    def test_get_list_next_page(self):
+        self.client.login(email=self.user.email, password="Password123")
+        Programme.objects.bulk_create(Programme(name=f'Programme {number}', cohort=1)
+                                      for number in range(settings.ITEM_ON_PAGE + 1))
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['programmes']), settings.ITEM_ON_PAGE)
+        next_cursor = response['X-Next-Cursor']
+        self.assertTrue(next_cursor)
+
+        response = self.client.get(reverse('programmes_next_page') + f'?cursor={next_cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'programmes/programme/programme_page_items.html')
+        self.assertTemplateNotUsed(response, 'programmes/programme_list_page.html')
+        self.assertEqual(len(response.context['programmes']), 1)
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+    def test_get_list_with_invalid_cursor(self):
+        self.client.login(email=self.user.email, password="Password123")
+        response = self.client.get(self.url + '?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
 
-class ProgrammeDetailViewTestCase(TestCase, LogInTester):
+
+class ProgrammeDetailViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the programme list view"""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -355,13 +392,18 @@ class ProgrammeDetailViewTestCase(TestCase, LogInTester):
         self.assertEqual(set(response.context['participants']), {self.portfolioCompany})
         self.assertEqual(set(response.context['coaches_mentors']), {self.coach})
 
+    @query_budget(8)
+    def test_get_programme_detail_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_get_detail_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
 
-class SearchProgrammeViewTestCase(TestCase):
+class SearchProgrammeViewTestCase(TestCase, QueryBudgetTester):
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
         "portfolio/tests/fixtures/default_company.json",
@@ -373,6 +415,7 @@ class SearchProgrammeViewTestCase(TestCase):
     ]
 
     def setUp(self) -> None:
+        reset_typeaheads()
         self.user = User.objects.get(email="john.doe@example.org")
         self.admin_user = User.objects.get(email="petra.pickles@example.org")
         self.defaultCompany = Company.objects.get(id=1)
@@ -392,6 +435,12 @@ class SearchProgrammeViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response, HttpResponse)
 
+    # The first search loads the typeahead, which the later ones read without querying.
+    @query_budget(2, data={'searchresult': 'A'})
+    def test_get_search_programme_query_budget(self):
+        self.client.login(email=self.admin_user.email, password="Password123")
+        return self.url
+
     def test_get_search_programme_returns_correct_data_for_all_companies(self):
         self.client.login(email=self.user.email, password="Password123")
         response = self.client.get(self.url, data={'searchresult': 'A'})
@@ -11,13 +11,13 @@ from django.urls import reverse
 
 from portfolio.forms import ChangePasswordForm, ContactDetailsForm, ProfilePictureForm
 from portfolio.models import User
-from portfolio.tests.helpers import LogInTester, reverse_with_next
+from portfolio.tests.helpers import LogInTester, reverse_with_next, QueryBudgetTester, query_budget
 
 logging.getLogger("PIL").setLevel(logging.WARNING)
 from django.conf import settings as django_settings
 
 
-class SettingsViewTestCase(TestCase, LogInTester):
+class SettingsViewTestCase(TestCase, LogInTester, QueryBudgetTester):
     """Unit tests of the dashboard view"""
     fixtures = [
         "portfolio/tests/fixtures/default_user.json",
@@ -64,6 +64,21 @@ class SettingsViewTestCase(TestCase, LogInTester):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'settings/account_settings.html')
 
+    @query_budget(2)
+    def test_get_account_settings_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.url
+
+    @query_budget(2)
+    def test_get_contact_details_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.contact_details_url
+
+    @query_budget(2)
+    def test_get_change_password_query_budget(self):
+        self.client.login(email=self.user.email, password="Password123")
+        return self.change_password_url
+
     def test_get_account_settings_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('login', self.url)
         response = self.client.get(self.url)
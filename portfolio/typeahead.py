@@ -0,0 +1,341 @@
+"""In-memory typeahead over the names of companies, individuals and programmes.
+
+The search bars send a request on every keystroke. Instead of querying the names each time, every process keeps a
+suffix array of the lower-cased names: the (pk, offset) of every suffix, sorted by the text of the suffix, so that a
+substring lookup (the name__contains semantics the search bars have always had) is a binary search into that array.
+The suffixes are not copied, the text of one is only sliced from its name while it is compared. Alongside each name
+the index keeps the few attributes the session filters need (archived, investor, founder, ...), so filtered lookups
+never query them either.
+
+An index is loaded from the database on its first lookup, together with the data version of its rows (see
+DataVersion), and lookups run no query after that. The receivers at the bottom apply every saved or deleted row to the
+indexes of the process once its transaction commits, re-reading only that entity, and follow the data version the
+write replaced, so a rolled back change never reaches an index. Rows changed elsewhere (by another process, an import,
+a seeder or an update without signals) replace the version without being applied: at most every
+TYPEAHEAD_CHECK_INTERVAL seconds, a lookup has a background thread read the version, and the index is loaded again
+only when it is not the one the index followed.
+"""
+import functools
+import logging
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from portfolio.fragment_cache import COMPANIES, INDIVIDUALS
+from portfolio.models import Company, Individual, Programme, DataVersion, Founder, Investor, InvestorCompany, \
+    Portfolio_Company
+from vcpms import settings
+
+logger = logging.getLogger(__name__)
+
+PROGRAMMES = 'programmes'
+
+# Number of suggestions shown under a search bar.
+SUGGESTIONS = 5
+
+# Characters of a suffix the array is sorted by. Longer search strings are looked up by their first characters and
+# the matches checked in full, which keeps the sort keys built while loading small whatever the length of the names.
+SORT_LENGTH = 32
+
+# Seconds between two checks of an index for rows changed without its receivers.
+TYPEAHEAD_CHECK_INTERVAL = getattr(settings, 'TYPEAHEAD_CHECK_INTERVAL', 5)
+
+
+def _sort_key(lowered, suffix):
+    pk, offset = suffix
+    return lowered[pk][offset:offset + SORT_LENGTH], pk
+
+
+class TypeaheadIndex:
+    """A suffix array over entity names, with the attributes used to filter the suggestions of each entity."""
+
+    def __init__(self, load_rows, version):
+        """load_rows(pks=None) yields (pk, name, attributes) for every entity, or for those with the given pks,
+        version names the DataVersion of the rows."""
+
+        self._load_rows = load_rows
+        self.version = version
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loaded_version = None
+        # The version that replaced each version, kept for the changes applied before the change they follow.
+        self._next_versions = {}
+        self._checked_at = 0
+        self._checking = False
+        self._names = {}
+        self._lowered = {}
+        self._attributes = {}
+        self._starts = []
+        self._suffixes = []
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def load(self, version=None):
+        """Replaces the content of the index with every entity in the database."""
+
+        if version is None:
+            # Read before the rows, so that rows written meanwhile come with a newer version and are loaded again.
+            version = DataVersion.current(self.version)
+        names = {}
+        lowered = {}
+        attributes = {}
+        for pk, name, entity_attributes in self._load_rows():
+            names[pk] = name or ''
+            lowered[pk] = names[pk].lower()
+            attributes[pk] = entity_attributes
+
+        sort_key = functools.partial(_sort_key, lowered)
+        starts = sorted(((pk, 0) for pk in lowered), key=sort_key)
+        suffixes = sorted(((pk, offset) for pk, name in lowered.items() for offset in range(len(name))), key=sort_key)
+        with self._lock:
+            self._names, self._lowered, self._attributes = names, lowered, attributes
+            self._starts, self._suffixes = starts, suffixes
+            self._loaded_version = version
+            self._next_versions = {}
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+    def reset(self):
+        """Discards the index, it is loaded again on the next lookup."""
+
+        with self._lock:
+            self._loaded = False
+            self._loaded_version = None
+            self._next_versions = {}
+            self._names, self._lowered, self._attributes = {}, {}, {}
+            self._starts, self._suffixes = [], []
+
+    def apply(self, pks, previous, version):
+        """Replaces the entities with the given pks by their rows in the database, once a transaction writing them
+        committed and replaced the data version of the rows from previous to version."""
+
+        if not self._loaded:
+            return
+        rows = list(self._load_rows(pks)) if pks else []
+        with self._lock:
+            if not self._loaded:
+                return
+            for pk in pks:
+                self._remove(pk)
+            for pk, name, attributes in rows:
+                self._insert(pk, name or '', attributes)
+            # Transactions of other threads may commit their changes in another order than their versions.
+            self._next_versions[previous] = version
+            while self._loaded_version in self._next_versions:
+                self._loaded_version = self._next_versions.pop(self._loaded_version)
+
+    def check(self):
+        """Loads the index again when its rows were changed without its receivers since it was loaded."""
+
+        version = DataVersion.current(self.version)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if not self._loaded or version == self._loaded_version:
+                return
+        self.load(version)
+
+    def search(self, searched, limit=SUGGESTIONS, **criteria):
+        """Returns up to limit {'id', 'name'} dicts whose name contains the search string, case-insensitively, and
+        whose attributes equal the given criteria. Names starting with the search string come first, in alphabetical
+        order, then the names containing it, by the text from where they contain it."""
+
+        term = searched.lower()
+        if not term:
+            return []
+
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            found = []
+            seen = set()
+            for suffixes in (self._starts, self._suffixes):
+                for pk in self._scan(suffixes, term):
+                    if len(found) == limit:
+                        break
+                    if pk not in seen and self._matches(pk, criteria):
+                        seen.add(pk)
+                        found.append(pk)
+                if len(found) == limit:
+                    break
+            results = [{'id': pk, 'name': self._names[pk]} for pk in found]
+        self._check_later()
+        return results
+
+    def _check_later(self):
+        """Starts a check in a background thread, unless one ran in the last TYPEAHEAD_CHECK_INTERVAL seconds."""
+
+        with self._lock:
+            if self._checking or time.monotonic() - self._checked_at < TYPEAHEAD_CHECK_INTERVAL:
+                return
+            self._checking = True
+        threading.Thread(target=self._check_in_background, name='typeahead-check', daemon=True).start()
+
+    def _check_in_background(self):
+        try:
+            self.check()
+        except Exception:
+            logger.warning("Checking the %s typeahead failed", self.version, exc_info=True)
+        finally:
+            self._checking = False
+            connection.close()
+
+    def _position(self, suffixes, key):
+        """Returns the position of the first suffix not sorted before key."""
+
+        low, high = 0, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            if _sort_key(self._lowered, suffixes[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _insert(self, pk, name, attributes):
+        self._names[pk] = name
+        self._lowered[pk] = name.lower()
+        self._attributes[pk] = attributes
+        for suffixes, offsets in ((self._starts, [0]), (self._suffixes, range(len(name)))):
+            for offset in offsets:
+                suffix = (pk, offset)
+                suffixes.insert(self._position(suffixes, _sort_key(self._lowered, suffix)), suffix)
+
+    def _remove(self, pk):
+        if pk not in self._lowered:
+            return
+        for suffixes, offsets in ((self._starts, [0]), (self._suffixes, range(len(self._lowered[pk])))):
+            for offset in offsets:
+                suffix = (pk, offset)
+                # The suffixes of a name sharing their sort key are next to each other, in no particular order.
+                position = self._position(suffixes, _sort_key(self._lowered, suffix))
+                while suffixes[position] != suffix:
+                    position += 1
+                del suffixes[position]
+        del self._names[pk], self._lowered[pk], self._attributes[pk]
+
+    def _scan(self, suffixes, term):
+        """Yields the pk of every suffix starting with term, in the order of the array."""
+
+        key = term[:SORT_LENGTH]
+        low, high = 0, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(suffixes[middle], len(key)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        for position in range(low, len(suffixes)):
+            pk, offset = suffixes[position]
+            if not self._lowered[pk].startswith(key, offset):
+                return
+            if self._lowered[pk].startswith(term, offset):
+                yield pk
+
+    def _key(self, suffix, length):
+        pk, offset = suffix
+        return self._lowered[pk][offset:offset + length]
+
+    def _matches(self, pk, criteria):
+        attributes = self._attributes[pk]
+        return all(attributes.get(key) == value for key, value in criteria.items())
+
+
+def _company_rows(pks=None):
+    companies = Company.objects.all() if pks is None else Company.objects.filter(pk__in=pks)
+    rows = companies.values_list('id', 'name', 'is_archived', 'is_investor', 'is_portfolio_company')
+    for pk, name, is_archived, is_investor, is_portfolio_company in rows:
+        yield pk, name, {'is_archived': is_archived, 'is_investor': is_investor,
+                         'is_portfolio_company': is_portfolio_company}
+
+
+def _individual_rows(pks=None):
+    individuals = Individual.objects.all() if pks is None else Individual.objects.filter(pk__in=pks)
+    rows = individuals.with_roles().values_list('id', 'name', 'is_archived', 'is_founder', 'is_investor')
+    for pk, name, is_archived, is_founder, is_investor in rows:
+        yield pk, name, {'is_archived': is_archived, 'is_founder': is_founder, 'is_investor': is_investor}
+
+
+def _programme_rows(pks=None):
+    programmes = Programme.objects.all() if pks is None else Programme.objects.filter(pk__in=pks)
+    for pk, name in programmes.values_list('id', 'name'):
+        yield pk, name, {}
+
+
+company_typeahead = TypeaheadIndex(_company_rows, COMPANIES)
+individual_typeahead = TypeaheadIndex(_individual_rows, INDIVIDUALS)
+programme_typeahead = TypeaheadIndex(_programme_rows, PROGRAMMES)
+
+TYPEAHEADS = [company_typeahead, individual_typeahead, programme_typeahead]
+
+
+def company_criteria(company_filter, is_archived=False):
+    """Translates a company filter of the session (see CompanyQuerySet.with_filter) into search criteria."""
+
+    criteria = {'is_archived': is_archived}
+    company_filter = int(company_filter or 1)
+    if company_filter == 3:
+        criteria['is_investor'] = True
+    elif company_filter == 2:
+        criteria['is_portfolio_company'] = True
+    return criteria
+
+
+def individual_criteria(individual_filter, is_archived=False):
+    """Translates an individual filter of the session (2: founders, 3: investors) into search criteria."""
+
+    criteria = {'is_archived': is_archived}
+    individual_filter = str(individual_filter)
+    if individual_filter == '2':
+        criteria['is_founder'] = True
+    elif individual_filter == '3':
+        criteria['is_investor'] = True
+    return criteria
+
+
+# The typeaheads showing the rows of each model, with the field of a row holding the pk of the entity it changes.
+DEPENDENT_TYPEAHEADS = {
+    Company: [(company_typeahead, 'pk')],
+    InvestorCompany: [(company_typeahead, 'company_id')],
+    Portfolio_Company: [(company_typeahead, 'parent_company_id')],
+    Individual: [(individual_typeahead, 'pk')],
+    Founder: [(individual_typeahead, 'individualFounder_id')],
+    Investor: [(company_typeahead, 'company_id'), (individual_typeahead, 'individual_id')],
+    Programme: [(programme_typeahead, 'pk')],
+}
+
+
+@receiver(signals.post_save, sender=Programme)
+@receiver(signals.post_delete, sender=Programme)
+def invalidate_programmes(sender, instance, **kwargs):
+    """Replaces the data version of the programmes, as the grid receivers do for the companies and individuals."""
+
+    instance._bumped_versions = {PROGRAMMES: DataVersion.bump(PROGRAMMES)}
+
+
+@receiver(signals.post_save, sender=Company)
+@receiver(signals.post_delete, sender=Company)
+@receiver(signals.post_save, sender=InvestorCompany)
+@receiver(signals.post_delete, sender=InvestorCompany)
+@receiver(signals.post_save, sender=Portfolio_Company)
+@receiver(signals.post_delete, sender=Portfolio_Company)
+@receiver(signals.post_save, sender=Individual)
+@receiver(signals.post_delete, sender=Individual)
+@receiver(signals.post_save, sender=Founder)
+@receiver(signals.post_delete, sender=Founder)
+@receiver(signals.post_save, sender=Investor)
+@receiver(signals.post_delete, sender=Investor)
+@receiver(signals.post_save, sender=Programme)
+@receiver(signals.post_delete, sender=Programme)
+def update_typeaheads(sender, instance, **kwargs):
+    """Applies the entity changed by a saved or deleted row to the typeaheads of this process once the transaction
+    commits, with the data version the write replaced."""
+
+    for typeahead, field in DEPENDENT_TYPEAHEADS[sender]:
+        pk = getattr(instance, field)
+        previous, version = instance._bumped_versions[typeahead.version]
+        transaction.on_commit(functools.partial(typeahead.apply, [] if pk is None else [pk], previous, version))
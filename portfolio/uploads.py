@@ -0,0 +1,234 @@
+"""Chunked, resumable document uploads.
+
+Instead of a single multipart POST, a client uploads a document in three steps:
+
+1. init: POST the name and size of the file and where it goes (see ChunkedUploadForm) to upload_init. This creates a
+   DocumentUpload and an empty temporary file in UPLOAD_TEMP_DIR, and returns the id of the upload.
+2. chunks: PUT the bytes of the file, in order, to upload_chunk, each with a Content-Range header (bytes first-last/size)
+   giving its offset. A chunk is streamed to the end of the temporary file, never held whole in memory. A chunk that does
+   not start where the previous one ended, or is sent while another one is written, is refused with 409 and the offset
+   expected, so after a dropped connection the client asks for the offset (GET upload_chunk) and carries on from there.
+   The bytes of a chunk cut short are kept.
+3. finalize: POST to upload_finalize once every byte is in. The temporary file is moved into the document storage, or
+   dropped when a blob already has the same content, and the Document is created, with its size and SHA-256 checksum.
+   A second finalization of the same upload is refused with 409.
+
+The checksum is computed on the fly: each process keeps the hash of the uploads it received the last chunk of, and
+updates it with every chunk it writes. A process getting a chunk of an upload it has no current hash of, because
+another process took the previous chunk or it restarted since, first hashes the bytes already in the temporary file.
+
+Uploads left unfinished for UPLOAD_EXPIRY seconds are deleted with their temporary file when a new upload starts.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.core.files import File, locks
+from django.db import transaction
+from django.utils import timezone
+
+from portfolio.models import Document, DocumentBlob, DocumentUpload
+from portfolio.models.document_model import content_addressed
+from vcpms import settings
+
+UPLOAD_TEMP_DIR = getattr(settings, 'UPLOAD_TEMP_DIR', os.path.join(settings.BASE_DIR, 'uploads'))
+
+# Size of the chunks clients are asked to send, and of the largest chunk accepted
+UPLOAD_CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024)
+UPLOAD_MAX_CHUNK_SIZE = getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024)
+
+# Seconds after which an unfinished upload is deleted
+UPLOAD_EXPIRY = getattr(settings, 'UPLOAD_EXPIRY', 24 * 60 * 60)
+
+# Bytes read from the request or the temporary file at a time
+READ_SIZE = 64 * 1024
+
+# Number of uploads a process keeps the running hash of
+KEPT_HASHES = 100
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+_hashes = OrderedDict()
+_hashes_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """A chunk or a finalization refused, with the HTTP status to answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _UploadedFile(File):
+    """The complete temporary file of an upload, which the file system storage moves into place rather than copies."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def temp_path(upload):
+    """Returns the path of the temporary file holding the chunks of an upload received so far."""
+
+    return os.path.join(UPLOAD_TEMP_DIR, f'{upload.upload_id}.part')
+
+
+def parse_content_range(header, size):
+    """Returns the offset and the length of the chunk of a file of size bytes given by a Content-Range header."""
+
+    match = _CONTENT_RANGE.match(header.strip())
+    if match is None:
+        raise UploadError("A chunk needs a Content-Range header: bytes first-last/size.")
+    first, last, total = (int(group) for group in match.groups())
+    if total != size:
+        raise UploadError(f"The file is {size} bytes long, not {total}.")
+    if last < first or last >= size:
+        raise UploadError(f"bytes {first}-{last} are not in a file of {size} bytes.", status=416)
+    return first, last - first + 1
+
+
+def _forget_hash(upload_id):
+    with _hashes_lock:
+        _hashes.pop(upload_id, None)
+
+
+def _hash_of(upload):
+    """Returns the SHA-256 of the bytes of an upload received so far, hashing its temporary file when this process does
+    not have it already."""
+
+    with _hashes_lock:
+        offset, sha256 = _hashes.pop(upload.upload_id, (None, None))
+    if offset == upload.received:
+        return sha256
+    sha256 = hashlib.sha256()
+    with open(temp_path(upload), 'rb') as file:
+        remaining = upload.received
+        while remaining > 0:
+            data = file.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            sha256.update(data)
+            remaining -= len(data)
+    return sha256
+
+
+def _keep_hash(upload, sha256):
+    with _hashes_lock:
+        _hashes[upload.upload_id] = (upload.received, sha256)
+        while len(_hashes) > KEPT_HASHES:
+            _hashes.popitem(last=False)
+
+
+def purge_stale_uploads():
+    """Deletes the uploads left unfinished for UPLOAD_EXPIRY seconds, and their temporary files."""
+
+    for upload in DocumentUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=UPLOAD_EXPIRY)):
+        abort(upload)
+
+
+def start(upload):
+    """Saves a new upload and creates its empty temporary file."""
+
+    purge_stale_uploads()
+    os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+    upload.save()
+    open(temp_path(upload), 'wb').close()
+    _keep_hash(upload, hashlib.sha256())
+    return upload
+
+
+def write_chunk(upload, stream, content_range):
+    """Appends the chunk of an upload read from stream, whose offset and length are given by a Content-Range header, to
+    its temporary file. Returns the upload, with the offset of the next chunk in received.
+
+    The chunk is written under an exclusive lock of the temporary file, outside any transaction, and the offset is then
+    moved past it only if it still is where the chunk starts: of two requests sending a chunk at once, the second is
+    refused with 409."""
+
+    first, length = parse_content_range(content_range, upload.size)
+    if length > UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks are at most {UPLOAD_MAX_CHUNK_SIZE} bytes long.", status=413)
+    with open(temp_path(upload), 'r+b') as file:
+        if not locks.lock(file, locks.LOCK_EX | locks.LOCK_NB):
+            raise UploadError("Another chunk of the file is being written.", status=409)
+        try:
+            upload.refresh_from_db(fields=['received'])
+            if first != upload.received:
+                raise UploadError(f"The next chunk starts at byte {upload.received}.", status=409)
+            sha256 = _hash_of(upload)
+            written = 0
+            # Drops the bytes of a chunk written after the offset was last saved.
+            file.truncate(first)
+            file.seek(first)
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                file.write(data)
+                sha256.update(data)
+                written += len(data)
+            file.flush()
+            moved = DocumentUpload.objects.filter(upload_id=upload.upload_id, received=first).update(
+                received=first + written, updated_at=timezone.now())
+            if not moved:
+                raise UploadError("Another chunk of the file was written meanwhile.", status=409)
+            upload.received = first + written
+            _keep_hash(upload, sha256)
+        finally:
+            locks.unlock(file)
+    if written < length:
+        raise UploadError(f"The chunk was cut short, the next chunk starts at byte {upload.received}.")
+    return upload
+
+
+def finalize(upload, checksum=''):
+    """Creates the Document of a complete upload, moving its temporary file into the document storage, and deletes the
+    upload. Raises UploadError when bytes are missing, or when a checksum is given and the file does not match it, in
+    which case the upload is deleted.
+
+    The upload is claimed by deleting its row in the transaction creating the Document: of two requests finalizing it
+    at once, only the one deleting it creates a Document, the other is refused with 409."""
+
+    if not upload.complete:
+        raise UploadError(f"{upload.size - upload.received} bytes of the file are missing.", status=409)
+    try:
+        digest = _hash_of(upload).hexdigest()
+    except FileNotFoundError:
+        raise UploadError("The upload is finalized already.", status=409)
+    if checksum and checksum.lower() != digest:
+        abort(upload)
+        raise UploadError("The file received does not match its checksum, it must be uploaded again.", status=422)
+    document = Document(file_name=upload.file_name, file_type=upload.file_name.split(".")[-1], file_size=upload.size,
+                        checksum=digest, is_private=upload.is_private, company_id=upload.company_id,
+                        individual_id=upload.individual_id, programme_id=upload.programme_id)
+    with transaction.atomic():
+        if not DocumentUpload.objects.filter(upload_id=upload.upload_id, received=upload.size).delete()[0]:
+            raise UploadError("The upload is finalized already.", status=409)
+        with open(temp_path(upload), 'rb') as file:
+            if content_addressed():
+                # The file was hashed chunk by chunk, the blob is found or stored without reading it again.
+                document.blob = DocumentBlob.store(_UploadedFile(file, name=upload.file_name), digest)
+                document.file = document.blob.file.name
+            else:
+                document.file = _UploadedFile(file, name=upload.file_name)
+            document.save()
+    _discard(upload)
+    return document
+
+
+def _discard(upload):
+    _forget_hash(upload.upload_id)
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def abort(upload):
+    """Deletes an upload and its temporary file."""
+
+    _discard(upload)
+    upload.delete()
@@ -3,6 +3,7 @@ from .auth_views import *
 from .contract_right_views import *
 from .dashboard_views import *
 from .document_views import *
+from .upload_views import *
 from .founder_views import *
 from .individual_views import *
 from .investment_views import *
@@ -10,3 +11,9 @@ from .permission_views import *
 from .programme_views import *
 from .settings_views import *
 from .investor_individual_views import *
+from .export_views import *
+from .import_views import *
+from .metrics_views import *
+from .slow_query_views import *
+from .profiling_views import *
+from .template_report_views import *
@@ -1,11 +1,13 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator, EmptyPage
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
 
-from portfolio.models import Company, Individual, Portfolio_Company, InvestorCompany, Founder, Investor
+from portfolio.models import Company, Individual
+from portfolio.pagination import KeysetPaginator, InvalidCursor
+from portfolio.typeahead import company_typeahead, individual_typeahead, company_criteria, individual_criteria
+from vcpms import settings
 
 """Archive views"""
 
@@ -14,22 +16,8 @@ from portfolio.models import Company, Individual, Portfolio_Company, InvestorCom
 def archive(request):
     """This is the archive page. ONLY VIEWED BY ADMINS"""
     if request.user.is_staff:
-        company_page_number = request.GET.get('page1', 1)
-        individual_page_number = request.GET.get('page2', 1)
-
-        companies = Company.objects.filter(is_archived=True).order_by('id')
-        individuals = Individual.objects.filter(is_archived=True).order_by('id')
-
-        companies_paginator = Paginator(companies, 5)
-        individuals_paginator = Paginator(individuals, 5)
-
-        try:
-            companies_page = companies_paginator.page(company_page_number)
-            individuals_page = individuals_paginator.page(individual_page_number)
-
-        except EmptyPage:
-            companies_page = []
-            individuals_page = []
+        companies_page = _page_or_first(archived_companies(request), request.GET.get('company_cursor'))
+        individuals_page = _page_or_first(archived_individuals(request), request.GET.get('individual_cursor'))
 
         context = {
             "companies": companies_page,
@@ -55,34 +43,15 @@ def archive_search(request):
             if searched == "":
                 response = []
             else:
-                if request.session['archived_company_filter'] == '3':
-                    investor_companies = InvestorCompany.objects.all()
-                    company_search_result = Company.objects.filter(id__in=investor_companies.values('company'),
-                                                                   name__contains=searched,
-                                                                   is_archived=True).values().order_by('id')
-                elif request.session['archived_company_filter'] == '2':
-                    company_search_result = Portfolio_Company.objects.filter(parent_company__name__contains=searched,
-                                                                             is_archived=True).values().order_by('id')
-                else:
-                    company_search_result = Company.objects.filter(name__contains=searched,
-                                                                   is_archived=True).values().order_by('id')
-
-                if request.session['archived_individual_filter'] == '2':
-                    founder_individuals = Founder.objects.all()
-                    individual_search_result = Individual.objects.filter(
-                        id__in=founder_individuals.values('individualFounder'), name__contains=searched,
-                        is_archived=True).values().order_by('id')
-                elif request.session['archived_individual_filter'] == '3':
-                    individual_search_result = Investor.objects.filter(individual__name__contains=searched,
-                                                                       is_archived=True).values().order_by(
-                        'id')
-                else:
-                    individual_search_result = Individual.objects.filter(name__contains=searched,
-                                                                         is_archived=True).values().order_by('id')
+                company_search_result = company_typeahead.search(
+                    searched, limit=4, **company_criteria(request.session['archived_company_filter'], is_archived=True))
+                individual_search_result = individual_typeahead.search(
+                    searched, limit=4,
+                    **individual_criteria(request.session['archived_individual_filter'], is_archived=True))
                 response.append(
-                    ("Companies", list(company_search_result[:4]), {'destination_url': 'portfolio_company'}))
+                    ("Companies", company_search_result, {'destination_url': 'portfolio_company'}))
                 response.append(
-                    ("Individuals", list(individual_search_result[:4]), {'destination_url': 'individual_profile'}))
+                    ("Individuals", individual_search_result, {'destination_url': 'individual_profile'}))
 
             search_results_table_html = render_to_string('partials/search/search_results_table.html', {
                 'search_results': response, 'searched': searched, "destination_url": "portfolio_company"})
@@ -100,30 +69,13 @@ def change_archived_company_filter(request):
     if request.user.is_staff:
         if request.method == "GET":
             filter_number = request.GET['filter_number']
-            page_number = request.GET.get('page1', 1)
             if filter_number:
                 request.session['archived_company_filter'] = filter_number
             else:
                 request.session['archived_company_filter'] = 1
 
-            if request.session['archived_company_filter'] == '3':
-                investor_companies = InvestorCompany.objects.all()
-                result = Company.objects.filter(id__in=investor_companies.values('company'), is_archived=True).order_by(
-                    'id')
-            elif request.session['archived_company_filter'] == '2':
-                result = Portfolio_Company.objects.filter(parent_company__is_archived=True).order_by('id')
-            else:
-                result = Company.objects.filter(is_archived=True).order_by('id')
-
-            paginator = Paginator(result, 6)
-
-            try:
-                companies_page = paginator.page(page_number)
-            except EmptyPage:
-                companies_page = []
-
             context = {
-                "companies": companies_page,
+                "companies": _page_or_first(archived_companies(request), request.GET.get('company_cursor')),
             }
 
             archived_companies_table_html = render_to_string('archive/archived_companies_table.html', context, request)
@@ -138,32 +90,13 @@ def change_archived_individual_filter(request):
     if request.user.is_staff:
         if request.method == "GET":
             filter_number = request.GET['filter_number']
-            page_number = request.GET.get('page2', 1)
             if filter_number:
                 request.session['archived_individual_filter'] = filter_number
             else:
                 request.session['archived_individual_filter'] = 1
 
-            if request.session['archived_individual_filter'] == '2':
-                founder_individuals = Founder.objects.all()
-                result = Individual.objects.filter(id__in=founder_individuals.values('individualFounder'),
-                                                   is_archived=True).order_by('id')
-            elif request.session['archived_individual_filter'] == '3':
-                all_investors = Investor.objects.all()
-                result = Individual.objects.filter(id__in=all_investors.values('individual'),
-                                                   is_archived=True).order_by('id')
-            else:
-                result = Individual.objects.filter(is_archived=True).values().order_by('id')
-
-            paginator = Paginator(result, 6)
-
-            try:
-                individuals_page = paginator.page(page_number)
-            except EmptyPage:
-                individuals_page = []
-
             context = {
-                "individuals": individuals_page,
+                "individuals": _page_or_first(archived_individuals(request), request.GET.get('individual_cursor')),
             }
 
             archived_individuals_table_html = render_to_string('archive/archived_individuals_table.html', context,
@@ -172,3 +105,53 @@ def change_archived_individual_filter(request):
             return HttpResponse(archived_individuals_table_html)
     else:
         return redirect('logout')
+
+
+def archived_companies(request):
+    """Returns the archived companies of the session filter."""
+
+    return Company.objects.with_filter(request.session['archived_company_filter']).filter(is_archived=True)
+
+
+def archived_individuals(request):
+    """Returns the archived individuals of the session filter."""
+
+    return Individual.objects.with_filter(request.session['archived_individual_filter']) \
+        .filter(is_archived=True).with_roles()
+
+
+def _page_or_first(object_list, cursor):
+    paginator = KeysetPaginator(object_list, settings.ITEM_ON_PAGE)
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor:
+        return paginator.page()
+
+
+def _next_page(request, object_list, template_name, context_name):
+    try:
+        page = KeysetPaginator(object_list, settings.ITEM_ON_PAGE).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    response = HttpResponse(render_to_string(template_name, {context_name: page}, request))
+    response['X-Next-Cursor'] = page.next_cursor or ''
+    return response
+
+
+@login_required
+def archived_companies_next_page(request):
+    """Returns the archived companies following a cursor, for the "Load more" button and infinite scroll"""
+
+    if not request.user.is_staff:
+        return redirect('logout')
+    return _next_page(request, archived_companies(request), 'archive/archived_company_page_items.html', "companies")
+
+
+@login_required
+def archived_individuals_next_page(request):
+    """Returns the archived individuals following a cursor, for the "Load more" button and infinite scroll"""
+
+    if not request.user.is_staff:
+        return redirect('logout')
+    return _next_page(request, archived_individuals(request), 'archive/archived_individual_page_items.html',
+                      "individuals")
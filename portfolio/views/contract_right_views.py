@@ -6,10 +6,11 @@ from django.views.generic import ListView, CreateView, DeleteView
 
 from portfolio.forms import ContractRightForm
 from portfolio.models.investment_model import ContractRight, Investment
+from portfolio.views.mixins import KeysetPaginationMixin
 from vcpms import settings
 
 
-class ContractRightsListView(LoginRequiredMixin, ListView):
+class ContractRightsListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     template_name = 'investment/contract_rights/contract_right_list.html'
     paginate_by = settings.ITEM_ON_PAGE
     context_object_name = 'contract_rights'
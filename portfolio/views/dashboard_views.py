@@ -1,17 +1,20 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core.paginator import Paginator, EmptyPage
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views.generic import ListView
 
 from portfolio.forms.company_form import CompanyCreateForm
-from portfolio.models import Company, Programme, Investment, InvestorCompany, Portfolio_Company, Document, Founder, \
-    Individual
-from portfolio.models.investor_model import Investor
+from portfolio.fragment_cache import cached_fragment, COMPANIES
+from portfolio.loaders import CompanyPageLoader
+from portfolio.models import Company
+from portfolio.pagination import KeysetPaginator, InvalidCursor
+from portfolio.search import company_index
+from portfolio.typeahead import company_typeahead, company_criteria
 from django.template import RequestContext
+from vcpms import settings
 
 
 # Create your views here.
@@ -20,23 +23,16 @@ def dashboard(request):
     """The main dashboard page of the website."""
 
     # Data for the each company will be listed here.
-    page_number = request.GET.get('page', 1)
-    # print(type(request.session.get('company_filter')))
-
-    if int(request.session['company_filter']) == 3:
-        investors = Investor.objects.all()
-        companies = Company.objects.filter(id__in=investors.values('company'), is_archived=False).order_by('id')
-    elif int(request.session['company_filter']) == 2:
-        companies = Company.objects.filter(parent_company__parent_company__is_archived=False).order_by('id')
-    else:
-        companies = Company.objects.filter(is_archived=False).order_by('id')
+    cursor = request.GET.get('cursor')
+
+    companies = Company.objects.with_filter(request.session['company_filter']).filter(is_archived=False)
 
-    paginator = Paginator(companies, 6)
+    paginator = KeysetPaginator(companies, settings.ITEM_ON_PAGE)
 
     try:
-        companies_page = paginator.page(page_number)
-    except EmptyPage:
-        companies_page = []
+        companies_page = paginator.page(cursor)
+    except InvalidCursor:
+        companies_page = paginator.page()
 
     context = {
         "companies": companies_page,
@@ -57,18 +53,7 @@ def searchcomp(request):
         if searched == "":
             response = []
         else:
-            # search_result = Company.objects.filter(name__contains=searched, is_archived=False).values()[:5]
-            if request.session['company_filter'] == 3:
-                # investor_companies = InvestorCompany.objects.all()
-                # search_result = Company.objects.filter(id__in=investor_companies.values('company'), is_archived=False, name__contains=searched)[:5]
-                investors = Investor.objects.all()
-                search_result = Company.objects.filter(id__in=investors.values('company'), is_archived=False,
-                                                       name__contains=searched).order_by('id')[:5]
-            elif request.session['company_filter'] == 2:
-                search_result = Company.objects.filter(parent_company__parent_company__is_archived=False,
-                                                       parent_company__parent_company__name__contains=searched)[:5]
-            else:
-                search_result = Company.objects.filter(name__contains=searched, is_archived=False).values()[:5]
+            search_result = company_typeahead.search(searched, **company_criteria(request.session['company_filter']))
             response.append(("Companies", list(search_result), {'destination_url': 'portfolio_company'}))
 
         search_results_table_html = render_to_string('partials/search/search_results_table.html', {
@@ -77,30 +62,15 @@ def searchcomp(request):
         return HttpResponse(search_results_table_html)
 
     elif request.method == "POST":
-        page_number = request.POST.get('page', 1)
         searched = request.POST['searchresult']
         if searched == "":
             return redirect('dashboard')
         else:
-            if request.session['company_filter'] == 3:
-                investor_companies = InvestorCompany.objects.all()
-                companies = Company.objects.filter(id__in=investor_companies.values('company'), is_archived=False,
-                                                   name__contains=searched).order_by('id')[:5]
-            elif request.session['company_filter'] == 2:
-                companies = Company.objects.filter(parent_company__parent_company__is_archived=False,
-                                                   parent_company__parent_company__name__contains=searched).order_by(
-                    'id')[:5]
-            else:
-                companies = Company.objects.filter(name__contains=searched, is_archived=False).values().order_by('id')[
-                            :5]
-
-        paginator = Paginator(companies, 6)
-        try:
-            companies_page = paginator.page(page_number)
-        except EmptyPage:
-            companies_page = []
+            # The best ranked matches only, without counting them: the results have no further pages.
+            companies = Company.objects.with_filter(request.session['company_filter']).filter(is_archived=False)
+            companies = company_index.search(companies, searched)[:5]
 
-        return render(request, 'company/main_dashboard.html', {"companies": companies_page, "searched": searched})
+        return render(request, 'company/main_dashboard.html', {"companies": list(companies), "searched": searched})
 
 
 # @login_required
@@ -130,41 +100,19 @@ class CompanyDetailView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     paginate_by = 10
 
     def dispatch(self, request, company_id, *args, **kwargs):
-        self.company = Company.objects.get(id=company_id)
+        self.loader = CompanyPageLoader(company_id)
+        self.company = self.loader.company
         return super().dispatch(request, company_id, *args, **kwargs)
 
     def get_context_data(self, *, object_list=None, **kwargs):
-        # print(((not self.company.is_archived) or (self.company.is_archived and self.request.user.is_staff)))
         context = super().get_context_data(**kwargs)
-        context['company'] = self.company
-        context['is_investor_company'] = Investor.objects.filter(company=self.company).exists()
-        context['is_portfolio_company'] = Portfolio_Company.objects.filter(parent_company=self.company).exists()
+        context.update(self.loader.get_context_data())
         context['counter'] = [1, 2, 3]
         context['contract_counter'] = [1, 2, 3, 4]
-        programmes = Programme.objects.filter(participants__name=self.company.name)
-        context['programmes'] = programmes
-        context['documents'] = Document.objects.filter(company=self.company)
-        founders = Founder.objects.all()
-        context["founders"] = Individual.objects.filter(id__in=founders.values('individualFounder'), is_archived=False)
-        investments = Investment.objects.filter(startup=self.company.id)
-        investors = Investor.objects.filter(id__in=investments.values('investor'))
-        context['company_investors'] = Company.objects.filter(id__in=investors.values('company'))
-        context['individual_investors'] = Individual.objects.filter(id__in=investors.values('individual'))
-        coaches_mentors = Individual.objects.none()
-        for programme in programmes:
-            coaches_mentors = coaches_mentors.union(programme.coaches_mentors.all())
-        context['coaches_mentors'] = coaches_mentors
-
         return context
 
     def get_queryset(self):
-        self.investments = []
-        if Investment.objects.filter(startup__parent_company=self.company).exists():
-            self.investments = Investment.objects.filter(startup__parent_company=self.company).order_by('id')
-            print(len(self.investments))
-        elif Investment.objects.filter(investor__company=self.company).exists():
-            self.investments = Investment.objects.filter(investor__company=self.company).order_by('id')
-        return self.investments
+        return self.loader.investments
 
     def test_func(self):
         return (not self.company.is_archived) or (self.company.is_archived and self.request.user.is_staff)
@@ -236,35 +184,39 @@ def unarchive_company(request, company_id):
     return redirect('archive_page')
 
 
+def company_grid(request, cursor):
+    """Renders the page of the company grid following the cursor, reusing the cached rendering when possible"""
+
+    company_filter = request.session['company_filter']
+    layout = int(request.session["company_layout"])
+
+    def render_grid():
+        result = Company.objects.with_filter(company_filter).filter(is_archived=False)
+        paginator = KeysetPaginator(result, settings.ITEM_ON_PAGE)
+        try:
+            companies_page = paginator.page(cursor)
+        except InvalidCursor:
+            companies_page = paginator.page()
+        return render_to_string('partials/company/company_grid.html',
+                                {"companies": companies_page, "async_company_layout": layout}, request)
+
+    return cached_fragment(COMPANIES, (company_filter, layout, cursor), render_grid)
+
+
 @login_required
 def change_company_layout(request):
     """This view handles the change of the layout of the company dashboard"""
 
     if request.method == "GET":
         layout_number = request.GET['layout_number']
-        page_number = request.GET.get('page', 1)
+        cursor = request.GET.get('cursor')
         if layout_number:
             request.session['company_layout'] = layout_number
         else:
             request.session['company_layout'] = 1
 
-        if request.session['company_filter'] == '3':
-            investors = Investor.objects.all()
-            result = Company.objects.filter(id__in=investors.values('company'), is_archived=False).order_by('id')
-        elif request.session['company_filter'] == '2':
-            result = Company.objects.filter(parent_company__parent_company__is_archived=False).order_by('id')
-        else:
-            result = Company.objects.filter(is_archived=False).values().order_by('id')
-
-        paginator = Paginator(result, 6)
-
-        try:
-            companies_page = paginator.page(page_number)
-        except EmptyPage:
-            companies_page = []
-
         context = {
-            "companies": companies_page,
+            "grid": company_grid(request, cursor),
             "search_url": reverse('company_search_result'),
             "placeholder": "Search for a Company",
             "async_company_layout": int(request.session["company_layout"]),
@@ -282,29 +234,14 @@ def change_company_filter(request):
 
     if request.method == "GET":
         filter_number = request.GET['filter_number']
-        page_number = request.GET.get('page', 1)
+        cursor = request.GET.get('cursor')
         if filter_number:
             request.session['company_filter'] = filter_number
         else:
             request.session['company_filter'] = 1
 
-        if request.session['company_filter'] == '3':
-            investors = Investor.objects.all()
-            result = Company.objects.filter(id__in=investors.values('company'), is_archived=False).order_by('id')
-        elif request.session['company_filter'] == '2':
-            result = Company.objects.filter(parent_company__parent_company__is_archived=False).order_by('id')
-        elif request.session['company_filter'] == '1':
-            result = Company.objects.filter(is_archived=False).values().order_by('id')
-
-        paginator = Paginator(result, 6)
-
-        try:
-            companies_page = paginator.page(page_number)
-        except EmptyPage:
-            companies_page = []
-
         context = {
-            "companies": companies_page,
+            "grid": company_grid(request, cursor),
             "search_url": reverse('company_search_result'),
             "placeholder": "Search for a Company",
             "async_company_layout": int(request.session["company_layout"]),
@@ -314,3 +251,27 @@ def change_company_filter(request):
                                                      request)
 
         return HttpResponse(search_results_table_html)
+
+
+@login_required
+def companies_next_page(request):
+    """This view returns the dashboard companies following a cursor, for the "Load more" button and infinite scroll"""
+
+    companies = Company.objects.with_filter(request.session['company_filter']).filter(is_archived=False)
+    paginator = KeysetPaginator(companies, settings.ITEM_ON_PAGE)
+
+    try:
+        companies_page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    context = {
+        "companies": companies_page,
+        "async_company_layout": int(request.session["company_layout"]),
+    }
+
+    response = HttpResponse(render_to_string('partials/company/company_page_items.html', context, request))
+    response['X-Next-Cursor'] = companies_page.next_cursor or ''
+    if request.GET.get('with_total'):
+        response['X-Approximate-Total'] = companies_page.approximate_count
+    return response
@@ -1,9 +1,9 @@
-import os
-
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, Http404
-from django.shortcuts import render, redirect
+from django.http import Http404
+from django.shortcuts import render, redirect, get_object_or_404
 
+from portfolio.file_delivery import deliver
+from portfolio.previews import preview_file
 from portfolio.forms import DocumentUploadForm, URLUploadForm
 from portfolio.models import Document, Company, Individual, Programme
 
@@ -120,20 +120,24 @@ def open_url(request, file_id):
     return redirect(document_url)
 
 
-# Download a document from the database.
+# Download a document from the database, streamed in chunks, resumable with Range requests.
 @login_required
 def download_document(request, file_id):
-    document = Document.objects.get(file_id=file_id)
-    file_path = document.file.path
+    document = get_object_or_404(Document, file_id=file_id)
+    return deliver(request, document.file, document.file_name, document.updated_at)
 
-    if os.path.exists(file_path):
-        with open(file_path, "rb") as download_file:
-            response = HttpResponse(download_file.read(), content_type="application/octet-stream")
-            response["Content-Disposition"] = "attachment; filename=" + document.file_name
 
-            return response
-    else:
+# Show the thumbnail or the preview of a document, generated in the background after the upload. A preview not generated
+# yet is queued and not found, without waiting for it.
+@login_required
+def document_preview(request, file_id, size):
+    document = get_object_or_404(Document, file_id=file_id)
+    if document.is_private and not request.user.is_staff:
+        raise Http404
+    preview = preview_file(document, size)
+    if preview is None:
         raise Http404
+    return deliver(request, preview, content_type='image/jpeg', attachment=False)
 
 
 # Change access permissions for a document.
@@ -0,0 +1,21 @@
+from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse, Http404
+from django.shortcuts import redirect
+
+from portfolio.exports import DATASETS, FORMATS, export_lines
+
+"""Export views"""
+
+
+@login_required
+def export_data(request, dataset, export_format):
+    """Streams every investment, company or individual as a CSV or NDJSON download. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        if dataset not in DATASETS or export_format not in FORMATS:
+            raise Http404("Unknown export")
+
+        response = StreamingHttpResponse(export_lines(dataset, export_format), content_type=FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{export_format}"'
+        return response
+    else:
+        return redirect('logout')
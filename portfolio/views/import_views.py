@@ -0,0 +1,26 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+
+from portfolio.forms import PortfolioImportForm
+from portfolio.imports import import_csv
+
+"""Import views"""
+
+
+@login_required
+def import_portfolio(request):
+    """Imports the rows of an uploaded CSV file and shows the rows that could not be imported. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        report = None
+        if request.method == "POST":
+            form = PortfolioImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                lines = (line.decode('utf-8-sig') for line in form.cleaned_data['file'])
+                report = import_csv(form.cleaned_data['kind'], lines)
+                form = PortfolioImportForm()
+        else:
+            form = PortfolioImportForm()
+
+        return render(request, 'import/import_portfolio.html', {"form": form, "report": report})
+    else:
+        return redirect('logout')
@@ -1,17 +1,30 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core.paginator import Paginator, EmptyPage
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views.generic import ListView
 
 from portfolio.forms import IndividualCreateForm, AddressCreateForm, PastExperienceForm
+from portfolio.fragment_cache import cached_fragment, INDIVIDUALS
 from portfolio.models import Individual, ResidentialAddress, Founder, Document, Company
 from portfolio.models.investment_model import Investor, Investment
 from portfolio.models.past_experience_model import PastExperience
+from portfolio.pagination import KeysetPaginator, InvalidCursor
+from portfolio.search import individual_index
+from portfolio.typeahead import individual_typeahead, individual_criteria
 from django.template import RequestContext
+from vcpms import settings
+
+"""
+Return the individuals that are not archived, of the filter of the session, with their roles.
+"""
+
+
+def listed_individuals(request):
+    return Individual.objects.with_filter(request.session['individual_filter']).filter(is_archived=False).with_roles()
+
 
 """
 Search an individual.
@@ -27,7 +40,8 @@ def individual_search(request):
         if (searched == ""):
             response = []
         else:
-            search_result = Individual.objects.filter(name__contains=searched).values()[:5]
+            search_result = individual_typeahead.search(searched,
+                                                        **individual_criteria(request.session['individual_filter']))
             response.append(("Individual", list(search_result), {'destination_url': 'individual_profile'}))
 
         individual_search_results_table_html = render_to_string('partials/search/search_results_table.html', {
@@ -37,34 +51,16 @@ def individual_search(request):
 
 
     elif request.method == "POST":
-        page_number = request.POST.get('page', 1)
         searched = request.POST['searchresult']
 
         if searched == "":
             return redirect('individual_page')
         else:
-            individuals = Individual.objects.filter(name__contains=searched).values()
-            if request.session['individual_filter'] == '2':
-                founder_individuals = Founder.objects.all()
-                individuals = Individual.objects.filter(id__in=founder_individuals.values('individualFounder'),
-                                                        name__contains=searched, is_archived=False).order_by('id')
-            elif request.session['individual_filter'] == '3':
-                investors = Investor.objects.all()
-                individuals = Individual.objects.filter(id__in=investors.values('individual'), name__contains=searched,
-                                                        is_archived=False).order_by('id')
-            else:
-                individuals = Individual.objects.filter(is_archived=False, name__contains=searched).values().order_by(
-                    'id')
-
-        paginator = Paginator(individuals, 6)
-
-        try:
-            individual_page = paginator.page(page_number)
-        except EmptyPage:
-            individual_page = []
+            # The best ranked matches only, without counting them: the results have no further pages.
+            individuals = individual_index.search(listed_individuals(request), searched)[:settings.ITEM_ON_PAGE]
 
         return render(request, 'individual/individual_page.html',
-                      {"individuals": individual_page, "searched": searched})
+                      {"individuals": list(individuals), "searched": searched})
 
     else:
         return HttpResponse("Request method is not a GET")
@@ -113,25 +109,14 @@ Past data to the individual page.
 
 @login_required
 def individual_page(request):
-    page_number = request.GET.get('page', 1)
-    # individuals = Individual.objects.filter(is_archived=False).order_by('id')
-
-    if request.session['individual_filter'] == '2':
-        founder_individuals = Founder.objects.all()
-        individuals = Individual.objects.filter(id__in=founder_individuals.values('individualFounder'),
-                                                is_archived=False).order_by('id')
-    elif request.session['individual_filter'] == '3':
-        investors = Investor.objects.all()
-        individuals = Individual.objects.filter(id__in=investors.values('individual'), is_archived=False).order_by('id')
-    else:
-        individuals = Individual.objects.filter(is_archived=False).values().order_by('id')
+    cursor = request.GET.get('cursor')
 
-    paginator = Paginator(individuals, 6)
+    paginator = KeysetPaginator(listed_individuals(request), settings.ITEM_ON_PAGE)
 
     try:
-        individuals_page = paginator.page(page_number)
-    except EmptyPage:
-        individuals_page = []
+        individuals_page = paginator.page(cursor)
+    except InvalidCursor:
+        individuals_page = paginator.page()
 
     data = {
         'individuals': individuals_page,
@@ -225,7 +210,7 @@ class IndividualProfileListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
 
     def dispatch(self, request, id, *args, **kwargs):
         self.id = id
-        self.individual = Individual.objects.get(id=self.id)
+        self.individual = Individual.objects.with_roles().get(id=self.id)
         return super().dispatch(request, id, *args, **kwargs)
 
     def get_queryset(self):
@@ -276,6 +261,27 @@ def unarchive_individual(request, id):
     return redirect('individual_profile', id=individual.id)
 
 
+"""
+Render the page of the individual grid following a cursor, reusing the cached rendering when possible.
+"""
+
+
+def individual_grid(request, cursor):
+    individual_filter = request.session['individual_filter']
+    layout = int(request.session["individual_layout"])
+
+    def render_grid():
+        paginator = KeysetPaginator(listed_individuals(request), settings.ITEM_ON_PAGE)
+        try:
+            individuals_page = paginator.page(cursor)
+        except InvalidCursor:
+            individuals_page = paginator.page()
+        return render_to_string('partials/individual/individual_grid.html',
+                                {"individuals": individuals_page, "async_individual_layout": layout}, request)
+
+    return cached_fragment(INDIVIDUALS, (individual_filter, layout, cursor), render_grid)
+
+
 """
 Asynchronously filter individuals on the individuals page
 """
@@ -285,31 +291,14 @@ Asynchronously filter individuals on the individuals page
 def change_individual_filter(request):
     if request.method == "GET":
         filter_number = request.GET['filter_number']
-        page_number = request.GET.get('page', 1)
+        cursor = request.GET.get('cursor')
         if filter_number:
             request.session['individual_filter'] = filter_number
         else:
             request.session['individual_filter'] = 1
 
-        if request.session['individual_filter'] == '2':
-            founder_individuals = Founder.objects.all()
-            result = Individual.objects.filter(id__in=founder_individuals.values('individualFounder'),
-                                               is_archived=False).order_by('id')
-        elif request.session['individual_filter'] == '3':
-            investors = Investor.objects.all()
-            result = Individual.objects.filter(id__in=investors.values('individual'), is_archived=False).order_by('id')
-        else:
-            result = Individual.objects.filter(is_archived=False).values().order_by('id')
-
-        paginator = Paginator(result, 6)
-
-        try:
-            individual_page = paginator.page(page_number)
-        except EmptyPage:
-            individual_page = []
-
         context = {
-            "individuals": individual_page,
+            "grid": individual_grid(request, cursor),
             "search_url": reverse('individual_search_result'),
             "placeholder": "Search for a Individual",
             "async_individual_layout": int(request.session["individual_layout"]),
@@ -330,31 +319,14 @@ Update layout of the individual page.
 def change_individual_layout(request):
     if request.method == "GET":
         layout_number = request.GET['layout_number']
-        page_number = request.GET.get('page', 1)
+        cursor = request.GET.get('cursor')
         if layout_number:
             request.session['individual_layout'] = layout_number
         else:
             request.session['individual_layout'] = 1
 
-        if request.session['individual_filter'] == '2':
-            founder_individuals = Founder.objects.all()
-            result = Individual.objects.filter(id__in=founder_individuals.values('individualFounder'),
-                                               is_archived=False).order_by('id')
-        elif request.session['individual_filter'] == '3':
-            investors = Investor.objects.all()
-            result = Individual.objects.filter(id__in=investors.values('individual'), is_archived=False).order_by('id')
-        else:
-            result = Individual.objects.filter(is_archived=False).values().order_by('id')
-
-        paginator = Paginator(result, 6)
-
-        try:
-            individuals_page = paginator.page(page_number)
-        except EmptyPage:
-            individuals_page = []
-
         context = {
-            "individuals": individuals_page,
+            "grid": individual_grid(request, cursor),
             "search_url": reverse('individual_search_result'),
             "placeholder": "Search for a Individual",
             "async_individual_layout": int(request.session["individual_layout"]),
@@ -364,3 +336,29 @@ def change_individual_layout(request):
                                                      request)
 
         return HttpResponse(search_results_table_html)
+
+
+"""
+Return the individuals following a cursor, for the "Load more" button and infinite scroll.
+"""
+
+
+@login_required
+def individuals_next_page(request):
+    paginator = KeysetPaginator(listed_individuals(request), settings.ITEM_ON_PAGE)
+
+    try:
+        individuals_page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    context = {
+        "individuals": individuals_page,
+        "async_individual_layout": int(request.session["individual_layout"]),
+    }
+
+    response = HttpResponse(render_to_string('partials/individual/individual_page_items.html', context, request))
+    response['X-Next-Cursor'] = individuals_page.next_cursor or ''
+    if request.GET.get('with_total'):
+        response['X-Approximate-Total'] = individuals_page.approximate_count
+    return response
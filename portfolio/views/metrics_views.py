@@ -0,0 +1,17 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from django.shortcuts import redirect
+
+from portfolio import metrics as request_metrics
+
+"""Metrics views"""
+
+
+@login_required
+def metrics(request):
+    """The request metrics of every worker process, in the Prometheus text format. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        return HttpResponse(request_metrics.exposition(request_metrics.collect()),
+                            content_type=request_metrics.CONTENT_TYPE)
+    else:
+        return redirect('logout')
@@ -1,6 +1,9 @@
 from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.http import Http404
 from django.shortcuts import redirect
 
+from portfolio.pagination import KeysetPaginator, InvalidCursor
+
 
 class LoginProhibitedMixin:
     """Mixin that redirects when a user is logged in."""
@@ -63,3 +66,23 @@ class FindObjectMixin:
             # return redirect(url,kwargs=self.redirect_when_no_object_found_url_kwargs)
             return redirect(url)
         return super().dispatch(request, id, *args, **kwargs)
+
+
+class KeysetPaginationMixin:
+    """Mixin that paginates a ListView with a KeysetPaginator, on the cursor query parameter rather than a page number.
+
+    The page is in page_obj as with the default paginator. The cursor of the next page is also sent in the X-Next-Cursor
+    header, so that the view rendered with the template of the items of a page answers the "Load more" button."""
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_next()
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        response['X-Next-Cursor'] = context['page_obj'].next_cursor or ''
+        return response
@@ -7,11 +7,11 @@ from django.views.generic import ListView, UpdateView, CreateView, DeleteView
 
 from portfolio.forms import UserCreationForm, CreateGroupForm, EditGroupForm, EditUserForm
 from portfolio.models import User
-from portfolio.views.mixins import FindObjectMixin
+from portfolio.views.mixins import FindObjectMixin, KeysetPaginationMixin
 from vcpms import settings
 
 
-class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class UserListView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'permissions/user_list.html'
     http_method_names = ['get']
     context_object_name = 'users'
@@ -24,7 +24,7 @@ class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return redirect('dashboard')
 
     def get_queryset(self):
-        return User.objects.filter(is_staff=False).order_by('id')
+        return User.objects.filter(is_staff=False).prefetch_related('groups').order_by('id')
 
 
 class UserSignUpFormView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
@@ -174,7 +174,7 @@ class GroupListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     paginate_by = settings.ADMINS_USERS_PER_PAGE
 
     def get_queryset(self):
-        return Group.objects.all().order_by('id')
+        return Group.objects.prefetch_related('permissions').order_by('id')
 
     def test_func(self):
         return self.request.user.is_staff
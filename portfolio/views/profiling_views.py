@@ -0,0 +1,51 @@
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render, redirect
+
+from portfolio import profiling
+
+"""Profiling views"""
+
+
+@login_required
+def profile_list(request):
+    """The requests recently profiled on demand. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        return render(request, 'monitoring/profile_list.html', {
+            'profiles': profiling.recent_profiles(),
+            'parameter': profiling.PROFILE_PARAMETER,
+        })
+    else:
+        return redirect('logout')
+
+
+@login_required
+def profile_detail(request, profile_id):
+    """The hot functions of a profiled request, sorted by the column given in the sort GET parameter. ONLY FOR
+    ADMINS"""
+    if request.user.is_staff:
+        if profiling.profile_path(profile_id) is None:
+            raise Http404("Unknown profile")
+        sort = request.GET.get('sort', 'cumtime')
+        if sort not in profiling.SORT_KEYS:
+            sort = 'cumtime'
+        return render(request, 'monitoring/profile_detail.html', {
+            'profile': profiling.describe(profile_id),
+            'functions': profiling.hot_functions(profile_id, sort),
+            'sort': sort,
+        })
+    else:
+        return redirect('logout')
+
+
+@login_required
+def profile_download(request, profile_id):
+    """Downloads the cProfile stats of a profiled request as a .prof file. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        path = profiling.profile_path(profile_id)
+        if path is None:
+            raise Http404("Unknown profile")
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof',
+                            content_type='application/octet-stream')
+    else:
+        return redirect('logout')
@@ -1,14 +1,19 @@
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator, EmptyPage
 from django.forms import model_to_dict
 from django.http import HttpResponse
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views.generic import TemplateView, CreateView, DeleteView, UpdateView, DetailView, ListView
 
+from portfolio.file_delivery import deliver
 from portfolio.forms import CreateProgrammeForm, EditProgrammeForm
 from portfolio.models import Programme, Document
+from portfolio.search import programme_index
+from portfolio.typeahead import programme_typeahead
+from portfolio.views.mixins import KeysetPaginationMixin
 from vcpms import settings
 
 
@@ -19,7 +24,7 @@ class SearchProgramme(TemplateView):
         searched = request.GET['searchresult']
         search_result = {}
         if searched != "":
-            search_result = Programme.objects.filter(name__contains=searched).values()
+            search_result = programme_typeahead.search(searched)
 
         search_results_table_html = render_to_string('programmes/search/search_results_table.html', {
             'search_results': list(search_result), 'searched': searched})
@@ -32,7 +37,7 @@ class SearchProgramme(TemplateView):
         if searched == "":
             return redirect('programme_list')
 
-        programmes = Programme.objects.filter(name__contains=searched).values().order_by('id')
+        programmes = programme_index.search(Programme.objects.all(), searched).values()
 
         paginator = Paginator(programmes, 6)
         try:
@@ -44,13 +49,13 @@ class SearchProgramme(TemplateView):
                       {"programmes": programmes_page, "searched": searched})
 
 
-class ProgrammeListView(LoginRequiredMixin, ListView):
+class ProgrammeListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     template_name = 'programmes/programme_list_page.html'
     context_object_name = 'programmes'
     paginate_by = settings.ITEM_ON_PAGE
 
     def get_queryset(self):
-        return Programme.objects.all().order_by('id')
+        return Programme.objects.prefetch_related('partners', 'coaches_mentors').order_by('id')
 
 
 class ProgrammeCreateView(LoginRequiredMixin, CreateView):
@@ -105,3 +110,9 @@ class ProgrammeDetailView(LoginRequiredMixin, DetailView):
         context['coaches_mentors'] = instance.coaches_mentors.all()
         context['documents'] = Document.objects.filter(programme=instance)
         return context
+
+
+@login_required
+def programme_cover(request, id):
+    programme = get_object_or_404(Programme, id=id)
+    return deliver(request, programme.cover, attachment=False)
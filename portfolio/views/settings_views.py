@@ -3,9 +3,11 @@ from django.contrib.auth import logout
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 
+from portfolio.file_delivery import deliver
 from portfolio.forms import ChangePasswordForm, ContactDetailsForm, ProfilePictureForm
+from portfolio.models import User
 
 """
 View and Update user settings
@@ -61,6 +63,12 @@ def remove_profile_picture(request):
     return redirect("account_settings")
 
 
+@login_required
+def profile_picture(request, user_id):
+    user = get_object_or_404(User, id=user_id)
+    return deliver(request, user.profile_picture, attachment=False)
+
+
 @login_required
 def change_password(request):
     if request.method == "POST":
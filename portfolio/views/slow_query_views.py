@@ -0,0 +1,19 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+
+from portfolio import slow_queries
+
+"""Slow query views"""
+
+
+@login_required
+def slow_query_report(request):
+    """The statements of the slow query log taking the most time, grouped by fingerprint. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        return render(request, 'monitoring/slow_queries.html', {
+            'offenders': slow_queries.top_offenders(slow_queries.slow_query_log.read()),
+            'threshold_ms': slow_queries.SLOW_QUERY_THRESHOLD * 1000,
+            'sample_rate': slow_queries.SLOW_QUERY_SAMPLE_RATE,
+        })
+    else:
+        return redirect('logout')
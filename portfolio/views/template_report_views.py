@@ -0,0 +1,24 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+
+from portfolio import metrics as request_metrics, template_profiling
+from vcpms import settings
+
+"""Template report views"""
+
+
+@login_required
+def template_report(request):
+    """The render time and SQL queries of every template across requests, sorted by the column given in the sort GET
+    parameter. ONLY FOR ADMINS"""
+    if request.user.is_staff:
+        sort = request.GET.get('sort', 'self')
+        if sort not in template_profiling.COLUMNS:
+            sort = 'self'
+        return render(request, 'monitoring/template_report.html', {
+            'templates': template_profiling.report(request_metrics.collect(), sort),
+            'sort': sort,
+            'enabled': getattr(settings, 'TEMPLATE_PROFILING', False),
+        })
+    else:
+        return redirect('logout')
@@ -0,0 +1,84 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+
+from portfolio import uploads
+from portfolio.forms import ChunkedUploadForm
+from portfolio.models import DocumentUpload
+
+"""Chunked, resumable document uploads, see portfolio.uploads"""
+
+
+def _state(upload):
+    return {
+        'upload_id': str(upload.upload_id),
+        'offset': upload.received,
+        'size': upload.size,
+        'chunk_size': uploads.UPLOAD_CHUNK_SIZE,
+        'chunk_url': reverse('upload_chunk', kwargs={'upload_id': upload.upload_id}),
+        'finalize_url': reverse('upload_finalize', kwargs={'upload_id': upload.upload_id}),
+    }
+
+
+def _error(upload, error):
+    return JsonResponse({'error': str(error), 'offset': upload.received}, status=error.status)
+
+
+# The page showing the documents of the company, individual or programme a document was uploaded to.
+def _document_page(document):
+    if document.company_id:
+        return reverse('portfolio_company', kwargs={'company_id': document.company_id})
+    elif document.individual_id:
+        return reverse('individual_profile', kwargs={'id': document.individual_id})
+    else:
+        return reverse('programme_detail', kwargs={'id': document.programme_id})
+
+
+@login_required
+@require_POST
+def upload_init(request):
+    """Starts the upload of a document in chunks."""
+    form = ChunkedUploadForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    upload = form.save(commit=False)
+    upload.user = request.user
+    uploads.start(upload)
+    return JsonResponse(_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_chunk(request, upload_id):
+    """GET: the offset to resume the upload from. PUT: appends the chunk given by the Content-Range header. DELETE:
+    abandons the upload."""
+    upload = get_object_or_404(DocumentUpload, upload_id=upload_id, user=request.user)
+    if request.method == 'PUT':
+        try:
+            upload = uploads.write_chunk(upload, request, request.META.get('HTTP_CONTENT_RANGE', ''))
+        except uploads.UploadError as error:
+            upload.refresh_from_db()
+            return _error(upload, error)
+    elif request.method == 'DELETE':
+        uploads.abort(upload)
+        return HttpResponse(status=204)
+    return JsonResponse(_state(upload))
+
+
+@login_required
+@require_POST
+def upload_finalize(request, upload_id):
+    """Creates the document of a complete upload. The client can send the SHA-256 of the file in checksum."""
+    upload = get_object_or_404(DocumentUpload, upload_id=upload_id, user=request.user)
+    try:
+        document = uploads.finalize(upload, request.POST.get('checksum', ''))
+    except uploads.UploadError as error:
+        return _error(upload, error)
+    return JsonResponse({
+        'file_id': document.file_id,
+        'file_size': document.file_size,
+        'checksum': document.checksum,
+        'redirect': _document_page(document),
+    }, status=201)
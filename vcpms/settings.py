@@ -45,12 +45,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'portfolio.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'portfolio.middleware.MetricsMiddleware',
+    'portfolio.middleware.SlowQueryLogMiddleware',
+    'portfolio.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'vcpms.urls'
@@ -143,6 +147,85 @@ ITEM_ON_PAGE = 6
 
 ADMINS_USERS_PER_PAGE = 15
 
+# Seconds an approximate listing total is cached by the keyset paginator
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Seconds a rendered grid of companies or individuals is kept. Cached grids are also discarded as soon as the rows
+# they show change.
+FRAGMENT_CACHE_TIMEOUT = 300
+
+# Directory shared by the worker processes, where each writes a snapshot of its request metrics for /metrics to add
+# up. Leave unset when a single process serves the site.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Seconds between two snapshots of the request metrics of a worker process to METRICS_DIR
+METRICS_FLUSH_INTERVAL = 5
+
+# Seconds above which an SQL statement is written to the slow query log
+SLOW_QUERY_THRESHOLD = 0.5
+
+# Fraction of the other SQL statements written to the slow query log, to compare with a typical query
+SLOW_QUERY_SAMPLE_RATE = 0.0
+
+# The slow query log, written to a file per process next to this path, each rotated at SLOW_QUERY_LOG_MAX_BYTES keeping
+# SLOW_QUERY_LOG_BACKUPS old files
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Where the requests profiled on demand by staff users are saved, and how many of them are kept
+PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+PROFILE_KEEP = 50
+
+# Whether every response has a Server-Timing header breaking its duration down (DB, templates, cache, session, view).
+# On by default in DEBUG only, as the header shows the timings to every client. Set the SERVER_TIMING environment
+# variable to 1 or 0 to turn it on or off.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1' if DEBUG else '0') == '1'
+
+# Whether every template render is timed, with the SQL queries it triggers, for the template report. On by default in
+# DEBUG only. Set the TEMPLATE_PROFILING environment variable to 1 or 0 to turn it on or off.
+TEMPLATE_PROFILING = os.environ.get('TEMPLATE_PROFILING', '1' if DEBUG else '0') == '1'
+
+# Where the reports of the management commands run with --profile-memory are saved, and the number of frames
+# tracemalloc keeps per allocation to find the call site in the app
+MEMORY_PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'memory')
+MEMORY_PROFILE_FRAMES = 25
+
+# Whether the files of new documents are stored once by content under media/blobs, shared by every document with the
+# same bytes, rather than under the name of their company, individual or programme. Run the dedupe_documents command
+# to move the files stored before.
+CONTENT_ADDRESSED_DOCUMENTS = True
+
+# Bytes read from a document and sent at a time when it is downloaded
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Where the documents uploaded in chunks are kept until they are complete, the size of the chunks clients are asked to
+# send, the largest chunk accepted and the seconds after which an unfinished upload is deleted
+UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'uploads')
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Who sends documents, profile pictures and programme covers once a view has authorised the request: the worker
+# ('stream'), nginx ('x-accel-redirect') or Apache and lighttpd ('x-sendfile'). Set with the FILE_DELIVERY environment
+# variable, see portfolio/file_delivery.py for the configuration of the front-end server.
+FILE_DELIVERY = os.environ.get('FILE_DELIVERY', 'stream')
+
+# Internal location of nginx aliasing MEDIA_ROOT, that X-Accel-Redirect points to
+FILE_DELIVERY_INTERNAL_URL = '/protected-media/'
+
+# Threads generating the thumbnails and previews of documents in the background
+PREVIEW_WORKERS = 2
+
+# Largest number of pixels of an image decoded for its previews, above which it keeps the icon of its file type
+PREVIEW_MAX_PIXELS = 50_000_000
+
+# Seconds between two checks of the typeahead indexes for rows changed by another process, an import or a seeder
+TYPEAHEAD_CHECK_INTERVAL = 5
+
+# Session store timing its loads and saves for the Server-Timing header, stored like the default database sessions
+SESSION_ENGINE = 'portfolio.sessions'
+
 # Setting Cache for faster retrieval
 # CACHES = {
 #     'default': {
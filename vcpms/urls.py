@@ -36,6 +36,7 @@ urlpatterns = [
     path('portfolio_company/unarchive/<int:company_id>', views.unarchive_company, name='unarchive_company'),
     path('change_company_layout/', views.change_company_layout, name='change_company_layout'),
     path('change_company_filter/', views.change_company_filter, name='change_company_filter'),
+    path('companies_next_page/', views.companies_next_page, name='companies_next_page'),
 
     # Individual CRUD
     path("individual_page/individual_create/", views.individual_create, name="individual_create"),
@@ -50,6 +51,7 @@ urlpatterns = [
     path('individual_page/unarchive/<int:id>', views.unarchive_individual, name='unarchive_individual'),
     path('change_individual_layout/', views.change_individual_layout, name='change_individual_layout'),
     path('change_individual_filter/', views.change_individual_filter, name='change_individual_filter'),
+    path('individuals_next_page/', views.individuals_next_page, name='individuals_next_page'),
 
     # Individual Search
 
@@ -64,10 +66,14 @@ urlpatterns = [
     # Programme CRUD
     path("select2/", include("django_select2.urls")),
     path("programme_page/", views.ProgrammeListView.as_view(), name="programme_list"),
+    path("programmes_next_page/",
+         views.ProgrammeListView.as_view(template_name='programmes/programme/programme_page_items.html'),
+         name="programmes_next_page"),
     path("programme_page/create/", views.ProgrammeCreateView.as_view(), name="programme_create"),
     path("programme_page/<int:id>/update/", views.ProgrammeUpdateView.as_view(), name="programme_update"),
     path("programme_page/<int:id>/delete/", views.ProgrammeDeleteView.as_view(), name="programme_delete"),
     path("programme_page/<int:id>", views.ProgrammeDetailView.as_view(), name="programme_detail"),
+    path("programme_page/<int:id>/cover", views.programme_cover, name="programme_cover"),
     path('programme_page/search_result', views.SearchProgramme.as_view(), name="programme_search_result"),
 
     # Archive views
@@ -78,6 +84,9 @@ urlpatterns = [
          name='change_archived_company_filter'),
     path('change_archived_individual_filter/', views.change_archived_individual_filter,
          name='change_archived_individual_filter'),
+    path('archived_companies_next_page/', views.archived_companies_next_page, name='archived_companies_next_page'),
+    path('archived_individuals_next_page/', views.archived_individuals_next_page,
+         name='archived_individuals_next_page'),
 
     # Settings views
     path("account_settings/", views.account_settings, name="account_settings"),
@@ -85,10 +94,13 @@ urlpatterns = [
     path("account_settings/contact_details", views.contact_details, name="contact_details"),
     path("account_settings/upload_profile_picture", views.upload_profile_picture, name="upload_profile_picture"),
     path("account_settings/remove_profile_picture", views.remove_profile_picture, name="remove_profile_picture"),
+    path("profile_picture/<int:user_id>", views.profile_picture, name="profile_picture"),
     path("deactivate_account", views.deactivate_account, name="deactivate_account"),
 
     # Permissions
     path("permissions/users/", views.UserListView.as_view(), name="permission_user_list"),
+    path("permissions/users_next_page/", views.UserListView.as_view(template_name='permissions/user_page_items.html'),
+         name="permission_users_next_page"),
     path("permissions/create_user/", views.UserSignUpFormView.as_view(), name="permission_create_user"),
     path("permissions/<int:id>/edit_user/", views.UserEditFormView.as_view(), name="permission_edit_user"),
     path("permissions/<int:id>/delete_user/", views.UserDeleteView.as_view(), name="permission_delete_user"),
@@ -119,17 +131,37 @@ urlpatterns = [
          name="individual_document_upload"),
     path("programme_page/<int:programme_id>/upload_document/", views.programme_document_upload,
          name="programme_document_upload"),
+    path("uploads/", views.upload_init, name="upload_init"),
+    path("uploads/<uuid:upload_id>", views.upload_chunk, name="upload_chunk"),
+    path("uploads/<uuid:upload_id>/finalize", views.upload_finalize, name="upload_finalize"),
     path("redirect/<int:file_id>", views.open_url, name="open_url"),
     path("download_document/<int:file_id>", views.download_document, name="download_document"),
+    path("document_preview/<int:file_id>/<str:size>", views.document_preview, name="document_preview"),
     path("document_permissions/<int:file_id>", views.change_permissions, name="change_permissions"),
     path("delete_document/<int:file_id>", views.delete_document, name="delete_document"),
 
     # ContractRights
     path("contract_right_list/<int:investment_id>", views.ContractRightsListView.as_view(), name='contract_right_list'),
+    path("contract_rights_next_page/<int:investment_id>",
+         views.ContractRightsListView.as_view(
+             template_name='investment/contract_rights/contract_right_page_items.html'),
+         name='contract_rights_next_page'),
     path("contract_right/create/<int:investment_id>", views.ContractRightCreateView.as_view(),
          name='contract_right_create'),
     path("contract_right/delete/<int:id>", views.ContractRightDeleteView.as_view(), name='contract_right_delete'),
 
+    # Imports and exports
+    path("import/", views.import_portfolio, name="import_portfolio"),
+    path("export/<str:dataset>/<str:export_format>", views.export_data, name="export_data"),
+
+    # Monitoring
+    path("metrics", views.metrics, name="metrics"),
+    path("slow_queries/", views.slow_query_report, name="slow_query_report"),
+    path("templates_report/", views.template_report, name="template_report"),
+    path("profiles/", views.profile_list, name="profile_list"),
+    path("profiles/<str:profile_id>/", views.profile_detail, name="profile_detail"),
+    path("profiles/<str:profile_id>/download/", views.profile_download, name="profile_download"),
+
 ]
 
 if settings.DEBUG: